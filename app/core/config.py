@@ -86,6 +86,10 @@ class Settings(BaseSettings):
     # 队列轮询/清理间隔（秒）
     QUEUE_POLL_INTERVAL_SECONDS: float = Field(default=1.0)
     QUEUE_CLEANUP_INTERVAL_SECONDS: float = Field(default=60.0)
+    # Worker 并发：单进程同时执行的分析任务数；阻塞出队等待时长需小于 Redis socket_timeout
+    WORKER_CONCURRENCY: int = Field(default=1)
+    QUEUE_BLOCK_TIMEOUT_SECONDS: float = Field(default=5.0)
+    WORKER_DRAIN_TIMEOUT_SECONDS: float = Field(default=600.0)
 
     # 并发控制
     DEFAULT_USER_CONCURRENT_LIMIT: int = Field(default=3)
@@ -135,6 +139,11 @@ class Settings(BaseSettings):
     SSE_TASK_MAX_IDLE_SECONDS: int = Field(default=300)
     SSE_BATCH_POLL_INTERVAL_SECONDS: float = Field(default=2.0)
     SSE_BATCH_MAX_IDLE_SECONDS: int = Field(default=600)
+    # SSE 进度订阅中心（进程级单个 PSUBSCRIBE 连接）
+    SSE_HUB_CLIENT_BUFFER: int = Field(default=100)  # 每个客户端缓冲的消息数，满时合并/丢弃旧进度
+    SSE_HUB_REPLAY_SIZE: int = Field(default=50)  # 每个频道保留用于 Last-Event-ID 续传的消息数
+    SSE_HUB_HISTORY_TTL_SECONDS: float = Field(default=900.0)
+    SSE_HUB_READ_TIMEOUT_SECONDS: float = Field(default=5.0)
 
 
     # 监控配置
@@ -196,6 +205,8 @@ class Settings(BaseSettings):
     TUSHARE_QUOTES_SYNC_CRON: str = Field(default="*/5 9-15 * * 1-5")  # 交易时间每5分钟
     TUSHARE_HISTORICAL_SYNC_ENABLED: bool = Field(default=True)
     TUSHARE_HISTORICAL_SYNC_CRON: str = Field(default="0 16 * * 1-5")  # 工作日16点
+    TUSHARE_DATE_MAJOR_SYNC: bool = Field(default=True, description="全市场日线增量同步按交易日批量获取")
+    TUSHARE_DATE_MAJOR_LOOKBACK_DAYS: int = Field(default=30, ge=1, le=365, description="按交易日同步时检查缺失的回溯天数")
     TUSHARE_FINANCIAL_SYNC_ENABLED: bool = Field(default=True)
     TUSHARE_FINANCIAL_SYNC_CRON: str = Field(default="0 3 * * 0")  # 周日凌晨3点
     TUSHARE_STATUS_CHECK_ENABLED: bool = Field(default=True)
@@ -223,6 +234,14 @@ class Settings(BaseSettings):
     AKSHARE_INIT_HISTORICAL_DAYS: int = Field(default=365, ge=1, le=3650, description="初始化历史数据天数")
     AKSHARE_INIT_BATCH_SIZE: int = Field(default=100, ge=10, le=1000, description="初始化批处理大小")
     AKSHARE_INIT_AUTO_START: bool = Field(default=False, description="应用启动时自动检查并初始化数据")
+    AKSHARE_RATE_LIMIT_PER_MINUTE: int = Field(default=120, ge=1, le=6000, description="AKShare逐只股票同步每分钟最大请求数")
+    BAOSTOCK_RATE_LIMIT_PER_MINUTE: int = Field(default=100, ge=1, le=6000, description="BaoStock逐只股票同步每分钟最大请求数")
+
+    # 逐只股票同步流水线（Tushare/AKShare/BaoStock/港股/美股共用）
+    SYNC_PIPELINE_FETCHERS: int = Field(default=4, ge=1, le=32, description="并发获取协程数（仍受数据源速率限制器约束）")
+    SYNC_PIPELINE_WRITERS: int = Field(default=2, ge=1, le=16, description="MongoDB写入协程数")
+    SYNC_PIPELINE_PROGRESS_EVERY: int = Field(default=50, ge=1, le=10000, description="每完成多少只股票更新一次进度和断点")
+    SYNC_CHECKPOINT_ENABLED: bool = Field(default=True, description="全市场同步按股票记录断点，中断后重跑时跳过已完成股票")
 
     # ==================== 债券（BOND_CN）同步配置 ====================
     BONDS_SYNC_ENABLED: bool = Field(default=True, description="启用债券同步任务")
@@ -348,12 +367,14 @@ class Settings(BaseSettings):
     # 港股数据源配置（按需获取+缓存模式）
     HK_DATA_CACHE_HOURS: int = Field(default=24, ge=1, le=168, description="港股数据缓存时长（小时）")
     HK_DEFAULT_DATA_SOURCE: str = Field(default="yfinance", description="港股默认数据源（yfinance/akshare）")
+    HK_SYNC_RATE_LIMIT_PER_MINUTE: int = Field(default=120, ge=1, le=6000, description="港股行情同步每分钟最大请求数")
 
     # ==================== 美股数据配置 ====================
 
     # 美股数据源配置（按需获取+缓存模式）
     US_DATA_CACHE_HOURS: int = Field(default=24, ge=1, le=168, description="美股数据缓存时长（小时）")
     US_DEFAULT_DATA_SOURCE: str = Field(default="yfinance", description="美股默认数据源（yfinance/finnhub）")
+    US_SYNC_RATE_LIMIT_PER_MINUTE: int = Field(default=120, ge=1, le=6000, description="美股行情同步每分钟最大请求数")
 
     # ===== 新闻数据同步服务配置 =====
     NEWS_SYNC_ENABLED: bool = Field(default=True)
@@ -363,6 +384,11 @@ class Settings(BaseSettings):
     NEWS_SYNC_SOURCES: str = Field(default="tushare,akshare", description="新闻同步使用的数据源，逗号分隔（默认不含realtime）")
     NEWS_SYNC_DISABLE_INTRADAY: bool = Field(default=True, description="是否禁止在盘中抓取新闻（工作日 09:30-11:30, 13:00-15:00）")
 
+    # ===== 数据库导入导出配置 =====
+    DATABASE_EXPORT_BATCH_SIZE: int = Field(default=1000, ge=1, le=100000, description="导出时每批从游标读取的文档数")
+    DATABASE_EXPORT_CONCURRENCY: int = Field(default=3, ge=1, le=16, description="同时导出的集合数")
+    DATABASE_IMPORT_BATCH_SIZE: int = Field(default=1000, ge=1, le=100000, description="导入时每次 insert_many 的文档数")
+
     @property
     def is_production(self) -> bool:
         """是否为生产环境"""
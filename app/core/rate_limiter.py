@@ -202,19 +202,19 @@ def get_tushare_rate_limiter(tier: str = "standard", safety_margin: float = 0.8)
     return _tushare_limiter
 
 
-def get_akshare_rate_limiter() -> AKShareRateLimiter:
-    """获取AKShare速率限制器（单例）"""
+def get_akshare_rate_limiter(max_calls: int = 60, time_window: float = 60) -> AKShareRateLimiter:
+    """获取AKShare速率限制器（单例，参数仅在首次创建时生效）"""
     global _akshare_limiter
     if _akshare_limiter is None:
-        _akshare_limiter = AKShareRateLimiter()
+        _akshare_limiter = AKShareRateLimiter(max_calls=max_calls, time_window=time_window)
     return _akshare_limiter
 
 
-def get_baostock_rate_limiter() -> BaoStockRateLimiter:
-    """获取BaoStock速率限制器（单例）"""
+def get_baostock_rate_limiter(max_calls: int = 100, time_window: float = 60) -> BaoStockRateLimiter:
+    """获取BaoStock速率限制器（单例，参数仅在首次创建时生效）"""
     global _baostock_limiter
     if _baostock_limiter is None:
-        _baostock_limiter = BaoStockRateLimiter()
+        _baostock_limiter = BaoStockRateLimiter(max_calls=max_calls, time_window=time_window)
     return _baostock_limiter
 
 
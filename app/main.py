@@ -1031,6 +1031,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"UserService cleanup error: {e}")
 
+        # 关闭 SSE 进度订阅中心
+        try:
+            from app.services.progress.pubsub_hub import close_progress_hub
+            await close_progress_hub()
+        except Exception as e:
+            logger.warning(f"ProgressHub cleanup error: {e}")
+
         await close_db()
         logger.info("TradingAgents FastAPI backend stopped")
 
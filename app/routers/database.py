@@ -2,9 +2,12 @@
 数据库管理API路由
 """
 
+import asyncio
 import logging
 import json
 import os
+import shutil
+import tempfile
 from datetime import datetime
 from typing import Dict, Any, List
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
@@ -33,8 +36,9 @@ class ImportRequest(BaseModel):
 class ExportRequest(BaseModel):
     """导出请求"""
     collections: List[str] = []  # 空列表表示导出所有集合
-    format: str = "json"  # json, csv
+    format: str = "json"  # json, ndjson, csv, parquet, xlsx
     sanitize: bool = False  # 是否脱敏（清空敏感字段，用于演示系统）
+    compress: bool = False  # 是否 gzip 压缩（json/ndjson/csv）
 
 # 响应模型
 class DatabaseStatusResponse(BaseModel):
@@ -179,17 +183,23 @@ async def import_data(
         logger.info(f"   格式: {format}")
         logger.info(f"   覆盖模式: {overwrite}")
 
-        # 读取文件内容
-        content = await file.read()
-        logger.info(f"   文件大小: {len(content)} 字节")
+        # 上传内容先分块落盘，导入时再流式解析，避免整个文件驻留内存
+        suffix = os.path.splitext(file.filename or "")[1]
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, tmp, 1024 * 1024)
+            upload_path = tmp.name
+        logger.info(f"   文件大小: {os.path.getsize(upload_path)} 字节")
 
-        result = await database_service.import_data(
-            content=content,
-            collection=collection,
-            format=format,
-            overwrite=overwrite,
-            filename=file.filename
-        )
+        try:
+            result = await database_service.import_data(
+                content=upload_path,
+                collection=collection,
+                format=format,
+                overwrite=overwrite,
+                filename=file.filename
+            )
+        finally:
+            os.remove(upload_path)
 
         logger.info(f"✅ 导入成功: {result}")
 
@@ -220,7 +230,8 @@ async def export_data(
         file_path = await database_service.export_data(
             collections=request.collections,
             format=request.format,
-            sanitize=request.sanitize
+            sanitize=request.sanitize,
+            compress=request.compress
         )
 
         return FileResponse(
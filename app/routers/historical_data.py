@@ -3,6 +3,7 @@
 历史数据查询API
 提供统一的历史K线数据查询接口
 """
+import asyncio
 import logging
 from datetime import datetime, date
 from typing import Dict, Any, List, Optional
@@ -153,6 +154,41 @@ async def get_latest_date(
         raise HTTPException(status_code=500, detail=f"查询失败: {e}")
 
 
+@router.get("/coverage")
+async def get_coverage(
+    data_source: str = Query(..., description="数据源 (tushare/akshare/baostock)"),
+    period: str = Query("daily", description="数据周期 (daily/weekly/monthly)"),
+    as_of: Optional[str] = Query(None, description="期望的最新交易日 (YYYY-MM-DD)，默认取已有数据的最大日期"),
+    include_symbols: bool = Query(False, description="是否返回每只股票的最后交易日"),
+    check_latest: bool = Query(False, description="用数据完整性检查器核对最新交易日"),
+    refresh: bool = Query(False, description="忽略缓存重新聚合")
+):
+    """获取历史数据覆盖情况（每只股票的最后交易日）"""
+    try:
+        service = await get_historical_data_service()
+        summary = await service.get_coverage_summary(data_source, period, as_of=as_of, refresh=refresh)
+        last_dates = await service.get_coverage_map(data_source, period)
+        if include_symbols:
+            summary["symbols"] = last_dates
+        if check_latest:
+            from tradingagents.dataflows.data_completeness_checker import get_data_completeness_checker
+            # 获取最新交易日可能访问外部接口，放到线程中执行
+            is_complete, message, details = await asyncio.to_thread(
+                get_data_completeness_checker().check_coverage, last_dates, "CN", as_of
+            )
+            summary["completeness"] = {"is_complete": is_complete, "message": message, **details}
+
+        return {
+            "success": True,
+            "data": summary,
+            "message": "查询成功"
+        }
+
+    except Exception as e:
+        logger.error(f"获取覆盖情况失败 {data_source}/{period}: {e}")
+        raise HTTPException(status_code=500, detail=f"查询失败: {e}")
+
+
 @router.get("/statistics")
 async def get_data_statistics():
     """获取历史数据统计信息"""
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 import asyncio
 import json
 import logging
 import time
+from typing import Any, Optional
 
 from app.routers.auth_db import get_current_user
-from app.core.database import get_redis_client
 from app.core.config import settings
+from app.services.progress.pubsub_hub import get_progress_hub
 
 from app.services.queue_service import get_queue_service, QueueService
 
@@ -15,104 +16,68 @@ router = APIRouter()
 logger = logging.getLogger("webapi.sse")
 
 
-async def task_progress_generator(task_id: str, user_id: str):
-    """Generate SSE events for task progress updates"""
-    r = get_redis_client()
-    pubsub = None
+def _sse_event(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """格式化一条 SSE 消息"""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {payload}\n\n"
+
+
+async def task_progress_generator(task_id: str, user_id: str, last_event_id: Optional[str] = None):
+    """Generate SSE events for task progress updates
+
+    通过进程级 ProgressHub 订阅（共享单个 PSUBSCRIBE 连接），不再为每个连接单独创建 PubSub。
+    """
     channel = f"task_progress:{task_id}"
+    sub = None
 
     try:
         # Load dynamic SSE settings
         try:
             from app.services.config_provider import provider as config_provider
             eff = await config_provider.get_effective_system_settings()
-            poll_timeout = float(eff.get("sse_poll_timeout_seconds", 1.0))
             heartbeat_every = int(eff.get("sse_heartbeat_interval_seconds", 10))
             max_idle_seconds = int(eff.get("sse_task_max_idle_seconds", 300))
         except Exception:
-            poll_timeout = float(getattr(settings, "SSE_POLL_TIMEOUT_SECONDS", 1.0))
             heartbeat_every = int(getattr(settings, "SSE_HEARTBEAT_INTERVAL_SECONDS", 10))
             max_idle_seconds = int(getattr(settings, "SSE_TASK_MAX_IDLE_SECONDS", 300))
 
-        # 🔥 修复：创建 PubSub 连接
-        pubsub = r.pubsub()
-        logger.info(f"📡 [SSE-Task] 创建 PubSub 连接: task={task_id}, user={user_id}")
+        sub = await get_progress_hub().subscribe([channel], last_event_id=last_event_id)
+        logger.info(f"📡 [SSE-Task] 已订阅: task={task_id}, user={user_id}, resume_from={last_event_id}")
 
-        # 🔥 修复：订阅频道（可能失败，需要确保 pubsub 被清理）
-        try:
-            await pubsub.subscribe(channel)
-            logger.info(f"✅ [SSE-Task] 订阅频道成功: {channel}")
-            # Send initial connection confirmation
-            yield f"event: connected\ndata: {{\"task_id\": \"{task_id}\", \"message\": \"已连接进度流\"}}\n\n"
-        except Exception as subscribe_error:
-            # 🔥 订阅失败时立即清理 pubsub 连接
-            logger.error(f"❌ [SSE-Task] 订阅频道失败: {subscribe_error}")
-            try:
-                await pubsub.close()
-                logger.info(f"🧹 [SSE-Task] 订阅失败后已关闭 PubSub 连接")
-            except Exception as close_error:
-                logger.error(f"❌ [SSE-Task] 关闭 PubSub 连接失败: {close_error}")
-            # 重新抛出异常，让外层 except 处理
-            raise
-
-        # Listen for progress updates
-        idle_elapsed = 0.0
-        last_hb = time.monotonic()
-
-        while idle_elapsed < max_idle_seconds:
-            try:
-                message = await asyncio.wait_for(pubsub.get_message(ignore_subscribe_messages=True), timeout=poll_timeout)
-                if message and message['type'] == 'message':
-                    # Reset idle timer on valid message
-                    idle_elapsed = 0.0
-                    try:
-                        progress_data = json.loads(message['data'])
-                        yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
-                    except json.JSONDecodeError:
-                        logger.warning(f"Invalid JSON in progress message: {message['data']}")
-                else:
-                    # No update: accumulate idle time and send heartbeat if due
-                    idle_elapsed += poll_timeout
-                    now = time.monotonic()
-                    if now - last_hb >= heartbeat_every:
-                        yield f"event: heartbeat\ndata: {{\"timestamp\": \"{asyncio.get_event_loop().time()}\"}}\n\n"
-                        last_hb = now
+        # Send initial connection confirmation
+        yield _sse_event("connected", {"task_id": task_id, "message": "已连接进度流"})
 
-            except asyncio.TimeoutError:
-                idle_elapsed += poll_timeout
-                continue
+        # Listen for progress updates: 无消息时按心跳间隔唤醒，空闲超时后结束
+        last_activity = time.monotonic()
+        while True:
+            idle = time.monotonic() - last_activity
+            if idle >= max_idle_seconds:
+                break
+            event = await sub.get(timeout=min(heartbeat_every, max_idle_seconds - idle))
+            if event is not None:
+                last_activity = time.monotonic()
+                yield _sse_event("progress", event.data, event_id=event.id)
+            else:
+                yield _sse_event("heartbeat", {"timestamp": str(asyncio.get_event_loop().time())})
 
     except Exception as e:
         logger.exception(f"SSE error for task {task_id}: {e}")
-        yield f"event: error\ndata: {{\"error\": \"连接异常: {str(e)}\"}}\n\n"
+        yield _sse_event("error", {"error": f"连接异常: {str(e)}"})
     finally:
-        # 🔥 修复：确保在所有情况下都释放连接
-        if pubsub:
-            logger.info(f"🧹 [SSE-Task] 清理 PubSub 连接: task={task_id}")
-
-            # 分步骤关闭，确保即使 unsubscribe 失败也能关闭连接
-            try:
-                await pubsub.unsubscribe(channel)
-                logger.debug(f"✅ [SSE-Task] 已取消订阅频道: {channel}")
-            except Exception as e:
-                logger.warning(f"⚠️ [SSE-Task] 取消订阅失败（将继续关闭连接）: {e}")
-
-            try:
-                await pubsub.close()
-                logger.info(f"✅ [SSE-Task] PubSub 连接已关闭: task={task_id}")
-            except Exception as e:
-                logger.error(f"❌ [SSE-Task] 关闭 PubSub 连接失败: {e}", exc_info=True)
-                # 即使关闭失败，也尝试重置连接
-                try:
-                    await pubsub.reset()
-                    logger.info(f"🔄 [SSE-Task] PubSub 连接已重置: task={task_id}")
-                except Exception as reset_error:
-                    logger.error(f"❌ [SSE-Task] 重置 PubSub 连接也失败: {reset_error}")
+        if sub is not None:
+            sub.close()
+            logger.info(f"🧹 [SSE-Task] 已取消订阅: task={task_id}")
 
 
 async def batch_progress_generator(batch_id: str, user_id: str):
-    """Generate SSE events for batch progress updates"""
+    """Generate SSE events for batch progress updates
+
+    批次内任务的进度消息经 ProgressHub 触发即时刷新，否则按轮询间隔刷新；
+    任务状态通过一次 pipeline 批量读取。
+    """
     svc = get_queue_service()
+    sub = None
 
     try:
         # Load dynamic SSE settings for batch stream
@@ -126,45 +91,37 @@ async def batch_progress_generator(batch_id: str, user_id: str):
             batch_max_idle_seconds = int(getattr(settings, "SSE_BATCH_MAX_IDLE_SECONDS", 600))
 
         # Send initial connection confirmation
-        yield f"event: connected\ndata: {{\"batch_id\": \"{batch_id}\", \"message\": \"已连接批次进度流\"}}\n\n"
+        yield _sse_event("connected", {"batch_id": batch_id, "message": "已连接批次进度流"})
 
-        idle_elapsed = 0.0
+        started = time.monotonic()
 
-        while idle_elapsed < batch_max_idle_seconds:
+        while time.monotonic() - started < batch_max_idle_seconds:
             try:
                 # Get current batch status
                 batch_data = await svc.get_batch(batch_id)
                 if not batch_data:
-                    yield f"event: error\ndata: {{\"error\": \"批次不存在\"}}\n\n"
+                    yield _sse_event("error", {"error": "批次不存在"})
                     break
 
                 # Check if batch belongs to user
                 if batch_data.get("user") != user_id:
-                    yield f"event: error\ndata: {{\"error\": \"无权限访问此批次\"}}\n\n"
+                    yield _sse_event("error", {"error": "无权限访问此批次"})
                     break
 
                 # Calculate batch progress based on task statuses
                 task_ids = batch_data.get("tasks", [])
                 if not task_ids:
-                    yield f"event: progress\ndata: {{\"batch_id\": \"{batch_id}\", \"message\": \"批次无任务\", \"progress\": 0}}\n\n"
+                    yield _sse_event("progress", {"batch_id": batch_id, "message": "批次无任务", "progress": 0})
                     await asyncio.sleep(batch_poll_interval)
-                    idle_elapsed += batch_poll_interval
                     continue
 
-                completed_count = 0
-                failed_count = 0
-                processing_count = 0
-
-                for task_id in task_ids:
-                    task_data = await svc.get_task(task_id)
-                    if task_data:
-                        status = task_data.get("status", "queued")
-                        if status == "completed":
-                            completed_count += 1
-                        elif status == "failed":
-                            failed_count += 1
-                        elif status == "processing":
-                            processing_count += 1
+                if sub is None:
+                    sub = await get_progress_hub().subscribe(f"task_progress:{t}" for t in task_ids)
+
+                statuses = await svc.get_task_statuses(task_ids)
+                completed_count = sum(1 for s in statuses if s == "completed")
+                failed_count = sum(1 for s in statuses if s == "failed")
+                processing_count = sum(1 for s in statuses if s == "processing")
 
                 total_tasks = len(task_ids)
                 finished_tasks = completed_count + failed_count
@@ -200,37 +157,46 @@ async def batch_progress_generator(batch_id: str, user_id: str):
                     "timestamp": asyncio.get_event_loop().time()
                 }
 
-                yield f"event: progress\ndata: {json.dumps(progress_data, ensure_ascii=False)}\n\n"
+                yield _sse_event("progress", progress_data)
 
                 # Break if batch is finished
                 if batch_status in ["completed", "failed", "partial"]:
-                    yield f"event: finished\ndata: {{\"batch_id\": \"{batch_id}\", \"final_status\": \"{batch_status}\"}}\n\n"
+                    yield _sse_event("finished", {"batch_id": batch_id, "final_status": batch_status})
                     break
 
-                # Wait before next update
-                await asyncio.sleep(batch_poll_interval)
-                idle_elapsed += batch_poll_interval
+                # 等待批次内任一任务的进度消息（即时刷新）或轮询间隔到期；积压的消息一并消费
+                if await sub.get(timeout=batch_poll_interval) is not None:
+                    while await sub.get(timeout=0) is not None:
+                        pass
 
             except Exception as e:
                 logger.exception(f"Batch progress error: {e}")
-                yield f"event: error\ndata: {{\"error\": \"获取批次状态失败: {str(e)}\"}}\n\n"
+                yield _sse_event("error", {"error": f"获取批次状态失败: {str(e)}"})
                 break
 
     except Exception as e:
         logger.exception(f"SSE batch error for {batch_id}: {e}")
-        yield f"event: error\ndata: {{\"error\": \"连接异常: {str(e)}\"}}\n\n"
+        yield _sse_event("error", {"error": f"连接异常: {str(e)}"})
+    finally:
+        if sub is not None:
+            sub.close()
 
 
 @router.get("/tasks/{task_id}")
-async def stream_task_progress(task_id: str, user: dict = Depends(get_current_user), svc: QueueService = Depends(get_queue_service)):
-    """Stream real-time progress updates for a specific task"""
+async def stream_task_progress(
+    task_id: str,
+    user: dict = Depends(get_current_user),
+    svc: QueueService = Depends(get_queue_service),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Stream real-time progress updates for a specific task (supports Last-Event-ID resume)"""
     # Verify task exists and belongs to user
     task_data = await svc.get_task(task_id)
     if not task_data or task_data.get("user") != user["id"]:
         raise HTTPException(status_code=404, detail="Task not found")
 
     return StreamingResponse(
-        task_progress_generator(task_id, user["id"]),
+        task_progress_generator(task_id, user["id"], last_event_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
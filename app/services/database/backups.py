@@ -7,10 +7,13 @@ import json
 import os
 import gzip
 import asyncio
+import contextlib
+import uuid
 import subprocess
 import shutil
+import tempfile
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 import logging
 
 from bson import ObjectId
@@ -18,6 +21,7 @@ from bson import ObjectId
 from app.core.database import get_mongo_db
 from app.core.config import settings
 from .serialization import serialize_document
+from . import streaming
 
 logger = logging.getLogger(__name__)
 
@@ -262,141 +266,176 @@ def _convert_date_fields(doc: dict) -> dict:
     return doc
 
 
-async def import_data(content: bytes, collection: str, *, format: str = "json", overwrite: bool = False, filename: str | None = None) -> Dict[str, Any]:
+def _prepare_import_document(doc: Any) -> Any:
+    """还原 _id（字符串 -> ObjectId）和日期字段"""
+    if not isinstance(doc, dict):
+        return doc
+    if "_id" in doc and isinstance(doc["_id"], str):
+        try:
+            doc["_id"] = ObjectId(doc["_id"])
+        except Exception:
+            del doc["_id"]
+
+    # 🔥 转换日期字段（字符串 -> datetime）
+    return _convert_date_fields(doc)
+
+
+def _detect_import_format(format: str, filename: str | None) -> str:
+    fmt = format.lower()
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if fmt == "json" and name.endswith((".ndjson", ".jsonl")):
+        fmt = "ndjson"
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in ("json", "ndjson"):
+        raise Exception(f"不支持的格式: {format}")
+    return fmt
+
+
+def _index_keys(info: Dict[str, Any]) -> List[tuple]:
     """
-    导入数据到数据库
+    index_information() 条目还原为 create_index 的键列表
 
-    支持两种导入模式：
-    1. 单集合模式：导入数据到指定集合
-    2. 多集合模式：导入包含多个集合的导出文件（自动检测）
+    文本索引的 key 是内部形式 [(前缀字段...), ("_fts", "text"), ("_ftsx", 1), (后缀字段...)]，
+    文本字段要从 weights 还原。
     """
-    db = get_mongo_db()
+    keys = list(info["key"])
+    names = [name for name, _ in keys]
+    if "_fts" not in names:
+        return keys
+    prefix = keys[:names.index("_fts")]
+    suffix = keys[names.index("_ftsx") + 1:] if "_ftsx" in names else []
+    return prefix + [(field, "text") for field in info.get("weights", {})] + suffix
 
-    if format.lower() == "json":
-        # 🔥 使用 asyncio.to_thread 将阻塞的 JSON 解析放到线程池执行
-        def _parse_json():
-            return json.loads(content.decode("utf-8"))
 
-        data = await asyncio.to_thread(_parse_json)
-    else:
-        raise Exception(f"不支持的格式: {format}")
+async def _copy_indexes(db, source: str, target: str) -> None:
+    """
+    把 source 集合现有的二级索引建到 target 上（rename 替换集合时索引随集合一起被替换）
 
-    # 检测是否为多集合导出格式
-    logger.info(f"🔍 [导入检测] 数据类型: {type(data)}")
+    单个索引重建失败只记录警告，不影响已经成功的导入。
+    """
+    for name, info in (await db[source].index_information()).items():
+        if name == "_id_":
+            continue
+        options = {k: v for k, v in info.items() if k not in ("key", "v", "ns")}
+        try:
+            await db[target].create_index(_index_keys(info), name=name, **options)
+        except Exception as e:
+            logger.warning(f"⚠️ 重建索引失败，已跳过 {source}.{name}: {e}")
 
-    # 🔥 新格式：包含 export_info 和 data 的字典
-    if isinstance(data, dict) and "export_info" in data and "data" in data:
-        logger.info(f"📦 检测到新版多集合导出文件（包含 export_info）")
-        export_info = data.get("export_info", {})
-        logger.info(f"📋 导出信息: 创建时间={export_info.get('created_at')}, 集合数={len(export_info.get('collections', []))}")
 
-        # 提取实际数据
-        data = data["data"]
-        logger.info(f"📦 包含 {len(data)} 个集合: {list(data.keys())}")
+async def import_data(content: Union[bytes, str, os.PathLike], collection: str, *, format: str = "json", overwrite: bool = False,
+                      filename: str | None = None, batch_size: int | None = None) -> Dict[str, Any]:
+    """
+    导入数据到数据库
 
-    # 🔥 旧格式：直接是集合名到文档列表的映射
-    if isinstance(data, dict):
-        logger.info(f"🔍 [导入检测] 字典包含 {len(data)} 个键")
-        logger.info(f"🔍 [导入检测] 键列表: {list(data.keys())[:10]}")  # 只显示前10个
+    支持两种导入模式：
+    1. 单集合模式：导入数据到指定集合
+    2. 多集合模式：导入包含多个集合的导出文件（自动检测）
 
-        # 检查每个键值对的类型
-        for k, v in list(data.items())[:5]:  # 只检查前5个
-            logger.info(f"🔍 [导入检测] 键 '{k}': 值类型={type(v)}, 是否为列表={isinstance(v, list)}")
-            if isinstance(v, list):
-                logger.info(f"🔍 [导入检测] 键 '{k}': 列表长度={len(v)}")
+    content 可以是文件内容或文件路径；JSON/NDJSON（可 gzip 压缩）均按块流式解析，
+    文档按 batch_size 分批 insert_many，解析下一批与写入当前批重叠进行。
 
-    if isinstance(data, dict) and all(isinstance(k, str) and isinstance(v, list) for k, v in data.items()):
-        # 多集合模式
-        logger.info(f"📦 确认为多集合导入模式，包含 {len(data)} 个集合")
+    文档先写入临时集合，全部解析、写入成功后才提交到目标集合：
+    - overwrite=True：复制目标集合索引后 rename(dropTarget=True) 替换目标集合
+    - overwrite=False：用 $merge 追加到目标集合（_id 冲突时报错，与直接 insert_many 一致）
+    解析或写入中途失败时丢弃临时集合，目标集合保持原样。
+    """
+    db = get_mongo_db()
+    fmt = _detect_import_format(format, filename)
+    batch_size = batch_size or settings.DATABASE_IMPORT_BATCH_SIZE
 
-        total_inserted = 0
-        imported_collections = []
+    stream = await asyncio.to_thread(streaming.open_import_stream, content)
+    state: Dict[str, Any] = {}
+    if fmt == "json":
+        records = streaming.iter_json_records(streaming.JsonStreamReader(stream), collection, state)
+    else:
+        records = streaming.iter_ndjson_records(stream, collection, state)
+    batches = streaming.iter_batches(records, batch_size, prepare=_prepare_import_document)
 
-        for coll_name, documents in data.items():
-            if not documents:  # 跳过空集合
-                logger.info(f"⏭️ 跳过空集合: {coll_name}")
-                continue
+    inserted: Dict[str, int] = {}
+    staging: Dict[str, str] = {}  # 目标集合 -> 临时集合
+    committed: List[str] = []
 
-            collection_obj = db[coll_name]
+    def _write_target(coll_name: str) -> str:
+        if coll_name not in staging:
+            staging[coll_name] = f"{coll_name}__import_{uuid.uuid4().hex[:8]}"
+        return staging[coll_name]
 
+    next_batch: Optional[asyncio.Future] = None
+    try:
+        # 🔥 解析在线程池执行，并预取下一批
+        next_batch = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+        while True:
+            item = await next_batch
+            if item is None:
+                break
+            next_batch = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+
+            coll_name, documents = item
+            if coll_name not in inserted:
+                logger.info(f"📥 开始导入集合 {coll_name}（{state.get('mode')}）")
+                if state.get("export_info"):
+                    export_info = state["export_info"]
+                    logger.info(f"📋 导出信息: 创建时间={export_info.get('created_at')}, 集合数={len(export_info.get('collections', []))}")
+            res = await db[_write_target(coll_name)].insert_many(documents)
+            inserted[coll_name] = inserted.get(coll_name, 0) + len(res.inserted_ids)
+
+        # 全部写入成功后才提交到目标集合
+        for coll_name in list(staging):
+            temp_name = staging[coll_name]
             if overwrite:
-                deleted_count = await collection_obj.delete_many({})
-                logger.info(f"🗑️ 清空集合 {coll_name}：删除 {deleted_count.deleted_count} 条文档")
-
-            # 处理 _id 字段和日期字段
-            for doc in documents:
-                # 转换 _id
-                if "_id" in doc and isinstance(doc["_id"], str):
-                    try:
-                        doc["_id"] = ObjectId(doc["_id"])
-                    except Exception:
-                        del doc["_id"]
-
-                # 🔥 转换日期字段（字符串 -> datetime）
-                _convert_date_fields(doc)
-
-            # 插入数据
-            if documents:
-                res = await collection_obj.insert_many(documents)
-                inserted_count = len(res.inserted_ids)
-                total_inserted += inserted_count
-                imported_collections.append(coll_name)
-                logger.info(f"✅ 导入集合 {coll_name}：{inserted_count} 条文档")
-
+                await _copy_indexes(db, coll_name, temp_name)
+                await db[temp_name].rename(coll_name, dropTarget=True)
+                logger.info(f"🔁 覆盖集合 {coll_name}：已替换为导入数据")
+            else:
+                await db[temp_name].aggregate([
+                    {"$merge": {"into": coll_name, "whenMatched": "fail", "whenNotMatched": "insert"}}
+                ]).to_list(length=None)
+                await db[temp_name].drop()
+            del staging[coll_name]
+            committed.append(coll_name)
+    finally:
+        # 预取的解析线程无法取消，等它结束后再关闭流
+        if next_batch is not None:
+            await asyncio.gather(next_batch, return_exceptions=True)
+        await asyncio.to_thread(stream.close)
+        for temp_name in staging.values():
+            with contextlib.suppress(Exception):
+                await db[temp_name].drop()
+            logger.warning(f"⚠️ 导入未完成，已丢弃临时集合 {temp_name}")
+        if staging and committed:
+            logger.warning(f"⚠️ 导入中断前已提交的集合: {', '.join(f'{c}({inserted[c]}条)' for c in committed)}")
+
+    if state.get("mode", "multi_collection") == "multi_collection":
+        for coll_name, count in inserted.items():
+            logger.info(f"✅ 导入集合 {coll_name}：{count} 条文档")
         return {
             "mode": "multi_collection",
-            "collections": imported_collections,
-            "total_collections": len(imported_collections),
-            "total_inserted": total_inserted,
+            "collections": list(inserted),
+            "total_collections": len(inserted),
+            "total_inserted": sum(inserted.values()),
             "filename": filename,
             "format": format,
             "overwrite": overwrite,
         }
-    else:
-        # 单集合模式（兼容旧版本）
-        logger.info(f"📄 单集合导入模式，目标集合: {collection}")
-        logger.info(f"🔍 [单集合模式] 数据类型: {type(data)}")
-
-        if isinstance(data, dict):
-            logger.info(f"🔍 [单集合模式] 字典包含 {len(data)} 个键")
-            logger.info(f"🔍 [单集合模式] 键列表: {list(data.keys())[:10]}")
-
-        collection_obj = db[collection]
-
-        if not isinstance(data, list):
-            logger.info(f"🔍 [单集合模式] 数据不是列表，转换为列表")
-            data = [data]
-
-        logger.info(f"🔍 [单集合模式] 准备插入 {len(data)} 条文档")
-
-        if overwrite:
-            deleted_count = await collection_obj.delete_many({})
-            logger.info(f"🗑️ 清空集合 {collection}：删除 {deleted_count.deleted_count} 条文档")
-
-        for doc in data:
-            # 转换 _id
-            if "_id" in doc and isinstance(doc["_id"], str):
-                try:
-                    doc["_id"] = ObjectId(doc["_id"])
-                except Exception:
-                    del doc["_id"]
-
-            # 🔥 转换日期字段（字符串 -> datetime）
-            _convert_date_fields(doc)
-
-        inserted_count = 0
-        if data:
-            res = await collection_obj.insert_many(data)
-            inserted_count = len(res.inserted_ids)
 
-        return {
-            "mode": "single_collection",
-            "collection": collection,
-            "inserted_count": inserted_count,
-            "filename": filename,
-            "format": format,
-            "overwrite": overwrite,
-        }
+    # 单集合模式（兼容旧版本）：覆盖模式下即使没有文档也清空目标集合
+    if overwrite and collection not in inserted:
+        deleted = await db[collection].delete_many({})
+        logger.info(f"🗑️ 清空集合 {collection}：删除 {deleted.deleted_count} 条文档")
+    inserted_count = inserted.get(collection, 0)
+    logger.info(f"✅ 单集合导入完成 {collection}：{inserted_count} 条文档")
+    return {
+        "mode": "single_collection",
+        "collection": collection,
+        "inserted_count": inserted_count,
+        "filename": filename,
+        "format": format,
+        "overwrite": overwrite,
+    }
 
 
 def _sanitize_document(doc: Any) -> Any:
@@ -445,12 +484,35 @@ def _sanitize_document(doc: Any) -> Any:
         return doc
 
 
-async def export_data(collections: Optional[List[str]] = None, *, export_dir: str, format: str = "json", sanitize: bool = False) -> str:
-    import pandas as pd
+async def export_data(collections: Optional[List[str]] = None, *, export_dir: str, format: str = "json", sanitize: bool = False,
+                      compress: bool = False, batch_size: int | None = None, concurrency: int | None = None,
+                      progress: Optional[Callable] = None) -> str:
+    """
+    流式导出数据
+
+    各集合按游标分批写入临时 NDJSON 分片（最多 concurrency 个集合并行），再流式拼装为最终文件：
+    - json: {"export_info": ..., "data": {集合: [文档...]}}（与导入格式兼容）
+    - ndjson/jsonl: 首行 export_info，其后每行 {"_collection": ..., "document": ...}
+    - csv: 单个 CSV，_collection 列标识来源集合
+    - parquet: 单个 Parquet 文件，按批次写 row group（需要 pyarrow）
+    - xlsx/excel: 每个集合一个工作表
+
+    compress=True 时 json/ndjson/csv 输出为 gzip 文件。
+    progress(collection, exported, total) 每批调用一次，可为同步或异步函数。
+    """
+    fmt = format.lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt == "excel":
+        fmt = "xlsx"
+    if fmt not in ("json", "ndjson", "csv", "parquet", "xlsx"):
+        raise Exception(f"不支持的导出格式: {format}")
 
     # 🔥 使用异步数据库连接
     db = get_mongo_db()
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    batch_size = batch_size or settings.DATABASE_EXPORT_BATCH_SIZE
+    concurrency = concurrency or settings.DATABASE_EXPORT_CONCURRENCY
 
     if not collections:
         # 🔥 异步调用 list_collection_names()
@@ -458,80 +520,61 @@ async def export_data(collections: Optional[List[str]] = None, *, export_dir: st
         collections = [c for c in collections if not c.startswith("system.")]
 
     os.makedirs(export_dir, exist_ok=True)
+    parts_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix=f".export_{timestamp}_", dir=export_dir)
+    parts = [streaming.ExportPart(name, os.path.join(parts_dir, f"{index:04d}.ndjson"))
+             for index, name in enumerate(collections)]
 
-    all_data: Dict[str, List[dict]] = {}
-    for collection_name in collections:
-        collection = db[collection_name]
-        docs: List[dict] = []
+    # 如果启用脱敏，递归清空所有敏感字段
+    transform = _sanitize_document if sanitize else None
+    semaphore = asyncio.Semaphore(concurrency)
 
+    async def _export_collection(part: streaming.ExportPart) -> None:
         # users 集合在脱敏模式下只导出空数组（保留结构，不导出实际用户数据）
-        if sanitize and collection_name == "users":
-            all_data[collection_name] = []
-            continue
-
-        # 🔥 异步迭代查询结果
-        async for doc in collection.find():
-            docs.append(serialize_document(doc))
-        all_data[collection_name] = docs
+        if sanitize and part.collection == "users":
+            await asyncio.to_thread(lambda: open(part.path, "w").close())
+            return
+        async with semaphore:
+            collection = db[part.collection]
+            total = await collection.estimated_document_count()
+            logger.info(f"📤 开始导出集合 {part.collection}（约 {total} 条）")
+            await streaming.dump_collection(
+                collection, part, batch_size=batch_size, transform=transform,
+                track_columns=fmt in ("csv", "parquet", "xlsx"), total=total, progress=progress,
+            )
+            logger.info(f"✅ 集合 {part.collection} 导出完成：{part.count} 条")
 
-    # 如果启用脱敏，递归清空所有敏感字段
-    if sanitize:
-        all_data = _sanitize_document(all_data)
+    try:
+        await asyncio.gather(*(_export_collection(part) for part in parts))
 
-    if format.lower() == "json":
-        filename = f"export_{timestamp}.json"
-        file_path = os.path.join(export_dir, filename)
-        export_data_dict = {
-            "export_info": {
-                "created_at": datetime.utcnow().isoformat(),
-                "collections": collections,
-                "format": format,
-            },
-            "data": all_data,
+        export_info = {
+            "created_at": datetime.utcnow().isoformat(),
+            "collections": collections,
+            "format": format,
         }
-
-        # 🔥 使用 asyncio.to_thread 将阻塞的文件 I/O 操作放到线程池执行
-        def _write_json():
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(export_data_dict, f, ensure_ascii=False, indent=2)
-
-        await asyncio.to_thread(_write_json)
-        return file_path
-
-    if format.lower() == "csv":
-        filename = f"export_{timestamp}.csv"
+        extension = {"json": "json", "ndjson": "ndjson", "csv": "csv", "parquet": "parquet", "xlsx": "xlsx"}[fmt]
+        filename = f"export_{timestamp}.{extension}"
+        if compress and fmt in ("json", "ndjson", "csv"):
+            filename += ".gz"
         file_path = os.path.join(export_dir, filename)
-        rows: List[dict] = []
-        for collection_name, documents in all_data.items():
-            for doc in documents:
-                row = {**doc}
-                row["_collection"] = collection_name
-                rows.append(row)
 
         # 🔥 使用 asyncio.to_thread 将阻塞的文件 I/O 操作放到线程池执行
-        def _write_csv():
-            if rows:
-                pd.DataFrame(rows).to_csv(file_path, index=False, encoding="utf-8-sig")
+        def _assemble():
+            if fmt == "parquet":
+                streaming.write_parquet(file_path, parts)
+            elif fmt == "xlsx":
+                streaming.write_excel(file_path, parts)
             else:
-                pd.DataFrame().to_csv(file_path, index=False, encoding="utf-8-sig")
-
-        await asyncio.to_thread(_write_csv)
-        return file_path
-
-    if format.lower() in ["xlsx", "excel"]:
-        filename = f"export_{timestamp}.xlsx"
-        file_path = os.path.join(export_dir, filename)
-
-        # 🔥 使用 asyncio.to_thread 将阻塞的文件 I/O 操作放到线程池执行
-        def _write_excel():
-            with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-                for collection_name, documents in all_data.items():
-                    df = pd.DataFrame(documents) if documents else pd.DataFrame()
-                    sheet = collection_name[:31]
-                    df.to_excel(writer, sheet_name=sheet, index=False)
-
-        await asyncio.to_thread(_write_excel)
+                encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+                with streaming.open_export_output(file_path, compress, encoding) as out:
+                    if fmt == "json":
+                        streaming.write_json(out, parts, export_info)
+                    elif fmt == "ndjson":
+                        streaming.write_ndjson(out, parts, export_info)
+                    else:
+                        streaming.write_csv(out, parts)
+
+        await asyncio.to_thread(_assemble)
+        logger.info(f"✅ 导出完成: {file_path}（{sum(p.count for p in parts)} 条文档）")
         return file_path
-
-    raise Exception(f"不支持的导出格式: {format}")
-
+    finally:
+        await asyncio.to_thread(shutil.rmtree, parts_dir, True)
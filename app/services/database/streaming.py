@@ -0,0 +1,448 @@
+"""
+Streaming helpers for database export/import.
+
+导出时每个集合按游标分批写入一个 NDJSON 分片（可多个集合并行），再把分片流式拼装成
+JSON / NDJSON / CSV / Parquet / Excel 最终文件；导入时逐块解析上传文件，按批次 insert_many。
+整个过程内存占用只与批次大小有关，与集合规模无关。
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .serialization import serialize_document
+
+# Excel 单个工作表最大行数（含表头）
+EXCEL_MAX_ROWS = 1_048_576
+
+
+@dataclass
+class ExportPart:
+    """单个集合的导出分片"""
+    collection: str
+    path: str
+    count: int = 0
+    # 列名 -> 出现过的值类型（CSV/Parquet/Excel 需要全部列和类型才能写表头/schema）
+    columns: Dict[str, Set[str]] = field(default_factory=dict)
+
+
+def _type_tag(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "json"
+
+
+def _cell(value: Any) -> Any:
+    """嵌套结构转为 JSON 字符串，供表格类格式写入"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+async def _notify(progress: Optional[Callable], *args) -> None:
+    if progress is None:
+        return
+    result = progress(*args)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def dump_collection(
+    collection,
+    part: ExportPart,
+    *,
+    batch_size: int = 1000,
+    transform: Optional[Callable[[dict], dict]] = None,
+    track_columns: bool = False,
+    total: Optional[int] = None,
+    progress: Optional[Callable] = None,
+) -> ExportPart:
+    """
+    按游标批次把集合写入 NDJSON 分片
+
+    序列化和写盘在线程池执行，且与下一批的游标读取重叠（最多一批在途）。
+    progress(collection, exported, total) 每批调用一次，可为同步或异步函数。
+    """
+    handle = await asyncio.to_thread(open, part.path, "w", encoding="utf-8")
+
+    def _write(batch: List[dict]) -> int:
+        lines = []
+        for doc in batch:
+            doc = serialize_document(doc)
+            if transform is not None:
+                doc = transform(doc)
+            if track_columns:
+                for key, value in doc.items():
+                    part.columns.setdefault(key, set()).add(_type_tag(value))
+            lines.append(json.dumps(doc, ensure_ascii=False, default=str))
+        handle.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    async def _flush(batch: List[dict]) -> None:
+        part.count += await asyncio.to_thread(_write, batch)
+        await _notify(progress, part.collection, part.count, total)
+
+    pending: Optional[asyncio.Future] = None
+    try:
+        batch: List[dict] = []
+        async for doc in collection.find({}, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(_flush(batch))
+                batch = []
+        if pending is not None:
+            await pending
+            pending = None
+        if batch:
+            await _flush(batch)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        await asyncio.to_thread(handle.close)
+    return part
+
+
+def _iter_part_lines(part: ExportPart) -> Iterator[str]:
+    with open(part.path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield line
+
+
+def open_export_output(path: str, compress: bool, encoding: str = "utf-8") -> IO[str]:
+    if compress:
+        return gzip.open(path, "wt", encoding=encoding, compresslevel=6, newline="")
+    return open(path, "w", encoding=encoding, newline="")
+
+
+def write_json(out: IO[str], parts: List[ExportPart], export_info: Dict[str, Any]) -> None:
+    """{"export_info": ..., "data": {集合: [文档...]}}，分片中的行原样拼接，不再解析"""
+    out.write('{\n"export_info": ' + json.dumps(export_info, ensure_ascii=False) + ',\n"data": {')
+    for index, part in enumerate(parts):
+        out.write((",\n" if index else "\n") + json.dumps(part.collection, ensure_ascii=False) + ": [")
+        separator = "\n"
+        for line in _iter_part_lines(part):
+            out.write(separator + line)
+            separator = ",\n"
+        out.write("]")
+    out.write("\n}\n}\n")
+
+
+def write_ndjson(out: IO[str], parts: List[ExportPart], export_info: Dict[str, Any]) -> None:
+    """首行为 export_info，其后每行 {"_collection": 集合, "document": 文档}"""
+    out.write(json.dumps({"export_info": export_info}, ensure_ascii=False) + "\n")
+    for part in parts:
+        prefix = '{"_collection": ' + json.dumps(part.collection, ensure_ascii=False) + ', "document": '
+        for line in _iter_part_lines(part):
+            out.write(prefix + line + "}\n")
+
+
+def _union_columns(parts: List[ExportPart]) -> Dict[str, Set[str]]:
+    columns: Dict[str, Set[str]] = {}
+    for part in parts:
+        for name, tags in part.columns.items():
+            columns.setdefault(name, set()).update(tags)
+    return columns
+
+
+def write_csv(out: IO[str], parts: List[ExportPart]) -> None:
+    """所有集合写入同一个 CSV，_collection 列标识来源集合"""
+    fieldnames = [c for c in _union_columns(parts) if c != "_collection"] + ["_collection"]
+    writer = csv.DictWriter(out, fieldnames=fieldnames, restval="", extrasaction="ignore")
+    writer.writeheader()
+    for part in parts:
+        for line in _iter_part_lines(part):
+            row = json.loads(line)
+            row["_collection"] = part.collection
+            writer.writerow(row)
+
+
+def write_parquet(path: str, parts: List[ExportPart], batch_size: int = 10000) -> None:
+    """所有集合写入同一个 Parquet 文件（按批次写 row group），_collection 列标识来源集合"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("导出 Parquet 格式需要安装 pyarrow")
+
+    columns = {name: tags - {"null"} for name, tags in _union_columns(parts).items() if name != "_collection"}
+
+    def _arrow_type(tags: Set[str]):
+        if tags == {"bool"}:
+            return pa.bool_()
+        if tags == {"int"}:
+            return pa.int64()
+        if tags and tags <= {"int", "float"}:
+            return pa.float64()
+        return pa.string()
+
+    schema = pa.schema([(name, _arrow_type(tags)) for name, tags in columns.items()] + [("_collection", pa.string())])
+    as_text = {name for name in columns if schema.field(name).type == pa.string()}
+
+    def _table(collection: str, docs: List[dict]):
+        data = {}
+        for name in columns:
+            values = [doc.get(name) for doc in docs]
+            if name in as_text:
+                values = [v if v is None or isinstance(v, str) else
+                          json.dumps(v, ensure_ascii=False, default=str) for v in values]
+            data[name] = values
+        data["_collection"] = [collection] * len(docs)
+        return pa.Table.from_pydict(data, schema=schema)
+
+    with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+        for part in parts:
+            docs: List[dict] = []
+            for line in _iter_part_lines(part):
+                docs.append(json.loads(line))
+                if len(docs) >= batch_size:
+                    writer.write_table(_table(part.collection, docs))
+                    docs = []
+            if docs:
+                writer.write_table(_table(part.collection, docs))
+
+
+def write_excel(path: str, parts: List[ExportPart]) -> None:
+    """每个集合一个工作表（openpyxl 只写模式逐行写出），超出 Excel 行数上限时续写到新工作表"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    used_titles: Set[str] = set()
+
+    def _new_sheet(base: str, header: List[str]):
+        title, n = base[:31], 1
+        while title in used_titles:
+            n += 1
+            title = f"{base[:28]}_{n}"
+        used_titles.add(title)
+        sheet = workbook.create_sheet(title)
+        if header:
+            sheet.append(header)
+        return sheet
+
+    for part in parts:
+        header = list(part.columns)
+        sheet = _new_sheet(part.collection, header)
+        rows = 1
+        for line in _iter_part_lines(part):
+            if rows >= EXCEL_MAX_ROWS:
+                sheet, rows = _new_sheet(part.collection, header), 1
+            doc = json.loads(line)
+            sheet.append([_cell(doc.get(name)) for name in header])
+            rows += 1
+    if not used_titles:
+        workbook.create_sheet("Sheet")
+    workbook.save(path)
+
+
+# ---------------------------------------------------------------------------
+# 导入
+# ---------------------------------------------------------------------------
+
+def open_import_stream(source: Union[bytes, str, os.PathLike]) -> IO[str]:
+    """打开导入源（字节内容或文件路径），自动识别 gzip"""
+    raw = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, "rb")
+    magic = raw.read(2)
+    raw.seek(0)
+    if magic == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding="utf-8-sig")
+
+
+class JsonStreamReader:
+    """
+    增量 JSON 读取器
+
+    只在需要时从流中读入下一块文本，逐个解析数组元素/对象键值，
+    每个文档用 json.JSONDecoder.raw_decode 解码，不把整个文件读入内存。
+    """
+
+    def __init__(self, stream: IO[str], chunk_size: int = 1 << 20):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（不消费）；到达末尾返回空字符串"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON 格式错误: 期望 '{char}'，实际为 {self.buf[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # 值后面还有字符才能确定数字等值没有被截断
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON 格式错误: 数组元素之间应为 ','，实际为 {char!r}")
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """逐个产出对象的键；调用方必须在取下一个键之前读完对应的值"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"JSON 格式错误: 对象成员之间应为 ','，实际为 {char!r}")
+
+
+def _iter_collection_arrays(reader: JsonStreamReader, names: Iterator[str]):
+    for name in names:
+        if reader.peek() == "[":
+            for doc in reader.iter_array():
+                yield name, doc
+        else:
+            reader.read_value()  # 非数组值不是集合，跳过
+
+
+def iter_json_records(reader: JsonStreamReader, default_collection: str, state: Dict[str, Any]):
+    """
+    识别三种 JSON 导入格式并逐条产出 (集合, 文档)：
+
+    - 新版多集合导出 {"export_info": ..., "data": {集合: [文档...]}}
+    - 旧版多集合导出 {集合: [文档...]}
+    - 单集合：文档数组或单个文档
+
+    export_info 先于 data 出现时（本模块导出的格式）data 按块流式解析；其余顶层对象要读完才能
+    判断含义，先整体缓存：含 export_info 为新版导出，所有值都是数组为旧版多集合导出，否则为单个文档
+    （如 {"tags": [...], "name": "x"}）。
+
+    state["mode"] 在产出第一条记录前设为 multi_collection / single_collection，
+    state["export_info"] 保存导出信息（如有）。
+    """
+    first = reader.peek()
+    if first == "[":
+        state["mode"] = "single_collection"
+        for doc in reader.iter_array():
+            yield default_collection, doc
+        return
+    if first != "{":
+        raise ValueError("JSON 格式错误: 顶层应为对象或数组")
+
+    buffered: Dict[str, Any] = {}
+    for key in reader.iter_object_keys():
+        if key == "export_info":
+            state["export_info"] = reader.read_value()
+        elif key == "data" and "export_info" in state and reader.peek() == "{":
+            state["mode"] = "multi_collection"
+            yield from _iter_collection_arrays(reader, reader.iter_object_keys())
+        else:
+            buffered[key] = reader.read_value()
+
+    if "export_info" in state:
+        state["mode"] = "multi_collection"
+        data = buffered.get("data")
+        collections = data.items() if isinstance(data, dict) else ()
+    elif all(isinstance(value, list) for value in buffered.values()):
+        state["mode"] = "multi_collection"
+        collections = buffered.items()
+    else:
+        state["mode"] = "single_collection"
+        yield default_collection, buffered
+        return
+    for name, docs in collections:
+        if isinstance(docs, list):  # 非数组值不是集合，跳过
+            for doc in docs:
+                yield name, doc
+
+
+def iter_ndjson_records(stream: IO[str], default_collection: str, state: Dict[str, Any]):
+    """逐行读取 NDJSON：带 _collection/document 的行为多集合导出，其余行作为单集合文档"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        if isinstance(obj, dict) and set(obj) == {"export_info"}:
+            state["export_info"] = obj["export_info"]
+            continue
+        if isinstance(obj, dict) and "_collection" in obj and "document" in obj:
+            state.setdefault("mode", "multi_collection")
+            yield obj["_collection"], obj["document"]
+        else:
+            state.setdefault("mode", "single_collection")
+            yield default_collection, obj
+
+
+def iter_batches(
+    records: Iterator[Tuple[str, dict]],
+    batch_size: int,
+    prepare: Optional[Callable[[dict], dict]] = None,
+) -> Iterator[Tuple[str, List[dict]]]:
+    """把连续同集合的记录按 batch_size 分组（prepare 在此线程中逐条处理文档）"""
+    current: Optional[str] = None
+    batch: List[dict] = []
+    for collection_name, doc in records:
+        if (collection_name != current and batch) or len(batch) >= batch_size:
+            yield current, batch
+            batch = []
+        current = collection_name
+        batch.append(prepare(doc) if prepare else doc)
+    if batch:
+        yield current, batch
@@ -8,7 +8,7 @@ import csv
 import gzip
 import shutil
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from bson import ObjectId
 import motor.motor_asyncio
 import redis.asyncio as redis
@@ -164,14 +164,16 @@ class DatabaseService:
         """清理操作日志（委托子模块）"""
         return await _db_cleanup.cleanup_operation_logs(days)
 
-    async def import_data(self, content: bytes, collection: str, format: str = "json",
+    async def import_data(self, content: Union[bytes, str], collection: str, format: str = "json",
                          overwrite: bool = False, filename: str = None) -> Dict[str, Any]:
-        """导入数据（委托子模块）"""
+        """导入数据（委托子模块，content 可为文件内容或文件路径）"""
         return await _db_backups.import_data(content, collection, format=format, overwrite=overwrite, filename=filename)
 
-    async def export_data(self, collections: List[str] = None, format: str = "json", sanitize: bool = False) -> str:
+    async def export_data(self, collections: List[str] = None, format: str = "json", sanitize: bool = False,
+                          compress: bool = False) -> str:
         """导出数据（委托子模块）"""
-        return await _db_backups.export_data(collections, export_dir=self.export_dir, format=format, sanitize=sanitize)
+        return await _db_backups.export_data(collections, export_dir=self.export_dir, format=format, sanitize=sanitize,
+                                             compress=compress)
 
     def _serialize_document(self, doc: dict) -> dict:
         """序列化文档，处理特殊类型（委托子模块）"""
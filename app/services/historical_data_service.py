@@ -5,6 +5,7 @@
 """
 import asyncio
 import logging
+import time
 from datetime import datetime, date
 from typing import Dict, Any, List, Optional, Union
 import pandas as pd
@@ -22,6 +23,8 @@ class HistoricalDataService:
         """初始化服务"""
         self.db = None
         self.collection = None
+        # 覆盖图缓存：{(data_source, period): (缓存时间, {symbol: 最后交易日})}
+        self._coverage_cache: Dict[tuple, tuple] = {}
         
     async def initialize(self):
         """初始化数据库连接"""
@@ -62,11 +65,25 @@ class HistoricalDataService:
                 ("trade_date", -1)
             ], name="symbol_date_index", background=True)
 
+            # 5. 复合索引：数据源+周期+股票代码+交易日期（覆盖每只股票最后交易日的聚合）
+            await self.collection.create_index([
+                ("data_source", 1),
+                ("period", 1),
+                ("symbol", 1),
+                ("trade_date", -1)
+            ], name="source_period_symbol_date_index", background=True)
+
             logger.info("✅ 历史数据索引检查完成")
         except Exception as e:
             # 索引创建失败不应该阻止服务启动
             logger.warning(f"⚠️ 创建索引时出现警告（可能已存在）: {e}")
     
+    # bulk_write 每批操作数与同时在途的批次数
+    bulk_batch_size = 500
+    max_concurrent_writes = 4
+    # 覆盖图缓存有效期（秒）
+    coverage_cache_ttl = 300
+
     async def save_historical_data(
         self,
         symbol: str,
@@ -96,93 +113,32 @@ class HistoricalDataService:
                 logger.warning(f"⚠️ {symbol} 历史数据为空，跳过保存")
                 return 0
 
-            from datetime import datetime
             total_start = datetime.now()
 
             logger.info(f"💾 开始保存 {symbol} 历史数据: {len(data)}条记录 (数据源: {data_source})")
 
-            # ⏱️ 性能监控：单位转换
-            convert_start = datetime.now()
-            # 🔥 在 DataFrame 层面做单位转换（向量化操作，比逐行快得多）
-            if data_source == "tushare":
-                # 成交额：千元 -> 元
-                if 'amount' in data.columns:
-                    data['amount'] = data['amount'] * 1000
-                elif 'turnover' in data.columns:
-                    data['turnover'] = data['turnover'] * 1000
-
-                # 成交量：手 -> 股
-                if 'volume' in data.columns:
-                    data['volume'] = data['volume'] * 100
-                elif 'vol' in data.columns:
-                    data['vol'] = data['vol'] * 100
+            # ⏱️ 性能监控：按列构建文档（日期、单位、数值转换都在整列上完成）
+            prepare_start = datetime.now()
+            frame = data.assign(symbol=symbol)
 
             # 🔥 港股/美股数据：添加 pre_close 字段（从前一天的 close 获取）
-            if market in ["HK", "US"] and 'pre_close' not in data.columns and 'close' in data.columns:
-                # 使用 shift(1) 将 close 列向下移动一行，得到前一天的收盘价
-                data['pre_close'] = data['close'].shift(1)
+            if market in ["HK", "US"] and 'pre_close' not in frame.columns and 'close' in frame.columns:
+                frame['pre_close'] = frame['close'].shift(1)
                 logger.debug(f"✅ {symbol} 添加 pre_close 字段（从前一天的 close 获取）")
 
-            convert_duration = (datetime.now() - convert_start).total_seconds()
-
-            # ⏱️ 性能监控：构建操作列表
-            prepare_start = datetime.now()
-            # 准备批量操作
-            operations = []
-            saved_count = 0
-            batch_size = 200  # 进一步减小批量大小，避免超时（从500改为200）
-
-            for date_index, row in data.iterrows():
-                try:
-                    # 标准化数据（传递日期索引）
-                    doc = self._standardize_record(symbol, row, data_source, market, period, date_index)
-
-                    # 创建upsert操作
-                    filter_doc = {
-                        "symbol": doc["symbol"],
-                        "trade_date": doc["trade_date"],
-                        "data_source": doc["data_source"],
-                        "period": doc["period"]
-                    }
-
-                    from pymongo import ReplaceOne
-                    operations.append(ReplaceOne(
-                        filter=filter_doc,
-                        replacement=doc,
-                        upsert=True
-                    ))
-
-                    # 批量执行（每200条）
-                    if len(operations) >= batch_size:
-                        batch_write_start = datetime.now()
-                        batch_saved = await self._execute_bulk_write_with_retry(symbol, operations)
-                        batch_write_duration = (datetime.now() - batch_write_start).total_seconds()
-                        logger.debug(f"   批量写入 {len(operations)} 条，耗时 {batch_write_duration:.2f}秒")
-                        saved_count += batch_saved
-                        operations = []
-
-                except Exception as e:
-                    # 获取日期信息用于错误日志
-                    date_str = str(date_index) if hasattr(date_index, '__str__') else 'unknown'
-                    logger.error(f"❌ 处理记录失败 {symbol} {date_str}: {e}")
-                    continue
-
+            documents = self._build_documents(frame, data_source, market, period)
             prepare_duration = (datetime.now() - prepare_start).total_seconds()
 
-            # ⏱️ 性能监控：最后一批写入
-            final_write_start = datetime.now()
-            # 执行剩余操作
-            if operations:
-                saved_count += await self._execute_bulk_write_with_retry(
-                    symbol, operations
-                )
-            final_write_duration = (datetime.now() - final_write_start).total_seconds()
+            # ⏱️ 性能监控：并发批量写入
+            write_start = datetime.now()
+            saved_count = await self._bulk_write_batches(symbol, documents, data_source, period)
+            write_duration = (datetime.now() - write_start).total_seconds()
 
             total_duration = (datetime.now() - total_start).total_seconds()
             logger.info(
                 f"✅ {symbol} 历史数据保存完成: {saved_count}条记录，"
                 f"总耗时 {total_duration:.2f}秒 "
-                f"(转换: {convert_duration:.3f}秒, 准备: {prepare_duration:.2f}秒, 最后写入: {final_write_duration:.2f}秒)"
+                f"(准备: {prepare_duration:.3f}秒, 写入: {write_duration:.2f}秒)"
             )
             return saved_count
             
@@ -190,6 +146,186 @@ class HistoricalDataService:
             logger.error(f"❌ 保存历史数据失败 {symbol}: {e}")
             return 0
 
+    async def save_market_data(
+        self,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str = "CN",
+        period: str = "daily"
+    ) -> int:
+        """
+        保存多只股票的历史数据（按交易日获取的全市场行情）
+
+        Args:
+            data: 长表，含 symbol 列和 date/trade_date 列
+            data_source: 数据源
+            market: 市场类型
+            period: 数据周期
+
+        Returns:
+            保存的记录数量
+        """
+        if self.collection is None:
+            await self.initialize()
+        if data is None or data.empty:
+            return 0
+
+        start = datetime.now()
+        documents = self._build_documents(data, data_source, market, period)
+        saved_count = await self._bulk_write_batches(f"全市场{period}", documents, data_source, period)
+        logger.info(
+            f"✅ 全市场历史数据保存完成: {data['symbol'].nunique()}只股票 {saved_count}条记录，"
+            f"耗时 {(datetime.now() - start).total_seconds():.2f}秒"
+        )
+        return saved_count
+
+    @staticmethod
+    def _build_operations(documents: List[Dict[str, Any]]) -> List:
+        from pymongo import ReplaceOne
+
+        return [
+            ReplaceOne(
+                filter={"symbol": doc["symbol"], "trade_date": doc["trade_date"],
+                        "data_source": doc["data_source"], "period": doc["period"]},
+                replacement=doc,
+                upsert=True
+            )
+            for doc in documents
+        ]
+
+    async def _bulk_write_batches(self, label: str, documents: List[Dict[str, Any]],
+                                  data_source: str, period: str) -> int:
+        """
+        分批 bulk_write，最多 max_concurrent_writes 批同时在途
+
+        只有整批写入成功的文档才推进已缓存的覆盖图；失败或部分失败的批次不推进，
+        下次增量同步仍会从原来的最后交易日重新获取。
+        """
+        if not documents:
+            return 0
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrent_writes))
+
+        async def write(batch):
+            async with semaphore:
+                return await self._execute_bulk_write_with_retry(label, self._build_operations(batch))
+
+        batches = [documents[i:i + self.bulk_batch_size]
+                   for i in range(0, len(documents), self.bulk_batch_size)]
+        results = await asyncio.gather(*(write(batch) for batch in batches))
+        for batch, saved in zip(batches, results):
+            if saved >= len(batch):
+                self._advance_coverage(data_source, period, batch)
+        logger.debug(f"   {label}: {len(batches)} 批写入完成（并发 {self.max_concurrent_writes}）")
+        return sum(results)
+
+    def _build_documents(
+        self,
+        data: pd.DataFrame,
+        data_source: str,
+        market: str,
+        period: str
+    ) -> List[Dict[str, Any]]:
+        """
+        按列批量构建文档（字段与 _standardize_record 一致）
+
+        data 需含 symbol 列；日期取 date/trade_date 列，没有时取 DatetimeIndex。
+        """
+        now = datetime.utcnow()
+        df = data
+        if 'date' in df.columns:
+            dates = df['date']
+        elif 'trade_date' in df.columns:
+            dates = df['trade_date']
+        elif isinstance(df.index, pd.DatetimeIndex):
+            dates = pd.Series(df.index, index=df.index)
+        else:
+            # 与 _standardize_record 一致：既没有日期列也没有日期索引时使用当天日期
+            dates = pd.Series(self._format_date(None), index=df.index)
+        trade_dates = self._format_date_column(dates)
+
+        def column(*names) -> pd.Series:
+            for name in names:
+                if name in df.columns:
+                    return pd.to_numeric(df[name], errors='coerce').astype(float)
+            return pd.Series(float('nan'), index=df.index)
+
+        amount = column('amount', 'turnover')
+        volume = column('volume', 'vol')
+        if data_source == "tushare":
+            # 成交额：千元 -> 元；成交量：手 -> 股
+            amount = amount * 1000
+            volume = volume * 100
+
+        close, pre_close = column('close'), column('pre_close', 'preclose')
+        has_prev = close.notna() & pre_close.notna() & (close != 0) & (pre_close != 0)
+        change = (close - pre_close).round(4)
+        pct_chg = (change / pre_close * 100).round(4)
+        change = change.where(has_prev, column('change'))
+        pct_chg = pct_chg.where(has_prev, column('pct_chg', 'change_percent'))
+
+        symbols = df['symbol'].astype(str)
+        if market == "CN":
+            full_symbols = symbols + symbols.str.startswith('6').map({True: '.SH', False: '.SZ'})
+        elif market == "HK":
+            full_symbols = symbols + '.HK'
+        else:
+            full_symbols = symbols
+
+        frame = pd.DataFrame({
+            "symbol": symbols,
+            "code": symbols,
+            "full_symbol": full_symbols,
+            "trade_date": trade_dates,
+            "open": column('open'),
+            "high": column('high'),
+            "low": column('low'),
+            "close": close,
+            "pre_close": pre_close,
+            "volume": volume,
+            "amount": amount,
+            "change": change,
+            "pct_chg": pct_chg,
+        })
+        # 可选字段：只写入有值的字段
+        optional = {
+            "turnover_rate": ('turnover_rate', 'turn'),
+            "volume_ratio": ('volume_ratio',),
+            "pe": ('pe',),
+            "pb": ('pb',),
+            "ps": ('ps',),
+            "adjustflag": ('adjustflag', 'adj_factor'),
+            "tradestatus": ('tradestatus',),
+            "isST": ('isST',),
+        }
+        optional_columns = []
+        for key, names in optional.items():
+            if any(name in df.columns for name in names):
+                frame[key] = column(*names)
+                optional_columns.append(key)
+
+        frame = frame.astype(object).where(frame.notna(), None)
+        base = {"market": market, "period": period, "data_source": data_source,
+                "created_at": now, "updated_at": now, "version": 1}
+        documents = []
+        for record in frame.to_dict('records'):
+            for key in optional_columns:
+                if record[key] is None:
+                    del record[key]
+            record.update(base)
+            documents.append(record)
+        return documents
+
+    @staticmethod
+    def _format_date_column(dates: pd.Series) -> pd.Series:
+        """整列格式化为 YYYY-MM-DD（支持 datetime、YYYYMMDD、带时间的字符串）"""
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            return dates.dt.strftime('%Y-%m-%d')
+        values = dates.map(lambda v: v.strftime('%Y-%m-%d') if isinstance(v, (date, datetime)) else str(v))
+        compact = values.str.fullmatch(r'\d{8}')
+        values = values.where(~compact, values.str[:4] + '-' + values.str[4:6] + '-' + values.str[6:8])
+        with_time = values.str.match(r'\d{4}-\d{2}-\d{2}[ T]')
+        return values.where(~with_time, values.str[:10])
+
     async def _execute_bulk_write_with_retry(
         self,
         symbol: str,
@@ -448,6 +584,97 @@ class HistoricalDataService:
             logger.error(f"❌ 获取最新日期失败 {symbol}: {e}")
             return None
     
+    async def get_last_trade_dates(
+        self,
+        data_source: str,
+        period: str = "daily",
+        symbols: Optional[List[str]] = None
+    ) -> Dict[str, str]:
+        """
+        一次聚合获取每只股票的最后交易日
+
+        按 (data_source, period, symbol, trade_date) 索引排序后分组取首条，
+        代替逐只股票 find().sort().limit(1)。
+
+        Returns:
+            {symbol: 最后交易日 (YYYY-MM-DD)}，没有数据的股票不在结果中
+        """
+        if self.collection is None:
+            await self.initialize()
+
+        match: Dict[str, Any] = {"data_source": data_source, "period": period}
+        if symbols is not None:
+            match["symbol"] = {"$in": list(symbols)}
+
+        cursor = self.collection.aggregate([
+            {"$match": match},
+            {"$sort": {"symbol": 1, "trade_date": -1}},
+            {"$group": {"_id": "$symbol", "last_date": {"$first": "$trade_date"}}},
+        ], allowDiskUse=True)
+        return {doc["_id"]: doc["last_date"] async for doc in cursor}
+
+    async def get_coverage_map(
+        self,
+        data_source: str,
+        period: str = "daily",
+        refresh: bool = False
+    ) -> Dict[str, str]:
+        """
+        获取带缓存的覆盖图 {symbol: 最后交易日}
+
+        缓存 coverage_cache_ttl 秒，本服务保存数据时同步推进；
+        增量同步应传 refresh=True 以读取其它进程写入的最新状态。
+        """
+        key = (data_source, period)
+        cached = self._coverage_cache.get(key)
+        if cached and not refresh and (time.monotonic() - cached[0]) < self.coverage_cache_ttl:
+            return cached[1]
+
+        last_dates = await self.get_last_trade_dates(data_source, period)
+        self._coverage_cache[key] = (time.monotonic(), last_dates)
+        logger.debug(f"📊 覆盖图已刷新: {data_source}/{period} {len(last_dates)}只股票")
+        return last_dates
+
+    async def get_coverage_summary(
+        self,
+        data_source: str,
+        period: str = "daily",
+        as_of: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        覆盖图摘要（供同步状态页与数据完整性检查使用）
+
+        Args:
+            as_of: 期望的最新交易日，默认取覆盖图中的最大日期
+        """
+        last_dates = await self.get_coverage_map(data_source, period, refresh=refresh)
+        latest_date = max(last_dates.values()) if last_dates else None
+        target = as_of or latest_date
+        behind = sorted(symbol for symbol, last in last_dates.items() if target and last < target)
+        return {
+            "data_source": data_source,
+            "period": period,
+            "total_symbols": len(last_dates),
+            "latest_date": latest_date,
+            "target_date": target,
+            "up_to_date": len(last_dates) - len(behind),
+            "behind_count": len(behind),
+            "behind_sample": behind[:20],
+            "oldest_date": min(last_dates.values()) if last_dates else None,
+        }
+
+    def _advance_coverage(self, data_source: str, period: str, documents: List[Dict[str, Any]]):
+        """按已写入的文档推进已缓存的覆盖图（未缓存时不做任何事）"""
+        cached = self._coverage_cache.get((data_source, period))
+        if not cached or not documents:
+            return
+        last_dates = cached[1]
+        for doc in documents:
+            symbol, trade_date = doc["symbol"], doc["trade_date"]
+            if trade_date and trade_date > last_dates.get(symbol, ""):
+                last_dates[symbol] = trade_date
+
     async def get_data_statistics(self) -> Dict[str, Any]:
         """获取数据统计信息"""
         if self.collection is None:
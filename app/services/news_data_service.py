@@ -275,6 +275,7 @@ class NewsDataService:
             "sentiment_score": self._safe_float(news_data.get("sentiment_score")),
             "keywords": news_data.get("keywords", []),
             "importance": news_data.get("importance", "medium"),
+            "coverage": int(news_data.get("coverage", 1) or 1),
             # 注意：不包含 language 字段，避免与 MongoDB 文本索引冲突
 
             # 元数据
@@ -10,3 +10,4 @@ from .log_handler import (
     unregister_analysis_tracker,
 )
 
+from .pubsub_hub import ProgressEvent, ProgressHub, get_progress_hub, close_progress_hub
@@ -0,0 +1,256 @@
+"""
+进度消息订阅中心（进程级单例）
+
+原实现中每个 SSE 连接各自创建一个 Redis PubSub 连接并轮询 get_message，
+浏览器标签页一多就会耗尽连接池并产生大量空转唤醒。本模块改为：
+
+- 每个进程只维持一个 PubSub 连接，PSUBSCRIBE task_progress:*；
+- 消息按频道分发到各客户端的有界缓冲区（Subscription）；
+- 慢消费者缓冲区满时合并同一频道的旧进度（进度消息是全量快照，保留最新即可），
+  仍然放不下时丢弃最旧的消息；
+- 每个频道保留最近若干条消息，支持按 SSE Last-Event-ID 断线续传。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.core.database import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+TASK_PROGRESS_PATTERN = "task_progress:*"
+
+
+@dataclass
+class ProgressEvent:
+    """一条进度消息；id 形如 "<epoch>-<seq>"，用于 SSE 的 id 字段"""
+    id: str
+    seq: int
+    channel: str
+    data: Any
+
+
+class Subscription:
+    """单个客户端的订阅：有界缓冲 + 慢消费者合并"""
+
+    def __init__(self, hub: "ProgressHub", channels: Set[str], maxsize: int):
+        self.hub = hub
+        self.channels = channels
+        self.maxsize = max(1, maxsize)
+        self.coalesced = 0
+        self.dropped = 0
+        self._buffer: Deque[ProgressEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, event: ProgressEvent):
+        if len(self._buffer) >= self.maxsize:
+            # 合并：移除同频道尚未消费的旧进度，只保留最新一条
+            before = len(self._buffer)
+            self._buffer = deque(e for e in self._buffer if e.channel != event.channel)
+            self.coalesced += before - len(self._buffer)
+            if len(self._buffer) >= self.maxsize:
+                self._buffer.popleft()
+                self.dropped += 1
+        self._buffer.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[ProgressEvent]:
+        """取下一条消息；超时返回 None"""
+        if not self._buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popleft() if self._buffer else None
+
+    def close(self):
+        self.hub._unsubscribe(self)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class ProgressHub:
+    """进程级进度订阅中心：单个 PSUBSCRIBE 连接向所有客户端扇出"""
+
+    def __init__(
+        self,
+        redis_factory: Callable[[], Any] = get_redis_client,
+        pattern: str = TASK_PROGRESS_PATTERN,
+        client_buffer: Optional[int] = None,
+        replay_size: Optional[int] = None,
+        history_ttl: Optional[float] = None,
+    ):
+        self._redis_factory = redis_factory
+        self.pattern = pattern
+        self.client_buffer = int(client_buffer or getattr(settings, "SSE_HUB_CLIENT_BUFFER", 100))
+        self.replay_size = int(replay_size or getattr(settings, "SSE_HUB_REPLAY_SIZE", 50))
+        self.history_ttl = float(history_ttl or getattr(settings, "SSE_HUB_HISTORY_TTL_SECONDS", 900))
+        # 读取超时需小于 Redis socket_timeout，避免空闲时被判定为连接超时
+        self.read_timeout = float(getattr(settings, "SSE_HUB_READ_TIMEOUT_SECONDS", 5.0))
+
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._history: Dict[str, Deque[ProgressEvent]] = {}
+        self._history_touched: Dict[str, float] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self.messages_received = 0
+
+    # ---- 订阅管理 ----
+    async def subscribe(self, channels: Iterable[str], last_event_id: Optional[str] = None) -> Subscription:
+        """订阅若干频道；带 Last-Event-ID 时先回放其后的历史消息"""
+        self._ensure_reader()
+        if not self._connected.is_set():
+            # 首个订阅者：等待 PSUBSCRIBE 生效，避免连接建立前的消息丢失
+            try:
+                await asyncio.wait_for(self._connected.wait(), timeout=self.read_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ [ProgressHub] 等待订阅连接超时，继续建立客户端订阅")
+        sub = Subscription(self, set(channels), self.client_buffer)
+        for channel in sub.channels:
+            self._subscribers.setdefault(channel, set()).add(sub)
+        if last_event_id:
+            for event in self._replay(sub.channels, last_event_id):
+                sub.push(event)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        for channel in sub.channels:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[channel]
+
+    def _replay(self, channels: Set[str], last_event_id: str) -> List[ProgressEvent]:
+        epoch, _, seq = last_event_id.partition("-")
+        # 其它进程/重启前的 ID 无法比较，回放全部保留的历史
+        after = int(seq) if epoch == self.epoch and seq.isdigit() else 0
+        events = [e for c in channels for e in self._history.get(c, ()) if e.seq > after]
+        return sorted(events, key=lambda e: e.seq)
+
+    # ---- 消息分发 ----
+    def dispatch(self, channel: str, raw: Any) -> Optional[ProgressEvent]:
+        """分发一条消息到订阅者并记入历史"""
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid JSON in progress message: {raw}")
+            return None
+
+        seq = next(self._seq)
+        event = ProgressEvent(id=f"{self.epoch}-{seq}", seq=seq, channel=channel, data=data)
+        self.messages_received += 1
+
+        history = self._history.get(channel)
+        if history is None:
+            history = self._history[channel] = deque(maxlen=self.replay_size)
+        history.append(event)
+        now = time.monotonic()
+        self._history_touched[channel] = now
+
+        for sub in tuple(self._subscribers.get(channel, ())):
+            sub.push(event)
+
+        if self.messages_received % 1000 == 0:
+            self._prune_history(now)
+        return event
+
+    def _prune_history(self, now: float):
+        expired = [c for c, t in self._history_touched.items()
+                   if now - t > self.history_ttl and c not in self._subscribers]
+        for channel in expired:
+            self._history.pop(channel, None)
+            self._history_touched.pop(channel, None)
+
+    # ---- Redis 读取 ----
+    def _ensure_reader(self):
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._redis_factory().pubsub()
+                await pubsub.psubscribe(self.pattern)
+                self._connected.set()
+                logger.info(f"📡 [ProgressHub] 已订阅 {self.pattern}")
+                backoff = 1.0
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.read_timeout)
+                    if message is None:
+                        # 空闲时顺带清理无人订阅的过期历史
+                        self._prune_history(time.monotonic())
+                    elif message.get("type") == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._connected.clear()
+                logger.warning(f"⚠️ [ProgressHub] 订阅连接异常，{backoff:.0f}s 后重连: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.punsubscribe(self.pattern)
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def stop(self):
+        """停止订阅（应用关闭时调用）"""
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader = None
+        self._connected.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        subs = {s for group in self._subscribers.values() for s in group}
+        return {
+            "connected": self._connected.is_set(),
+            "channels": len(self._subscribers),
+            "subscribers": len(subs),
+            "messages_received": self.messages_received,
+            "history_channels": len(self._history),
+            "coalesced": sum(s.coalesced for s in subs),
+            "dropped": sum(s.dropped for s in subs),
+        }
+
+
+_hub: Optional[ProgressHub] = None
+
+
+def get_progress_hub() -> ProgressHub:
+    """获取进程级 ProgressHub 单例"""
+    global _hub
+    if _hub is None:
+        _hub = ProgressHub()
+    return _hub
+
+
+async def close_progress_hub():
+    global _hub
+    if _hub is not None:
+        await _hub.stop()
+        _hub = None
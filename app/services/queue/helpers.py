@@ -3,8 +3,9 @@
 """
 from __future__ import annotations
 import time
-from typing import Dict
+from typing import Dict, Optional
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
 from .keys import (
     READY_LIST,
@@ -59,3 +60,17 @@ async def clear_visibility_timeout(r: Redis, task_id: str) -> None:
     timeout_key = VISIBILITY_TIMEOUT_PREFIX + task_id
     await r.delete(timeout_key)
 
+
+
+async def blocking_move_to_processing(r: Redis, worker_list: str, timeout: float) -> Optional[str]:
+    """阻塞地将就绪队列队首任务原子移动到 Worker 的处理中列表
+
+    优先使用 BLMOVE（Redis >= 6.2），不支持时回退到 BRPOPLPUSH。
+    入队为 LPUSH，队首在右侧，因此从 RIGHT 取出、推入处理中列表的 LEFT。
+    """
+    try:
+        return await r.blmove(READY_LIST, worker_list, timeout, "RIGHT", "LEFT")
+    except ResponseError as e:
+        if "unknown command" not in str(e).lower():
+            raise
+        return await r.brpoplpush(READY_LIST, worker_list, timeout)
@@ -17,6 +17,12 @@ USER_PROCESSING_PREFIX = "qa:user_processing:"
 GLOBAL_CONCURRENT_KEY = "qa:global_concurrent"
 VISIBILITY_TIMEOUT_PREFIX = "qa:visibility:"
 
+# 每个 Worker 的处理中列表（BLMOVE/BRPOPLPUSH 目标，保证出队原子、可回收）
+WORKER_PROCESSING_PREFIX = "qa:worker_processing:"
+
+# Worker 心跳键（带 TTL，过期即视为 Worker 已退出/崩溃）
+WORKER_HEARTBEAT_KEY = "worker:{worker_id}:heartbeat"
+
 # 配置常量 - 开源版限制
 DEFAULT_USER_CONCURRENT_LIMIT = 3
 GLOBAL_CONCURRENT_LIMIT = 3  # 开源版全局最大并发限制为3
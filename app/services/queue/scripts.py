@@ -0,0 +1,199 @@
+"""
+队列状态迁移的 Lua 脚本（服务端原子执行）
+
+- ENQUEUE: 并发限制校验 + 写任务哈希 + 入就绪队列 + 批次登记，支持一次提交多个任务
+- DEQUEUE: 认领候选任务（用户与全局并发校验、标记处理中、可见性超时、状态更新），返回任务哈希
+- ACK:     取消处理中标记 + 移出 Worker 处理中列表 + 清除可见性超时 + 更新状态并归档
+- REQUEUE: 把 Worker 处理中列表队头的任务移回就绪队列，同时取消处理中标记、清除可见性超时、重置状态
+
+脚本访问的每个键都通过 KEYS 传入（符合 Redis 脚本规范，集群模式下可正确路由）；
+依赖任务字段才能确定的键（用户处理中集合等）由调用方先读出字段再传入，
+脚本内重新校验字段未变，期间被其他客户端改动时放弃本次操作。
+脚本第一行注释为脚本名，便于日志识别。
+"""
+
+ENQUEUE_LUA = """
+-- qa:enqueue
+-- KEYS: 1=就绪队列 2=用户处理中集合 3=全局处理中集合 4=批次任务集合 5=批次哈希 6..=任务哈希(与任务对应)
+-- ARGV: 1=用户并发上限 2=全局并发上限 3=用户ID 4=当前时间 5=参数JSON
+--       6=批次ID(可空) 7=是否写批次哈希(1/0) 8=批次提交总数 9..=任务ID,股票代码 成对
+if redis.call('SCARD', KEYS[2]) >= tonumber(ARGV[1]) then
+  return {'user_limit'}
+end
+if redis.call('SCARD', KEYS[3]) >= tonumber(ARGV[2]) then
+  return {'global_limit'}
+end
+
+local user_id, now, params, batch_id = ARGV[3], ARGV[4], ARGV[5], ARGV[6]
+
+if ARGV[7] == '1' then
+  redis.call('HSET', KEYS[5], 'id', batch_id, 'user', user_id, 'status', 'queued',
+             'submitted', ARGV[8], 'created_at', now)
+end
+
+local n = 0
+for i = 9, #ARGV, 2 do
+  local task_id, symbol = ARGV[i], ARGV[i + 1]
+  local key = KEYS[6 + n]
+  redis.call('HSET', key, 'id', task_id, 'user', user_id, 'symbol', symbol, 'status', 'queued',
+             'created_at', now, 'params', params, 'enqueued_at', now)
+  if batch_id ~= '' then
+    redis.call('HSET', key, 'batch_id', batch_id)
+    redis.call('SADD', KEYS[4], task_id)
+  end
+  redis.call('LPUSH', KEYS[1], task_id)
+  n = n + 1
+end
+return {'ok', tostring(n)}
+"""
+
+DEQUEUE_LUA = """
+-- qa:dequeue
+-- KEYS: 1=就绪队列 2=全局处理中集合 3=Worker处理中列表
+--       之后每个候选任务 3 个键：任务哈希、所属用户处理中集合、可见性超时键
+-- ARGV: 1=用户并发上限 2=全局并发上限 3=Worker ID 4=当前时间 5=可见性超时
+--       6=是否为已阻塞取出的任务(1/0) 7..=候选任务ID,读取到的用户ID 成对（按队首优先排列）
+local ready, processing, worker_list = KEYS[1], KEYS[2], KEYS[3]
+local user_limit, global_limit = tonumber(ARGV[1]), tonumber(ARGV[2])
+local worker_id, now, vis_timeout = ARGV[3], tonumber(ARGV[4]), tonumber(ARGV[5])
+local taken = ARGV[6] == '1'
+
+local function claim(task_id, task_key, user_key, vis_key)
+  redis.call('SADD', user_key, task_id)
+  redis.call('SADD', processing, task_id)
+  redis.call('HSET', vis_key, 'task_id', task_id, 'worker_id', worker_id,
+             'timeout_at', string.format('%d', now + vis_timeout))
+  redis.call('EXPIRE', vis_key, vis_timeout)
+  redis.call('HSET', task_key, 'status', 'processing', 'worker_id', worker_id,
+             'started_at', string.format('%d', now))
+  local out = redis.call('HGETALL', task_key)
+  table.insert(out, 1, 'ok')
+  return out
+end
+
+local global_full = redis.call('SCARD', processing) >= global_limit
+
+if taken then
+  -- 阻塞出队：任务已由 BLMOVE 放入 Worker 处理中列表
+  local task_id, user = ARGV[7], ARGV[8]
+  local task_key, user_key, vis_key = KEYS[4], KEYS[5], KEYS[6]
+  local current = redis.call('HGET', task_key, 'user')
+  if not current then
+    redis.call('LREM', worker_list, 1, task_id)
+    return {'missing'}
+  end
+  if global_full or current ~= user then
+    -- 全局已满（或用户字段已变化）：放回队首，保持顺序
+    redis.call('LREM', worker_list, 1, task_id)
+    redis.call('RPUSH', ready, task_id)
+    return {'global_limit'}
+  end
+  if redis.call('SCARD', user_key) >= user_limit then
+    -- 用户超限：与原实现一致放回队尾
+    redis.call('LREM', worker_list, 1, task_id)
+    redis.call('LPUSH', ready, task_id)
+    return {'user_limit'}
+  end
+  return claim(task_id, task_key, user_key, vis_key)
+end
+
+if global_full then
+  return {'global_limit'}
+end
+
+-- 非阻塞出队：按队首优先依次尝试候选任务，跳过并发超限用户的任务，避免队头阻塞
+local skipped = false
+local base = 3
+for i = 7, #ARGV, 2 do
+  local task_id, user = ARGV[i], ARGV[i + 1]
+  local task_key, user_key, vis_key = KEYS[base + 1], KEYS[base + 2], KEYS[base + 3]
+  local current = redis.call('HGET', task_key, 'user')
+  if not current then
+    -- 任务数据已丢失：从就绪队列清理
+    redis.call('LREM', ready, -1, task_id)
+  elseif current == user then
+    if redis.call('SCARD', user_key) >= user_limit then
+      skipped = true
+    elseif redis.call('LREM', ready, -1, task_id) > 0 then
+      redis.call('LPUSH', worker_list, task_id)
+      return claim(task_id, task_key, user_key, vis_key)
+    end
+    -- LREM 为 0：已被其他 Worker 取走，继续下一个
+  end
+  base = base + 3
+end
+if skipped then
+  return {'user_limit'}
+end
+return {'empty'}
+"""
+
+ACK_LUA = """
+-- qa:ack
+-- KEYS: 1=任务哈希 2=全局处理中集合 3=结果集合(完成/失败) 4=用户处理中集合
+--       5=可见性超时键 6=Worker处理中列表(无 Worker 时为空列表键)
+-- ARGV: 1=任务ID 2=状态 3=当前时间 4=读取到的用户ID 5=读取到的Worker ID
+local task_id = ARGV[1]
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return 0
+end
+local user = redis.call('HGET', KEYS[1], 'user') or ''
+local worker_id = redis.call('HGET', KEYS[1], 'worker_id') or ''
+if user ~= ARGV[4] or worker_id ~= ARGV[5] then
+  -- 读取后任务被重新认领：由调用方重新读取再确认
+  return -1
+end
+if user ~= '' then
+  redis.call('SREM', KEYS[4], task_id)
+end
+redis.call('SREM', KEYS[2], task_id)
+if worker_id ~= '' then
+  redis.call('LREM', KEYS[6], 1, task_id)
+end
+redis.call('DEL', KEYS[5])
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'completed_at', ARGV[3])
+redis.call('SADD', KEYS[3], task_id)
+return 1
+"""
+
+REQUEUE_LUA = """
+-- qa:requeue
+-- KEYS: 1=Worker处理中列表 2=就绪队列 3=任务哈希 4=全局处理中集合 5=用户处理中集合 6=可见性超时键
+-- ARGV: 1=任务ID 2=读取到的用户ID 3=当前时间
+local task_id = ARGV[1]
+if redis.call('LINDEX', KEYS[1], 0) ~= task_id then
+  -- 读取后列表被改动：由调用方重新读取
+  return -1
+end
+if redis.call('EXISTS', KEYS[3]) == 0 then
+  -- 任务数据已丢失：保留 ID（移到列表末尾），交由调用方记录
+  redis.call('LMOVE', KEYS[1], KEYS[1], 'LEFT', 'RIGHT')
+  return 0
+end
+local user = redis.call('HGET', KEYS[3], 'user') or ''
+if user ~= ARGV[2] then
+  return -1
+end
+redis.call('LPOP', KEYS[1])
+if user ~= '' then
+  redis.call('SREM', KEYS[5], task_id)
+end
+redis.call('SREM', KEYS[4], task_id)
+redis.call('DEL', KEYS[6])
+redis.call('HSET', KEYS[3], 'status', 'queued', 'worker_id', '', 'requeued_at', ARGV[3])
+-- 处理中列表 LEFT 为最新取出的任务：由新到旧依次放回队首，最早取出的任务最终位于队首
+redis.call('RPUSH', KEYS[2], task_id)
+return 1
+"""
+
+# 非阻塞出队时最多扫描的就绪队列深度
+DEQUEUE_SCAN_DEPTH = 50
+
+# 批量入队时单次脚本调用的最大任务数（避免单个脚本长时间阻塞 Redis）
+BULK_ENQUEUE_CHUNK = 500
+
+# ACK 读取字段后任务被并发改动时的最大重试次数
+ACK_MAX_ATTEMPTS = 3
+
+# 回收 Worker 任务时，读取后列表或任务被并发改动的最大重试次数
+REQUEUE_MAX_ATTEMPTS = 3
@@ -26,6 +26,8 @@ from app.services.queue import (
     USER_PROCESSING_PREFIX,
     GLOBAL_CONCURRENT_KEY,
     VISIBILITY_TIMEOUT_PREFIX,
+    WORKER_PROCESSING_PREFIX,
+    WORKER_HEARTBEAT_KEY,
     DEFAULT_USER_CONCURRENT_LIMIT,
     GLOBAL_CONCURRENT_LIMIT,
     VISIBILITY_TIMEOUT_SECONDS,
@@ -35,12 +37,25 @@ from app.services.queue import (
     unmark_task_processing,
     set_visibility_timeout,
     clear_visibility_timeout,
+    blocking_move_to_processing,
+)
+from app.services.queue.scripts import (
+    ENQUEUE_LUA,
+    DEQUEUE_LUA,
+    ACK_LUA,
+    REQUEUE_LUA,
+    DEQUEUE_SCAN_DEPTH,
+    BULK_ENQUEUE_CHUNK,
+    ACK_MAX_ATTEMPTS,
+    REQUEUE_MAX_ATTEMPTS,
 )
 
 logger = logging.getLogger(__name__)
 
 # Redis键名与配置常量由 app.services.queue.keys 提供（此处不再重复定义）
 
+_SCRIPT_SOURCES = {"enqueue": ENQUEUE_LUA, "dequeue": DEQUEUE_LUA, "ack": ACK_LUA, "requeue": REQUEUE_LUA}
+
 
 class QueueService:
     """增强版队列服务类"""
@@ -50,6 +65,7 @@ class QueueService:
         self.user_concurrent_limit = DEFAULT_USER_CONCURRENT_LIMIT
         self.global_concurrent_limit = GLOBAL_CONCURRENT_LIMIT
         self.visibility_timeout = VISIBILITY_TIMEOUT_SECONDS
+        self._scripts: Dict[str, Any] = {}
 
     async def enqueue_task(
         self,
@@ -58,116 +74,242 @@ class QueueService:
         params: Dict[str, Any],
         batch_id: Optional[str] = None
     ) -> str:
-        """任务入队，支持并发控制（开源版FIFO队列）"""
-
-        # 检查用户并发限制
-        if not await self._check_user_concurrent_limit(user_id):
-            raise ValueError(f"用户 {user_id} 达到并发限制 ({self.user_concurrent_limit})")
-
-        # 检查全局并发限制
-        if not await self._check_global_concurrent_limit():
-            raise ValueError(f"系统达到全局并发限制 ({self.global_concurrent_limit})")
+        """任务入队，支持并发控制（开源版FIFO队列）
 
+        并发校验与写入在同一 Lua 脚本中原子完成（一次往返）。
+        """
         task_id = str(uuid.uuid4())
-        key = TASK_PREFIX + task_id
-        now = int(time.time())
-
-        mapping = {
-            "id": task_id,
-            "user": user_id,
-            "symbol": symbol,
-            "status": "queued",
-            "created_at": str(now),
-            "params": json.dumps(params or {}),
-            "enqueued_at": str(now)
-        }
-
-        if batch_id:
-            mapping["batch_id"] = batch_id
-
-        # 保存任务数据
-        await self.r.hset(key, mapping=mapping)
-
-        # 添加到FIFO队列
-        await self.r.lpush(READY_LIST, task_id)
-
-        if batch_id:
-            await self.r.sadd(BATCH_TASKS_PREFIX + batch_id, task_id)
-
+        await self._enqueue_many(user_id, [(task_id, symbol)], params, batch_id)
         logger.info(f"任务已入队: {task_id}")
         return task_id
 
+    async def _enqueue_many(
+        self,
+        user_id: str,
+        tasks: List[tuple],
+        params: Dict[str, Any],
+        batch_id: Optional[str] = None,
+        create_batch: bool = False,
+    ) -> int:
+        """批量入队：(task_id, symbol) 列表按块交给 ENQUEUE 脚本，每块一次往返"""
+        now = str(int(time.time()))
+        params_json = json.dumps(params or {})
+        total = 0
+        for start in range(0, max(len(tasks), 1), BULK_ENQUEUE_CHUNK):
+            chunk = tasks[start:start + BULK_ENQUEUE_CHUNK]
+            args = [
+                self.user_concurrent_limit,
+                self.global_concurrent_limit,
+                user_id,
+                now,
+                params_json,
+                batch_id or "",
+                "1" if create_batch and start == 0 else "0",
+                len(tasks),
+            ]
+            for task_id, symbol in chunk:
+                args.extend([task_id, symbol])
+
+            res = await self._script("enqueue")(
+                keys=[
+                    READY_LIST,
+                    USER_PROCESSING_PREFIX + user_id,
+                    SET_PROCESSING,
+                    BATCH_TASKS_PREFIX + (batch_id or ""),
+                    BATCH_PREFIX + (batch_id or ""),
+                    *(TASK_PREFIX + task_id for task_id, _ in chunk),
+                ],
+                args=args,
+            )
+            status = res[0] if res else None
+            if status == "user_limit":
+                raise ValueError(f"用户 {user_id} 达到并发限制 ({self.user_concurrent_limit})")
+            if status == "global_limit":
+                raise ValueError(f"系统达到全局并发限制 ({self.global_concurrent_limit})")
+            total += int(res[1])
+        return total
+
     async def dequeue_task(self, worker_id: str) -> Optional[Dict[str, Any]]:
-        """从FIFO队列中取出任务"""
+        """从FIFO队列中取出任务
+
+        先读出队首若干候选任务及其用户，再由 DEQUEUE 脚本原子地校验并认领：
+        跳过并发超限用户的任务而不是弹出再放回，取出的任务同时记入 Worker 处理中列表。
+        """
         try:
-            # 从FIFO队列获取任务
-            task_id = await self.r.rpop(READY_LIST)
-            if not task_id:
+            candidates = await self._ready_candidates()
+            if not candidates:
                 return None
+            task_data = await self._claim(worker_id, candidates, taken=False)
+            if task_data:
+                logger.info(f"任务已出队: {task_data.get('id')} -> Worker: {worker_id}")
+            return task_data
 
-            # 获取任务详情
-            task_data = await self.get_task(task_id)
-            if not task_data:
-                logger.warning(f"任务数据不存在: {task_id}")
-                return None
+        except Exception as e:
+            logger.error(f"出队失败: {e}")
+            return None
 
-            user_id = task_data.get("user")
+    async def dequeue_task_blocking(self, worker_id: str, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        """阻塞出队：有新任务时立即唤醒（BLMOVE/BRPOPLPUSH 到 Worker 处理中列表）
 
-            # 再次检查并发限制（防止竞态条件）
-            if not await self._check_user_concurrent_limit(user_id):
-                # 如果超过限制，将任务放回队列
-                await self.r.lpush(READY_LIST, task_id)
-                logger.warning(f"用户 {user_id} 并发限制，任务重新入队: {task_id}")
+        - 任务 ID 原子地落入 qa:worker_processing:<worker_id>，Worker 崩溃时可回收；
+        - 取出后由 DEQUEUE 脚本完成用户/全局并发校验与认领，超限时移回就绪队列并返回 None，
+          由调用方稍后重试。
+        """
+        worker_list = WORKER_PROCESSING_PREFIX + worker_id
+        try:
+            task_id = await blocking_move_to_processing(self.r, worker_list, timeout)
+            if not task_id:
                 return None
 
-            # 标记任务为处理中
-            await self._mark_task_processing(task_id, user_id, worker_id)
-
-            # 设置可见性超时
-            await self._set_visibility_timeout(task_id, worker_id)
-
-            # 更新任务状态
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": "processing",
-                "worker_id": worker_id,
-                "started_at": str(int(time.time()))
-            })
-
-            logger.info(f"任务已出队: {task_id} -> Worker: {worker_id}")
+            user = await self.r.hget(TASK_PREFIX + task_id, "user")
+            task_data = await self._claim(worker_id, [(task_id, user or "")], taken=True)
+            if task_data:
+                logger.info(f"任务已出队(阻塞): {task_id} -> Worker: {worker_id}")
             return task_data
 
         except Exception as e:
-            logger.error(f"出队失败: {e}")
+            logger.error(f"阻塞出队失败: {e}")
             return None
 
-    async def ack_task(self, task_id: str, success: bool = True) -> bool:
-        """确认任务完成"""
+    async def _ready_candidates(self) -> List[tuple]:
+        """读取就绪队列队首的候选任务及其所属用户（队首优先），用于向 DEQUEUE 脚本声明键"""
+        task_ids = await self.r.lrange(READY_LIST, -DEQUEUE_SCAN_DEPTH, -1)
+        if not task_ids:
+            return []
+        task_ids.reverse()
+        async with self.r.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                pipe.hget(TASK_PREFIX + task_id, "user")
+            users = await pipe.execute()
+        return [(task_id, user or "") for task_id, user in zip(task_ids, users)]
+
+    async def _claim(self, worker_id: str, candidates: List[tuple], taken: bool) -> Optional[Dict[str, Any]]:
+        """执行 DEQUEUE 脚本；candidates 为 (task_id, user_id) 列表，成功时返回解析后的任务数据"""
+        keys = [READY_LIST, SET_PROCESSING, WORKER_PROCESSING_PREFIX + worker_id]
+        args = [
+            self.user_concurrent_limit,
+            self.global_concurrent_limit,
+            worker_id,
+            int(time.time()),
+            self.visibility_timeout,
+            "1" if taken else "0",
+        ]
+        for task_id, user in candidates:
+            keys.extend([TASK_PREFIX + task_id, USER_PROCESSING_PREFIX + user, VISIBILITY_TIMEOUT_PREFIX + task_id])
+            args.extend([task_id, user])
+
+        res = await self._script("dequeue")(keys=keys, args=args)
+        status = res[0] if res else "empty"
+        if status == "ok":
+            flat = res[1:]
+            return self._parse_task(dict(zip(flat[::2], flat[1::2])))
+        if status == "missing":
+            logger.warning(f"任务数据不存在: {candidates[0][0]}")
+        elif status == "user_limit":
+            logger.debug(f"就绪任务所属用户均达到并发限制 (Worker: {worker_id})")
+        return None
+
+    async def requeue_worker_tasks(self, worker_id: str) -> int:
+        """将 Worker 处理中列表里未确认的任务放回就绪队列（Worker 退出/排空超时时调用）
+
+        逐个读取列表队头任务的用户，再由 REQUEUE 脚本原子地移回就绪队列并重置状态；
+        任何一步失败时任务 ID 仍留在处理中列表，下次回收时继续处理。
+        任务数据已丢失的 ID 不会删除，只记录日志。
+        """
+        worker_list = WORKER_PROCESSING_PREFIX + worker_id
+        count = 0
+        missing: List[str] = []
         try:
-            task_data = await self.get_task(task_id)
-            if not task_data:
-                return False
+            pending = await self.r.llen(worker_list)
+            retries = 0
+            while pending > 0:
+                task_id = await self.r.lindex(worker_list, 0)
+                if not task_id:
+                    break
+                task_data = await self.get_task(task_id)
+                user = (task_data or {}).get("user") or ""
+                result = int(await self._script("requeue")(
+                    keys=[
+                        worker_list,
+                        READY_LIST,
+                        TASK_PREFIX + task_id,
+                        SET_PROCESSING,
+                        USER_PROCESSING_PREFIX + user,
+                        VISIBILITY_TIMEOUT_PREFIX + task_id,
+                    ],
+                    args=[task_id, user, str(int(time.time()))],
+                ))
+                if result < 0:
+                    retries += 1
+                    if retries >= REQUEUE_MAX_ATTEMPTS:
+                        break
+                    continue
+                pending -= 1
+                if result == 1:
+                    count += 1
+                else:
+                    missing.append(task_id)
+            if count:
+                logger.warning(f"Worker {worker_id} 未完成任务已放回队列: {count} 个")
+            if missing:
+                logger.error(f"Worker {worker_id} 处理中列表的任务数据不存在，已保留在列表中: {missing}")
+        except Exception as e:
+            logger.error(f"回收Worker任务失败: {worker_id} - {e}")
+        return count
 
-            user_id = task_data.get("user")
-            worker_id = task_data.get("worker_id")
+    async def recover_stale_workers(self, exclude: Optional[str] = None) -> int:
+        """回收已崩溃 Worker 的处理中列表（Worker 启动时调用）
 
-            # 从处理中集合移除
-            await self._unmark_task_processing(task_id, user_id)
+        扫描 qa:worker_processing:<worker_id>，心跳键已不存在的 Worker 视为已退出，
+        其列表中的任务通过 requeue_worker_tasks 放回就绪队列；exclude 为当前 Worker 自身。
+        """
+        recovered = 0
+        try:
+            async for key in self.r.scan_iter(match=WORKER_PROCESSING_PREFIX + "*", count=100):
+                worker_id = key[len(WORKER_PROCESSING_PREFIX):]
+                if worker_id == exclude:
+                    continue
+                if await self.r.exists(WORKER_HEARTBEAT_KEY.format(worker_id=worker_id)):
+                    continue
+                recovered += await self.requeue_worker_tasks(worker_id)
+            if recovered:
+                logger.warning(f"已回收失联Worker的未完成任务: {recovered} 个")
+        except Exception as e:
+            logger.error(f"回收失联Worker任务失败: {e}")
+        return recovered
 
-            # 清除可见性超时
-            await self._clear_visibility_timeout(task_id)
+    async def _remove_from_worker_list(self, task_id: str, worker_id: Optional[str]):
+        """从 Worker 处理中列表移除任务（阻塞与非阻塞出队都会把任务记入该列表）"""
+        if worker_id:
+            await self.r.lrem(WORKER_PROCESSING_PREFIX + worker_id, 1, task_id)
 
-            # 更新任务状态
-            status = "completed" if success else "failed"
-            await self.r.hset(TASK_PREFIX + task_id, mapping={
-                "status": status,
-                "completed_at": str(int(time.time()))
-            })
+    async def ack_task(self, task_id: str, success: bool = True) -> bool:
+        """确认任务完成
 
-            # 添加到相应的集合
-            if success:
-                await self.r.sadd(SET_COMPLETED, task_id)
-            else:
-                await self.r.sadd(SET_FAILED, task_id)
+        先读出任务的用户与 Worker（确定需声明的键），再由 ACK 脚本原子完成全部状态迁移；
+        两步之间任务被重新认领时脚本返回 -1，重新读取后再试。
+        """
+        try:
+            status = "completed" if success else "failed"
+            task_key = TASK_PREFIX + task_id
+            for _ in range(ACK_MAX_ATTEMPTS):
+                user, worker_id = await self.r.hmget(task_key, ["user", "worker_id"])
+                user, worker_id = user or "", worker_id or ""
+                done = int(await self._script("ack")(
+                    keys=[
+                        task_key,
+                        SET_PROCESSING,
+                        SET_COMPLETED if success else SET_FAILED,
+                        USER_PROCESSING_PREFIX + user,
+                        VISIBILITY_TIMEOUT_PREFIX + task_id,
+                        WORKER_PROCESSING_PREFIX + worker_id,
+                    ],
+                    args=[task_id, status, str(int(time.time())), user, worker_id],
+                ) or 0)
+                if done >= 0:
+                    break
+            if done != 1:
+                return False
 
             logger.info(f"任务已确认: {task_id} (成功: {success})")
             return True
@@ -177,18 +319,11 @@ class QueueService:
             return False
 
     async def create_batch(self, user_id: str, symbols: List[str], params: Dict[str, Any]) -> tuple[str, int]:
+        """批量创建任务：批次哈希与全部任务在少量脚本调用中写入（每 BULK_ENQUEUE_CHUNK 个一次往返）"""
         batch_id = str(uuid.uuid4())
-        now = int(time.time())
-        batch_key = BATCH_PREFIX + batch_id
-        await self.r.hset(batch_key, mapping={
-            "id": batch_id,
-            "user": user_id,
-            "status": "queued",
-            "submitted": str(len(symbols)),
-            "created_at": str(now),
-        })
-        for s in symbols:
-            await self.enqueue_task(user_id=user_id, symbol=s, params=params, batch_id=batch_id)
+        tasks = [(str(uuid.uuid4()), s) for s in symbols]
+        await self._enqueue_many(user_id, tasks, params, batch_id=batch_id, create_batch=True)
+        logger.info(f"批次已入队: {batch_id} ({len(tasks)} 个任务)")
         return batch_id, len(symbols)
 
     async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -196,6 +331,10 @@ class QueueService:
         data = await self.r.hgetall(key)
         if not data:
             return None
+        return self._parse_task(data)
+
+    @staticmethod
+    def _parse_task(data: Dict[str, Any]) -> Dict[str, Any]:
         # parse fields
         if "params" in data:
             try:
@@ -208,6 +347,23 @@ class QueueService:
             data["submitted"] = int(data["submitted"])
         return data
 
+    def _script(self, name: str):
+        """按需注册 Lua 脚本（EVALSHA，NOSCRIPT 时 redis-py 自动回退加载）"""
+        script = self._scripts.get(name)
+        if script is None:
+            script = self.r.register_script(_SCRIPT_SOURCES[name])
+            self._scripts[name] = script
+        return script
+
+    async def get_task_statuses(self, task_ids: List[str]) -> List[Optional[str]]:
+        """批量读取任务状态（一次 pipeline 往返），顺序与 task_ids 一致"""
+        if not task_ids:
+            return []
+        async with self.r.pipeline(transaction=False) as pipe:
+            for task_id in task_ids:
+                pipe.hget(TASK_PREFIX + task_id, "status")
+            return await pipe.execute()
+
     async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
         key = BATCH_PREFIX + batch_id
         data = await self.r.hgetall(key)
@@ -307,8 +463,9 @@ class QueueService:
 
             user_id = task_data.get("user")
 
-            # 从处理中集合移除
+            # 从处理中集合/Worker处理中列表移除
             await self._unmark_task_processing(task_id, user_id)
+            await self._remove_from_worker_list(task_id, task_data.get("worker_id"))
 
             # 清除可见性超时
             await self._clear_visibility_timeout(task_id)
@@ -341,6 +498,7 @@ class QueueService:
             if status == "processing":
                 # 如果正在处理中，从处理集合移除
                 await self._unmark_task_processing(task_id, user_id)
+                await self._remove_from_worker_list(task_id, task_data.get("worker_id"))
                 await self._clear_visibility_timeout(task_id)
             elif status == "queued":
                 # 如果在队列中，从队列移除
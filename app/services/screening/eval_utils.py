@@ -157,6 +157,104 @@ def evaluate_conditions(
     return False
 
 
+
+def _compare_mask(left: pd.Series, right: Any, op: str) -> pd.Series:
+    """Vectorized counterpart of the scalar comparisons in evaluate_conditions."""
+    if op == ">":
+        return left > right
+    if op == "<":
+        return left < right
+    if op == ">=":
+        return left >= right
+    if op == "<=":
+        return left <= right
+    if op == "==":
+        return left == right
+    if op == "!=":
+        return left != right
+    return pd.Series(False, index=left.index)
+
+
+def evaluate_conditions_mask(
+    last: pd.DataFrame,
+    prev: pd.DataFrame,
+    node: Dict[str, Any],
+    allowed_fields: Iterable[str],
+    allowed_ops: Iterable[str],
+) -> pd.Series:
+    """
+    Evaluate the condition DSL for every symbol at once.
+
+    ``last``/``prev`` hold each symbol's latest and previous bar (index=code,
+    columns=fields). Semantics mirror ``evaluate_conditions`` row by row.
+    """
+    index = last.index
+    none = pd.Series(False, index=index)
+    if not node:
+        return pd.Series(True, index=index)
+    # group 节点
+    if node.get("op") == "group" or "children" in node:
+        logic = (node.get("logic") or "AND").upper()
+        children = node.get("children", [])
+        if logic not in {"AND", "OR"}:
+            logic = "AND"
+        masks = [evaluate_conditions_mask(last, prev, c, allowed_fields, allowed_ops) for c in children]
+        if not masks:
+            return pd.Series(logic == "AND", index=index)
+        out = masks[0]
+        for m in masks[1:]:
+            out = (out & m) if logic == "AND" else (out | m)
+        return out
+
+    # 叶子：字段比较
+    field = node.get("field")
+    op = node.get("op")
+    if field not in allowed_fields or op not in set(allowed_ops):
+        return none
+
+    def col(frame: pd.DataFrame, name: str) -> pd.Series:
+        if name in frame.columns:
+            return pd.to_numeric(frame[name], errors="coerce")
+        return pd.Series(np.nan, index=index)
+
+    # 需要最近两行（交叉）
+    if op in {"cross_up", "cross_down"}:
+        right_field = node.get("right_field")
+        if right_field not in allowed_fields:
+            return none
+        a0, a1 = col(last, field), col(prev, field)
+        b0, b1 = col(last, right_field), col(prev, right_field)
+        valid = a0.notna() & a1.notna() & b0.notna() & b1.notna()
+        if op == "cross_up":
+            return valid & (a1 <= b1) & (a0 > b0)
+        return valid & (a1 >= b1) & (a0 < b0)
+
+    # 普通比较：最近一行
+    left = col(last, field)
+    valid = left.notna()
+
+    if node.get("right_field"):
+        rf = node.get("right_field")
+        if rf not in allowed_fields:
+            return none
+        right: Any = col(last, rf)
+    else:
+        right = node.get("value")
+
+    try:
+        if op == "between":
+            lo_hi = right if isinstance(right, (list, tuple)) else (None, None)
+            lo, hi = lo_hi if isinstance(lo_hi, (list, tuple)) and len(lo_hi) == 2 else (None, None)
+            if lo is None or hi is None:
+                return none
+            return valid & (left >= float(lo)) & (left <= float(hi))
+        if not isinstance(right, pd.Series):
+            right = float(right)
+        return valid & _compare_mask(left, right, op)
+    except Exception:
+        return none
+
+
 def safe_float(v: Any) -> Optional[float]:
     try:
         if v is None or (isinstance(v, float) and np.isnan(v)):
@@ -0,0 +1,279 @@
+"""
+Vectorized full-universe screening engine.
+
+The daily K-line panel for the whole universe is loaded with a single MongoDB
+query, reshaped into a (bars × symbols) matrix whose last row is every
+symbol's latest bar, and the TECH_FIELDS indicators are computed column-wise
+for all symbols at once. Condition evaluation then works on the last two rows
+as boolean masks (see ``eval_utils.evaluate_conditions_mask``).
+
+Bars are right-aligned by position rather than by calendar date, so suspended
+days never introduce gaps and every column sees exactly the series a
+per-symbol ``compute_many`` call would see (leading rows are NaN padding).
+"""
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+from tradingagents.tools.analysis.indicators import ewm_mean, kdj_kernel
+
+logger = logging.getLogger("agents")
+
+# 面板基础列（统一为小写，与 ScreeningService.BASE_FIELDS 对齐）
+PANEL_FIELDS: Tuple[str, ...] = ("open", "high", "low", "close", "vol", "amount")
+
+# MongoDB 中同一股票可能存在多个数据源的K线，按此顺序择优
+DEFAULT_SOURCE_PRIORITY: Tuple[str, ...] = ("tushare", "akshare", "baostock")
+
+_PANEL_COLUMNS = ["code", "trade_date", *PANEL_FIELDS]
+
+
+def empty_panel() -> pd.DataFrame:
+    return pd.DataFrame(columns=_PANEL_COLUMNS)
+
+
+def load_daily_panel(
+    db,
+    symbols: Sequence[str],
+    start_date: str,
+    end_date: str,
+    period: str = "daily",
+    source_priority: Sequence[str] = DEFAULT_SOURCE_PRIORITY,
+    batch_size: int = 20000,
+) -> pd.DataFrame:
+    """
+    一次查询加载全市场K线面板（长表）
+
+    Args:
+        db: 同步 MongoDB 数据库实例（pymongo）
+        symbols: 股票代码列表
+        start_date: 开始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD
+        period: 数据周期
+        source_priority: 数据源优先级，每只股票只保留可用的最高优先级数据源
+        batch_size: 游标批量大小
+
+    Returns:
+        DataFrame: 列为 code, trade_date, open, high, low, close, vol, amount，
+        按 (code, trade_date) 升序排列
+    """
+    if not symbols:
+        return empty_panel()
+
+    query = {
+        "symbol": {"$in": list(symbols)},
+        "period": period,
+        "trade_date": {"$gte": start_date, "$lte": end_date},
+    }
+    if source_priority:
+        query["data_source"] = {"$in": list(source_priority)}
+    projection = {
+        "_id": 0, "symbol": 1, "trade_date": 1, "data_source": 1,
+        "open": 1, "high": 1, "low": 1, "close": 1,
+        "volume": 1, "vol": 1, "amount": 1,
+    }
+
+    docs = list(db.stock_daily_quotes.find(query, projection).batch_size(batch_size))
+    if not docs:
+        return empty_panel()
+
+    df = pd.DataFrame.from_records(docs)
+    return normalize_panel(df, source_priority)
+
+
+def normalize_panel(df: pd.DataFrame, source_priority: Sequence[str] = DEFAULT_SOURCE_PRIORITY) -> pd.DataFrame:
+    """将原始行情文档表统一为面板长表（列名、数据源择优、去重、排序）"""
+    if df is None or df.empty:
+        return empty_panel()
+
+    df = df.rename(columns={"symbol": "code"})
+    if "vol" not in df.columns and "volume" in df.columns:
+        df = df.rename(columns={"volume": "vol"})
+    elif "volume" in df.columns:
+        df["vol"] = df["vol"].fillna(df["volume"])
+
+    # 每只股票仅保留优先级最高的数据源，避免多源K线交错
+    if "data_source" in df.columns and source_priority:
+        rank = df["data_source"].map({s: i for i, s in enumerate(source_priority)}).fillna(len(source_priority))
+        best = rank.groupby(df["code"]).transform("min")
+        df = df[rank == best].copy()
+
+    for col in PANEL_FIELDS:
+        if col not in df.columns:
+            df[col] = np.nan
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    df = df[_PANEL_COLUMNS]
+    df = df.drop_duplicates(subset=["code", "trade_date"], keep="last")
+    return df.sort_values(["code", "trade_date"], kind="mergesort").reset_index(drop=True)
+
+
+def to_bar_matrix(
+    panel: pd.DataFrame,
+    fields: Iterable[str] = PANEL_FIELDS,
+    max_bars: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    将面板长表转换为右对齐的 (bars × symbols) 矩阵
+
+    每列是一只股票自身的K线序列，最后一行是其最新一根K线，
+    K线不足的股票在顶部以 NaN 填充。
+
+    Returns:
+        {field: DataFrame(index=位置, columns=code)}
+    """
+    fields = list(fields)
+    if panel is None or panel.empty:
+        return {f: pd.DataFrame() for f in fields}
+
+    panel = panel.sort_values(["code", "trade_date"], kind="mergesort")
+    codes, col_idx = np.unique(panel["code"].to_numpy(), return_inverse=True)
+    from_end = panel.groupby("code", sort=False).cumcount(ascending=False).to_numpy()
+
+    if max_bars is not None:
+        keep = from_end < int(max_bars)
+        panel, col_idx, from_end = panel[keep], col_idx[keep], from_end[keep]
+
+    n_rows = int(from_end.max()) + 1
+    row_idx = n_rows - 1 - from_end
+
+    out: Dict[str, pd.DataFrame] = {}
+    for f in fields:
+        mat = np.full((n_rows, len(codes)), np.nan)
+        mat[row_idx, col_idx] = panel[f].to_numpy(dtype=float)
+        out[f] = pd.DataFrame(mat, columns=codes)
+    return out
+
+
+class _ColumnBlockIndexer(BaseIndexer):
+    """展平矩阵（按列，order="F"）上的滚动窗口边界：窗口不跨越列边界"""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        pos = np.arange(num_values, dtype=np.int64)
+        col_start = pos - pos % self.n_rows
+        start = np.maximum(pos - int(self.window_size) + 1, col_start)
+        return start, pos + 1
+
+
+def _col_rolling(frame: pd.DataFrame, n: int, min_periods: int, how: str) -> pd.DataFrame:
+    """
+    按列滚动计算
+
+    DataFrame.rolling 会逐列调用底层实现（5000 列即 5000 次调用）；这里把矩阵按列展平，
+    用自定义窗口边界在一次 cython 调用中完成，窗口不跨列，结果与逐列计算一致。
+    """
+    flat = pd.Series(frame.to_numpy().ravel(order="F"))
+    indexer = _ColumnBlockIndexer(window_size=int(n), n_rows=frame.shape[0])
+    res = getattr(flat.rolling(indexer, min_periods=int(min_periods)), how)()
+    return pd.DataFrame(res.to_numpy().reshape(frame.shape, order="F"), index=frame.index, columns=frame.columns)
+
+
+def _col_ewm_mean(frame: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """按列 EWM 均值（所有列同时递推，等价于 ``frame.ewm(**kwargs).mean()``）"""
+    return pd.DataFrame(ewm_mean(frame.to_numpy(), **kwargs), index=frame.index, columns=frame.columns)
+
+
+def _kdj_matrix(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame,
+                n: int = 9, m1: int = 3, m2: int = 3) -> Dict[str, pd.DataFrame]:
+    lowest_low = _col_rolling(low, n, n, "min")
+    highest_high = _col_rolling(high, n, n, "max")
+    rsv = ((close - lowest_low) / (highest_high - lowest_low) * 100).replace([np.inf, -np.inf], np.nan)
+
+    # 与 indicators.kdj 相同的递推内核，对所有股票同时推进
+    k, d = kdj_kernel(rsv.to_numpy(), m1=m1, m2=m2, init=50.0)
+    k_df = pd.DataFrame(k, index=close.index, columns=close.columns)
+    d_df = pd.DataFrame(d, index=close.index, columns=close.columns)
+    return {"kdj_k": k_df, "kdj_d": d_df, "kdj_j": 3 * k_df - 2 * d_df}
+
+
+def compute_panel_indicators(bars: Dict[str, pd.DataFrame], need_tech: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    对 (bars × symbols) 矩阵按列批量计算派生字段与技术指标
+
+    指标参数与 ScreeningService 的 TECH_FIELDS 一致，公式与
+    ``tradingagents.tools.analysis.indicators`` 相同，结果与逐只调用
+    ``compute_many`` 的输出一致。
+    """
+    close = bars["close"]
+    out: Dict[str, pd.DataFrame] = dict(bars)
+    out["pct_chg"] = (close / close.shift(1) - 1) * 100.0
+    if not need_tech or close.empty:
+        return out
+
+    high, low = bars["high"], bars["low"]
+
+    for n in (5, 10, 20, 60):
+        out[f"ma{n}"] = _col_rolling(close, n, 1, "mean")
+    out["ema12"] = _col_ewm_mean(close, span=12, adjust=False)
+    out["ema26"] = _col_ewm_mean(close, span=26, adjust=False)
+
+    dif = out["ema12"] - out["ema26"]
+    dea = _col_ewm_mean(dif, span=9, adjust=False)
+    out["dif"], out["dea"], out["macd_hist"] = dif, dea, dif - dea
+
+    # RSI14（国际标准，Wilder's EMA）
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = _col_ewm_mean(gain, alpha=1 / 14.0, adjust=False)
+    avg_loss = _col_ewm_mean(loss, alpha=1 / 14.0, adjust=False)
+    out["rsi14"] = 100 - (100 / (1 + avg_gain / avg_loss.replace(0, np.nan)))
+
+    mid = out["ma20"]
+    std = _col_rolling(close, 20, 1, "std")
+    out["boll_mid"], out["boll_upper"], out["boll_lower"] = mid, mid + 2.0 * std, mid - 2.0 * std
+
+    prev_close = close.shift(1)
+    tr = np.fmax(np.fmax((high - low).abs(), (high - prev_close).abs()), (low - prev_close).abs())
+    out["atr14"] = _col_rolling(tr, 14, 14, "mean")
+
+    out.update(_kdj_matrix(high, low, close, n=9, m1=3, m2=3))
+    return out
+
+
+def latest_rows(frames: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    取每只股票最近两根K线的全部字段
+
+    Returns:
+        (last, prev): 以 code 为索引、字段为列的 DataFrame；
+        K线不足两根的股票在 prev 中为 NaN
+    """
+    frames = {f: m for f, m in frames.items() if not m.empty}
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame()
+    last = pd.DataFrame({f: m.iloc[-1] for f, m in frames.items()})
+    if len(next(iter(frames.values()))) >= 2:
+        prev = pd.DataFrame({f: m.iloc[-2] for f, m in frames.items()})
+    else:
+        prev = pd.DataFrame(np.nan, index=last.index, columns=last.columns)
+    last.index.name = prev.index.name = "code"
+    return last, prev
+
+
+def dataframes_to_panel(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """将逐只获取的标准化K线 DataFrame（DataSourceManager 输出）拼接为面板长表"""
+    parts: List[pd.DataFrame] = []
+    for code, df in frames.items():
+        if df is None or df.empty:
+            continue
+        part = df.rename(columns={
+            "Open": "open", "High": "high", "Low": "low", "Close": "close",
+            "Volume": "vol", "volume": "vol", "Amount": "amount",
+            "date": "trade_date",
+        }).copy()
+        part["code"] = code
+        if "trade_date" not in part.columns:
+            # 无日期列时按原有顺序编号，保证组内排序稳定
+            part["trade_date"] = [f"{i:08d}" for i in range(len(part))]
+        else:
+            part["trade_date"] = pd.to_datetime(part["trade_date"], errors="coerce").dt.strftime("%Y-%m-%d")
+        parts.append(part)
+    if not parts:
+        return empty_panel()
+    return normalize_panel(pd.concat(parts, ignore_index=True), source_priority=())
@@ -3,12 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import time
 
 import pandas as pd
 import numpy as np
 
-# 统一指标库
-from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
 # 统一多数据源DF接口（按优先级降级）
 from tradingagents.dataflows.data_source_manager import get_data_source_manager
 from tradingagents.dataflows.providers.china.fundamentals_snapshot import get_cn_fund_snapshot
@@ -17,9 +16,19 @@ from tradingagents.dataflows.providers.china.fundamentals_snapshot import get_cn
 from app.services.screening.eval_utils import (
     collect_fields_from_conditions as _collect_fields_from_conditions_util,
     evaluate_conditions as _evaluate_conditions_util,
+    evaluate_conditions_mask as _evaluate_conditions_mask_util,
     evaluate_fund_conditions as _evaluate_fund_conditions_util,
     safe_float as _safe_float_util,
 )
+# 全市场向量化筛选引擎
+from app.services.screening.panel_engine import (
+    compute_panel_indicators,
+    dataframes_to_panel,
+    empty_panel,
+    latest_rows,
+    load_daily_panel,
+    to_bar_matrix,
+)
 
 # --- DSL 约束 ---
 ALLOWED_FIELDS = {
@@ -52,6 +61,9 @@ TECH_FIELDS = {
 }
 FUND_FIELDS = {"pe", "pb", "roe", "market_cap"}
 
+# 结果项中返回的技术指标字段
+RESULT_TECH_FIELDS = ("ma20", "rsi14", "kdj_k", "kdj_d", "kdj_j", "dif", "dea", "macd_hist")
+
 ALLOWED_OPS = {">", "<", ">=", "<=", "==", "!=", "between", "cross_up", "cross_down"}
 
 
@@ -69,6 +81,9 @@ import logging
 logger = logging.getLogger("agents")
 
 class ScreeningService:
+    # MongoDB 面板缺失时逐只补齐/基本面快照的最大股票数（逐只请求外部数据源较慢）
+    fallback_limit: int = 120
+
     def __init__(self):
         # 数据源通过统一DF接口获取，不直接绑定具体源
         self.provider = None
@@ -76,16 +91,12 @@ class ScreeningService:
     # --- 公共入口 ---
     def run(self, conditions: Dict[str, Any], params: ScreeningParams) -> Dict[str, Any]:
         symbols = self._get_universe()
-        # 为控制时长，先限制样本规模（后续用批量/缓存优化）
-        symbols = symbols[:120]
 
         end_date = datetime.now()
         start_date = end_date - timedelta(days=220)
         end_s = end_date.strftime("%Y-%m-%d")
         start_s = start_date.strftime("%Y-%m-%d")
 
-        results: List[Dict[str, Any]] = []
-
         # 解析条件中涉及的字段，决定是否需要技术指标/行情
         needed_fields = self._collect_fields_from_conditions(conditions)
         order_fields = {o.get("field") for o in (params.order_by or []) if o.get("field")}
@@ -94,96 +105,118 @@ class ScreeningService:
         need_base = any(f in BASE_FIELDS for f in all_needed) or need_tech
         need_fund = any(f in FUND_FIELDS for f in all_needed)
 
-        for code in symbols:
-            try:
-                dfc = None
-                last = None
-
-                # 如需要基础行情/技术指标才取K线
-                if need_base:
-                    manager = get_data_source_manager()
-                    df = manager.get_stock_dataframe(code, start_s, end_s)
-                    if df is None or df.empty:
-                        continue
-                    # 统一列为小写
-                    dfu = df.rename(columns={
-                        "Open": "open", "High": "high", "Low": "low", "Close": "close",
-                        "Volume": "vol", "Amount": "amount"
-                    }).copy()
-                    # 计算派生：pct_chg
-                    if "close" in dfu.columns:
-                        dfu["pct_chg"] = dfu["close"].pct_change() * 100.0
-
-                    # 仅在需要技术指标时计算
-                    if need_tech:
-                        specs = [
-                            IndicatorSpec("ma", {"n": 5}),
-                            IndicatorSpec("ma", {"n": 10}),
-                            IndicatorSpec("ma", {"n": 20}),
-                            IndicatorSpec("ema", {"n": 12}),
-                            IndicatorSpec("ema", {"n": 26}),
-                            IndicatorSpec("macd"),
-                            IndicatorSpec("rsi", {"n": 14}),
-                            IndicatorSpec("boll", {"n": 20, "k": 2}),
-                            IndicatorSpec("atr", {"n": 14}),
-                            IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
-                        ]
-                        dfc = compute_many(dfu, specs)
-                    else:
-                        dfc = dfu
-
-                    last = dfc.iloc[-1]
-
-                # 评估条件（若条件完全是基本面且不涉及行情/技术，这里可跳过K线）
-                passes = True
-                if need_base:
-                    passes = self._evaluate_conditions(dfc, conditions)
-                elif need_fund and not need_base and not need_tech:
-                    # 仅基本面条件：使用基本面快照判断
-                    snap = get_cn_fund_snapshot(code)
-                    if not snap:
-                        passes = False
-                    else:
-                        passes = self._evaluate_fund_conditions(snap, conditions)
-
-                if passes:
-                    item = {"code": code}
-                    if last is not None:
-                        item.update({
-                            "close": self._safe_float(last.get("close")),
-                            "pct_chg": self._safe_float(last.get("pct_chg")),
-                            "amount": self._safe_float(last.get("amount")),
-                            "ma20": self._safe_float(last.get("ma20")) if need_tech else None,
-                            "rsi14": self._safe_float(last.get("rsi14")) if need_tech else None,
-                            "kdj_k": self._safe_float(last.get("kdj_k")) if need_tech else None,
-                            "kdj_d": self._safe_float(last.get("kdj_d")) if need_tech else None,
-                            "kdj_j": self._safe_float(last.get("kdj_j")) if need_tech else None,
-                            "dif": self._safe_float(last.get("dif")) if need_tech else None,
-                            "dea": self._safe_float(last.get("dea")) if need_tech else None,
-                            "macd_hist": self._safe_float(last.get("macd_hist")) if need_tech else None,
-                        })
-                    results.append(item)
-            except Exception:
-                continue
+        if need_base:
+            # 全市场向量化：一次加载K线面板，按列计算指标，按掩码评估条件
+            frame = self._screen_panel(symbols, conditions, start_s, end_s, need_tech)
+        else:
+            frame = self._screen_fundamentals(symbols, conditions, need_fund)
 
-        total = len(results)
-        # 排序
-        if params.order_by:
-            for order in reversed(params.order_by):  # 后者优先级低
-                f = order.get("field")
-                d = order.get("direction", "desc").lower()
-                if f in ALLOWED_FIELDS:
-                    results.sort(key=lambda x: (x.get(f) is None, x.get(f)), reverse=(d == "desc"))
+        total = len(frame)
+        frame = self._sort_frame(frame, params.order_by)
 
         # 分页
         start = params.offset or 0
         end = start + (params.limit or 50)
-        page_items = results[start:end]
+        page = frame.iloc[start:end]
 
         return {
             "total": total,
-            "items": page_items,
+            "items": [self._to_item(code, row, need_base, need_tech) for code, row in page.iterrows()],
         }
+
+    def _screen_panel(
+        self,
+        symbols: List[str],
+        conditions: Dict[str, Any],
+        start_s: str,
+        end_s: str,
+        need_tech: bool,
+    ) -> pd.DataFrame:
+        """在全市场K线面板上计算指标并评估条件，返回命中股票的最新一行（index=code）"""
+        panel = self._load_panel(symbols, start_s, end_s)
+        if panel.empty:
+            return pd.DataFrame()
+
+        frames = compute_panel_indicators(to_bar_matrix(panel), need_tech=need_tech)
+        last, prev = latest_rows(frames)
+        mask = _evaluate_conditions_mask_util(last, prev, conditions, ALLOWED_FIELDS, ALLOWED_OPS)
+        return last[mask.to_numpy()]
+
+    def _load_panel(self, symbols: List[str], start_s: str, end_s: str) -> pd.DataFrame:
+        """优先一次性从 MongoDB 加载面板；缺失的股票按统一DF接口逐只补齐（受 fallback_limit 限制）"""
+        panel = empty_panel()
+        try:
+            from app.core.database import get_mongo_db_sync
+
+            t0 = time.time()
+            panel = load_daily_panel(get_mongo_db_sync(), symbols, start_s, end_s)
+            logger.info(
+                f"📊 K线面板加载完成: {panel['code'].nunique() if not panel.empty else 0}/{len(symbols)} 只股票, "
+                f"{len(panel)} 条, 耗时 {time.time() - t0:.2f}秒"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 从 MongoDB 批量加载K线面板失败，改用逐只获取: {e}")
+
+        loaded = set(panel["code"].unique()) if not panel.empty else set()
+        missing = [s for s in symbols if s not in loaded][: self.fallback_limit]
+        if not missing:
+            return panel
+
+        manager = get_data_source_manager()
+        fetched: Dict[str, pd.DataFrame] = {}
+        for code in missing:
+            try:
+                fetched[code] = manager.get_stock_dataframe(code, start_s, end_s)
+            except Exception:
+                continue
+        extra = dataframes_to_panel(fetched)
+        if extra.empty:
+            return panel
+        if panel.empty:
+            return extra
+        return pd.concat([panel, extra], ignore_index=True)
+
+    def _screen_fundamentals(self, symbols: List[str], conditions: Dict[str, Any], need_fund: bool) -> pd.DataFrame:
+        """仅基本面（或无条件）筛选：逐只使用基本面快照判断"""
+        # 快照需逐只请求外部接口，仍限制样本规模
+        codes: List[str] = []
+        for code in symbols[: self.fallback_limit]:
+            try:
+                if need_fund:
+                    snap = get_cn_fund_snapshot(code)
+                    if not snap or not self._evaluate_fund_conditions(snap, conditions):
+                        continue
+                codes.append(code)
+            except Exception:
+                continue
+        return pd.DataFrame(index=pd.Index(codes, name="code"))
+
+    def _sort_frame(self, frame: pd.DataFrame, order_by: Optional[List[Dict[str, str]]]) -> pd.DataFrame:
+        """按 order_by 多字段排序（前者优先，缺失值排在最后）"""
+        by: List[str] = []
+        ascending: List[bool] = []
+        for order in order_by or []:
+            f = order.get("field")
+            if f in ALLOWED_FIELDS and f in frame.columns and f not in by:
+                by.append(f)
+                ascending.append(order.get("direction", "desc").lower() != "desc")
+        if not by or frame.empty:
+            return frame
+        return frame.sort_values(by=by, ascending=ascending, na_position="last", kind="mergesort")
+
+    def _to_item(self, code: str, row: pd.Series, need_base: bool, need_tech: bool) -> Dict[str, Any]:
+        item: Dict[str, Any] = {"code": code}
+        if not need_base:
+            return item
+        item.update({
+            "close": self._safe_float(row.get("close")),
+            "pct_chg": self._safe_float(row.get("pct_chg")),
+            "amount": self._safe_float(row.get("amount")),
+        })
+        for f in RESULT_TECH_FIELDS:
+            item[f] = self._safe_float(row.get(f)) if need_tech else None
+        return item
+
     def _evaluate_fund_conditions(self, snap: Dict[str, Any], node: Dict[str, Any]) -> bool:
         """Delegate fundamental condition evaluation to utils to keep service slim."""
         return _evaluate_fund_conditions_util(snap, node, FUND_FIELDS)
@@ -206,9 +239,9 @@ class ScreeningService:
     def _get_universe(self) -> List[str]:
         """获取A股代码集合：从 MongoDB stock_basic_info 集合获取所有A股股票代码"""
         try:
-            from app.core.database import get_mongo_db
+            from app.core.database import get_mongo_db_sync
 
-            db = get_mongo_db()
+            db = get_mongo_db_sync()
             collection = db.stock_basic_info
 
             # 查询所有A股股票代码（兼容不同的数据结构）
@@ -223,8 +256,8 @@ class ScreeningService:
                 {"code": 1, "_id": 0}
             )
 
-            # 同步获取所有股票代码
-            codes = [doc.get("code") for doc in cursor if doc.get("code")]
+            # 同步获取所有股票代码（多数据源可能重复，保持顺序去重）
+            codes = list(dict.fromkeys(doc.get("code") for doc in cursor if doc.get("code")))
 
             if codes:
                 logger.info(f"📊 从 MongoDB 获取到 {len(codes)} 只A股股票")
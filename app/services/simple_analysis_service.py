@@ -21,6 +21,7 @@ init_logging()
 
 from tradingagents.graph.trading_graph import TradingAgentsGraph
 from tradingagents.default_config import DEFAULT_CONFIG
+from tradingagents.utils.async_bridge import run_coro_sync
 from app.models.analysis import (
     AnalysisTask, AnalysisStatus, SingleAnalysisRequest, AnalysisParameters
 )
@@ -1116,22 +1117,16 @@ class SimpleAnalysisService:
                         })
 
                     # 🔥 使用同步方式更新内存和 MongoDB，避免事件循环冲突
-                    # 1. 更新内存中的任务状态（使用新事件循环）
-                    import asyncio
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(
-                            self.memory_manager.update_task_status(
-                                task_id=task_id,
-                                status=TaskStatus.RUNNING,
-                                progress=progress,
-                                message=message,
-                                current_step=step
-                            )
+                    # 1. 更新内存中的任务状态（经由常驻事件循环）
+                    run_coro_sync(
+                        self.memory_manager.update_task_status(
+                            task_id=task_id,
+                            status=TaskStatus.RUNNING,
+                            progress=progress,
+                            message=message,
+                            current_step=step
                         )
-                    finally:
-                        loop.close()
+                    )
 
                     # 2. 更新 MongoDB（使用同步客户端，避免事件循环冲突）
                     from pymongo import MongoClient
@@ -1461,21 +1456,16 @@ class SimpleAnalysisService:
                                     )
                                     sync_client.close()
 
-                                    # 异步更新内存（创建新的事件循环）
-                                    loop = asyncio.new_event_loop()
-                                    asyncio.set_event_loop(loop)
-                                    try:
-                                        loop.run_until_complete(
-                                            self.memory_manager.update_task_status(
-                                                task_id=task_id,
-                                                status=TaskStatus.RUNNING,
-                                                progress=int(progress_pct),
-                                                message=message,
-                                                current_step=message
-                                            )
+                                    # 异步更新内存（经由常驻事件循环）
+                                    run_coro_sync(
+                                        self.memory_manager.update_task_status(
+                                            task_id=task_id,
+                                            status=TaskStatus.RUNNING,
+                                            progress=int(progress_pct),
+                                            message=message,
+                                            current_step=message
                                         )
-                                    finally:
-                                        loop.close()
+                                    )
 
                                     logger.debug(f"✅ [Graph进度] 已同步更新内存和MongoDB: {int(progress_pct)}%")
                             except Exception as sync_err:
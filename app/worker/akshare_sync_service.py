@@ -7,10 +7,13 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
+from app.core.config import settings
 from app.core.database import get_mongo_db
+from app.core.rate_limiter import get_akshare_rate_limiter
 from app.services.historical_data_service import get_historical_data_service
 from app.services.news_data_service import get_news_data_service
 from tradingagents.dataflows.providers.china.akshare import AKShareProvider
+from app.worker.sync_pipeline import SyncPipeline, historical_checkpoint, merge_pipeline_stats
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,10 @@ class AKShareSyncService:
         self.db = None
         self.batch_size = 100
         self.rate_limit_delay = 0.2  # AKShare建议的延迟
+        # 逐只股票历史数据同步的速率限制（流水线的获取协程共享）
+        self.rate_limiter = get_akshare_rate_limiter(
+            max_calls=int(getattr(settings, "AKSHARE_RATE_LIMIT_PER_MINUTE", 120))
+        )
     
     async def initialize(self):
         """初始化同步服务"""
@@ -570,7 +577,8 @@ class AKShareSyncService:
                 end_date = datetime.now().strftime('%Y-%m-%d')
 
             # 2. 确定要同步的股票列表
-            if symbols is None:
+            full_market = symbols is None
+            if full_market:
                 basic_info_cursor = self.db.stock_basic_info.find({}, {"code": 1})
                 symbols = [doc["code"] async for doc in basic_info_cursor]
 
@@ -590,27 +598,33 @@ class AKShareSyncService:
 
             logger.info(f"📊 历史数据同步: 结束日期={end_date}, 股票数量={len(symbols)}, 模式={'增量' if incremental else '全量'}")
 
-            # 4. 批量处理
-            for i in range(0, len(symbols), self.batch_size):
-                batch = symbols[i:i + self.batch_size]
-                batch_stats = await self._process_historical_batch(
-                    batch, start_date, end_date, period, incremental
-                )
-
-                # 更新统计
-                stats["success_count"] += batch_stats["success_count"]
-                stats["error_count"] += batch_stats["error_count"]
-                stats["total_records"] += batch_stats["total_records"]
-                stats["errors"].extend(batch_stats["errors"])
-
-                # 进度日志
-                progress = min(i + self.batch_size, len(symbols))
-                logger.info(f"📈 历史数据同步进度: {progress}/{len(symbols)} "
-                           f"(成功: {stats['success_count']}, 记录: {stats['total_records']})")
-
-                # API限流
-                if i + self.batch_size < len(symbols):
-                    await asyncio.sleep(self.rate_limit_delay)
+            # 4. 流水线处理：多个获取协程受速率限制器约束并发拉取，写入与获取重叠
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
+            # 增量同步：一次聚合取出所有股票的最后交易日
+            last_dates = None
+            if incremental and not start_date:
+                last_dates = await self._load_last_sync_dates(period)
+            pipeline = SyncPipeline(
+                f"AKShare{period_name}",
+                fetch=lambda symbol: self._fetch_symbol_history(
+                    symbol, start_date, end_date, period, incremental, last_dates
+                ),
+                save=lambda symbol, hist_data: self.historical_service.save_historical_data(
+                    symbol=symbol,
+                    data=hist_data,
+                    data_source="akshare",
+                    market="CN",
+                    period=period
+                ),
+                rate_limiter=self.rate_limiter,
+                progress=lambda done, total, symbol: self._log_historical_progress(done, total),
+                checkpoint=historical_checkpoint(
+                    self.db, "akshare", period, "incremental" if incremental else "full", end_date
+                ) if full_market else None,
+            )
+            result = await pipeline.run(symbols)
+            merge_pipeline_stats(stats, result, "sync_historical_data", empty_as_error=True)
 
             # 4. 完成统计
             stats["end_time"] = datetime.utcnow()
@@ -629,78 +643,49 @@ class AKShareSyncService:
             stats["errors"].append({"error": str(e), "context": "sync_historical_data"})
             return stats
 
-    async def _process_historical_batch(
+    async def _fetch_symbol_history(
         self,
-        batch: List[str],
-        start_date: str,
+        symbol: str,
+        start_date: Optional[str],
         end_date: str,
         period: str = "daily",
-        incremental: bool = False
-    ) -> Dict[str, Any]:
-        """处理历史数据批次"""
-        batch_stats = {
-            "success_count": 0,
-            "error_count": 0,
-            "total_records": 0,
-            "errors": []
-        }
-
-        for symbol in batch:
-            try:
-                # 确定该股票的起始日期
-                symbol_start_date = start_date
-                if not symbol_start_date:
-                    if incremental:
-                        # 增量同步：获取该股票的最后日期
-                        symbol_start_date = await self._get_last_sync_date(symbol)
-                        logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
-                    else:
-                        # 全量同步：最近1年
-                        symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-
-                # 获取历史数据
-                hist_data = await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period)
+        incremental: bool = False,
+        last_dates: Optional[Dict[str, str]] = None
+    ):
+        """流水线获取阶段：确定该股票的起始日期并拉取历史数据"""
+        symbol_start_date = start_date
+        if not symbol_start_date:
+            if incremental:
+                # 增量同步：获取该股票的最后日期
+                symbol_start_date = await self._get_last_sync_date(symbol, last_dates)
+                logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
+            else:
+                # 全量同步：最近1年
+                symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
 
-                if hist_data is not None and not hist_data.empty:
-                    # 保存到统一历史数据集合
-                    if self.historical_service is None:
-                        self.historical_service = await get_historical_data_service()
+        return await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period)
 
-                    saved_count = await self.historical_service.save_historical_data(
-                        symbol=symbol,
-                        data=hist_data,
-                        data_source="akshare",
-                        market="CN",
-                        period=period
-                    )
+    async def _log_historical_progress(self, done: int, total: int):
+        """流水线按批次回调的进度日志"""
+        logger.info(f"📈 历史数据同步进度: {done}/{total}")
 
-                    batch_stats["success_count"] += 1
-                    batch_stats["total_records"] += saved_count
-                    logger.debug(f"✅ {symbol}历史数据同步成功: {saved_count}条记录")
-                else:
-                    batch_stats["error_count"] += 1
-                    batch_stats["errors"].append({
-                        "code": symbol,
-                        "error": "历史数据为空",
-                        "context": "_process_historical_batch"
-                    })
-
-            except Exception as e:
-                batch_stats["error_count"] += 1
-                batch_stats["errors"].append({
-                    "code": symbol,
-                    "error": str(e),
-                    "context": "_process_historical_batch"
-                })
-
-        return batch_stats
+    async def _load_last_sync_dates(self, period: str = "daily") -> Optional[Dict[str, str]]:
+        """一次聚合获取全部股票的最后交易日，失败时返回 None（退回逐只查询）"""
+        try:
+            last_dates = await self.historical_service.get_coverage_map("akshare", period, refresh=True)
+            logger.info(f"📅 已加载 {len(last_dates)} 只股票的最后同步日期（单次聚合）")
+            return last_dates
+        except Exception as e:
+            logger.warning(f"⚠️ 批量获取最后同步日期失败，改为逐只查询: {e}")
+            return None
 
-    async def _get_last_sync_date(self, symbol: str = None) -> str:
+    async def _get_last_sync_date(self, symbol: str = None, last_dates: Optional[Dict[str, str]] = None) -> str:
         """
         获取最后同步日期
 
         Args:
             symbol: 股票代码，如果提供则返回该股票的最后日期+1天
+            last_dates: 预先聚合的 {symbol: 最后交易日}，提供时不再逐只查询
 
         Returns:
             日期字符串 (YYYY-MM-DD)
@@ -711,7 +696,10 @@ class AKShareSyncService:
 
             if symbol:
                 # 获取特定股票的最新日期
-                latest_date = await self.historical_service.get_latest_date(symbol, "akshare")
+                if last_dates is not None:
+                    latest_date = last_dates.get(symbol)
+                else:
+                    latest_date = await self.historical_service.get_latest_date(symbol, "akshare")
                 if latest_date:
                     # 返回最后日期的下一天（避免重复同步）
                     try:
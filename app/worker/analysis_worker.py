@@ -24,7 +24,12 @@ from app.core.redis_client import init_redis, close_redis
 from app.core.config import settings
 from app.models.analysis import AnalysisTask, AnalysisParameters
 from app.services.config_provider import provider as config_provider
-from app.services.queue import DEFAULT_USER_CONCURRENT_LIMIT, GLOBAL_CONCURRENT_LIMIT, VISIBILITY_TIMEOUT_SECONDS
+from app.services.queue import (
+    DEFAULT_USER_CONCURRENT_LIMIT,
+    GLOBAL_CONCURRENT_LIMIT,
+    VISIBILITY_TIMEOUT_SECONDS,
+    WORKER_HEARTBEAT_KEY,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +42,17 @@ class AnalysisWorker:
         self.queue_service = None
         self.running = False
         self.current_task = None
+        # 并发执行中的任务：task_id -> asyncio.Task
+        self.in_flight: Dict[str, asyncio.Task] = {}
 
         # 配置参数（可由系统设置覆盖）
         self.heartbeat_interval = int(getattr(settings, 'WORKER_HEARTBEAT_INTERVAL', 30))
         self.max_retries = int(getattr(settings, 'QUEUE_MAX_RETRIES', 3))
         self.poll_interval = float(getattr(settings, 'QUEUE_POLL_INTERVAL_SECONDS', 1))  # 队列轮询间隔（秒）
         self.cleanup_interval = float(getattr(settings, 'QUEUE_CLEANUP_INTERVAL_SECONDS', 60))
+        self.concurrency = max(1, int(getattr(settings, 'WORKER_CONCURRENCY', 1)))  # 单进程并发任务数
+        self.block_timeout = float(getattr(settings, 'QUEUE_BLOCK_TIMEOUT_SECONDS', 5))  # 阻塞出队等待（秒）
+        self.drain_timeout = float(getattr(settings, 'WORKER_DRAIN_TIMEOUT_SECONDS', 600))  # 关闭时排空等待（秒）
 
         # 注册信号处理器
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -82,8 +92,14 @@ class AnalysisWorker:
                 self.heartbeat_interval = int(effective_settings.get("worker_heartbeat_interval_seconds", self.heartbeat_interval))
                 self.poll_interval = float(effective_settings.get("queue_poll_interval_seconds", self.poll_interval))
                 self.cleanup_interval = float(effective_settings.get("queue_cleanup_interval_seconds", self.cleanup_interval))
+                self.concurrency = max(1, int(effective_settings.get("worker_concurrency", self.concurrency)))
             except Exception:
                 pass
+
+            # 先登记自身心跳，再回收没有心跳的 Worker 遗留在处理中列表的任务
+            await self._send_heartbeat()
+            await self.queue_service.recover_stale_workers(exclude=self.worker_id)
+
             # 启动心跳任务
             heartbeat_task = asyncio.create_task(self._heartbeat_loop())
 
@@ -110,26 +126,74 @@ class AnalysisWorker:
             await self._cleanup()
 
     async def _work_loop(self):
-        """主工作循环"""
-        logger.info(f"✅ Worker {self.worker_id} 开始工作")
+        """主工作循环
+
+        以信号量限制并发数：拿到空闲槽位后阻塞出队（有新任务立即唤醒），
+        每个任务在独立协程中执行；停止后等待在途任务排空。
+        """
+        logger.info(f"✅ Worker {self.worker_id} 开始工作 (并发: {self.concurrency})")
+        semaphore = asyncio.Semaphore(self.concurrency)
 
         while self.running:
+            if semaphore.locked():
+                # 槽位全满：短暂休眠后再检查 running，保证收到 SIGTERM 后及时进入排空
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            await semaphore.acquire()
+            dispatched = False
             try:
-                # 从队列获取任务
-                task_data = await self.queue_service.dequeue_task(self.worker_id)
+                if not self.running:
+                    break
+
+                # 阻塞等待新任务（全局/用户并发超限时返回 None）
+                task_data = await self.queue_service.dequeue_task_blocking(self.worker_id, self.block_timeout)
 
                 if task_data:
-                    await self._process_task(task_data)
-                else:
-                    # 没有任务，短暂休眠
+                    self._dispatch(task_data, semaphore)
+                    dispatched = True
+                elif self.running:
+                    # 无任务或达到并发限制，短暂休眠
                     await asyncio.sleep(self.poll_interval)
 
             except Exception as e:
                 logger.error(f"工作循环异常: {e}")
                 await asyncio.sleep(5)  # 异常后等待5秒再继续
+            finally:
+                if not dispatched:
+                    semaphore.release()
 
+        await self._drain()
         logger.info(f"🔄 Worker {self.worker_id} 工作循环结束")
 
+    def _dispatch(self, task_data: Dict[str, Any], semaphore: asyncio.Semaphore):
+        """在独立协程中执行任务，结束后释放并发槽位"""
+        task_id = task_data.get("id")
+        job = asyncio.create_task(self._process_task(task_data))
+        self.in_flight[task_id] = job
+
+        def _done(_job: asyncio.Task):
+            self.in_flight.pop(task_id, None)
+            semaphore.release()
+
+        job.add_done_callback(_done)
+
+    async def _drain(self):
+        """排空在途任务；超时未完成的任务取消并放回队列"""
+        if not self.in_flight:
+            return
+
+        logger.info(f"⏳ 等待 {len(self.in_flight)} 个在途任务完成 (最长 {self.drain_timeout:.0f} 秒)")
+        _, pending = await asyncio.wait(list(self.in_flight.values()), timeout=self.drain_timeout)
+
+        if pending:
+            logger.warning(f"⚠️ 排空超时，取消 {len(pending)} 个任务并放回队列")
+            for job in pending:
+                job.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if self.queue_service:
+                await self.queue_service.requeue_worker_tasks(self.worker_id)
+
     async def _process_task(self, task_data: Dict[str, Any]):
         """处理单个任务"""
         task_id = task_data.get("id")
@@ -140,6 +204,7 @@ class AnalysisWorker:
 
         self.current_task = task_id
         success = False
+        cancelled = False
 
         try:
             # 构建分析任务对象
@@ -153,6 +218,7 @@ class AnalysisWorker:
             task = AnalysisTask(
                 task_id=task_id,
                 user_id=user_id,
+                symbol=stock_code,
                 stock_code=stock_code,
                 batch_id=task_data.get("batch_id"),
                 parameters=parameters
@@ -161,28 +227,38 @@ class AnalysisWorker:
             # 执行分析
             result = await get_analysis_service().execute_analysis_task(
                 task,
-                progress_callback=self._progress_callback
+                progress_callback=self._make_progress_callback(task_id)
             )
 
             success = True
             logger.info(f"✅ 任务完成: {task_id} - 耗时: {result.execution_time:.2f}秒")
 
+        except asyncio.CancelledError:
+            # 排空超时被取消：不确认，由 requeue_worker_tasks 放回队列
+            logger.warning(f"⏹️ 任务被取消: {task_id}")
+            cancelled = True
+            raise
+
         except Exception as e:
             logger.error(f"❌ 任务执行失败: {task_id} - {e}")
             logger.error(traceback.format_exc())
 
         finally:
-            # 确认任务完成
-            try:
-                await self.queue_service.ack_task(task_id, success)
-            except Exception as e:
-                logger.error(f"确认任务失败: {task_id} - {e}")
-
-            self.current_task = None
-
-    def _progress_callback(self, progress: int, message: str):
-        """进度回调函数"""
-        logger.debug(f"任务进度 {self.current_task}: {progress}% - {message}")
+            if not cancelled:
+                # 确认任务完成
+                try:
+                    await self.queue_service.ack_task(task_id, success)
+                except Exception as e:
+                    logger.error(f"确认任务失败: {task_id} - {e}")
+
+            if self.current_task == task_id:
+                self.current_task = next(iter(self.in_flight.keys() - {task_id}), None)
+
+    def _make_progress_callback(self, task_id: str):
+        """为每个任务生成独立的进度回调（并发时 current_task 不唯一）"""
+        def _callback(progress: int, message: str):
+            logger.debug(f"任务进度 {task_id}: {progress}% - {message}")
+        return _callback
 
     async def _heartbeat_loop(self):
         """心跳循环"""
@@ -206,10 +282,12 @@ class AnalysisWorker:
                 "worker_id": self.worker_id,
                 "timestamp": datetime.utcnow().isoformat(),
                 "current_task": self.current_task,
+                "current_tasks": list(self.in_flight.keys()),
+                "concurrency": self.concurrency,
                 "status": "active" if self.running else "stopping"
             }
 
-            heartbeat_key = f"worker:{self.worker_id}:heartbeat"
+            heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
             await redis_service.set_json(heartbeat_key, heartbeat_data, ttl=self.heartbeat_interval * 2)
 
         except Exception as e:
@@ -235,7 +313,7 @@ class AnalysisWorker:
             # 清理心跳记录
             from app.core.redis_client import get_redis_service
             redis_service = get_redis_service()
-            heartbeat_key = f"worker:{self.worker_id}:heartbeat"
+            heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
             await redis_service.redis.delete(heartbeat_key)
         except Exception as e:
             logger.error(f"清理心跳记录失败: {e}")
@@ -11,8 +11,10 @@ from dataclasses import dataclass
 
 from app.core.config import get_settings
 from app.core.database import get_database
+from app.core.rate_limiter import get_baostock_rate_limiter
 from app.services.historical_data_service import get_historical_data_service
 from tradingagents.dataflows.providers.china.baostock import BaoStockProvider
+from app.worker.sync_pipeline import SyncPipeline, historical_checkpoint
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +47,9 @@ class BaoStockSyncService:
             self.provider = BaoStockProvider()
             self.historical_service = None  # 延迟初始化
             self.db = None  # 🔥 延迟初始化，在 initialize() 中设置
+            self.rate_limiter = get_baostock_rate_limiter(
+                max_calls=int(getattr(self.settings, "BAOSTOCK_RATE_LIMIT_PER_MINUTE", 100))
+            )
 
             logger.info("✅ BaoStock同步服务初始化成功")
         except Exception as e:
@@ -387,21 +392,27 @@ class BaoStockSyncService:
 
             logger.info(f"📊 开始同步{len(stock_codes)}只股票的历史数据...")
 
-            # 批量处理
-            for i in range(0, len(stock_codes), batch_size):
-                batch = stock_codes[i:i + batch_size]
-                batch_stats = await self._sync_historical_batch(batch, days, end_date, period, use_incremental)
-                
-                stats.historical_records += batch_stats.historical_records
-                stats.errors.extend(batch_stats.errors)
-                
-                logger.info(f"📊 批次进度: {i + len(batch)}/{len(stock_codes)}, "
-                          f"记录: {batch_stats.historical_records}, "
-                          f"错误: {len(batch_stats.errors)}")
-                
-                # 避免API限制
-                await asyncio.sleep(0.5)
-            
+            # 流水线处理：获取与写入重叠；baostock 客户端共用一个全局会话，获取协程只能有一个
+            # 增量同步：一次聚合取出所有股票的最后交易日
+            last_dates = await self._load_last_sync_dates(period) if use_incremental else None
+
+            mode = "incremental" if use_incremental else ("all" if days >= 3650 else f"{days}d")
+            pipeline = SyncPipeline(
+                f"BaoStock{period_name}",
+                fetch=lambda code: self._fetch_symbol_history(
+                    code, days, end_date, period, use_incremental, last_dates
+                ),
+                save=lambda code, hist_data: self._update_historical_data(code, hist_data, period),
+                rate_limiter=self.rate_limiter,
+                fetchers=1,
+                progress=lambda done, total, code: self._log_historical_progress(done, total),
+                progress_every=batch_size,
+                checkpoint=historical_checkpoint(self.db, "baostock", period, mode, end_date),
+            )
+            result = await pipeline.run(stock_codes)
+            stats.historical_records += result["total_records"]
+            stats.errors.extend(f"处理{e['code']}历史数据失败: {e['error']}" for e in result["errors"])
+
             logger.info(f"✅ BaoStock历史数据同步完成: {stats.historical_records}条记录")
             return stats
             
@@ -410,44 +421,32 @@ class BaoStockSyncService:
             stats.errors.append(str(e))
             return stats
     
-    async def _sync_historical_batch(
+    async def _fetch_symbol_history(
         self,
-        code_batch: List[str],
+        code: str,
         days: int,
         end_date: str,
         period: str = "daily",
-        incremental: bool = False
-    ) -> BaoStockSyncStats:
-        """同步历史数据批次"""
-        stats = BaoStockSyncStats()
-
-        for code in code_batch:
-            try:
-                # 确定该股票的起始日期
-                if incremental:
-                    # 增量同步：获取该股票的最后日期
-                    start_date = await self._get_last_sync_date(code)
-                    logger.debug(f"📅 {code}: 从 {start_date} 开始同步")
-                elif days >= 3650:
-                    # 全历史同步
-                    start_date = "1990-01-01"
-                else:
-                    # 固定天数同步
-                    start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-                hist_data = await self.provider.get_historical_data(code, start_date, end_date, period)
-
-                if hist_data is not None and not hist_data.empty:
-                    # 更新数据库
-                    records_count = await self._update_historical_data(code, hist_data, period)
-                    stats.historical_records += records_count
-                else:
-                    stats.errors.append(f"获取{code}历史数据失败")
-
-            except Exception as e:
-                stats.errors.append(f"处理{code}历史数据失败: {e}")
-
-        return stats
+        incremental: bool = False,
+        last_dates: Optional[Dict[str, str]] = None
+    ):
+        """流水线获取阶段：确定该股票的起始日期并拉取历史数据"""
+        if incremental:
+            # 增量同步：获取该股票的最后日期
+            start_date = await self._get_last_sync_date(code, last_dates)
+            logger.debug(f"📅 {code}: 从 {start_date} 开始同步")
+        elif days >= 3650:
+            # 全历史同步
+            start_date = "1990-01-01"
+        else:
+            # 固定天数同步
+            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+        return await self.provider.get_historical_data(code, start_date, end_date, period)
+
+    async def _log_historical_progress(self, done: int, total: int):
+        """流水线按批次回调的进度日志"""
+        logger.info(f"📊 批次进度: {done}/{total}")
 
     async def _update_historical_data(self, code: str, hist_data, period: str = "daily") -> int:
         """更新历史数据到数据库"""
@@ -490,12 +489,25 @@ class BaoStockSyncService:
             logger.error(f"❌ 更新历史数据到数据库失败: {e}")
             return 0
     
-    async def _get_last_sync_date(self, symbol: str = None) -> str:
+    async def _load_last_sync_dates(self, period: str = "daily") -> Optional[Dict[str, str]]:
+        """一次聚合获取全部股票的最后交易日，失败时返回 None（退回逐只查询）"""
+        try:
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
+            last_dates = await self.historical_service.get_coverage_map("baostock", period, refresh=True)
+            logger.info(f"📅 已加载 {len(last_dates)} 只股票的最后同步日期（单次聚合）")
+            return last_dates
+        except Exception as e:
+            logger.warning(f"⚠️ 批量获取最后同步日期失败，改为逐只查询: {e}")
+            return None
+
+    async def _get_last_sync_date(self, symbol: str = None, last_dates: Optional[Dict[str, str]] = None) -> str:
         """
         获取最后同步日期
 
         Args:
             symbol: 股票代码，如果提供则返回该股票的最后日期+1天
+            last_dates: 预先聚合的 {symbol: 最后交易日}，提供时不再逐只查询
 
         Returns:
             日期字符串 (YYYY-MM-DD)
@@ -506,7 +518,10 @@ class BaoStockSyncService:
 
             if symbol:
                 # 获取特定股票的最新日期
-                latest_date = await self.historical_service.get_latest_date(symbol, "baostock")
+                if last_dates is not None:
+                    latest_date = last_dates.get(symbol)
+                else:
+                    latest_date = await self.historical_service.get_latest_date(symbol, "baostock")
                 if latest_date:
                     # 返回最后日期的下一天（避免重复同步）
                     try:
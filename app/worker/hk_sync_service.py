@@ -31,6 +31,8 @@ from tradingagents.dataflows.providers.hk.hk_stock import HKStockProvider
 from tradingagents.dataflows.providers.hk.improved_hk import ImprovedHKStockProvider
 from app.core.database import get_mongo_db
 from app.core.config import settings
+from app.core.rate_limiter import RateLimiter
+from app.worker.sync_pipeline import SyncPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +59,13 @@ class HKDataService:
         self._stock_list_cache_time = None
         self._stock_list_cache_ttl = 3600 * 24  # 缓存24小时
 
+        # 逐只股票同步的速率限制（流水线的获取协程共享）
+        self.rate_limiter = RateLimiter(
+            max_calls=int(getattr(settings, "HK_SYNC_RATE_LIMIT_PER_MINUTE", 120)),
+            time_window=60,
+            name="HKSyncRateLimiter"
+        )
+
     async def initialize(self):
         """初始化同步服务"""
         logger.info("✅ 港股同步服务初始化完成")
@@ -394,49 +403,54 @@ class HKDataService:
         logger.info(f"🇭🇰 开始同步港股实时行情 (数据源: {source})")
         
         operations = []
-        failed_count = 0
-        
-        for stock_code in self.hk_stock_list:
-            try:
-                # 获取实时价格
-                quote = provider.get_real_time_price(stock_code)
-                
-                if not quote or not quote.get('price'):
-                    logger.warning(f"⚠️ 跳过无效行情: {stock_code}")
-                    failed_count += 1
-                    continue
-                
-                # 标准化行情数据
-                normalized_quote = {
-                    "code": stock_code.lstrip('0').zfill(5),
-                    "close": float(quote.get('price', 0)),
-                    "open": float(quote.get('open', 0)),
-                    "high": float(quote.get('high', 0)),
-                    "low": float(quote.get('low', 0)),
-                    "volume": int(quote.get('volume', 0)),
-                    "currency": "HKD",
-                    "updated_at": datetime.now()
-                }
-                
-                # 计算涨跌幅
-                if normalized_quote["open"] > 0:
-                    pct_chg = ((normalized_quote["close"] - normalized_quote["open"]) / normalized_quote["open"]) * 100
-                    normalized_quote["pct_chg"] = round(pct_chg, 2)
-                
-                operations.append(
-                    UpdateOne(
-                        {"code": normalized_quote["code"]},
-                        {"$set": normalized_quote},
-                        upsert=True
-                    )
+
+        async def fetch(stock_code: str):
+            # 获取实时价格（同步接口，放到线程中执行）
+            quote = await asyncio.to_thread(provider.get_real_time_price, stock_code)
+            if not quote or not quote.get('price'):
+                logger.warning(f"⚠️ 跳过无效行情: {stock_code}")
+                return None
+            return quote
+
+        async def collect(stock_code: str, quote) -> int:
+            # 标准化行情数据
+            normalized_quote = {
+                "code": stock_code.lstrip('0').zfill(5),
+                "close": float(quote.get('price', 0)),
+                "open": float(quote.get('open', 0)),
+                "high": float(quote.get('high', 0)),
+                "low": float(quote.get('low', 0)),
+                "volume": int(quote.get('volume', 0)),
+                "currency": "HKD",
+                "updated_at": datetime.now()
+            }
+
+            # 计算涨跌幅
+            if normalized_quote["open"] > 0:
+                pct_chg = ((normalized_quote["close"] - normalized_quote["open"]) / normalized_quote["open"]) * 100
+                normalized_quote["pct_chg"] = round(pct_chg, 2)
+
+            operations.append(
+                UpdateOne(
+                    {"code": normalized_quote["code"]},
+                    {"$set": normalized_quote},
+                    upsert=True
                 )
-                
-                logger.debug(f"✅ 准备同步行情: {stock_code} (价格: {normalized_quote['close']} HKD)")
-                
-            except Exception as e:
-                logger.error(f"❌ 同步行情失败: {stock_code}: {e}")
-                failed_count += 1
-        
+            )
+            logger.debug(f"✅ 准备同步行情: {stock_code} (价格: {normalized_quote['close']} HKD)")
+            return 1
+
+        # 并发获取（受速率限制器约束），行情汇总后一次批量写入
+        pipeline = SyncPipeline(
+            "港股行情",
+            fetch=fetch,
+            save=collect,
+            rate_limiter=self.rate_limiter,
+            writers=1,
+        )
+        outcome = await pipeline.run(self.hk_stock_list)
+        failed_count = outcome["empty_count"] + outcome["error_count"]
+
         # 执行批量操作
         result = {"updated": 0, "inserted": 0, "failed": failed_count}
         
@@ -14,6 +14,7 @@ from zoneinfo import ZoneInfo
 from tradingagents.dataflows.providers.china.tushare import get_tushare_provider
 from tradingagents.dataflows.providers.china.akshare import get_akshare_provider
 from tradingagents.dataflows.news.realtime_news import RealtimeNewsAggregator
+from tradingagents.dataflows.news.near_duplicates import cluster_near_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -449,8 +450,27 @@ class NewsDataSyncService:
             if key not in seen:
                 seen.add(key)
                 unique_news.append(news)
-        
-        return unique_news
+
+        # 近似重复聚类：多家媒体转载的同一事件只保留一条，簇大小记为覆盖度；不同股票的新闻不合并
+        clusters = cluster_near_duplicates(
+            [news.get("title", "") for news in unique_news],
+            [news.get("content") or news.get("summary") or "" for news in unique_news],
+            groups=[news.get("symbol") for news in unique_news]
+        )
+        if len(clusters) == len(unique_news):
+            return unique_news
+
+        importance_rank = {"high": 2, "medium": 1, "low": 0}
+        merged = []
+        for members in clusters:
+            group = [unique_news[i] for i in members]
+            best = max(group, key=lambda n: (importance_rank.get(n.get("importance"), 0),
+                                             len(n.get("content") or n.get("summary") or "")))
+            best["coverage"] = sum(int(n.get("coverage", 1) or 1) for n in group)
+            merged.append(best)
+
+        logger.debug(f"🔁 近似重复新闻合并: {len(unique_news)} -> {len(merged)}")
+        return merged
     
     async def sync_market_news(
         self,
@@ -0,0 +1,314 @@
+"""
+同步流水线执行器
+各 *SyncService 的逐只股票同步（获取 → 保存）共用的生产者/消费者流水线：
+
+- N 个获取协程并发拉取数据，每次请求前先通过数据源的 RateLimiter
+- 独立的写入协程池消费队列写入 MongoDB，写入与后续股票的获取重叠进行
+- 进度按批次回调（而不是每只股票一次），同时检查停止信号
+- 按股票记录断点，任务中断后同一批次重跑时跳过已完成的股票
+- 结束时输出获取/写入两个阶段的吞吐统计
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_COLLECTION = "sync_checkpoints"
+
+FetchFunc = Callable[[str], Awaitable[Any]]
+SaveFunc = Callable[[str, Any], Awaitable[int]]
+ProgressFunc = Callable[[int, int, str], Awaitable[None]]
+StopFunc = Callable[[], Awaitable[bool]]
+
+_DONE = object()
+
+
+class SyncCheckpoint:
+    """按股票记录的同步断点（sync_checkpoints 集合，一个 key 一个文档）"""
+
+    def __init__(self, db, key: str):
+        self.collection = db[CHECKPOINT_COLLECTION]
+        self.key = key
+
+    async def load(self) -> Set[str]:
+        doc = await self.collection.find_one({"key": self.key}, {"completed": 1})
+        return set(doc.get("completed", [])) if doc else set()
+
+    async def mark(self, symbols: List[str]) -> None:
+        if not symbols:
+            return
+        await self.collection.update_one(
+            {"key": self.key},
+            {"$addToSet": {"completed": {"$each": symbols}},
+             "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def clear(self) -> None:
+        await self.collection.delete_one({"key": self.key})
+
+
+def historical_checkpoint(db, source: str, period: str, mode: str, end_date: str) -> Optional[SyncCheckpoint]:
+    """全市场历史数据同步的断点：同一数据源/周期/模式/结束日期的重跑共享断点"""
+    if db is None or not getattr(settings, "SYNC_CHECKPOINT_ENABLED", True):
+        return None
+    return SyncCheckpoint(db, f"{source}:historical:{period}:{mode}:{end_date}")
+
+
+def merge_pipeline_stats(stats: Dict[str, Any], result: Dict[str, Any], context: str,
+                         empty_as_error: bool = False) -> Dict[str, Any]:
+    """把流水线结果合并到 sync_historical_data 的统计字典
+
+    无数据的股票计入 empty_count；empty_as_error=True 时同时按错误统计（与 AKShare 原有口径一致）。
+    """
+    stats["success_count"] += result["success_count"]
+    stats["error_count"] += result["error_count"]
+    stats["empty_count"] = stats.get("empty_count", 0) + result["empty_count"]
+    stats["total_records"] += result["total_records"]
+    stats["errors"].extend({**error, "context": context} for error in result["errors"])
+    if empty_as_error:
+        stats["error_count"] += result["empty_count"]
+        stats["errors"].extend({"code": symbol, "error": "历史数据为空", "context": context}
+                               for symbol in result["empty_symbols"])
+    stats["resumed_count"] = result["skipped"]
+    stats["pipeline"] = result["metrics"]
+    if result["stopped"]:
+        stats["stopped"] = True
+    return stats
+
+
+@dataclass
+class StageMetrics:
+    """单个阶段的吞吐统计"""
+    name: str
+    workers: int
+    items: int = 0
+    busy_seconds: float = 0.0
+    wait_seconds: float = 0.0
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        wall = max(wall_seconds, 1e-9)
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "avg_seconds": round(self.busy_seconds / self.items, 3) if self.items else 0.0,
+            "items_per_second": round(self.items / wall, 2),
+            "utilization": round(min(self.busy_seconds / (wall * self.workers), 1.0), 3),
+        }
+
+
+class SyncPipeline:
+    """
+    获取/保存两阶段流水线
+
+    fetch(symbol) 返回待保存的数据，返回 None（或空 DataFrame）表示该股票无数据；
+    save(symbol, payload) 返回写入的记录数。单只股票的异常只计入 errors，不中断整批；
+    progress/should_stop 抛出的异常（如任务被取消）会终止流水线并向上抛出。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: FetchFunc,
+        save: SaveFunc,
+        rate_limiter=None,
+        fetchers: Optional[int] = None,
+        writers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        progress: Optional[ProgressFunc] = None,
+        progress_every: Optional[int] = None,
+        should_stop: Optional[StopFunc] = None,
+        checkpoint: Optional[SyncCheckpoint] = None,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.save = save
+        self.rate_limiter = rate_limiter
+        self.fetchers = max(1, fetchers or int(getattr(settings, "SYNC_PIPELINE_FETCHERS", 4)))
+        self.writers = max(1, writers or int(getattr(settings, "SYNC_PIPELINE_WRITERS", 2)))
+        self.queue_size = queue_size or self.fetchers * 2
+        self.progress = progress
+        self.progress_every = max(1, progress_every or int(getattr(settings, "SYNC_PIPELINE_PROGRESS_EVERY", 50)))
+        self.should_stop = should_stop
+        self.checkpoint = checkpoint
+
+    async def run(self, symbols: Iterable[str]) -> Dict[str, Any]:
+        symbols = list(dict.fromkeys(symbols))
+        result: Dict[str, Any] = {
+            "total": len(symbols),
+            "skipped": 0,
+            "success_count": 0,
+            "empty_count": 0,
+            "empty_symbols": [],
+            "error_count": 0,
+            "total_records": 0,
+            "errors": [],
+            "stopped": False,
+        }
+
+        completed = await self.checkpoint.load() if self.checkpoint else set()
+        pending = [s for s in symbols if s not in completed]
+        result["skipped"] = len(symbols) - len(pending)
+        if result["skipped"]:
+            logger.info(f"⏭️ [{self.name}] 断点续跑：跳过已完成的 {result['skipped']} 只股票")
+
+        self._fetch_metrics = StageMetrics("fetch", self.fetchers)
+        self._save_metrics = StageMetrics("save", self.writers)
+        self._result = result
+        self._done = result["skipped"]
+        self._reported = self._done
+        self._unflushed: List[str] = []
+        self._last_symbol = ""
+        self._flush_lock = asyncio.Lock()
+        self._stop = asyncio.Event()
+
+        inbox: asyncio.Queue = asyncio.Queue()
+        for symbol in pending:
+            inbox.put_nowait(symbol)
+        outbox: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        running_fetchers = [self.fetchers]
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(self._fetcher(inbox, outbox, running_fetchers)) for _ in range(self.fetchers)]
+        tasks += [asyncio.create_task(self._writer(outbox)) for _ in range(self.writers)]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            await self._flush(final=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        result["stopped"] = self._stop.is_set()
+        result["metrics"] = self._report(time.perf_counter() - started)
+        if self.checkpoint and not result["stopped"] and not result["error_count"]:
+            await self.checkpoint.clear()
+        return result
+
+    async def _fetcher(self, inbox: asyncio.Queue, outbox: asyncio.Queue, running: List[int]):
+        while not self._stop.is_set():
+            try:
+                symbol = inbox.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+
+            if self.rate_limiter is not None:
+                waited = time.perf_counter()
+                await self.rate_limiter.acquire()
+                self._fetch_metrics.wait_seconds += time.perf_counter() - waited
+
+            began = time.perf_counter()
+            try:
+                payload = await self.fetch(symbol)
+            except Exception as e:
+                self._fetch_metrics.busy_seconds += time.perf_counter() - began
+                self._record_error(symbol, e, "fetch")
+                await self._complete(symbol, succeeded=False)
+                continue
+            self._fetch_metrics.busy_seconds += time.perf_counter() - began
+            self._fetch_metrics.items += 1
+
+            if payload is None or getattr(payload, "empty", False):
+                self._result["empty_count"] += 1
+                self._result["empty_symbols"].append(symbol)
+                await self._complete(symbol, succeeded=True)
+                continue
+
+            waited = time.perf_counter()
+            await outbox.put((symbol, payload))
+            self._fetch_metrics.wait_seconds += time.perf_counter() - waited
+
+        # 最后一个结束的获取协程通知写入协程退出
+        running[0] -= 1
+        if running[0] == 0:
+            for _ in range(self.writers):
+                await outbox.put(_DONE)
+
+    async def _writer(self, outbox: asyncio.Queue):
+        while True:
+            waited = time.perf_counter()
+            item = await outbox.get()
+            self._save_metrics.wait_seconds += time.perf_counter() - waited
+            if item is _DONE:
+                return
+
+            symbol, payload = item
+            began = time.perf_counter()
+            try:
+                saved = await self.save(symbol, payload)
+            except Exception as e:
+                self._save_metrics.busy_seconds += time.perf_counter() - began
+                self._record_error(symbol, e, "save")
+                await self._complete(symbol, succeeded=False)
+                continue
+            self._save_metrics.busy_seconds += time.perf_counter() - began
+            self._save_metrics.items += 1
+            self._result["success_count"] += 1
+            self._result["total_records"] += saved or 0
+            await self._complete(symbol, succeeded=True)
+
+    def _record_error(self, symbol: str, error: Exception, stage: str):
+        self._result["error_count"] += 1
+        self._result["errors"].append({
+            "code": symbol,
+            "error": str(error),
+            "error_type": type(error).__name__,
+            "stage": stage,
+        })
+        logger.error(f"❌ [{self.name}] {symbol} {'获取' if stage == 'fetch' else '保存'}失败: {error}")
+
+    async def _complete(self, symbol: str, succeeded: bool):
+        self._done += 1
+        self._last_symbol = symbol
+        if succeeded:
+            self._unflushed.append(symbol)
+        if self._done - self._reported >= self.progress_every:
+            await self._flush()
+
+    async def _flush(self, final: bool = False):
+        """批量写断点、回调进度、检查停止信号"""
+        async with self._flush_lock:
+            if not final and self._done - self._reported < self.progress_every:
+                return
+            marked, self._unflushed = self._unflushed, []
+            if self.checkpoint:
+                await self.checkpoint.mark(marked)
+            if self._done == self._reported:
+                return
+            self._reported = self._done
+            if self.progress:
+                await self.progress(self._done, self._result["total"], self._last_symbol)
+            if not final and self.should_stop and await self.should_stop():
+                logger.warning(f"⚠️ [{self.name}] 收到停止信号，停止获取新的股票")
+                self._stop.set()
+
+    def _report(self, wall_seconds: float) -> Dict[str, Any]:
+        fetch = self._fetch_metrics.report(wall_seconds)
+        save = self._save_metrics.report(wall_seconds)
+        processed = self._done - self._result["skipped"]
+        report = {
+            "wall_seconds": round(wall_seconds, 3),
+            "symbols_per_second": round(processed / max(wall_seconds, 1e-9), 2),
+            "fetch": fetch,
+            "save": save,
+        }
+        logger.info(
+            f"📊 [{self.name}] 流水线统计: {processed}只股票, 耗时 {wall_seconds:.2f}秒 "
+            f"({report['symbols_per_second']}只/秒) | "
+            f"获取 x{fetch['workers']}: {fetch['items']}次, 平均 {fetch['avg_seconds']}秒, "
+            f"限流/排队等待 {fetch['wait_seconds']}秒, 利用率 {fetch['utilization']:.0%} | "
+            f"写入 x{save['workers']}: {save['items']}次, 平均 {save['avg_seconds']}秒, "
+            f"利用率 {save['utilization']:.0%}"
+        )
+        return report
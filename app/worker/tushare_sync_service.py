@@ -7,6 +7,8 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 import logging
 
+import pandas as pd
+
 from tradingagents.dataflows.providers.china.tushare import TushareProvider
 from app.services.stock_data_service import get_stock_data_service
 from app.services.historical_data_service import get_historical_data_service
@@ -14,6 +16,7 @@ from app.services.news_data_service import get_news_data_service
 from app.core.database import get_mongo_db
 from app.core.config import settings
 from app.core.rate_limiter import get_tushare_rate_limiter
+from app.worker.sync_pipeline import SyncPipeline, historical_checkpoint, merge_pipeline_stats
 from app.utils.timezone import now_tz
 
 logger = logging.getLogger(__name__)
@@ -51,6 +54,12 @@ class TushareSyncService:
         self.rate_limit_delay = 0.1  # API调用间隔(秒) - 已弃用，使用rate_limiter
         self.max_retries = 3  # 最大重试次数
 
+        # 按交易日增量同步（全市场一次 daily 请求代替逐只股票请求）
+        self.date_major_sync = bool(getattr(settings, "TUSHARE_DATE_MAJOR_SYNC", True))
+        self.date_major_lookback_days = int(getattr(settings, "TUSHARE_DATE_MAJOR_LOOKBACK_DAYS", 30))
+        # 某个交易日已入库的股票数低于 已有历史的股票数 × 该比例 时视为缺失（停牌股票当天没有行情）
+        self.date_major_min_coverage = 0.9
+
         # 速率限制器（从环境变量读取配置）
         tushare_tier = getattr(settings, "TUSHARE_TIER", "standard")  # free/basic/standard/premium/vip
         safety_margin = float(getattr(settings, "TUSHARE_RATE_LIMIT_SAFETY_MARGIN", "0.8"))
@@ -577,6 +586,12 @@ class TushareSyncService:
             "errors": []
         }
 
+        # 全市场日线增量同步：按交易日批量获取
+        full_market = symbols is None
+        progress_start = 0
+        date_major = (self.date_major_sync and full_market and incremental
+                      and not all_history and period == "daily")
+
         try:
             # 1. 获取股票列表（排除退市股票）
             if symbols is None:
@@ -624,120 +639,46 @@ class TushareSyncService:
 
             logger.info(f"📊 历史数据同步: 结束日期={end_date}, 股票数量={len(symbols)}, 模式={'增量' if incremental else '全量'}")
 
-            # 4. 批量处理
-            for i, symbol in enumerate(symbols):
-                # 记录单个股票开始时间
-                stock_start_time = datetime.now()
-
-                try:
-                    # 检查是否需要退出
-                    if job_id and await self._should_stop(job_id):
-                        logger.warning(f"⚠️ 任务 {job_id} 收到停止信号，正在退出...")
-                        stats["stopped"] = True
-                        break
-
-                    # 速率限制
-                    await self.rate_limiter.acquire()
-
-                    # 确定该股票的起始日期
-                    symbol_start_date = start_date
-                    if not symbol_start_date:
-                        if all_history:
-                            symbol_start_date = "1990-01-01"
-                        elif incremental:
-                            # 增量同步：获取该股票的最后日期
-                            symbol_start_date = await self._get_last_sync_date(symbol)
-                            logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
-                        else:
-                            symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-
-                    # 记录请求参数
-                    logger.debug(
-                        f"🔍 {symbol}: 请求{period_name}数据 "
-                        f"start={symbol_start_date}, end={end_date}, period={period}"
-                    )
-
-                    # ⏱️ 性能监控：API 调用
-                    api_start = datetime.now()
-                    df = await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period=period)
-                    api_duration = (datetime.now() - api_start).total_seconds()
-
-                    if df is not None and not df.empty:
-                        # ⏱️ 性能监控：数据保存
-                        save_start = datetime.now()
-                        records_saved = await self._save_historical_data(symbol, df, period=period)
-                        save_duration = (datetime.now() - save_start).total_seconds()
-
-                        stats["success_count"] += 1
-                        stats["total_records"] += records_saved
-
-                        # 计算单个股票耗时
-                        stock_duration = (datetime.now() - stock_start_time).total_seconds()
-                        logger.info(
-                            f"✅ {symbol}: 保存 {records_saved} 条{period_name}记录，"
-                            f"总耗时 {stock_duration:.2f}秒 "
-                            f"(API: {api_duration:.2f}秒, 保存: {save_duration:.2f}秒)"
-                        )
-                    else:
-                        stock_duration = (datetime.now() - stock_start_time).total_seconds()
-                        logger.warning(
-                            f"⚠️ {symbol}: 无{period_name}数据 "
-                            f"(start={symbol_start_date}, end={end_date})，耗时 {stock_duration:.2f}秒"
-                        )
-
-                    # 每个股票都更新进度
-                    progress_percent = int(((i + 1) / len(symbols)) * 100)
-
-                    # 更新任务进度
-                    if job_id:
-                        await self._update_progress(
-                            job_id,
-                            progress_percent,
-                            f"正在同步 {symbol} ({i + 1}/{len(symbols)})"
-                        )
-
-                    # 每50个股票输出一次详细日志
-                    if (i + 1) % 50 == 0 or (i + 1) == len(symbols):
-                        logger.info(f"📈 {period_name}数据同步进度: {i + 1}/{len(symbols)} ({progress_percent}%) "
-                                   f"(成功: {stats['success_count']}, 记录: {stats['total_records']})")
-
-                        # 输出速率限制器统计
-                        limiter_stats = self.rate_limiter.get_stats()
-                        logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次, "
-                                   f"等待次数: {limiter_stats['total_waits']}, "
-                                   f"总等待时间: {limiter_stats['total_wait_time']:.1f}秒")
-
-                except Exception as e:
-                    import traceback
-                    error_details = traceback.format_exc()
-                    stats["error_count"] += 1
-                    stats["errors"].append({
-                        "code": symbol,
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                        "context": f"sync_historical_data_{period}",
-                        "traceback": error_details
-                    })
-                    logger.error(
-                        f"❌ {symbol} {period_name}数据同步失败\n"
-                        f"   参数: start={symbol_start_date if 'symbol_start_date' in locals() else 'N/A'}, "
-                        f"end={end_date}, period={period}\n"
-                        f"   错误类型: {type(e).__name__}\n"
-                        f"   错误信息: {str(e)}\n"
-                        f"   堆栈跟踪:\n{error_details}"
-                    )
+            if date_major:
+                remaining = await self._sync_daily_by_trade_date(symbols, start_date, end_date, stats, job_id)
+                if remaining is None:
+                    # 本地没有任何日线数据，按股票逐只全量同步
+                    logger.info("📊 本地尚无日线数据，改为逐只股票同步")
+                elif not remaining:
+                    return self._finish_historical_stats(stats, period_name)
+                else:
+                    # 没有任何历史记录的股票（新上市等）仍按股票从上市日期开始同步
+                    logger.info(f"📊 {len(remaining)} 只股票没有历史记录，逐只同步")
+                    symbols = remaining
+                    # 两个阶段共用一个进度刻度：逐只同步接在按交易日阶段之后
+                    progress_start = int(self._trade_date_stage_share(
+                        stats.get("trade_date_count", 0), len(remaining)) * 100)
+
+            # 增量同步：一次聚合取出所有股票的最后交易日
+            last_dates = None
+            if incremental and not start_date and not all_history:
+                last_dates = await self._load_last_sync_dates(period)
+
+            # 4. 流水线处理：多个获取协程受速率限制器约束并发拉取，写入与获取重叠
+            mode = "all" if all_history else ("incremental" if incremental else "full")
+            pipeline = SyncPipeline(
+                f"Tushare{period_name}",
+                fetch=lambda symbol: self._fetch_symbol_history(
+                    symbol, start_date, end_date, period, incremental, all_history, last_dates
+                ),
+                save=lambda symbol, df: self._save_historical_data(symbol, df, period=period),
+                rate_limiter=self.rate_limiter,
+                progress=lambda done, total, symbol: self._report_historical_progress(
+                    job_id, period_name, done, total, symbol, start=progress_start
+                ),
+                should_stop=(lambda: self._should_stop(job_id)) if job_id else None,
+                checkpoint=historical_checkpoint(self.db, "tushare", period, mode, end_date) if full_market else None,
+            )
+            result = await pipeline.run(symbols)
+            merge_pipeline_stats(stats, result, f"sync_historical_data_{period}")
 
             # 4. 完成统计
-            stats["end_time"] = datetime.utcnow()
-            stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
-
-            logger.info(f"✅ {period_name}数据同步完成: "
-                       f"股票 {stats['success_count']}/{stats['total_processed']}, "
-                       f"记录 {stats['total_records']} 条, "
-                       f"错误 {stats['error_count']} 个, "
-                       f"耗时 {stats['duration']:.2f} 秒")
-
-            return stats
+            return self._finish_historical_stats(stats, period_name)
 
         except Exception as e:
             import traceback
@@ -756,6 +697,172 @@ class TushareSyncService:
             })
             return stats
 
+    async def _fetch_symbol_history(
+        self,
+        symbol: str,
+        start_date: Optional[str],
+        end_date: str,
+        period: str,
+        incremental: bool,
+        all_history: bool,
+        last_dates: Optional[Dict[str, str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """流水线获取阶段：确定该股票的起始日期并拉取历史数据"""
+        symbol_start_date = start_date
+        if not symbol_start_date:
+            if all_history:
+                symbol_start_date = "1990-01-01"
+            elif incremental:
+                # 增量同步：获取该股票的最后日期
+                symbol_start_date = await self._get_last_sync_date(symbol, last_dates)
+                logger.debug(f"📅 {symbol}: 从 {symbol_start_date} 开始同步")
+            else:
+                symbol_start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+
+        df = await self.provider.get_historical_data(symbol, symbol_start_date, end_date, period=period)
+        if df is None or df.empty:
+            logger.warning(f"⚠️ {symbol}: 无{period}数据 (start={symbol_start_date}, end={end_date})")
+        return df
+
+    async def _report_historical_progress(self, job_id: Optional[str], period_name: str,
+                                          done: int, total: int, symbol: str, start: int = 0):
+        """流水线按批次回调：更新任务进度并输出速率限制器统计（进度映射到 start~100）"""
+        progress_percent = start + int(done / total * (100 - start)) if total else 100
+        if job_id:
+            await self._update_progress(job_id, progress_percent, f"正在同步 {symbol} ({done}/{total})")
+
+        logger.info(f"📈 {period_name}数据同步进度: {done}/{total} ({progress_percent}%)")
+        limiter_stats = self.rate_limiter.get_stats()
+        logger.info(f"   速率限制: {limiter_stats['current_calls']}/{limiter_stats['max_calls']}次, "
+                   f"等待次数: {limiter_stats['total_waits']}, "
+                   f"总等待时间: {limiter_stats['total_wait_time']:.1f}秒")
+
+    def _finish_historical_stats(self, stats: Dict[str, Any], period_name: str) -> Dict[str, Any]:
+        stats["end_time"] = datetime.utcnow()
+        stats["duration"] = (stats["end_time"] - stats["start_time"]).total_seconds()
+
+        logger.info(f"✅ {period_name}数据同步完成: "
+                   f"股票 {stats['success_count']}/{stats['total_processed']}, "
+                   f"记录 {stats['total_records']} 条, "
+                   f"错误 {stats['error_count']} 个, "
+                   f"耗时 {stats['duration']:.2f} 秒")
+
+        return stats
+
+    @staticmethod
+    def _trade_date_stage_share(trade_dates: int, remaining_symbols: int) -> float:
+        """按交易日阶段占整个同步的比例：按请求数估算（每个交易日 2 次，逐只同步每只股票约 1 次）"""
+        units = 2 * trade_dates
+        total = units + remaining_symbols
+        return units / total if total else 1.0
+
+    async def _sync_daily_by_trade_date(
+        self,
+        symbols: List[str],
+        start_date: Optional[str],
+        end_date: str,
+        stats: Dict[str, Any],
+        job_id: str = None
+    ) -> Optional[List[str]]:
+        """
+        按交易日增量同步全市场日线
+
+        1. 取本地最新交易日，向前回溯 date_major_lookback_days 天作为检查窗口；
+        2. 一次 trade_cal 请求得到窗口内的交易日，一次聚合查询得到每个交易日已入库的股票数；
+        3. 覆盖不足的交易日从新到旧逐日用 daily + adj_factor 获取全市场行情（每个交易日两次请求），
+           以窗口内每只股票最新的复权因子为基准计算前复权（与逐只股票调用 pro_bar 口径一致），
+           每个交易日获取后立即写入 stock_daily_quotes，内存中只保留当天数据。
+
+        Returns:
+            没有任何历史记录、需要逐只同步的股票；本地没有任何日线数据时返回 None
+        """
+        if self.historical_service is None:
+            self.historical_service = await get_historical_data_service()
+        collection = self.historical_service.collection
+        base_query = {"data_source": "tushare", "period": "daily"}
+
+        latest = await collection.find_one(base_query, {"trade_date": 1}, sort=[("trade_date", -1)])
+        if not latest:
+            return None
+
+        window_start = start_date
+        if not window_start:
+            lookback = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=self.date_major_lookback_days))
+            window_start = min(latest["trade_date"], lookback.strftime('%Y-%m-%d'))
+
+        await self.rate_limiter.acquire()
+        trade_dates = await self.provider.get_trade_dates(window_start, end_date)
+
+        counts = {}
+        async for doc in collection.aggregate([
+            {"$match": {**base_query, "trade_date": {"$gte": window_start, "$lte": end_date}}},
+            {"$group": {"_id": "$trade_date", "count": {"$sum": 1}}},
+        ]):
+            counts[doc["_id"]] = doc["count"]
+
+        # 覆盖率以已有历史记录的股票为基数（新上市股票另行逐只同步，不拉低覆盖率）
+        synced = set(await collection.distinct("symbol", base_query))
+        expected = sum(1 for s in symbols if s in synced) * self.date_major_min_coverage
+        missing = [d for d in trade_dates if counts.get(f"{d[:4]}-{d[4:6]}-{d[6:]}", 0) < expected]
+        logger.info(f"📅 按交易日同步: 窗口 {window_start} ~ {end_date}, "
+                    f"交易日 {len(trade_dates)} 个, 需同步 {len(missing)} 个 {missing}")
+
+        remaining = [s for s in symbols if s not in synced]
+        stats["trade_date_count"] = len(missing)
+        stage_share = self._trade_date_stage_share(len(missing), len(remaining))
+
+        wanted = set(symbols)
+        saved_symbols = set()
+        # 基准复权因子：从新到旧处理，每只股票首次出现的因子即窗口内最新因子
+        latest_factors = pd.Series(dtype=float)
+        for i, trade_date in enumerate(reversed(missing)):
+            if job_id and await self._should_stop(job_id):
+                logger.warning(f"⚠️ 任务 {job_id} 收到停止信号，正在退出...")
+                stats["stopped"] = True
+                break
+            try:
+                await self.rate_limiter.acquire()
+                daily = await self.provider.get_daily_by_trade_date(trade_date)
+                if daily is None:
+                    logger.warning(f"⚠️ {trade_date}: 无日线数据（可能尚未收盘或未发布）")
+                    continue
+                await self.rate_limiter.acquire()
+                factor = await self.provider.get_adj_factor_by_trade_date(trade_date)
+                if factor is not None:
+                    day_factors = factor.drop_duplicates('ts_code').set_index('ts_code')['adj_factor']
+                    latest_factors = pd.concat(
+                        [latest_factors, day_factors[~day_factors.index.isin(latest_factors.index)]]
+                    )
+
+                market_df = self.provider.standardize_market_daily(daily, factor, latest_factors=latest_factors)
+                market_df = market_df[market_df["symbol"].isin(wanted)]
+                saved = await self.historical_service.save_market_data(
+                    market_df, data_source="tushare", market="CN", period="daily"
+                )
+                stats["total_records"] += saved
+                saved_symbols.update(set(market_df["symbol"]) & synced)
+                logger.info(f"✅ {trade_date}: 全市场日线 {len(daily)} 条，写入 {saved} 条")
+            except Exception as e:
+                stats["error_count"] += 1
+                stats["errors"].append({
+                    "trade_date": trade_date,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "context": "sync_daily_by_trade_date",
+                })
+                logger.error(f"❌ {trade_date} 全市场日线同步失败: {e}")
+
+            if job_id:
+                await self._update_progress(
+                    job_id,
+                    int((i + 1) / max(len(missing), 1) * stage_share * 100),
+                    f"正在同步交易日 {trade_date} ({i + 1}/{len(missing)})"
+                )
+
+        stats["success_count"] += len(saved_symbols)
+        # 之前没有任何记录的股票按股票从上市日期开始补齐完整历史
+        return remaining
+
     async def _save_historical_data(self, symbol: str, df, period: str = "daily") -> int:
         """保存历史数据到数据库"""
         try:
@@ -777,12 +884,25 @@ class TushareSyncService:
             logger.error(f"❌ 保存{period}数据失败 {symbol}: {e}")
             return 0
 
-    async def _get_last_sync_date(self, symbol: str = None) -> str:
+    async def _load_last_sync_dates(self, period: str = "daily") -> Optional[Dict[str, str]]:
+        """一次聚合获取全部股票的最后交易日，失败时返回 None（退回逐只查询）"""
+        try:
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
+            last_dates = await self.historical_service.get_coverage_map("tushare", period, refresh=True)
+            logger.info(f"📅 已加载 {len(last_dates)} 只股票的最后同步日期（单次聚合）")
+            return last_dates
+        except Exception as e:
+            logger.warning(f"⚠️ 批量获取最后同步日期失败，改为逐只查询: {e}")
+            return None
+
+    async def _get_last_sync_date(self, symbol: str = None, last_dates: Optional[Dict[str, str]] = None) -> str:
         """
         获取最后同步日期
 
         Args:
             symbol: 股票代码，如果提供则返回该股票的最后日期+1天
+            last_dates: 预先聚合的 {symbol: 最后交易日}，提供时不再逐只查询
 
         Returns:
             日期字符串 (YYYY-MM-DD)
@@ -793,7 +913,10 @@ class TushareSyncService:
 
             if symbol:
                 # 获取特定股票的最新日期
-                latest_date = await self.historical_service.get_latest_date(symbol, "tushare")
+                if last_dates is not None:
+                    latest_date = last_dates.get(symbol)
+                else:
+                    latest_date = await self.historical_service.get_latest_date(symbol, "tushare")
                 if latest_date:
                     # 返回最后日期的下一天（避免重复同步）
                     try:
@@ -997,6 +1120,11 @@ class TushareSyncService:
                 sort=[("updated_at", -1)]
             )
 
+            # 日线覆盖情况（复用历史数据服务的覆盖图缓存）
+            if self.historical_service is None:
+                self.historical_service = await get_historical_data_service()
+            daily_coverage = await self.historical_service.get_coverage_summary("tushare", "daily")
+
             return {
                 "provider_connected": self.provider.is_available(),
                 "collections": {
@@ -1009,6 +1137,7 @@ class TushareSyncService:
                         "latest_update": latest_quotes.get("updated_at") if (latest_quotes and isinstance(latest_quotes, dict)) else None
                     }
                 },
+                "daily_coverage": daily_coverage,
                 "status_time": datetime.utcnow()
             }
 
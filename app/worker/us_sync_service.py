@@ -29,6 +29,8 @@ sys.path.insert(0, str(project_root))
 from tradingagents.dataflows.providers.us.yfinance import YFinanceUtils
 from app.core.database import get_mongo_db
 from app.core.config import settings
+from app.core.rate_limiter import RateLimiter
+from app.worker.sync_pipeline import SyncPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +50,13 @@ class USSyncService:
         self._stock_list_cache_time = None
         self._stock_list_cache_ttl = 3600 * 24  # 缓存24小时
 
+        # 逐只股票同步的速率限制（流水线的获取协程共享）
+        self.rate_limiter = RateLimiter(
+            max_calls=int(getattr(settings, "US_SYNC_RATE_LIMIT_PER_MINUTE", 120)),
+            time_window=60,
+            name="USSyncRateLimiter"
+        )
+
         # Finnhub 客户端（延迟初始化）
         self._finnhub_client = None
 
@@ -313,53 +322,55 @@ class USSyncService:
         logger.info(f"🇺🇸 开始同步美股实时行情 (数据源: {source})")
         
         operations = []
-        failed_count = 0
-        
-        for stock_code in self.us_stock_list:
-            try:
-                # 获取最近1天的数据作为实时行情
-                import yfinance as yf
-                ticker = yf.Ticker(stock_code)
-                data = ticker.history(period="1d")
-                
-                if data.empty:
-                    logger.warning(f"⚠️ 跳过无效行情: {stock_code}")
-                    failed_count += 1
-                    continue
-                
-                latest = data.iloc[-1]
-                
-                # 标准化行情数据
-                normalized_quote = {
-                    "code": stock_code.upper(),
-                    "close": float(latest['Close']),
-                    "open": float(latest['Open']),
-                    "high": float(latest['High']),
-                    "low": float(latest['Low']),
-                    "volume": int(latest['Volume']),
-                    "currency": "USD",
-                    "updated_at": datetime.now()
-                }
-                
-                # 计算涨跌幅
-                if normalized_quote["open"] > 0:
-                    pct_chg = ((normalized_quote["close"] - normalized_quote["open"]) / normalized_quote["open"]) * 100
-                    normalized_quote["pct_chg"] = round(pct_chg, 2)
-                
-                operations.append(
-                    UpdateOne(
-                        {"code": normalized_quote["code"]},
-                        {"$set": normalized_quote},
-                        upsert=True
-                    )
+
+        async def fetch(stock_code: str):
+            # 获取最近1天的数据作为实时行情（同步接口，放到线程中执行）
+            import yfinance as yf
+            data = await asyncio.to_thread(lambda: yf.Ticker(stock_code).history(period="1d"))
+            if data.empty:
+                logger.warning(f"⚠️ 跳过无效行情: {stock_code}")
+                return None
+            return data.iloc[-1]
+
+        async def collect(stock_code: str, quote) -> int:
+            # 标准化行情数据
+            normalized_quote = {
+                "code": stock_code.upper(),
+                "close": float(quote['Close']),
+                "open": float(quote['Open']),
+                "high": float(quote['High']),
+                "low": float(quote['Low']),
+                "volume": int(quote['Volume']),
+                "currency": "USD",
+                "updated_at": datetime.now()
+            }
+
+            # 计算涨跌幅
+            if normalized_quote["open"] > 0:
+                pct_chg = ((normalized_quote["close"] - normalized_quote["open"]) / normalized_quote["open"]) * 100
+                normalized_quote["pct_chg"] = round(pct_chg, 2)
+
+            operations.append(
+                UpdateOne(
+                    {"code": normalized_quote["code"]},
+                    {"$set": normalized_quote},
+                    upsert=True
                 )
-                
-                logger.debug(f"✅ 准备同步行情: {stock_code} (价格: {normalized_quote['close']} USD)")
-                
-            except Exception as e:
-                logger.error(f"❌ 同步行情失败: {stock_code}: {e}")
-                failed_count += 1
-        
+            )
+            logger.debug(f"✅ 准备同步行情: {stock_code} (价格: {normalized_quote['close']} USD)")
+            return 1
+
+        # 并发获取（受速率限制器约束），行情汇总后一次批量写入
+        pipeline = SyncPipeline(
+            "美股行情",
+            fetch=fetch,
+            save=collect,
+            rate_limiter=self.rate_limiter,
+            writers=1,
+        )
+        outcome = await pipeline.run(self.us_stock_list)
+        failed_count = outcome["empty_count"] + outcome["error_count"]
+
         # 执行批量操作
         result = {"updated": 0, "inserted": 0, "failed": failed_count}
         
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+递推类指标性能基准：原逐行 iloc 循环 vs 递推内核（NumPy / numba）
+
+默认规模为 10k bars × 5k symbols：
+- 原实现（逐只 Series + iloc 循环）只对少量样本股票实测，再按股票数线性外推；
+- 内核按列分块（避免一次性分配数 GB 内存）对全部股票实测。
+
+用法：
+    python scripts/development/benchmark_recursive_indicators.py
+    python scripts/development/benchmark_recursive_indicators.py --bars 2000 --symbols 500 --legacy-sample 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.tools.analysis.indicators import NUMBA_AVAILABLE, ewm_mean, kdj_kernel  # noqa: E402
+
+
+def legacy_kdj_recursion(rsv: pd.Series, m1: int = 3, m2: int = 3):
+    """原 indicators.kdj 中的逐行递推"""
+    k = pd.Series(np.nan, index=rsv.index)
+    d = pd.Series(np.nan, index=rsv.index)
+    alpha_k = 1 / float(m1)
+    alpha_d = 1 / float(m2)
+    last_k = 50.0
+    last_d = 50.0
+    for i in range(len(rsv)):
+        rv = rsv.iloc[i]
+        if np.isnan(rv):
+            k.iloc[i] = np.nan
+            d.iloc[i] = np.nan
+            continue
+        curr_k = (1 - alpha_k) * last_k + alpha_k * rv
+        curr_d = (1 - alpha_d) * last_d + alpha_d * curr_k
+        k.iloc[i] = curr_k
+        d.iloc[i] = curr_d
+        last_k, last_d = curr_k, curr_d
+    return k, d
+
+
+def make_rsv(bars: int, symbols: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rsv = rng.uniform(0, 100, (bars, symbols))
+    rsv[:8] = np.nan  # 窗口未满
+    return rsv
+
+
+def bench_legacy(bars: int, sample: int) -> float:
+    rsv = make_rsv(bars, sample, seed=0)
+    t0 = time.perf_counter()
+    for j in range(sample):
+        legacy_kdj_recursion(pd.Series(rsv[:, j]))
+    return (time.perf_counter() - t0) / sample
+
+
+def bench_kernel(bars: int, symbols: int, chunk: int, backend: str) -> dict:
+    # 预热（numba 首次编译不计入）
+    warm = make_rsv(16, 2, seed=0)
+    kdj_kernel(warm, backend=backend)
+    ewm_mean(warm, com=5, adjust=True, backend=backend)
+
+    kdj_s = ewm_s = 0.0
+    for start in range(0, symbols, chunk):
+        block = make_rsv(bars, min(chunk, symbols - start), seed=start)
+        t0 = time.perf_counter()
+        kdj_kernel(block, backend=backend)
+        t1 = time.perf_counter()
+        ewm_mean(block, com=5, adjust=True, backend=backend)  # 中国式 SMA RSI6 的平滑步骤
+        t2 = time.perf_counter()
+        kdj_s += t1 - t0
+        ewm_s += t2 - t1
+    return {"kdj": kdj_s, "ewm": ewm_s}
+
+
+def bench_pandas_ewm(bars: int, symbols: int, chunk: int) -> float:
+    total = 0.0
+    for start in range(0, symbols, chunk):
+        block = pd.DataFrame(make_rsv(bars, min(chunk, symbols - start), seed=start))
+        t0 = time.perf_counter()
+        block.ewm(com=5, adjust=True).mean()
+        total += time.perf_counter() - t0
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="递推类指标性能基准")
+    parser.add_argument("--bars", type=int, default=10_000)
+    parser.add_argument("--symbols", type=int, default=5_000)
+    parser.add_argument("--chunk", type=int, default=250, help="内核每次处理的股票列数")
+    parser.add_argument("--legacy-sample", type=int, default=3, help="原实现实测的样本股票数")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"递推指标基准: {args.bars} bars × {args.symbols} symbols (numba: {NUMBA_AVAILABLE})")
+    print("=" * 70)
+
+    per_symbol = bench_legacy(args.bars, args.legacy_sample)
+    legacy_total = per_symbol * args.symbols
+    print(f"原 iloc 循环 KDJ:   {per_symbol * 1000:10.1f} ms/只  → 外推全市场 {legacy_total:10.1f} 秒")
+
+    backends = ["numpy"] + (["numba"] if NUMBA_AVAILABLE else [])
+    for backend in backends:
+        res = bench_kernel(args.bars, args.symbols, args.chunk, backend)
+        print(f"KDJ 内核 [{backend:5s}]:  {res['kdj']:10.2f} 秒  (加速 {legacy_total / max(res['kdj'], 1e-9):,.0f}x)")
+        print(f"EWM 内核 [{backend:5s}]:  {res['ewm']:10.2f} 秒")
+
+    print(f"pandas DataFrame.ewm: {bench_pandas_ewm(args.bars, args.symbols, args.chunk):8.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+列式价格存储工具：转换已有 CSV 缓存 / 冷热加载基准
+
+convert: 把 {symbol}-YFin-data-*.csv 转换为 StockstatsUtils 使用的列式存储（<目录>/columnar）。
+         默认处理离线价格目录（<data_dir>/market_data/price_data）和 online 下载缓存
+         （data_cache_dir，同一只股票有多个日期的文件时取最新的一个）。
+benchmark: 逐只股票对比 pd.read_csv 与列式存储的冷加载（丢弃页缓存后首次读取）、
+           热加载耗时；没有现成 CSV 时可用 --synthetic 生成测试数据。
+
+用法：
+    python scripts/development/price_store_tool.py convert
+    python scripts/development/price_store_tool.py convert --src /path/to/price_data
+    python scripts/development/price_store_tool.py benchmark --src /path/to/price_data --limit 20
+    python scripts/development/price_store_tool.py benchmark --synthetic 50 --bars 2500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from tradingagents.dataflows.cache.price_store import ColumnarPriceStore  # noqa: E402
+
+CSV_MARKER = "-YFin-data-"
+
+
+def default_sources():
+    from tradingagents.config.config_manager import config_manager
+
+    settings = config_manager.load_settings()
+    sources = [os.path.join(config_manager.get_data_dir(), "market_data", "price_data")]
+    if settings.get("data_cache_dir"):
+        sources.append(settings["data_cache_dir"])
+    return [Path(s) for s in sources if os.path.isdir(s)]
+
+
+def find_csvs(src: Path):
+    """返回 {symbol: 最新的 CSV 路径}（文件名中的结束日期越晚越新）"""
+    latest = {}
+    for path in sorted(src.glob(f"*{CSV_MARKER}*.csv")):
+        symbol = path.name.split(CSV_MARKER)[0]
+        latest[symbol] = path
+    return latest
+
+
+def convert(src: Path, force: bool) -> int:
+    store = ColumnarPriceStore(src / "columnar")
+    converted = 0
+    for symbol, csv_path in find_csvs(src).items():
+        if not force and store.is_fresh_for(symbol, csv_path):
+            continue
+        try:
+            rows = store.import_csv(csv_path, symbol)
+            converted += 1
+            print(f"✅ {symbol:10s} {rows:6d} 行  ← {csv_path.name}")
+        except Exception as e:
+            print(f"❌ {symbol:10s} 转换失败: {e}")
+    print(f"📦 {src}: 转换 {converted} 只 → {store.root}")
+    return converted
+
+
+def drop_page_cache(paths):
+    """尽量把文件移出页缓存（仅 Linux 支持 posix_fadvise），使冷加载名副其实"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def load_csv(path: Path) -> pd.DataFrame:
+    """StockstatsUtils 原先的读取方式（含日期解析）"""
+    data = pd.read_csv(path)
+    data["Date"] = pd.to_datetime(data["Date"].astype(str).str[:10])
+    return data
+
+
+def timed(fn, repeat: int = 1) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def make_synthetic(directory: Path, symbols: int, bars: int):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2000-01-03", periods=bars).strftime("%Y-%m-%d")
+    for i in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+        pd.DataFrame({
+            "Date": dates,
+            "Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98, "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, bars),
+        }).to_csv(directory / f"SYN{i:04d}{CSV_MARKER}2000-01-03-2030-01-01.csv", index=False)
+
+
+def benchmark(src: Path, limit: int, repeat: int):
+    store = ColumnarPriceStore(src / "columnar")
+    csvs = list(find_csvs(src).items())[:limit]
+    if not csvs:
+        print(f"⚠️ {src} 下没有 *{CSV_MARKER}*.csv")
+        return
+    for symbol, csv_path in csvs:
+        if not store.is_fresh_for(symbol, csv_path):
+            store.import_csv(csv_path, symbol)
+
+    rows = []
+    can_drop = True
+    for symbol, csv_path in csvs:
+        column_files = list(store.symbol_dir(symbol).glob("*"))
+        can_drop &= drop_page_cache([csv_path])
+        csv_cold = timed(lambda: load_csv(csv_path))
+        csv_warm = timed(lambda: load_csv(csv_path), repeat)
+        drop_page_cache(column_files)
+        store_cold = timed(lambda: store.read_frame(symbol))
+        store_warm = timed(lambda: store.read_frame(symbol), repeat)
+        views = timed(lambda: store.read_columns(symbol), repeat)
+        rows.append((symbol, store.meta(symbol)["rows"], csv_cold, csv_warm, store_cold, store_warm, views))
+
+    print("=" * 96)
+    print(f"列式价格存储基准: {len(rows)} 只, 热加载取 {repeat} 次平均"
+          + ("" if can_drop else "（当前平台无法丢弃页缓存，冷加载可能偏快）"))
+    print("=" * 96)
+    print(f"{'symbol':10s} {'rows':>6s} {'csv冷(ms)':>10s} {'csv热(ms)':>10s} "
+          f"{'store冷(ms)':>12s} {'store热(ms)':>12s} {'列视图(ms)':>11s} {'热加速':>7s}")
+    for symbol, n, csv_cold, csv_warm, store_cold, store_warm, views in rows:
+        print(f"{symbol:10s} {n:6d} {csv_cold * 1000:10.2f} {csv_warm * 1000:10.2f} "
+              f"{store_cold * 1000:12.2f} {store_warm * 1000:12.2f} {views * 1000:11.3f} "
+              f"{csv_warm / max(store_warm, 1e-9):6.1f}x")
+    totals = np.array([r[2:] for r in rows]).mean(axis=0) * 1000
+    print("-" * 96)
+    print(f"{'平均':10s} {'':6s} {totals[0]:10.2f} {totals[1]:10.2f} {totals[2]:12.2f} {totals[3]:12.2f} "
+          f"{totals[4]:11.3f} {totals[1] / max(totals[3], 1e-9):6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列式价格存储工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_convert = sub.add_parser("convert", help="把 YFin CSV 缓存转换为列式存储")
+    p_convert.add_argument("--src", action="append", help="CSV 所在目录（可重复，默认离线价格目录和 data_cache_dir）")
+    p_convert.add_argument("--force", action="store_true", help="即使列式数据已是最新也重新转换")
+
+    p_bench = sub.add_parser("benchmark", help="冷/热加载耗时对比")
+    p_bench.add_argument("--src", help="CSV 所在目录（默认离线价格目录）")
+    p_bench.add_argument("--limit", type=int, default=20, help="最多测试的股票数")
+    p_bench.add_argument("--repeat", type=int, default=5, help="热加载重复次数")
+    p_bench.add_argument("--synthetic", type=int, default=0, help="生成 N 只合成股票数据进行测试")
+    p_bench.add_argument("--bars", type=int, default=2500, help="合成数据每只股票的 K 线数")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        sources = [Path(s) for s in args.src] if args.src else default_sources()
+        if not sources:
+            print("⚠️ 没有找到可转换的目录，请用 --src 指定")
+        for src in sources:
+            convert(src, args.force)
+    elif args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp:
+            make_synthetic(Path(tmp), args.synthetic, args.bars)
+            benchmark(Path(tmp), args.limit, args.repeat)
+    else:
+        sources = [Path(args.src)] if args.src else default_sources()[:1]
+        if not sources:
+            print("⚠️ 没有找到价格数据目录，请用 --src 指定或使用 --synthetic")
+            return
+        benchmark(sources[0], args.limit, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
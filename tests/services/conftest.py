@@ -0,0 +1,59 @@
+import pytest
+
+
+def _make_fake_redis():
+    """基于 fakeredis 的 Redis（lupa 执行真实 Lua 脚本），calls 记录每次往返"""
+    import fakeredis
+
+    class _View:
+        def __init__(self, read):
+            self._read = read
+
+        def __getitem__(self, key):
+            return self._read(key)
+
+    class FakeRedis(fakeredis.FakeAsyncRedis):
+        def __init__(self):
+            server = fakeredis.FakeServer()
+            super().__init__(server=server, decode_responses=True)
+            self.calls = []
+            # 同步快照，便于断言：lists / sets / hashes[key]
+            inspector = fakeredis.FakeRedis(server=server, decode_responses=True)
+            self.lists = _View(lambda key: inspector.lrange(key, 0, -1))
+            self.sets = _View(inspector.smembers)
+            self.hashes = _View(inspector.hgetall)
+
+        async def execute_command(self, *args, **options):
+            name = str(args[0]).lower()
+            # EVALSHA/SCRIPT LOAD 由 register_script 的包装统一记为一次脚本调用
+            if not name.startswith(("evalsha", "eval", "script")):
+                self.calls.append(name)
+            return await super().execute_command(*args, **options)
+
+        def register_script(self, source):
+            script = super().register_script(source)
+            name = source.strip().splitlines()[0].split(":", 1)[1]
+
+            async def call(keys=(), args=()):
+                self.calls.append(f"script:{name}")
+                return await script(keys=keys, args=args)
+
+            return call
+
+        def pipeline(self, *args, **kwargs):
+            pipe = super().pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def recorded(*a, **kw):
+                self.calls.append("pipeline")
+                return await execute(*a, **kw)
+
+            pipe.execute = recorded
+            return pipe
+
+    return FakeRedis()
+
+
+@pytest.fixture
+def fake_redis():
+    return _make_fake_redis()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.queue import (
+    READY_LIST,
+    SET_COMPLETED,
+    SET_PROCESSING,
+    WORKER_HEARTBEAT_KEY,
+    WORKER_PROCESSING_PREFIX,
+)
+from app.services.queue_service import QueueService
+
+
+U1, U2, U3 = (f"{i:024x}" for i in (1, 2, 3))  # ObjectId 形式的用户ID
+
+
+async def _enqueue(qs, n, users=(U1,)):
+    ids = []
+    for i in range(n):
+        ids.append(await qs.enqueue_task(users[i % len(users)], f"{600000 + i:06d}", {}))
+    return ids
+
+
+def test_blocking_dequeue_tracks_worker_list_and_ack_clears_it(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        (task_id,) = await _enqueue(qs, 1)
+
+        task = await qs.dequeue_task_blocking("w1", timeout=0.05)
+        assert task["id"] == task_id
+        assert r.lists[WORKER_PROCESSING_PREFIX + "w1"] == [task_id]
+        assert task_id in r.sets[SET_PROCESSING]
+
+        assert await qs.dequeue_task_blocking("w1", timeout=0.02) is None
+
+        await qs.ack_task(task_id, True)
+        assert r.lists[WORKER_PROCESSING_PREFIX + "w1"] == []
+        assert task_id in r.sets[SET_COMPLETED]
+        assert not r.sets[SET_PROCESSING]
+
+    asyncio.run(scenario())
+
+
+def test_blocking_dequeue_respects_user_limit(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.user_concurrent_limit = 1
+        await _enqueue(qs, 2)
+
+        assert await qs.dequeue_task_blocking("w1", timeout=0.05) is not None
+        assert await qs.dequeue_task_blocking("w1", timeout=0.05) is None
+        # 超限任务回到就绪队列，而不是滞留在处理中列表
+        assert len(r.lists[READY_LIST]) == 1
+        assert len(r.lists[WORKER_PROCESSING_PREFIX + "w1"]) == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def worker_factory(monkeypatch):
+    import app.worker.analysis_worker as mod
+
+    def make(concurrency, duration, queue_service):
+        state = {"active": 0, "peak": 0, "done": []}
+
+        async def execute(task, progress_callback=None):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                state["active"] -= 1
+            state["done"].append(task.task_id)
+            return SimpleNamespace(execution_time=duration)
+
+        monkeypatch.setattr(mod, "get_analysis_service", lambda: SimpleNamespace(execute_analysis_task=execute))
+        monkeypatch.setattr(mod.signal, "signal", lambda *a: None)  # 不在测试进程中注册信号处理器
+        w = mod.AnalysisWorker(worker_id="wtest")
+        w.queue_service = queue_service
+        w.concurrency = concurrency
+        w.block_timeout = 0.02
+        w.poll_interval = 0.005
+        w.running = True
+        return w, state
+
+    return make
+
+
+def test_worker_runs_tasks_concurrently_and_drains(worker_factory, fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.user_concurrent_limit = qs.global_concurrent_limit = 10
+        ids = await _enqueue(qs, 12, users=(U1, U2, U3))
+        w, state = worker_factory(concurrency=4, duration=0.1, queue_service=qs)
+
+        async def stop_when_queue_empty():
+            while r.lists[READY_LIST]:
+                await asyncio.sleep(0.005)
+            w.running = False  # 模拟 SIGTERM：仍有在途任务
+
+        t0 = time.perf_counter()
+        await asyncio.gather(w._work_loop(), stop_when_queue_empty())
+        elapsed = time.perf_counter() - t0
+
+        assert state["peak"] == 4
+        assert sorted(state["done"]) == sorted(ids)
+        assert r.sets[SET_COMPLETED] == set(ids)
+        assert not w.in_flight
+        assert elapsed < 12 * 0.1 / 2
+
+    asyncio.run(scenario())
+
+
+def test_drain_timeout_requeues_unfinished_tasks(worker_factory, fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        ids = await _enqueue(qs, 2, users=(U1, U2))
+        w, state = worker_factory(concurrency=2, duration=10, queue_service=qs)
+        w.drain_timeout = 0.05
+
+        async def stop_when_busy():
+            while state["active"] < 2:
+                await asyncio.sleep(0.005)
+            w.running = False
+
+        await asyncio.gather(w._work_loop(), stop_when_busy())
+
+        assert state["done"] == []
+        assert sorted(r.lists[READY_LIST]) == sorted(ids)
+        assert r.lists[WORKER_PROCESSING_PREFIX + "wtest"] == []
+        assert not r.sets[SET_PROCESSING]
+        assert r.hashes["qa:task:" + ids[0]]["status"] == "queued"
+
+    asyncio.run(scenario())
+
+
+def test_startup_recovers_lists_of_workers_without_heartbeat(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.user_concurrent_limit = qs.global_concurrent_limit = 10
+        dead_ids = await _enqueue(qs, 2, users=(U1, U2))
+        alive_id = (await _enqueue(qs, 1, users=(U3,)))[0]
+
+        for _ in dead_ids:
+            await qs.dequeue_task_blocking("dead", timeout=0.05)
+        await qs.dequeue_task_blocking("alive", timeout=0.05)
+        await r.set(WORKER_HEARTBEAT_KEY.format(worker_id="alive"), "{}", ex=60)
+
+        assert await qs.recover_stale_workers(exclude="me") == 2
+        # 失联 Worker 的任务按原顺序回到队首，存活 Worker 的任务不动
+        assert r.lists[READY_LIST] == list(reversed(dead_ids))
+        assert r.lists[WORKER_PROCESSING_PREFIX + "dead"] == []
+        assert r.lists[WORKER_PROCESSING_PREFIX + "alive"] == [alive_id]
+        assert r.sets[SET_PROCESSING] == {alive_id}
+        assert r.hashes["qa:task:" + dead_ids[0]]["status"] == "queued"
+
+    asyncio.run(scenario())
@@ -0,0 +1,161 @@
+import asyncio
+
+import pandas as pd
+
+from app.services.historical_data_service import HistoricalDataService
+from app.worker.tushare_sync_service import TushareSyncService
+
+
+class _FakeResult:
+    def __init__(self, n):
+        self.upserted_count = n
+        self.modified_count = 0
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeQuotes:
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.pipelines = []
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.pipelines.append(pipeline)
+        match = pipeline[0]["$match"]
+        last = {}
+        for doc in self.docs:
+            if all(doc[k] == v for k, v in match.items() if not isinstance(v, dict)):
+                if "symbol" in match and doc["symbol"] not in match["symbol"]["$in"]:
+                    continue
+                last[doc["symbol"]] = max(last.get(doc["symbol"], ""), doc["trade_date"])
+        return _FakeCursor([{"_id": s, "last_date": d} for s, d in last.items()])
+
+    async def bulk_write(self, operations, ordered=False):
+        self.docs.extend(op._doc for op in operations)
+        return _FakeResult(len(operations))
+
+
+def _doc(symbol, trade_date, source="tushare", period="daily"):
+    return {"symbol": symbol, "trade_date": trade_date, "data_source": source, "period": period}
+
+
+def test_last_trade_dates_use_one_grouped_aggregation():
+    service = HistoricalDataService()
+    service.collection = _FakeQuotes([
+        _doc("000001", "2025-01-06"), _doc("000001", "2025-01-08"), _doc("600000", "2025-01-07"),
+        _doc("000001", "2025-01-09", source="akshare"), _doc("000001", "2025-01-10", period="weekly"),
+    ])
+
+    assert asyncio.run(service.get_last_trade_dates("tushare")) == {"000001": "2025-01-08", "600000": "2025-01-07"}
+    pipeline = service.collection.pipelines[0]
+    assert pipeline[0] == {"$match": {"data_source": "tushare", "period": "daily"}}
+    # 排序键与 source_period_symbol_date_index 一致，分组取首条
+    assert pipeline[1] == {"$sort": {"symbol": 1, "trade_date": -1}}
+    assert pipeline[2]["$group"]["last_date"] == {"$first": "$trade_date"}
+
+
+def test_coverage_map_is_cached_and_advanced_by_saves():
+    service = HistoricalDataService()
+    service.collection = _FakeQuotes([_doc("000001", "2025-01-06"), _doc("600000", "2025-01-07")])
+
+    async def scenario():
+        await service.get_coverage_map("tushare")
+        df = pd.DataFrame({"date": ["2025-01-07", "2025-01-08"], "close": [1.0, 2.0]})
+        await service.save_historical_data("000001", df, data_source="tushare")
+        cached = await service.get_coverage_map("tushare")
+        summary = await service.get_coverage_summary("tushare")
+        return cached, summary
+
+    cached, summary = asyncio.run(scenario())
+    assert len(service.collection.pipelines) == 1
+    assert cached == {"000001": "2025-01-08", "600000": "2025-01-07"}
+    assert summary["latest_date"] == "2025-01-08"
+    assert summary["behind_count"] == 1 and summary["behind_sample"] == ["600000"]
+
+
+def test_failed_writes_do_not_advance_coverage():
+    service = HistoricalDataService()
+    service.collection = _FakeQuotes([_doc("000001", "2025-01-06")])
+    service.bulk_batch_size = 2
+    written = []
+
+    async def bulk_write(operations, ordered=False):
+        # 第二批写入失败（非超时错误，不重试）
+        if any(op._doc["trade_date"] >= "2025-01-09" for op in operations):
+            raise RuntimeError("write conflict")
+        written.extend(operations)
+        return _FakeResult(len(operations))
+
+    service.collection.bulk_write = bulk_write
+
+    async def scenario():
+        await service.get_coverage_map("tushare")
+        df = pd.DataFrame({"date": ["2025-01-07", "2025-01-08", "2025-01-09"], "close": [1.0, 2.0, 3.0]})
+        saved = await service.save_historical_data("000001", df, data_source="tushare")
+        return saved, await service.get_coverage_map("tushare")
+
+    saved, cached = asyncio.run(scenario())
+    assert saved == 2 and len(written) == 2
+    # 只推进到实际写入的 01-08，失败批次里的 01-09 下次仍会重新获取
+    assert cached == {"000001": "2025-01-08"}
+
+
+class _FakeHistorical:
+    def __init__(self):
+        self.coverage_calls = []
+
+    async def get_coverage_map(self, data_source, period="daily", refresh=False):
+        self.coverage_calls.append((data_source, period, refresh))
+        return {"000001": "2025-01-06"}
+
+    async def get_latest_date(self, symbol, data_source):
+        raise AssertionError("不应逐只查询最后日期")
+
+
+class _FakeBasicInfo:
+    async def find_one(self, query, projection=None):
+        return {"list_date": "20200102"}
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.requests = []
+
+    async def get_historical_data(self, symbol, start_date, end_date, period="daily"):
+        self.requests.append((symbol, start_date))
+        return None
+
+
+class _FakeLimiter:
+    async def acquire(self):
+        pass
+
+    def get_stats(self):
+        return {"current_calls": 0, "max_calls": 1, "total_waits": 0, "total_wait_time": 0.0}
+
+
+def test_incremental_sync_loads_last_dates_once():
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.provider = _FakeProvider()
+    service.rate_limiter = _FakeLimiter()
+    service.historical_service = _FakeHistorical()
+    service.date_major_sync = False
+    service.db = type("DB", (), {"stock_basic_info": _FakeBasicInfo()})()
+
+    asyncio.run(service.sync_historical_data(symbols=["000001", "300750"], end_date="2025-01-08"))
+
+    assert service.historical_service.coverage_calls == [("tushare", "daily", True)]
+    # 有历史的股票从最后日期次日开始，无历史的从上市日期开始
+    assert sorted(service.provider.requests) == [("000001", "2025-01-07"), ("300750", "2020-01-02")]
@@ -0,0 +1,234 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.database import backups
+from app.services.database.streaming import JsonStreamReader, iter_json_records
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeResult:
+    def __init__(self, ids=(), deleted=0):
+        self.inserted_ids = list(ids)
+        self.deleted_count = deleted
+
+
+class _FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.find_kwargs = []
+        self.insert_sizes = []
+        self.indexes = {"_id_": {"v": 2, "key": [("_id", 1)]}}
+        self.db = self.name = None
+
+    def find(self, query=None, **kwargs):
+        self.find_kwargs.append(kwargs)
+        return _FakeCursor(list(self.docs))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def insert_many(self, documents):
+        self.insert_sizes.append(len(documents))
+        self.db.inserts.append((self.name, len(documents)))
+        self.docs.extend(documents)
+        return _FakeResult(ids=range(len(documents)))
+
+    async def delete_many(self, query):
+        deleted, self.docs = len(self.docs), []
+        return _FakeResult(deleted=deleted)
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def create_index(self, keys, name, **options):
+        if any(key in ("_fts", "_ftsx") for key, _ in keys):
+            raise ValueError("text index keys must name the indexed fields")
+        if "weights" in options:
+            keys = [(k, v) for k, v in keys if v != "text"] + [("_fts", "text"), ("_ftsx", 1)]
+        self.indexes[name] = {"v": 2, "key": list(keys), **options}
+
+    def aggregate(self, pipeline):
+        source, into = self, pipeline[0]["$merge"]["into"]
+
+        class _Merge:
+            async def to_list(self, length=None):
+                target = source.db[into]
+                existing = {doc["_id"] for doc in target.docs if "_id" in doc}
+                for doc in source.docs:
+                    if doc.get("_id") in existing:
+                        raise ValueError("duplicate key")
+                    target.docs.append(doc)
+                return []
+
+        return _Merge()
+
+    async def rename(self, new_name, dropTarget=False):
+        assert dropTarget or new_name not in self.db
+        del self.db[self.name]
+        self.db[new_name] = self
+
+    async def drop(self):
+        self.db.pop(self.name, None)
+
+
+class _FakeDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.inserts = []
+
+    def __missing__(self, name):
+        self[name] = _FakeCollection()
+        return self[name]
+
+    def __setitem__(self, name, collection):
+        collection.db, collection.name = self, name
+        super().__setitem__(name, collection)
+
+    async def list_collection_names(self):
+        return list(self.keys())
+
+
+def _source_db():
+    db = _FakeDB()
+    db["quotes"] = _FakeCollection([
+        {"_id": ObjectId(), "code": f"{i:06d}", "close": i + 0.5, "created_at": datetime(2025, 1, 2, 15, 0)}
+        for i in range(25)
+    ])
+    db["users"] = _FakeCollection([{"_id": ObjectId(), "username": "admin", "password": "secret"}])
+    db["configs"] = _FakeCollection([{"_id": ObjectId(), "name": "llm", "api_key": "sk-x", "extra": {"max_tokens": 10}}])
+    return db
+
+
+def test_json_export_round_trips_through_streaming_import(monkeypatch, tmp_path):
+    source = _source_db()
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: source)
+    progress = []
+
+    path = asyncio.run(backups.export_data(["quotes", "configs"], export_dir=str(tmp_path), format="json",
+                                           batch_size=10, concurrency=2,
+                                           progress=lambda name, done, total: progress.append((name, done, total))))
+
+    exported = json.loads(open(path, encoding="utf-8").read())
+    assert exported["export_info"]["collections"] == ["quotes", "configs"]
+    assert len(exported["data"]["quotes"]) == 25
+    assert source["quotes"].find_kwargs == [{"batch_size": 10}]
+    assert [p for p in progress if p[0] == "quotes"] == [("quotes", 10, 25), ("quotes", 20, 25), ("quotes", 25, 25)]
+    # 临时分片已清理
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.rsplit("/", 1)[-1]]
+
+    target = _FakeDB()
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: target)
+    result = asyncio.run(backups.import_data(path, "ignored", batch_size=8))
+
+    assert result["mode"] == "multi_collection" and result["total_inserted"] == 26
+    # 先分批写入临时集合，成功后再合并到目标集合
+    assert [size for name, size in target.inserts if name.startswith("quotes__import_")] == [8, 8, 8, 1]
+    assert sorted(target) == ["configs", "quotes"] and len(target["quotes"].docs) == 25
+    doc = target["quotes"].docs[0]
+    assert isinstance(doc["_id"], ObjectId) and isinstance(doc["created_at"], datetime)
+
+
+def test_gzip_ndjson_and_csv_exports(monkeypatch, tmp_path):
+    source = _source_db()
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: source)
+
+    path = asyncio.run(backups.export_data(None, export_dir=str(tmp_path), format="ndjson", sanitize=True,
+                                           compress=True, batch_size=7))
+    assert path.endswith(".ndjson.gz")
+    lines = [json.loads(line) for line in gzip.open(path, "rt", encoding="utf-8")]
+    assert "export_info" in lines[0] and len(lines) == 1 + 25 + 1
+    config = next(line["document"] for line in lines[1:] if line["_collection"] == "configs")
+    assert config["api_key"] == "" and config["extra"] == {"max_tokens": 10}
+
+    target = _FakeDB()
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: target)
+    result = asyncio.run(backups.import_data(open(path, "rb").read(), "ignored", filename="backup.ndjson.gz"))
+    assert result["collections"] == ["quotes", "configs"] and result["total_inserted"] == 26
+
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: source)
+    csv_path = asyncio.run(backups.export_data(["configs", "quotes"], export_dir=str(tmp_path), format="csv"))
+    rows = list(csv.DictReader(io.StringIO(open(csv_path, encoding="utf-8-sig").read())))
+    assert len(rows) == 26 and rows[0]["_collection"] == "configs" and rows[1]["name"] == ""
+    assert rows[1]["code"] == "000000" and rows[0]["code"] == ""
+
+
+def test_json_reader_handles_legacy_layouts_across_chunk_boundaries():
+    def records(payload):
+        state = {}
+        reader = JsonStreamReader(io.StringIO(json.dumps(payload)), chunk_size=3)
+        return list(iter_json_records(reader, "default", state)), state["mode"]
+
+    assert records({"a": [{"x": 12345}, {"x": [1, 2]}], "b": []}) == \
+        ([("a", {"x": 12345}), ("a", {"x": [1, 2]})], "multi_collection")
+    assert records([{"v": 1.25}, {"v": "字符串"}]) == \
+        ([("default", {"v": 1.25}), ("default", {"v": "字符串"})], "single_collection")
+    assert records({"name": "单个文档", "n": 10}) == ([("default", {"name": "单个文档", "n": 10})], "single_collection")
+
+
+def test_json_reader_requires_every_value_to_be_a_list_and_finds_late_export_info():
+    def records(payload):
+        state = {}
+        reader = JsonStreamReader(io.StringIO(json.dumps(payload)), chunk_size=4)
+        return list(iter_json_records(reader, "default", state)), state
+
+    assert records({"tags": ["a", "b"], "name": "x"})[0] == [("default", {"tags": ["a", "b"], "name": "x"})]
+    docs, state = records({"data": {"quotes": [{"v": 1}], "meta": {}}, "export_info": {"collections": ["quotes"]}})
+    assert docs == [("quotes", {"v": 1})]
+    assert state["mode"] == "multi_collection" and state["export_info"] == {"collections": ["quotes"]}
+
+
+def test_overwrite_import_replaces_collection_only_after_success(monkeypatch):
+    target = _FakeDB()
+    target["quotes"] = _FakeCollection([{"code": "old"}])
+    target["quotes"].indexes["code_1"] = {"v": 2, "key": [("code", 1)], "unique": True}
+    target["quotes"].indexes["name_text"] = {"v": 2, "key": [("_fts", "text"), ("_ftsx", 1)],
+                                             "weights": {"name": 1}, "textIndexVersion": 3}
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: target)
+
+    broken = b'{"export_info": {}, "data": {"quotes": [{"code": "new1"}, {"code": "new2"}, {"code": '
+    with pytest.raises(ValueError):
+        asyncio.run(backups.import_data(broken, "ignored", overwrite=True, batch_size=1))
+    assert list(target) == ["quotes"] and target["quotes"].docs == [{"code": "old"}]
+
+    payload = json.dumps({"export_info": {}, "data": {"quotes": [{"code": "new1"}, {"code": "new2"}]}}).encode()
+    result = asyncio.run(backups.import_data(payload, "ignored", overwrite=True, batch_size=1))
+    assert result["total_inserted"] == 2 and list(target) == ["quotes"]
+    assert [doc["code"] for doc in target["quotes"].docs] == ["new1", "new2"]
+    assert target["quotes"].indexes["code_1"]["unique"] is True
+    assert target["quotes"].indexes["name_text"]["weights"] == {"name": 1}
+
+
+def test_append_import_inserts_nothing_when_file_is_truncated(monkeypatch):
+    target = _FakeDB()
+    target["quotes"] = _FakeCollection([{"code": "old"}])
+    monkeypatch.setattr(backups, "get_mongo_db", lambda: target)
+
+    broken = b'{"export_info": {}, "data": {"quotes": [{"code": "new1"}, {"code": "new2"}, {"code": '
+    with pytest.raises(ValueError):
+        asyncio.run(backups.import_data(broken, "ignored", overwrite=False, batch_size=1))
+    assert list(target) == ["quotes"] and target["quotes"].docs == [{"code": "old"}]
+
+    payload = json.dumps({"export_info": {}, "data": {"quotes": [{"code": "new1"}, {"code": "new2"}]}}).encode()
+    result = asyncio.run(backups.import_data(payload, "ignored", overwrite=False, batch_size=1))
+    assert result["total_inserted"] == 2 and list(target) == ["quotes"]
+    assert [doc["code"] for doc in target["quotes"].docs] == ["old", "new1", "new2"]
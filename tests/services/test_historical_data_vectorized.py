@@ -0,0 +1,90 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from app.services.historical_data_service import HistoricalDataService
+
+
+class _FakeResult:
+    def __init__(self, n):
+        self.upserted_count = n
+        self.modified_count = 0
+
+
+class _SlowCollection:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.docs = []
+
+    async def bulk_write(self, operations, ordered=False):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.docs.extend(op._doc for op in operations)
+        return _FakeResult(len(operations))
+
+
+def _tushare_frame(n):
+    dates = pd.bdate_range("2020-01-01", periods=n)
+    close = np.linspace(10, 20, n)
+    df = pd.DataFrame({
+        "ts_code": "600519.SH",
+        "open": close - 0.1, "high": close + 0.2, "low": close - 0.3, "close": close,
+        "pre_close": np.r_[np.nan, close[:-1]],
+        "change": 0.5, "pct_chg": 1.5, "volume": 1234.0, "amount": 5678.0,
+        "turnover_rate": [np.nan if i % 3 else 0.8 for i in range(n)],
+    }, index=pd.Index(dates, name="date"))
+    return df
+
+
+def _comparable(doc):
+    return {k: v for k, v in doc.items() if k not in ("created_at", "updated_at")}
+
+
+def test_columnar_documents_match_row_by_row_standardization():
+    service = HistoricalDataService()
+    df = _tushare_frame(50)
+
+    columnar = service._build_documents(df.assign(symbol="600519"), "tushare", "CN", "daily")
+
+    converted = df.copy()
+    converted["amount"] *= 1000
+    converted["volume"] *= 100
+    expected = [service._standardize_record("600519", row, "tushare", "CN", "daily", idx)
+                for idx, row in converted.iterrows()]
+    for doc in expected:
+        # 逐行路径在可选字段为 NaN 时写入 None；列式路径不写入该字段
+        if doc.get("turnover_rate") is None:
+            doc.pop("turnover_rate", None)
+
+    assert [_comparable(d) for d in columnar] == [_comparable(d) for d in expected]
+
+
+def test_date_formats_are_normalized_per_column():
+    service = HistoricalDataService()
+    df = pd.DataFrame({
+        "date": ["20240102", "2024-01-03", "2024-01-04 00:00:00", pd.Timestamp("2024-01-05")],
+        "close": [1.0, 2.0, 3.0, 4.0],
+    })
+    docs = service._build_documents(df.assign(symbol="00700"), "akshare", "HK", "daily")
+    assert [d["trade_date"] for d in docs] == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert docs[0]["full_symbol"] == "00700.HK"
+
+
+def test_save_pipelines_bulk_writes_with_bounded_concurrency():
+    service = HistoricalDataService()
+    service.collection = _SlowCollection()
+    service.bulk_batch_size = 100
+    service.max_concurrent_writes = 3
+    df = _tushare_frame(1000)
+
+    saved = asyncio.run(service.save_historical_data("600519", df, data_source="tushare"))
+
+    assert saved == 1000
+    assert service.collection.max_in_flight == 3
+    assert sorted(d["trade_date"] for d in service.collection.docs)[0] == "2020-01-01"
+    # 不修改调用方的 DataFrame
+    assert df["amount"].iloc[0] == 5678.0
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+from app.services.progress.pubsub_hub import ProgressHub
+
+
+class FakePubSub:
+    def __init__(self, inbox):
+        self.inbox = inbox
+        self.patterns = []
+
+    async def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.inbox.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def punsubscribe(self, *patterns):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.pubsubs = []
+
+    def pubsub(self):
+        ps = FakePubSub(self.inbox)
+        self.pubsubs.append(ps)
+        return ps
+
+    def publish(self, channel, data):
+        self.inbox.put_nowait({"type": "pmessage", "pattern": "task_progress:*",
+                               "channel": channel, "data": json.dumps(data)})
+
+
+def test_single_pattern_subscription_fans_out_to_clients():
+    async def scenario():
+        redis = FakeRedis()
+        hub = ProgressHub(redis_factory=lambda: redis)
+        a1 = await hub.subscribe(["task_progress:A"])
+        a2 = await hub.subscribe(["task_progress:A"])
+        b = await hub.subscribe(["task_progress:B"])
+
+        redis.publish("task_progress:A", {"progress": 10})
+        redis.publish("task_progress:B", {"progress": 20})
+
+        assert (await a1.get(timeout=1)).data == {"progress": 10}
+        assert (await a2.get(timeout=1)).data == {"progress": 10}
+        assert (await b.get(timeout=1)).data == {"progress": 20}
+        assert await a1.get(timeout=0.05) is None
+
+        assert len(redis.pubsubs) == 1
+        assert redis.pubsubs[0].patterns == ["task_progress:*"]
+        assert hub.stats()["subscribers"] == 3
+
+        for sub in (a1, a2, b):
+            sub.close()
+        assert hub.stats()["channels"] == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_buffer_is_bounded_and_keeps_latest():
+    async def scenario():
+        hub = ProgressHub(redis_factory=FakeRedis, client_buffer=3)
+        hub._connected.set()
+        hub._ensure_reader = lambda: None
+        sub = await hub.subscribe(["task_progress:A", "task_progress:B"])
+
+        hub.dispatch("task_progress:B", json.dumps({"progress": 1}))
+        for i in range(10):
+            hub.dispatch("task_progress:A", json.dumps({"progress": i * 10}))
+
+        received = []
+        while (event := await sub.get(timeout=0)) is not None:
+            received.append((event.channel, event.data["progress"]))
+
+        assert len(received) <= 3
+        assert received[-1] == ("task_progress:A", 90)
+        assert sub.coalesced > 0
+
+    asyncio.run(scenario())
+
+
+def test_last_event_id_replays_missed_messages():
+    async def scenario():
+        hub = ProgressHub(redis_factory=FakeRedis)
+        hub._connected.set()
+        hub._ensure_reader = lambda: None
+        events = [hub.dispatch("task_progress:A", json.dumps({"step": i})) for i in range(5)]
+        hub.dispatch("task_progress:other", json.dumps({"step": 99}))
+
+        sub = await hub.subscribe(["task_progress:A"], last_event_id=events[1].id)
+        replay = [(await sub.get(timeout=0)).data["step"] for _ in range(3)]
+        assert replay == [2, 3, 4]
+        assert await sub.get(timeout=0) is None
+
+        # 其它进程签发的 ID：回放全部保留的历史
+        sub2 = await hub.subscribe(["task_progress:A"], last_event_id="deadbeef-3")
+        assert [(await sub2.get(timeout=0)).data["step"] for _ in range(5)] == [0, 1, 2, 3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_task_sse_stream_emits_event_ids(monkeypatch):
+    import app.routers.sse as sse_mod
+
+    async def scenario():
+        redis = FakeRedis()
+        hub = ProgressHub(redis_factory=lambda: redis)
+        monkeypatch.setattr(sse_mod, "get_progress_hub", lambda: hub)
+
+        gen = sse_mod.task_progress_generator("T1", "u1")
+        assert (await gen.__anext__()).startswith("event: connected")
+        redis.publish("task_progress:T1", {"message": "分析中", "progress": 50})
+        chunk = await gen.__anext__()
+        assert chunk.startswith(f"id: {hub.epoch}-1\nevent: progress\n")
+        assert json.loads(chunk.split("data: ", 1)[1]) == {"message": "分析中", "progress": 50}
+        await gen.aclose()
+        assert hub.stats()["subscribers"] == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
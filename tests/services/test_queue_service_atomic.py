@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+from app.services.queue import (
+    BATCH_PREFIX,
+    READY_LIST,
+    SET_COMPLETED,
+    SET_PROCESSING,
+    TASK_PREFIX,
+    WORKER_PROCESSING_PREFIX,
+)
+from app.services.queue_service import QueueService
+
+U1, U2 = (f"{i:024x}" for i in (1, 2))
+
+
+def test_enqueue_dequeue_ack_round_trips(fake_redis):
+    async def scenario():
+        qs = QueueService(fake_redis)
+
+        task_id = await qs.enqueue_task(U1, "000001", {"research_depth": 2})
+        assert fake_redis.calls == ["script:enqueue"]
+
+        fake_redis.calls.clear()
+        task = await qs.dequeue_task("w1")
+        # 读取候选任务（LRANGE + 一次 pipeline 读用户）后由脚本原子认领
+        assert fake_redis.calls == ["lrange", "pipeline", "script:dequeue"]
+        assert task["id"] == task_id and task["status"] == "processing"
+        assert task["parameters"] == {"research_depth": 2}
+        assert fake_redis.lists[WORKER_PROCESSING_PREFIX + "w1"] == [task_id]
+
+        fake_redis.calls.clear()
+        assert await qs.ack_task(task_id, True)
+        assert fake_redis.calls == ["hmget", "script:ack"]
+        assert fake_redis.hashes[TASK_PREFIX + task_id]["status"] == "completed"
+        assert task_id in fake_redis.sets[SET_COMPLETED]
+        assert not fake_redis.sets[SET_PROCESSING]
+        assert fake_redis.lists[WORKER_PROCESSING_PREFIX + "w1"] == []
+
+        assert not await qs.ack_task("missing")
+
+    asyncio.run(scenario())
+
+
+def test_create_batch_enqueues_in_bulk(fake_redis):
+    async def scenario():
+        qs = QueueService(fake_redis)
+        symbols = [f"{600000 + i:06d}" for i in range(1200)]
+
+        batch_id, submitted = await qs.create_batch(U1, symbols, {})
+
+        assert submitted == 1200
+        assert fake_redis.calls == ["script:enqueue"] * 3  # 每 500 个任务一次往返
+        assert fake_redis.hashes[BATCH_PREFIX + batch_id]["submitted"] == "1200"
+        batch = await qs.get_batch(batch_id)
+        assert len(batch["tasks"]) == 1200
+        # FIFO：最早提交的股票位于队首（右侧）
+        queued = [fake_redis.hashes[TASK_PREFIX + t]["symbol"] for t in reversed(fake_redis.lists[READY_LIST])]
+        assert queued == symbols
+
+    asyncio.run(scenario())
+
+
+def test_dequeue_skips_users_at_limit_without_requeue(fake_redis):
+    async def scenario():
+        qs = QueueService(fake_redis)
+        qs.user_concurrent_limit = 1
+        a1 = await qs.enqueue_task(U1, "000001", {})
+        a2 = await qs.enqueue_task(U1, "000002", {})
+        b1 = await qs.enqueue_task(U2, "000003", {})
+
+        assert (await qs.dequeue_task("w1"))["id"] == a1
+        # U1 已达上限：跳过 a2 取 b1，a2 保持原位
+        assert (await qs.dequeue_task("w1"))["id"] == b1
+        assert await qs.dequeue_task("w1") is None
+        assert fake_redis.lists[READY_LIST] == [a2]
+
+    asyncio.run(scenario())
+
+
+def test_enqueue_rejects_when_limits_reached(fake_redis):
+    async def scenario():
+        qs = QueueService(fake_redis)
+        qs.user_concurrent_limit = 1
+        await qs.enqueue_task(U1, "000001", {})
+        await qs.dequeue_task("w1")
+        with pytest.raises(ValueError):
+            await qs.enqueue_task(U1, "000002", {})
+        with pytest.raises(ValueError):
+            await qs.create_batch(U1, ["000003"], {})
+        assert fake_redis.lists[READY_LIST] == []
+
+    asyncio.run(scenario())
+
+
+def test_blocking_and_non_blocking_dequeue_share_limits(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.user_concurrent_limit = 1
+        batch_id, _ = await qs.create_batch(U1, ["000001", "000002"], {"x": 1})
+        other = await qs.enqueue_task(U2, "000003", {})
+
+        first = await qs.dequeue_task("w1")
+        assert first["symbol"] == "000001" and first["parameters"] == {"x": 1}
+        assert (await qs.dequeue_task("w1"))["id"] == other
+        assert await qs.dequeue_task("w1") is None
+
+        assert await qs.ack_task(first["id"], True)
+        assert await r.scard(SET_PROCESSING) == 1
+        blocked = await qs.dequeue_task_blocking("w2", timeout=0.1)
+        assert blocked["symbol"] == "000002"
+        assert r.lists[WORKER_PROCESSING_PREFIX + "w2"] == [blocked["id"]]
+        assert len((await qs.get_batch(batch_id))["tasks"]) == 2
+
+    asyncio.run(scenario())
+
+
+def test_blocking_dequeue_returns_task_when_global_limit_full(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.global_concurrent_limit = 1
+        first = await qs.enqueue_task(U1, "000001", {})
+        await qs.dequeue_task("w1")
+        # 入队会被全局上限拒绝，直接写入一个已排队的任务
+        await r.lpush(READY_LIST, "pending")
+        await r.hset(TASK_PREFIX + "pending", mapping={"id": "pending", "user": U2, "status": "queued"})
+
+        # 全局并发在脚本内校验：取出的任务放回队首，Worker 处理中列表不残留
+        r.calls.clear()
+        assert await qs.dequeue_task_blocking("w2", timeout=0.05) is None
+        assert r.calls == ["blmove", "hget", "script:dequeue"]
+        assert r.lists[READY_LIST] == ["pending"]
+        assert r.lists[WORKER_PROCESSING_PREFIX + "w2"] == []
+        assert r.sets[SET_PROCESSING] == {first}
+
+    asyncio.run(scenario())
+
+
+def test_requeue_keeps_ids_when_reading_fails_midway_or_task_is_missing(fake_redis):
+    async def scenario():
+        r = fake_redis
+        qs = QueueService(r)
+        qs.user_concurrent_limit = 10
+        ids = [await qs.enqueue_task(U1, f"00000{i}", {}) for i in range(3)]
+        for _ in ids:
+            await qs.dequeue_task("w1")
+        worker_list = WORKER_PROCESSING_PREFIX + "w1"
+        assert r.lists[worker_list] == list(reversed(ids))
+
+        get_task, reads = qs.get_task, []
+
+        async def flaky_get_task(task_id):
+            reads.append(task_id)
+            if len(reads) == 2:
+                raise ConnectionError("redis down")
+            return await get_task(task_id)
+
+        qs.get_task = flaky_get_task
+        assert await qs.requeue_worker_tasks("w1") == 1
+        # 第二个任务读取失败：已移回的任务在就绪队列，其余仍在处理中列表
+        assert r.lists[READY_LIST] == [ids[2]]
+        assert r.lists[worker_list] == [ids[1], ids[0]]
+        assert r.hashes[TASK_PREFIX + ids[2]]["status"] == "queued"
+
+        qs.get_task = get_task
+        await r.delete(TASK_PREFIX + ids[1])
+        assert await qs.requeue_worker_tasks("w1") == 1
+        assert r.lists[READY_LIST] == [ids[2], ids[0]]
+        # 任务数据丢失的 ID 保留在列表中
+        assert r.lists[worker_list] == [ids[1]]
+        assert r.sets[SET_PROCESSING] == {ids[1]}
+
+    asyncio.run(scenario())
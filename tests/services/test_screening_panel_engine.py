@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+TECH = [
+    "pct_chg", "ma5", "ma10", "ma20", "ema12", "ema26", "dif", "dea", "macd_hist",
+    "rsi14", "boll_mid", "boll_upper", "boll_lower", "atr14", "kdj_k", "kdj_d", "kdj_j",
+]
+
+
+def _make_panel(lengths, seed=7):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i, n in enumerate(lengths):
+        code = f"{600000 + i:06d}"
+        dates = pd.bdate_range("2024-01-01", periods=n)
+        close = 10 + np.cumsum(rng.normal(0, 0.2, n))
+        high = close + rng.uniform(0, 0.3, n)
+        low = close - rng.uniform(0, 0.3, n)
+        for d, c, h, l in zip(dates, close, high, low):
+            rows.append({
+                "symbol": code, "trade_date": d.strftime("%Y-%m-%d"), "data_source": "tushare",
+                "open": c, "high": h, "low": l, "close": c, "volume": 1e6, "amount": 1e7,
+            })
+    return rows
+
+
+def _per_symbol(panel):
+    from tradingagents.tools.analysis.indicators import IndicatorSpec, compute_many
+
+    specs = [
+        IndicatorSpec("ma", {"n": 5}), IndicatorSpec("ma", {"n": 10}), IndicatorSpec("ma", {"n": 20}),
+        IndicatorSpec("ema", {"n": 12}), IndicatorSpec("ema", {"n": 26}), IndicatorSpec("macd"),
+        IndicatorSpec("rsi", {"n": 14}), IndicatorSpec("boll", {"n": 20, "k": 2}),
+        IndicatorSpec("atr", {"n": 14}), IndicatorSpec("kdj", {"n": 9, "m1": 3, "m2": 3}),
+    ]
+    out = {}
+    for code, g in panel.groupby("code"):
+        df = g.reset_index(drop=True).copy()
+        df["pct_chg"] = df["close"].pct_change() * 100.0
+        out[code] = compute_many(df, specs)
+    return out
+
+
+def test_panel_indicators_match_per_symbol_compute_many():
+    from app.services.screening.panel_engine import (
+        compute_panel_indicators, latest_rows, normalize_panel, to_bar_matrix,
+    )
+
+    panel = normalize_panel(pd.DataFrame(_make_panel([80, 30, 12, 1])))
+    frames = compute_panel_indicators(to_bar_matrix(panel))
+    last, prev = latest_rows(frames)
+
+    for code, df in _per_symbol(panel).items():
+        for f in TECH:
+            exp_last = df[f].iloc[-1]
+            exp_prev = df[f].iloc[-2] if len(df) >= 2 else np.nan
+            assert np.isclose(last.loc[code, f], exp_last, equal_nan=True), (code, f)
+            assert np.isclose(prev.loc[code, f], exp_prev, equal_nan=True), (code, f)
+
+
+def test_normalize_panel_keeps_highest_priority_source():
+    from app.services.screening.panel_engine import normalize_panel
+
+    raw = pd.DataFrame([
+        {"symbol": "000001", "trade_date": "2024-01-02", "data_source": "akshare", "close": 1.0, "volume": 5},
+        {"symbol": "000001", "trade_date": "2024-01-02", "data_source": "tushare", "close": 2.0, "volume": 6},
+        {"symbol": "000002", "trade_date": "2024-01-02", "data_source": "baostock", "close": 3.0, "volume": 7},
+    ])
+    out = normalize_panel(raw)
+    assert out["code"].tolist() == ["000001", "000002"]
+    assert out["close"].tolist() == [2.0, 3.0]
+    assert out["vol"].tolist() == [6, 7]
+
+
+@pytest.mark.parametrize("node", [
+    {"field": "close", "op": ">", "value": 10},
+    {"field": "rsi14", "op": "between", "value": [30, 70]},
+    {"field": "ma5", "op": "cross_up", "right_field": "ma10"},
+    {"field": "dif", "op": "cross_down", "right_field": "dea"},
+    {"field": "kdj_k", "op": ">=", "right_field": "kdj_d"},
+    {"field": "pe", "op": "<", "value": 20},
+    {"logic": "OR", "children": [
+        {"field": "close", "op": "<", "value": 9},
+        {"logic": "AND", "children": [
+            {"field": "boll_upper", "op": ">", "right_field": "close"},
+            {"field": "atr14", "op": "!=", "value": 0},
+        ]},
+    ]},
+])
+def test_mask_evaluation_matches_scalar_evaluation(node):
+    from app.services.screening.eval_utils import evaluate_conditions, evaluate_conditions_mask
+    from app.services.screening.panel_engine import (
+        compute_panel_indicators, latest_rows, normalize_panel, to_bar_matrix,
+    )
+    from app.services.screening_service import ALLOWED_FIELDS, ALLOWED_OPS
+
+    panel = normalize_panel(pd.DataFrame(_make_panel([60] * 40 + [1], seed=3)))
+    last, prev = latest_rows(compute_panel_indicators(to_bar_matrix(panel)))
+    mask = evaluate_conditions_mask(last, prev, node, ALLOWED_FIELDS, ALLOWED_OPS)
+
+    for code, df in _per_symbol(panel).items():
+        assert bool(mask[code]) == evaluate_conditions(df, node, ALLOWED_FIELDS, ALLOWED_OPS), code
+
+
+def test_run_screens_full_universe_with_one_query(monkeypatch):
+    import app.core.database as db_mod
+    import app.services.screening_service as mod
+    from app.services.screening_service import ScreeningParams, ScreeningService
+
+    docs = _make_panel([60] * 300, seed=11)
+    calls = []
+
+    class _FakeCursor(list):
+        def batch_size(self, _n):
+            return self
+
+    class _FakeColl:
+        def find(self, query, projection=None):
+            calls.append(query)
+            wanted = set(query["symbol"]["$in"])
+            return _FakeCursor(d for d in docs if d["symbol"] in wanted)
+
+    class _FakeDB:
+        stock_daily_quotes = _FakeColl()
+
+    monkeypatch.setattr(db_mod, "get_mongo_db_sync", lambda: _FakeDB(), raising=True)
+    codes = sorted({d["symbol"] for d in docs})
+    monkeypatch.setattr(ScreeningService, "_get_universe", lambda self: codes, raising=True)
+
+    def _no_fallback():
+        raise AssertionError("per-symbol fallback should not be used")
+
+    monkeypatch.setattr(mod, "get_data_source_manager", _no_fallback, raising=True)
+
+    svc = ScreeningService()
+    res = svc.run(
+        {"field": "close", "op": ">", "value": 0},
+        ScreeningParams(limit=10, offset=5, order_by=[{"field": "rsi14", "direction": "desc"}]),
+    )
+
+    assert len(calls) == 1
+    assert res["total"] == 300
+    assert len(res["items"]) == 10
+    rsis = [it["rsi14"] for it in res["items"]]
+    assert rsis == sorted(rsis, reverse=True)
+    assert {"code", "close", "pct_chg", "amount", "ma20", "kdj_k"} <= set(res["items"][0])
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from app.worker.sync_pipeline import SyncCheckpoint, SyncPipeline, merge_pipeline_stats
+
+
+class _FakeLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+
+
+class _FakeCheckpoints:
+    """sync_checkpoints 集合替身"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["key"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["key"], {"key": query["key"], "completed": []})
+        for symbol in update["$addToSet"]["completed"]["$each"]:
+            if symbol not in doc["completed"]:
+                doc["completed"].append(symbol)
+
+    async def delete_one(self, query):
+        self.docs.pop(query["key"], None)
+
+
+def test_fetch_overlaps_writes_with_bounded_fetchers():
+    active = {"fetch": 0, "fetch_peak": 0, "overlap": False, "saving": 0}
+    saved = []
+
+    async def fetch(symbol):
+        active["fetch"] += 1
+        active["fetch_peak"] = max(active["fetch_peak"], active["fetch"])
+        if active["saving"]:
+            active["overlap"] = True
+        await asyncio.sleep(0.02)
+        active["fetch"] -= 1
+        if symbol == "bad":
+            raise RuntimeError("timeout")
+        return None if symbol == "empty" else [symbol]
+
+    async def save(symbol, payload):
+        active["saving"] += 1
+        await asyncio.sleep(0.02)
+        active["saving"] -= 1
+        saved.append(symbol)
+        return 10
+
+    symbols = [f"{i:06d}" for i in range(20)] + ["empty", "bad"]
+    limiter = _FakeLimiter()
+    pipeline = SyncPipeline("test", fetch, save, rate_limiter=limiter, fetchers=3, writers=2)
+
+    started = time.perf_counter()
+    result = asyncio.run(pipeline.run(symbols))
+    elapsed = time.perf_counter() - started
+
+    # 串行需要 22×0.02 + 20×0.02 ≈ 0.84 秒
+    assert elapsed < 0.5
+    assert active["fetch_peak"] == 3 and active["overlap"]
+    assert limiter.acquired == 22
+    assert sorted(saved) == sorted(symbols[:20])
+    assert result["success_count"] == 20 and result["total_records"] == 200
+    assert result["empty_count"] == 1 and result["error_count"] == 1
+    assert result["errors"][0]["code"] == "bad" and result["errors"][0]["stage"] == "fetch"
+    assert result["metrics"]["fetch"]["items"] == 21 and result["metrics"]["save"]["items"] == 20
+
+
+def test_progress_is_reported_in_batches():
+    calls = []
+
+    async def fetch(symbol):
+        return [symbol]
+
+    async def save(symbol, payload):
+        return 1
+
+    async def progress(done, total, symbol):
+        calls.append((done, total))
+
+    pipeline = SyncPipeline("test", fetch, save, fetchers=2, progress=progress, progress_every=10)
+    asyncio.run(pipeline.run([str(i) for i in range(25)]))
+    assert calls == [(10, 25), (20, 25), (25, 25)]
+
+
+def test_stopped_run_resumes_from_checkpoint():
+    collection = _FakeCheckpoints()
+    db = {"sync_checkpoints": collection}
+    fetched = []
+
+    async def fetch(symbol):
+        fetched.append(symbol)
+        await asyncio.sleep(0.001)
+        return [symbol]
+
+    async def save(symbol, payload):
+        return 1
+
+    async def stop_now():
+        return True
+
+    symbols = [str(i) for i in range(30)]
+    first = SyncPipeline("test", fetch, save, fetchers=1, progress_every=5, should_stop=stop_now,
+                         checkpoint=SyncCheckpoint(db, "tushare:historical:daily:incremental:2025-01-08"))
+    result = asyncio.run(first.run(symbols))
+    assert result["stopped"]
+    completed = set(collection.docs["tushare:historical:daily:incremental:2025-01-08"]["completed"])
+    assert len(completed) >= 5 and len(completed) < 30
+
+    fetched.clear()
+    second = SyncPipeline("test", fetch, save, fetchers=2, progress_every=5,
+                          checkpoint=SyncCheckpoint(db, "tushare:historical:daily:incremental:2025-01-08"))
+    result = asyncio.run(second.run(symbols))
+    assert not result["stopped"] and result["skipped"] == len(completed)
+    assert sorted(fetched) == sorted(set(symbols) - completed)
+    # 全部完成后清除断点
+    assert collection.docs == {}
+
+
+def test_merge_reports_empty_results():
+    result = {"success_count": 2, "empty_count": 1, "empty_symbols": ["000003"], "error_count": 1,
+              "total_records": 20, "errors": [{"code": "000004", "error": "boom"}], "skipped": 0,
+              "metrics": {}, "stopped": False}
+
+    def fresh():
+        return {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+
+    stats = merge_pipeline_stats(fresh(), result, "tushare")
+    assert stats["empty_count"] == 1 and stats["error_count"] == 1
+
+    # AKShare 口径：无数据同时计为错误
+    stats = merge_pipeline_stats(fresh(), result, "akshare", empty_as_error=True)
+    assert stats["empty_count"] == 1 and stats["error_count"] == 2
+    assert stats["errors"][-1] == {"code": "000003", "error": "历史数据为空", "context": "akshare"}
@@ -0,0 +1,171 @@
+import asyncio
+
+import pandas as pd
+
+from app.services.historical_data_service import HistoricalDataService
+from app.worker.tushare_sync_service import TushareSyncService
+from tradingagents.dataflows.providers.china.tushare import TushareProvider
+
+
+class _FakeResult:
+    def __init__(self, n):
+        self.upserted_count = n
+        self.modified_count = 0
+
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeQuotes:
+    """stock_daily_quotes 替身：docs 为 {(symbol, trade_date): doc}"""
+
+    def __init__(self, docs):
+        self.docs = {(d["symbol"], d["trade_date"]): d for d in docs}
+        self.bulk_calls = 0
+
+    async def find_one(self, query, projection=None, sort=None):
+        if not self.docs:
+            return None
+        return {"trade_date": max(d for _, d in self.docs)}
+
+    def aggregate(self, pipeline):
+        window = pipeline[0]["$match"]["trade_date"]
+        counts = {}
+        for _, trade_date in self.docs:
+            if window["$gte"] <= trade_date <= window["$lte"]:
+                counts[trade_date] = counts.get(trade_date, 0) + 1
+        return _FakeCursor([{"_id": d, "count": c} for d, c in counts.items()])
+
+    async def distinct(self, field, query):
+        return sorted({s for s, _ in self.docs})
+
+    async def bulk_write(self, operations, ordered=False):
+        self.bulk_calls += 1
+        for op in operations:
+            doc = op._doc
+            self.docs[(doc["symbol"], doc["trade_date"])] = doc
+        return _FakeResult(len(operations))
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.calls = []
+
+    async def get_trade_dates(self, start, end):
+        self.calls.append(("trade_cal", start, end))
+        return ["20250106", "20250107", "20250108"]
+
+    async def get_daily_by_trade_date(self, trade_date):
+        self.calls.append(("daily", trade_date))
+        rows = [("000001.SZ", 10.0), ("600000.SH", 8.0), ("830001.BJ", 5.0)]
+        bump = int(trade_date[-1])
+        return pd.DataFrame({
+            "ts_code": [r[0] for r in rows], "trade_date": trade_date,
+            "open": [r[1] for r in rows], "high": [r[1] + 1 for r in rows], "low": [r[1] - 1 for r in rows],
+            "close": [r[1] + bump for r in rows], "pre_close": [r[1] + bump - 1 for r in rows],
+            "change": 1.0, "pct_chg": 0.0, "vol": 1000.0, "amount": 2000.0,
+        })
+
+    async def get_adj_factor_by_trade_date(self, trade_date):
+        self.calls.append(("adj_factor", trade_date))
+        # 600000 在 01-08 除权：因子翻倍
+        factor_600000 = 2.0 if trade_date == "20250108" else 1.0
+        return pd.DataFrame({"ts_code": ["000001.SZ", "600000.SH"], "trade_date": trade_date,
+                             "adj_factor": [1.0, factor_600000]})
+
+    standardize_market_daily = staticmethod(TushareProvider.standardize_market_daily)
+
+
+class _FakeLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+
+    def get_stats(self):
+        return {"current_calls": 0, "max_calls": 0, "total_waits": 0, "total_wait_time": 0.0}
+
+
+def _make_service(existing_docs):
+    service = TushareSyncService.__new__(TushareSyncService)
+    service.provider = _FakeProvider()
+    service.rate_limiter = _FakeLimiter()
+    service.historical_service = HistoricalDataService()
+    service.historical_service.collection = _FakeQuotes(existing_docs)
+    service.date_major_sync = True
+    service.date_major_lookback_days = 30
+    service.date_major_min_coverage = 0.9
+    return service
+
+
+def test_incremental_sync_fetches_missing_trade_dates_for_whole_market():
+    existing = [{"symbol": s, "trade_date": "2025-01-06"} for s in ("000001", "600000")]
+    service = _make_service(existing)
+    stats = {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+
+    remaining = asyncio.run(service._sync_daily_by_trade_date(
+        ["000001", "600000", "300750"], None, "2025-01-08", stats))
+
+    # 01-06 已覆盖，只按交易日从新到旧请求 01-08、01-07：每天 daily + adj_factor 两次
+    assert [c for c in service.provider.calls if c[0] != "trade_cal"] == [
+        ("daily", "20250108"), ("adj_factor", "20250108"), ("daily", "20250107"), ("adj_factor", "20250107")]
+    assert service.rate_limiter.acquired == 5
+    # 每个交易日获取后立即写入
+    assert service.historical_service.collection.bulk_calls == 2
+    assert stats["total_records"] == 4 and stats["success_count"] == 2
+    # 从未同步过的股票交给逐只同步；不在股票列表中的北交所代码不写入
+    assert remaining == ["300750"]
+
+    docs = service.historical_service.collection.docs
+    assert ("830001", "2025-01-07") not in docs
+    doc = docs[("000001", "2025-01-08")]
+    assert doc["full_symbol"] == "000001.SZ" and doc["close"] == 18.0
+    assert doc["volume"] == 100000.0 and doc["amount"] == 2000000.0
+    assert doc["change"] == 1.0 and doc["pct_chg"] == round(1 / 17 * 100, 4)
+    # 前复权以区间内最新因子为基准：除权前一天价格减半
+    assert docs[("600000", "2025-01-07")]["close"] == 7.5
+    assert docs[("600000", "2025-01-08")]["full_symbol"] == "600000.SH"
+    assert docs[("600000", "2025-01-08")]["close"] == 16.0
+
+
+def test_no_local_history_falls_back_to_per_symbol_sync():
+    service = _make_service([])
+    stats = {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+    assert asyncio.run(service._sync_daily_by_trade_date(["000001"], None, "2025-01-08", stats)) is None
+    assert service.provider.calls == []
+
+
+def test_trade_date_and_per_symbol_stages_share_one_progress_scale(monkeypatch):
+    existing = [{"symbol": s, "trade_date": "2025-01-06"} for s in ("000001", "600000")]
+    service = _make_service(existing)
+    progress = []
+
+    async def record(job_id, percent, message):
+        progress.append(percent)
+
+    async def no_stop(job_id):
+        return False
+
+    monkeypatch.setattr(service, "_update_progress", record)
+    monkeypatch.setattr(service, "_should_stop", no_stop)
+    stats = {"success_count": 0, "error_count": 0, "total_records": 0, "errors": []}
+    remaining = asyncio.run(service._sync_daily_by_trade_date(
+        ["000001", "600000", "300750"], None, "2025-01-08", stats, job_id="job"))
+
+    # 2 个交易日 × 2 次请求 + 1 只逐只同步的股票：交易日阶段占 80%
+    assert progress == [40, 80]
+    start = int(service._trade_date_stage_share(stats["trade_date_count"], len(remaining)) * 100)
+    asyncio.run(service._report_historical_progress("job", "日线", 1, 1, "300750", start=start))
+    assert progress[-1] == 100
@@ -20,12 +20,12 @@ from app.services.queue_service import QueueService, get_queue_service as real_g
 
 # ---------- Helpers / Fakes ----------
 class FakePubSub:
-    async def subscribe(self, channel: str):
+    async def psubscribe(self, pattern: str):
         return None
-    async def get_message(self, ignore_subscribe_messages: bool = True):
+    async def get_message(self, ignore_subscribe_messages: bool = True, timeout: float = 0.0):
         await asyncio.sleep(0.01)
         return None
-    async def unsubscribe(self, *channels):
+    async def punsubscribe(self, *patterns):
         return None
     async def close(self):
         return None
@@ -60,8 +60,9 @@ def make_test_app(fake_queue_service: QueueService):
 # ---------- Tests: SSE ----------
 
 def test_sse_task_connected_event(monkeypatch):
-    # Monkeypatch Redis client inside module to our fake
-    monkeypatch.setattr(sse_router_mod, "get_redis_client", lambda: FakeRedis())
+    # Route the shared progress hub to our fake Redis
+    from app.services.progress.pubsub_hub import ProgressHub
+    monkeypatch.setattr(sse_router_mod, "get_progress_hub", lambda: ProgressHub(redis_factory=FakeRedis))
 
     app = make_test_app(FakeQueueService())
     client = TestClient(app)
@@ -77,8 +78,9 @@ def test_sse_task_connected_event(monkeypatch):
 
 
 def test_sse_batch_connected_event(monkeypatch):
-    # Monkeypatch Redis client inside module to our fake
-    monkeypatch.setattr(sse_router_mod, "get_redis_client", lambda: FakeRedis())
+    # Route the shared progress hub to our fake Redis
+    from app.services.progress.pubsub_hub import ProgressHub
+    monkeypatch.setattr(sse_router_mod, "get_progress_hub", lambda: ProgressHub(redis_factory=FakeRedis))
     # Also patch queue_service.get_redis_client because batch generator constructs
     # a QueueService via get_queue_service() inside the generator
     import app.services.queue_service as qsvc_mod
@@ -0,0 +1,151 @@
+import pandas as pd
+
+from tradingagents.dataflows.cache.mongodb_cache_adapter import MongoDBCacheAdapter
+from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+from tradingagents.dataflows.providers.china.tushare import TushareProvider
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return [d for d in self.docs if d["symbol"] in query["symbol"]["$in"]
+                and d["data_source"] in query["data_source"]["$in"]]
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.stock_daily_quotes = FakeCollection(docs)
+
+
+def _quote(symbol, day, source, close):
+    return {"symbol": symbol, "code": symbol, "trade_date": day, "data_source": source, "period": "daily",
+            "open": close, "high": close, "low": close, "close": close, "volume": 100, "amount": 1000}
+
+
+def _mongo_adapter(docs):
+    adapter = MongoDBCacheAdapter.__new__(MongoDBCacheAdapter)
+    adapter.use_app_cache = True
+    adapter.db = FakeDB(docs)
+    adapter._get_data_source_priority = lambda symbol: ["tushare", "akshare", "baostock"]
+    return adapter
+
+
+def test_mongo_bulk_uses_one_query_and_best_source_per_symbol():
+    adapter = _mongo_adapter([
+        _quote("000001", "2024-01-03", "akshare", 9.0),
+        _quote("000001", "2024-01-02", "tushare", 10.0),
+        _quote("000001", "2024-01-03", "tushare", 11.0),
+        _quote("600000", "2024-01-02", "baostock", 7.0),
+    ])
+
+    result = adapter.get_historical_data_bulk(["000001", "600000", "300750"], "2024-01-01", "2024-01-31")
+
+    assert len(adapter.db.stock_daily_quotes.queries) == 1
+    assert adapter.db.stock_daily_quotes.queries[0]["trade_date"] == {"$gte": "2024-01-01", "$lte": "2024-01-31"}
+    assert set(result) == {"000001", "600000"}
+    assert result["000001"]["close"].tolist() == [10.0, 11.0]
+    assert result["600000"]["data_source"].tolist() == ["baostock"]
+
+
+class FakeProvider:
+    def __init__(self, data):
+        self.data = data
+        self.requested = []
+
+    async def get_historical_data_batch(self, symbols, start_date, end_date=None, period="daily"):
+        self.requested.append(list(symbols))
+        return {s: self.data[s] for s in symbols if s in self.data}
+
+    async def get_historical_data(self, symbol, start_date, end_date=None, period="daily"):
+        self.requested.append(symbol)
+        return self.data.get(symbol)
+
+
+def _manager(mongo, tushare, akshare, baostock):
+    manager = DataSourceManager.__new__(DataSourceManager)
+    manager.use_mongodb_cache = True
+    manager.available_sources = [ChinaDataSource.TUSHARE, ChinaDataSource.AKSHARE, ChinaDataSource.BAOSTOCK]
+    manager._get_data_source_priority_order = lambda symbol=None: list(manager.available_sources)
+    manager._get_mongodb_adapter = lambda: mongo
+    manager._get_tushare_adapter = lambda: tushare
+    manager._get_akshare_adapter = lambda: akshare
+    manager._get_baostock_adapter = lambda: baostock
+    return manager
+
+
+def test_get_stock_dataframes_only_falls_through_for_missing_symbols():
+    mongo = _mongo_adapter([_quote("000001", "2024-01-02", "tushare", 10.0)])
+    ts_df = pd.DataFrame({"ts_code": ["600000.SH"], "open": [7.0], "high": [7.0], "low": [7.0], "close": [7.0],
+                          "volume": [1.0], "amount": [1.0]},
+                         index=pd.DatetimeIndex(["2024-01-02"], name="date"))
+    ak_df = pd.DataFrame({"date": ["2024-01-02"], "code": ["300750"], "open": [5.0], "high": [5.0],
+                          "low": [5.0], "close": [5.0], "volume": [1.0], "amount": [1.0]})
+    tushare = FakeProvider({"600000": ts_df})
+    akshare = FakeProvider({"300750": ak_df})
+    baostock = FakeProvider({})
+
+    manager = _manager(mongo, tushare, akshare, baostock)
+    frames = manager.get_stock_dataframes(["000001", "600000", "300750", "688981"], "2024-01-01", "2024-01-31")
+
+    assert tushare.requested == [["600000", "300750", "688981"]]
+    assert sorted(akshare.requested) == ["300750", "688981"]
+    assert baostock.requested == ["688981"]
+    assert set(frames) == {"000001", "600000", "300750"}
+    for code, df in frames.items():
+        assert {"date", "open", "close", "vol", "code"} <= set(df.columns)
+        assert df["code"].tolist() == [code]
+
+    long = manager.get_stock_dataframes(["000001", "600000"], "2024-01-01", "2024-01-31", as_frame=True)
+    assert sorted(long["code"]) == ["000001", "600000"]
+
+
+def test_tushare_qfq_matches_pro_bar_convention():
+    bars = pd.DataFrame({"ts_code": ["000001.SZ"] * 2, "trade_date": ["20240102", "20240103"],
+                         "open": [10.0, 10.0], "high": [10.0, 10.0], "low": [10.0, 10.0],
+                         "close": [10.0, 10.0], "pre_close": [10.0, 10.0]})
+    factors = pd.DataFrame({"ts_code": ["000001.SZ"] * 2, "trade_date": ["20240102", "20240103"],
+                            "adj_factor": [1.0, 2.0]})
+
+    adjusted = TushareProvider._apply_qfq(bars, factors)
+
+    assert adjusted["close"].tolist() == [5.0, 10.0]
+    assert "adj_factor" not in adjusted.columns
+
+
+def test_tushare_batch_fetch_goes_through_rate_limiter(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    from tradingagents.dataflows.providers.china import tushare as tushare_module
+
+    class CountingLimiter:
+        calls = 0
+
+        async def acquire(self):
+            self.calls += 1
+
+    bars = pd.DataFrame({"ts_code": ["000001.SZ", "600000.SH"], "trade_date": ["20240131"] * 2,
+                         "open": [10.0, 7.0], "high": [10.0, 7.0], "low": [10.0, 7.0], "close": [10.0, 7.0],
+                         "pre_close": [10.0, 7.0], "vol": [1.0, 1.0], "amount": [1.0, 1.0]})
+    factors = bars[["ts_code", "trade_date"]].assign(adj_factor=1.0)
+    provider = TushareProvider.__new__(TushareProvider)
+    provider.logger = tushare_module.logger
+    provider.connected = True
+
+    def fetch(**kwargs):
+        return bars
+
+    provider.api = SimpleNamespace(daily=fetch, weekly=fetch, monthly=fetch, adj_factor=lambda **kw: factors)
+    provider._rate_limiter = CountingLimiter()
+    monkeypatch.setattr(tushare_module, "TUSHARE_AVAILABLE", True)
+
+    frames = asyncio.run(provider.get_historical_data_batch(["000001", "600000"], "20240101", "20241231",
+                                                            period="monthly"))
+
+    assert set(frames) == {"000001", "600000"}
+    # 一个分块：行情与复权因子各一次许可
+    assert provider._rate_limiter.calls == 2
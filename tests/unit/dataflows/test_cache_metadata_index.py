@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from tradingagents.dataflows.cache.file_cache import StockDataCache
+from tradingagents.dataflows.cache.memory_cache import MemoryLRUCache
+
+
+def _cache(path):
+    cache = StockDataCache(cache_dir=str(path))
+    cache.memory_cache = MemoryLRUCache(max_bytes=0)  # 关闭 L1，只验证索引
+    return cache
+
+
+def _no_glob(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("不应遍历 metadata 目录")
+    monkeypatch.setattr(Path, "glob", fail)
+
+
+def test_lookups_clear_and_stats_use_index(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    frame = pd.DataFrame({"close": [1.0, 2.0]})
+    wide = cache.save_stock_data("000001", frame, "2024-01-01", "2024-12-31", "tushare")
+    cache.save_stock_data("000001", frame, "2024-06-01", "2024-06-30", "tushare")
+    cache.save_stock_data("600000", frame, "2024-01-01", "2024-12-31", "tushare")
+    fund = cache.save_fundamentals_data("000001", "基本面报告", "openai")
+
+    _no_glob(monkeypatch)
+    # 没有精确匹配时优先返回覆盖请求区间的条目
+    assert cache.find_cached_stock_data("000001", "2024-03-01", "2024-03-31", "tushare") == wide
+    assert cache.find_cached_fundamentals_data("000001", "openai") == fund
+    assert cache.find_cached_stock_data("300750", "2024-03-01", "2024-03-31") is None
+
+    stats = cache.get_cache_stats()
+    assert stats["stock_data_count"] == 3 and stats["fundamentals_count"] == 1
+    assert stats["total_files"] == 4 and stats["total_size"] > 0
+
+    # 将一个条目的缓存时间改到 10 天前，只清理它
+    meta = cache._load_metadata(fund)
+    meta_cached = (datetime.now() - timedelta(days=10)).isoformat()
+    cache.metadata_index.upsert(fund, dict(meta, cached_at=meta_cached))
+    assert cache.clear_old_cache(max_age_days=7) == 1
+    assert not cache._get_metadata_path(fund).exists()
+    assert cache.find_cached_fundamentals_data("000001", "openai") is None
+    assert cache.get_cache_stats()["total_files"] == 3
+
+
+def test_index_is_rebuilt_from_existing_metadata(tmp_path):
+    cache = _cache(tmp_path)
+    key = cache.save_stock_data("000001", pd.DataFrame({"close": [1.0]}), "2024-01-01", "2024-01-31", "akshare")
+    cache.metadata_index.close()
+    (tmp_path / "metadata_index.sqlite3").unlink()
+    for suffix in ("-wal", "-shm"):
+        (tmp_path / f"metadata_index.sqlite3{suffix}").unlink(missing_ok=True)
+
+    reopened = _cache(tmp_path)
+    assert reopened.metadata_index.count() == 1
+    assert reopened.find_cached_stock_data("000001", "2024-01-05", "2024-01-20", "akshare") == key
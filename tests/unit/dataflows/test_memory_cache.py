@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+import tradingagents.dataflows.cache.memory_cache as memory_mod
+from tradingagents.dataflows.cache.file_cache import StockDataCache
+from tradingagents.dataflows.cache.memory_cache import MemoryLRUCache
+
+
+def test_lru_evicts_by_bytes_and_expires(monkeypatch):
+    cache = MemoryLRUCache(max_bytes=300, max_entry_bytes=200)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"y" * 100)
+    assert cache.get("a") == b"x" * 100  # a 变为最近使用
+    cache.put("c", b"z" * 150)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert not cache.put("big", b"w" * 250)
+
+    now = [1000.0]
+    monkeypatch.setattr(memory_mod.time, "monotonic", lambda: now[0])
+    cache.put("ttl", "v", ttl_seconds=10)
+    now[0] += 11
+    assert cache.get("ttl") is None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1 and stats["rejected"] == 1
+    assert stats["size_bytes"] <= 300
+
+
+@pytest.fixture
+def file_cache(tmp_path):
+    cache = StockDataCache(cache_dir=str(tmp_path))
+    cache.memory_cache = MemoryLRUCache(max_bytes=10 * 1024 * 1024)
+    return cache
+
+
+def _frame(close):
+    return pd.DataFrame({"close": [close, close + 1]}, index=["2024-01-02", "2024-01-03"])
+
+
+def test_repeated_lookups_are_served_from_memory(file_cache, monkeypatch):
+    file_cache.save_stock_data("000001", _frame(10.0), "2024-01-01", "2024-01-31", "tushare")
+
+    key = file_cache.find_cached_stock_data("000001", "2024-01-01", "2024-01-31", "tushare")
+    assert key is not None
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("不应访问磁盘")
+
+    monkeypatch.setattr(file_cache.metadata_dir.__class__, "glob", no_disk)
+    monkeypatch.setattr(pd, "read_csv", no_disk)
+    for _ in range(3):
+        assert file_cache.find_cached_stock_data("000001", "2024-01-01", "2024-01-31", "tushare") == key
+        df = file_cache.load_stock_data(key)
+        assert df["close"].tolist() == [10.0, 11.0]
+        df["close"] = 0  # 调用方修改不影响缓存
+
+    assert file_cache.load_stock_data(key)["close"].tolist() == [10.0, 11.0]
+    monkeypatch.undo()
+    stats = file_cache.get_cache_stats()["memory_cache"]
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_rewrite_invalidates_memory_entry(file_cache):
+    file_cache.save_stock_data("000001", _frame(10.0), "2024-01-01", "2024-01-31", "tushare")
+    key = file_cache.find_cached_stock_data("000001", "2024-01-01", "2024-01-31", "tushare")
+
+    # 本进程重写
+    file_cache.save_stock_data("000001", _frame(20.0), "2024-01-01", "2024-01-31", "tushare")
+    key = file_cache.find_cached_stock_data("000001", "2024-01-01", "2024-01-31", "tushare")
+    assert file_cache.load_stock_data(key)["close"].tolist() == [20.0, 21.0]
+
+    # 其它进程重写（元数据文件 mtime 变化）
+    _frame(30.0).to_csv(file_cache._load_metadata(key)["file_path"])
+    meta_path = file_cache._get_metadata_path(key)
+    st = os.stat(meta_path)
+    os.utime(meta_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    key = file_cache.find_cached_stock_data("000001", "2024-01-01", "2024-01-31", "tushare")
+    assert file_cache.load_stock_data(key)["close"].tolist() == [30.0, 31.0]
+    assert file_cache.memory_cache.stats()["invalidations"] >= 2
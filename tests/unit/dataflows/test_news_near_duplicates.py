@@ -0,0 +1,99 @@
+import random
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from tradingagents.dataflows.news.near_duplicates import cluster_near_duplicates
+from tradingagents.dataflows.news.realtime_news import NewsItem, RealtimeNewsAggregator
+
+
+def test_reworded_headlines_cluster_together():
+    titles = [
+        "贵州茅台2024年净利润同比增长15%，超市场预期",
+        "贵州茅台：2024年净利润同比增长15% 超出市场预期",
+        "【快讯】贵州茅台2024年净利润同比增长15%，超市场预期",
+        "宁德时代发布新一代钠离子电池",
+        "Apple reports record quarterly revenue driven by iPhone sales",
+        "Apple Reports Record Quarterly Revenue, Driven By iPhone Sales",
+    ]
+    assert cluster_near_duplicates(titles) == [[0, 1, 2], [3], [4, 5]]
+
+
+def test_aggregator_keeps_best_representative_with_coverage():
+    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+
+    def item(title, content, score, urgency="low"):
+        return NewsItem(title=title, content=content, source="s", publish_time=now, url="",
+                        urgency=urgency, relevance_score=score)
+
+    news = [
+        item("贵州茅台2024年净利润同比增长15%，超市场预期", "", 0.6),
+        item("贵州茅台：2024年净利润同比增长15% 超出市场预期", "公司公告显示全年净利润同比增长15%", 0.8),
+        item("宁德时代发布新一代钠离子电池", "", 0.5),
+        item("【快讯】贵州茅台2024年净利润同比增长15%，超市场预期", "", 0.8, urgency="high"),
+    ]
+    result = RealtimeNewsAggregator()._deduplicate_news(news)
+
+    assert [n.title for n in result] == [news[3].title, news[2].title]
+    assert [n.coverage for n in result] == [3, 1]
+    assert "3家媒体报道" in RealtimeNewsAggregator._coverage_note(result[0])
+
+
+def test_clustering_scales_linearly():
+    rng = random.Random(7)
+
+    def titles(count):
+        # 每 3 条共用一个随机事件标题，后两条加上不同转载前缀
+        events = ["".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(16)) for _ in range(count // 3)]
+        return [("", "【快讯】", "财经网：")[i % 3] + events[i // 3] for i in range(count)]
+
+    started = time.perf_counter()
+    clusters = cluster_near_duplicates(titles(600))
+    small = time.perf_counter() - started
+    started = time.perf_counter()
+    cluster_near_duplicates(titles(2400))
+    large = time.perf_counter() - started
+
+    assert len(clusters) == 200
+    # 4 倍数据量耗时应远小于成对比较的 16 倍
+    assert large < small * 8
+
+
+def test_inserted_function_words_still_match_titles():
+    titles = [
+        "Apple unveils new iPhone at September event",
+        "Apple unveils the new iPhone at its September event",
+        "Apple unveils new iPad at October event",
+    ]
+    assert cluster_near_duplicates(titles) == [[0, 1], [2]]
+
+
+def test_representative_ties_go_to_higher_priority_source():
+    now = datetime.now(ZoneInfo("Asia/Shanghai"))
+    # 合并顺序即来源优先级：FinnHub 在中文财经之前
+    news = [
+        NewsItem(title="Apple unveils new iPhone at September event", content="x" * 20, source="FinnHub",
+                 publish_time=now, url="", urgency="medium", relevance_score=0.8),
+        NewsItem(title="Apple unveils the new iPhone at its September event", content="y" * 20,
+                 source="中文财经", publish_time=now, url="", urgency="medium", relevance_score=0.8),
+    ]
+    best = RealtimeNewsAggregator._pick_cluster_representative(news)
+    assert best.source == "FinnHub" and best.coverage == 2
+
+
+def test_same_template_for_other_companies_or_events_stays_separate():
+    titles = [
+        "平安银行发布2024年第一季度报告",
+        "平安银行发布2024年半年度报告",
+        "贵州茅台关于回购股份进展的公告",
+        "贵州茅台关于股东减持股份进展的公告",
+        "招商银行发布2024年半年度报告",
+        "兴业银行发布2024年半年度报告",
+    ]
+    leads = ["", "", "", "", "招商银行上半年营收1729亿元", "兴业银行中期分红方案出炉"]
+    assert cluster_near_duplicates(titles, leads) == [[i] for i in range(6)]
+
+
+def test_groups_keep_identical_titles_of_different_symbols_apart():
+    titles = ["公司发布2024年半年度报告", "公司发布2024年半年度报告", "【快讯】公司发布2024年半年度报告"]
+    assert cluster_near_duplicates(titles, groups=["000001", "600036", "000001"]) == [[0, 2], [1]]
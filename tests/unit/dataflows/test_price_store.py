@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from tradingagents.dataflows.cache.price_store import ColumnarPriceStore
+
+
+def _bars(dates, start_close=10.0):
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": np.arange(len(dates), dtype=float) + start_close,
+        "Close": np.arange(len(dates), dtype=float) + start_close + 0.5,
+        "Volume": np.arange(len(dates), dtype=np.int64) * 100,
+    })
+
+
+def test_import_csv_and_memmap_views(tmp_path):
+    csv_path = tmp_path / "AAPL-YFin-data.csv"
+    _bars(["2025-01-02 00:00:00-05:00", "2025-01-03 00:00:00-05:00", "2025-01-06 00:00:00-05:00"]).to_csv(
+        csv_path, index=False)
+    store = ColumnarPriceStore(tmp_path / "columnar")
+
+    assert store.import_csv(csv_path, "AAPL") == 3
+    assert store.is_fresh_for("AAPL", csv_path)
+
+    columns = store.read_columns("AAPL")
+    assert isinstance(columns["Close"], np.memmap)
+    assert not columns["Close"].flags.writeable
+    assert columns["Date"].dtype == np.dtype("datetime64[D]")
+    assert columns["Volume"].dtype == np.int64
+
+    frame = store.read_frame("AAPL")
+    assert frame["Date"].tolist() == ["2025-01-02", "2025-01-03", "2025-01-06"]
+    assert frame["Close"].tolist() == [10.5, 11.5, 12.5]
+    frame.loc[0, "Close"] = -1  # 返回的是副本
+    assert store.read_columns("AAPL")["Close"][0] == 10.5
+
+
+def test_append_only_adds_newer_bars(tmp_path):
+    store = ColumnarPriceStore(tmp_path)
+    store.write("MSFT", _bars(["2025-01-02", "2025-01-03"]), updated="2025-01-04")
+
+    appended = store.append("MSFT", _bars(["2025-01-03", "2025-01-06", "2025-01-07"], start_close=20.0),
+                            updated="2025-01-08")
+    assert appended == 2
+    meta = store.meta("MSFT")
+    assert meta["rows"] == 4
+    assert meta["last_date"] == "2025-01-07"
+    assert meta["updated"] == "2025-01-08"
+    frame = store.read_frame("MSFT")
+    assert frame["Date"].tolist() == ["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"]
+    assert frame["Close"].tolist() == [10.5, 11.5, 21.5, 22.5]
+
+    # 中断的追加留下的尾部数据会在下次追加时截掉
+    with open(store.symbol_dir("MSFT") / "c2.bin", "ab") as f:
+        f.write(b"\x00" * 16)
+    assert store.append("MSFT", _bars(["2025-01-08"], start_close=30.0)) == 1
+    assert store.read_frame("MSFT")["Close"].tolist()[-2:] == [22.5, 30.5]
+
+    # 没有新 K 线时只更新 updated
+    assert store.append("MSFT", _bars(["2025-01-08"]), updated="2025-01-09") == 0
+    assert store.meta("MSFT")["updated"] == "2025-01-09"
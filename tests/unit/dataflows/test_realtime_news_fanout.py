@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from tradingagents.dataflows.news.realtime_news import NewsItem, RealtimeNewsAggregator
+
+
+def _item(title, source, minutes_ago):
+    return NewsItem(title=title, content="", source=source,
+                    publish_time=datetime.now(ZoneInfo("Asia/Shanghai")) - timedelta(minutes=minutes_ago),
+                    url="", urgency="low", relevance_score=0.5)
+
+
+def _aggregator(delays, fail=()):
+    aggregator = RealtimeNewsAggregator()
+    aggregator.newsapi_key = "key"
+    aggregator.source_timeout = 0.3
+    aggregator.total_timeout = 0.5
+
+    def make(name, minutes_ago):
+        def fetch(ticker, hours_back):
+            time.sleep(delays[name])
+            if name in fail:
+                raise RuntimeError("boom")
+            return [_item(f"{name} headline", name, minutes_ago)]
+        return fetch
+
+    aggregator._get_finnhub_realtime_news = make("finnhub", 1)
+    aggregator._get_alpha_vantage_news = make("alpha", 2)
+    aggregator._get_newsapi_news = make("newsapi", 3)
+    aggregator._get_chinese_finance_news = make("chinese", 4)
+    return aggregator
+
+
+def test_sources_run_concurrently():
+    aggregator = _aggregator({"finnhub": 0.2, "alpha": 0.2, "newsapi": 0.2, "chinese": 0.2})
+    started = time.monotonic()
+    news = aggregator.get_realtime_stock_news("AAPL", max_news=10)
+    assert time.monotonic() - started < 0.45
+    assert [n.source for n in news] == ["finnhub", "alpha", "newsapi", "chinese"]
+    assert [s["status"] for s in aggregator.last_metrics["sources"]] == ["ok"] * 4
+
+
+def test_slow_and_failing_sources_return_partial_results():
+    aggregator = _aggregator({"finnhub": 0.0, "alpha": 2.0, "newsapi": 0.0, "chinese": 0.05}, fail=("newsapi",))
+    started = time.monotonic()
+    news = aggregator.get_realtime_stock_news("AAPL")
+    assert time.monotonic() - started < 0.6
+    assert {n.source for n in news} == {"finnhub", "chinese"}
+
+    metrics = {s["source"]: s for s in aggregator.last_metrics["sources"]}
+    assert metrics["Alpha Vantage"]["status"] == "timeout"
+    assert metrics["NewsAPI"]["status"] == "error" and metrics["NewsAPI"]["error"] == "boom"
+    assert metrics["FinnHub"]["count"] == 1
+    assert aggregator.last_metrics["timed_out"] == ["Alpha Vantage"]
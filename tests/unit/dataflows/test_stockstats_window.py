@@ -0,0 +1,43 @@
+import pandas as pd
+
+import tradingagents.dataflows.interface as interface
+
+
+class FakeStockstatsUtils:
+    calls = []
+
+    @staticmethod
+    def get_stock_stats_window(symbol, indicators, start_date, end_date, data_dir, online=False):
+        FakeStockstatsUtils.calls.append((symbol, tuple(indicators), start_date, end_date, online))
+        frame = pd.DataFrame(
+            {"rsi": [40.0, 45.5, 50.25]},
+            index=["2025-01-02", "2025-01-03", "2025-01-06"],
+        )
+        return frame[(frame.index >= start_date) & (frame.index <= end_date)]
+
+    @staticmethod
+    def get_stock_stats(*args, **kwargs):
+        raise AssertionError("窗口函数不应再逐日调用 get_stock_stats")
+
+
+def test_window_computes_indicator_once(monkeypatch):
+    FakeStockstatsUtils.calls = []
+    monkeypatch.setattr(interface, "StockstatsUtils", FakeStockstatsUtils, raising=False)
+
+    offline = interface.get_stock_stats_indicators_window("AAPL", "rsi", "2025-01-06", 5, False)
+    lines = [l for l in offline.splitlines() if l.startswith("2025-")]
+    assert lines == ["2025-01-06: 50.25", "2025-01-03: 45.5", "2025-01-02: 40.0"]
+
+    online = interface.get_stock_stats_indicators_window("AAPL", "rsi", "2025-01-06", 3, True)
+    lines = [l for l in online.splitlines() if l.startswith("2025-")]
+    assert lines == [
+        "2025-01-06: 50.25",
+        "2025-01-05: N/A: Not a trading day (weekend or holiday)",
+        "2025-01-04: N/A: Not a trading day (weekend or holiday)",
+        "2025-01-03: 45.5",
+    ]
+
+    assert FakeStockstatsUtils.calls == [
+        ("AAPL", ("rsi",), "2025-01-01", "2025-01-06", False),
+        ("AAPL", ("rsi",), "2025-01-03", "2025-01-06", True),
+    ]
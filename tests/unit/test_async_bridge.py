@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from tradingagents.utils.async_bridge import AsyncBridge
+
+
+@pytest.fixture
+def bridge():
+    b = AsyncBridge("test-bridge")
+    yield b
+    b.shutdown()
+
+
+def test_calls_reuse_one_background_loop(bridge):
+    async def where():
+        return id(asyncio.get_running_loop()), threading.current_thread().name
+
+    first = bridge.run(where())
+    second = bridge.run(where())
+
+    assert first == second
+    assert first[1] == "test-bridge"
+    stats = bridge.stats()
+    assert stats["calls"] == 2 and stats["from_sync"] == 2
+    assert stats["loop_starts"] == 1 and stats["in_flight"] == 0
+
+
+def test_can_be_called_from_inside_a_running_loop(bridge):
+    async def add(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    async def caller():
+        # 同步代码（如 LangGraph 工具）在事件循环线程中被调用
+        return bridge.run(add(1, 2))
+
+    assert asyncio.run(caller()) == 3
+    assert bridge.stats()["from_running_loop"] == 1
+
+
+def test_timeout_cancels_the_coroutine(bridge):
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        bridge.run(slow(), timeout=0.05)
+
+    assert cancelled.wait(1)
+    assert bridge.stats()["timeouts"] == 1
+
+
+def test_errors_propagate_and_nested_calls_do_not_deadlock(bridge):
+    async def boom():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        bridge.run(boom())
+
+    async def inner():
+        return "inner"
+
+    async def outer():
+        # 协程内部再次同步桥接（例如 provider 调用了同步工具函数）
+        return bridge.run(inner())
+
+    assert bridge.run(outer(), timeout=5) == "inner"
+    stats = bridge.stats()
+    assert stats["errors"] == 1 and stats["nested"] == 1
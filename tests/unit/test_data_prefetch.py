@@ -0,0 +1,110 @@
+import contextvars
+import threading
+import time
+from types import SimpleNamespace
+
+from tradingagents.agents.utils.data_prefetch import (
+    TaskPrefetch,
+    build_prefetch_plan,
+    lookup_prefetched,
+    prefetchable,
+)
+
+
+def make_tool(calls, delay=0.0, fail=False):
+    @prefetchable("get_stock_market_data_unified")
+    def get_stock_market_data_unified(ticker, start_date, end_date):
+        calls.append((ticker, start_date, end_date, threading.current_thread().name))
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("network down")
+        return f"data {ticker} {end_date}"
+
+    return get_stock_market_data_unified
+
+
+def test_tool_waits_for_inflight_prefetch_instead_of_refetching():
+    calls = []
+    tool = make_tool(calls, delay=0.3)
+    prefetch = TaskPrefetch("task-1").start([
+        ("get_stock_market_data_unified", tool, {"ticker": "000001", "start_date": "2025-01-10",
+                                                 "end_date": "2025-01-10"}),
+    ])
+    token = prefetch.activate()
+    try:
+        started = time.time()
+        # 参数顺序/空白不同也命中同一个预取结果
+        assert tool(" 000001", end_date="2025-01-10", start_date="2025-01-10") == "data 000001 2025-01-10"
+        assert time.time() - started < 0.5
+        assert len(calls) == 1 and calls[0][3].startswith("prefetch")
+        assert prefetch.stats() == {"planned": 1, "hits": 1, "waits": 1, "failures": 0}
+
+        # 参数不一致时实时获取
+        assert tool("000001", "2025-01-01", "2025-01-09") == "data 000001 2025-01-09"
+        assert len(calls) == 2
+    finally:
+        prefetch.close(token)
+
+    # 任务结束后不再命中
+    assert lookup_prefetched("get_stock_market_data_unified",
+                             {"ticker": "000001", "start_date": "2025-01-10", "end_date": "2025-01-10"}) is None
+
+
+def test_failed_prefetch_falls_back_to_live_call():
+    calls = []
+    failing = make_tool(calls, fail=True)
+    prefetch = TaskPrefetch("task-2").start([
+        ("get_stock_market_data_unified", failing, {"ticker": "AAPL", "start_date": "2025-01-10",
+                                                    "end_date": "2025-01-10"}),
+    ])
+    token = prefetch.activate()
+    try:
+        live = make_tool(calls)
+        assert live("AAPL", "2025-01-10", "2025-01-10") == "data AAPL 2025-01-10"
+        assert prefetch.stats()["failures"] == 1
+        assert len(calls) == 2
+    finally:
+        prefetch.close(token)
+
+
+def test_lookup_is_scoped_to_the_current_task():
+    calls = []
+    tool = make_tool(calls)
+    arguments = {"ticker": "000001", "start_date": "2025-01-10", "end_date": "2025-01-10"}
+    other = TaskPrefetch("task-other").start([("get_stock_market_data_unified", tool, arguments)])
+    mine = TaskPrefetch("task-mine").start([])
+    try:
+        other.result(next(iter(other._futures)))
+        calls.clear()
+
+        # 未标记当前任务、或当前任务没有该预取时，不命中其他任务的结果
+        assert lookup_prefetched("get_stock_market_data_unified", arguments) is None
+        token = mine.activate()
+        try:
+            assert tool("000001", "2025-01-10", "2025-01-10") == "data 000001 2025-01-10"
+            assert len(calls) == 1
+        finally:
+            mine.close(token)
+
+        # 工具在复制的上下文（如 LangGraph 的工具线程）中执行时同样按任务查找
+        token = other.activate()
+        try:
+            context = contextvars.copy_context()
+            assert context.run(lookup_prefetched, "get_stock_market_data_unified", arguments) == \
+                "data 000001 2025-01-10"
+        finally:
+            other.close(token)
+    finally:
+        other.close()
+
+
+def test_plan_matches_analyst_tool_arguments():
+    toolkit = SimpleNamespace(**{name: SimpleNamespace(func=name) for name in (
+        "get_stock_market_data_unified", "get_stock_fundamentals_unified", "get_stock_sentiment_unified")})
+    plan = build_prefetch_plan(["market", "fundamentals", "social"], "600519", "2025-03-12", toolkit)
+    assert [(name, args) for name, _, args in plan] == [
+        ("get_stock_market_data_unified", {"ticker": "600519", "start_date": "2025-03-12", "end_date": "2025-03-12"}),
+        ("get_stock_fundamentals_unified", {"ticker": "600519", "start_date": "2025-03-02", "end_date": "2025-03-12",
+                                            "curr_date": "2025-03-12"}),
+        ("get_stock_sentiment_unified", {"ticker": "600519", "curr_date": "2025-03-12"}),
+    ]
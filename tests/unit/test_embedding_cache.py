@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        inputs = [input] if isinstance(input, str) else list(input)
+        self.calls.append(inputs)
+        data = [SimpleNamespace(index=i, embedding=[float(len(t)), 1.0, 0.5]) for i, t in enumerate(inputs)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def make_memory(cache):
+    memory = FinancialSituationMemory.__new__(FinancialSituationMemory)
+    memory.llm_provider = "openai"
+    memory.embedding = "text-embedding-3-small"
+    memory.client = SimpleNamespace(base_url="http://fake/v1", embeddings=FakeEmbeddingsAPI())
+    memory.max_embedding_length = 50000
+    memory.enable_embedding_length_check = True
+    memory.fallback_available = False
+    memory.embedding_cache = cache
+    return memory
+
+
+def test_batched_requests_and_shared_cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / "emb.sqlite3")
+    bull, bear = make_memory(cache), make_memory(cache)
+
+    texts = ["situation A", "situation BB", "situation A", "", "situation CCC"]
+    vectors = bull.get_embeddings(texts)
+    assert bull.client.embeddings.calls == [["situation A", "situation BB", "situation CCC"]]
+    assert vectors[0] == vectors[2] == [11.0, 1.0, 0.5]
+    assert vectors[3] == [0.0] * 1024
+
+    # 另一个记忆库嵌入相同文本：完全命中缓存
+    assert bear.get_embeddings(["situation BB", "situation A"])[0] == [12.0, 1.0, 0.5]
+    assert bear.get_embedding("situation CCC") == [13.0, 1.0, 0.5]
+    assert bear.client.embeddings.calls == []
+    assert bear.get_last_text_info()["cache_hit"] is True
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 3
+    assert stats["hit_rate"] == 0.5
+
+
+def test_disk_cache_survives_restart_and_batch_limit(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BATCH_SIZE", "2")
+    memory = make_memory(EmbeddingCache(tmp_path / "emb.sqlite3"))
+    memory.get_embeddings(["a", "bb", "ccc"])
+    assert memory.client.embeddings.calls == [["a", "bb"], ["ccc"]]
+
+    restarted = make_memory(EmbeddingCache(tmp_path / "emb.sqlite3", memory_entries=0))
+    assert restarted.get_embeddings(["ccc", "a"]) == [[3.0, 1.0, 0.5], [1.0, 1.0, 0.5]]
+    assert restarted.client.embeddings.calls == []
+    assert restarted.embedding_cache.stats()["disk_hits"] == 2
+
+    # 不同服务端点的同名模型不共用缓存
+    other = make_memory(restarted.embedding_cache)
+    other.client.base_url = "http://other/v1"
+    other.get_embedding("a")
+    assert other.client.embeddings.calls == [["a"]]
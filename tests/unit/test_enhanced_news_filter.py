@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from tradingagents.agents.utils.embedding_cache import EmbeddingCache
+from tradingagents.utils import enhanced_news_filter as module
+from tradingagents.utils.enhanced_news_filter import EnhancedNewsFilter
+
+
+class FakeSentenceModel:
+    """按关键词生成向量的句向量模型替身"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(texts))
+        return np.asarray([[float("招商银行" in t), float("600036" in t), 0.1] for t in texts])
+
+
+def make_filter(monkeypatch, tmp_path, model):
+    cache = EmbeddingCache(tmp_path / "emb.sqlite3")
+    monkeypatch.setattr(module, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(module, "_load_sentence_model", lambda name: model)
+    return EnhancedNewsFilter("600036", "招商银行", use_semantic=True)
+
+
+def test_frame_is_scored_in_one_batch(monkeypatch, tmp_path):
+    model = FakeSentenceModel()
+    news_filter = make_filter(monkeypatch, tmp_path, model)
+    news = pd.DataFrame({
+        "新闻标题": ["招商银行发布三季度业绩报告", "银行ETF指数多只成分股上涨", "招商银行发布三季度业绩报告"],
+        "新闻内容": ["净利润同比增长8%", "板块今日表现强势", "净利润同比增长8%"],
+    })
+
+    result = news_filter.filter_news_enhanced(news, min_score=30)
+
+    # 公司文本一次、新闻一次（重复文本只编码一次）
+    assert len(model.calls) == 2 and len(model.calls[1]) == 2
+    assert list(result["新闻标题"]) == ["招商银行发布三季度业绩报告"] * 2
+    single = news_filter.calculate_enhanced_relevance_score(news["新闻标题"][0], news["新闻内容"][0])
+    assert np.isclose(result["final_score"][0], single["final_score"])
+    assert np.isclose(result["semantic_score"][0], 100)
+
+
+def test_refiltering_for_another_ticker_reuses_cached_embeddings(monkeypatch, tmp_path):
+    model = FakeSentenceModel()
+    news = pd.DataFrame({"标题": ["招商银行与科技公司签署合作协议", "工商银行发布年报"], "内容": ["", None]})
+
+    make_filter(monkeypatch, tmp_path, model).filter_news_enhanced(news)
+    encoded_before = sum(len(call) for call in model.calls)
+
+    other = EnhancedNewsFilter("601398", "工商银行", use_semantic=True)
+    scored = other.filter_news_enhanced(news, min_score=0)
+
+    # 只有新公司的描述文本需要编码，新闻向量全部命中缓存
+    assert sum(len(call) for call in model.calls) - encoded_before == 6
+    assert all("工商银行" in t or "601398" in t for t in model.calls[-1])
+    assert len(scored) == 2
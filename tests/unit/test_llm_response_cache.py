@@ -0,0 +1,101 @@
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from tradingagents.llm_adapters.response_cache import (
+    LLM_CACHE_BYPASS_KEY,
+    LLMResponseCache,
+    attach_llm_cache,
+    bypass_llm_cache,
+)
+
+
+class CountingChatModel(FakeListChatModel):
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+def make_llm(cache, provider="dashscope", url="http://fake/v1", **kwargs):
+    llm = CountingChatModel(responses=[f"reply {i}" for i in range(10)], **kwargs)
+    return attach_llm_cache(llm, provider, url, cache)
+
+
+def messages(text="分析 000001"):
+    return [SystemMessage(content="你是市场分析师"), HumanMessage(content=text)]
+
+
+def test_identical_requests_hit_cache_and_keys_cover_params(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+    llm = make_llm(cache)
+
+    assert llm.invoke(messages()).content == "reply 0"
+    # 消息 id 不同但内容相同：命中，不再调用模型
+    assert llm.invoke(messages()).content == "reply 0"
+    assert llm.calls == 1
+
+    # 消息、绑定的工具、供应商不同时都是不同的键
+    assert llm.invoke(messages("分析 600519")).content == "reply 1"
+    tool = {"type": "function", "function": {"name": "get_price", "parameters": {"type": "object"}}}
+    assert llm.bind(tools=[tool]).invoke(messages()).content == "reply 2"
+    other = make_llm(cache, provider="deepseek")
+    assert other.invoke(messages()).content == "reply 0"
+    assert other.calls == 1
+
+    # 重启后从磁盘命中
+    restarted = make_llm(LLMResponseCache(tmp_path / "llm.sqlite3"))
+    assert restarted.invoke(messages("分析 600519")).content == "reply 1"
+    assert restarted.calls == 0
+
+
+def test_ttl_and_size_limit(tmp_path, monkeypatch):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3", ttl_seconds=60, max_bytes=10_000)
+    llm = make_llm(cache)
+    llm.invoke(messages())
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert llm.invoke(messages()).content == "reply 1"
+    assert llm.calls == 2
+
+    for i in range(30):
+        llm.responses = ["x" * 1000]
+        llm.i = 0
+        llm.invoke(messages(f"q{i}"))
+    stats = cache.stats()
+    assert stats["total_bytes"] <= 10_000
+    assert stats["evictions"] > 0
+
+
+def test_node_stats_and_bypass(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+    llm = make_llm(cache)
+
+    def analyst(state):
+        return {"messages": [llm.invoke(messages())]}
+
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("Market Analyst", analyst)
+    workflow.add_edge(START, "Market Analyst")
+    workflow.add_edge("Market Analyst", END)
+    graph = workflow.compile()
+
+    graph.invoke({"messages": []})
+    baseline = cache.node_stats()
+    graph.invoke({"messages": []})
+    graph.invoke({"messages": []}, config={"metadata": {LLM_CACHE_BYPASS_KEY: True}})
+    assert llm.calls == 2
+
+    assert cache.node_stats()["Market Analyst"] == {"hits": 1, "misses": 1, "bypassed": 1}
+    run = cache.stats(baseline=baseline)
+    assert run["nodes"] == {"Market Analyst": {"hits": 1, "misses": 0, "bypassed": 1}}
+
+    # 绕过时写回的新结果会被后续请求命中
+    assert llm.invoke(messages()).content == "reply 1"
+    with bypass_llm_cache():
+        assert llm.invoke(messages()).content == "reply 2"
+    assert llm.calls == 3
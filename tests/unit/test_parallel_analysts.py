@@ -0,0 +1,116 @@
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode
+
+import tradingagents.graph.setup as setup_mod
+from tradingagents.graph.conditional_logic import ConditionalLogic
+from tradingagents.graph.setup import ANALYST_STATE_KEYS, GraphSetup
+
+ANALYSTS = ["market", "social", "news", "fundamentals"]
+
+
+@tool
+def fake_lookup(query: str) -> str:
+    """查询假数据"""
+    return f"data for {query}"
+
+
+def fake_analyst(analyst_type, delay, seen):
+    report_key, count_key = ANALYST_STATE_KEYS[analyst_type]
+
+    def node(state):
+        tool_results = [m for m in state["messages"] if isinstance(m, ToolMessage)]
+        seen[analyst_type] = [m.tool_call_id for m in tool_results]
+        time.sleep(delay)
+        if not tool_results:
+            call = {"name": "fake_lookup", "args": {"query": analyst_type}, "id": f"call_{analyst_type}"}
+            return {"messages": [AIMessage(content="", tool_calls=[call])]}
+        report = f"{analyst_type} report " + "x" * 120
+        return {"messages": [AIMessage(content=report)], report_key: report,
+                count_key: state.get(count_key, 0) + 1}
+
+    return node
+
+
+def passthrough(key=None):
+    def node(state):
+        return {key: "done"} if key else {}
+    return node
+
+
+def build(monkeypatch, parallel, delay=0.2):
+    seen = {}
+    monkeypatch.setattr(setup_mod, "create_market_analyst", lambda *a: fake_analyst("market", delay, seen))
+    monkeypatch.setattr(setup_mod, "create_social_media_analyst", lambda *a: fake_analyst("social", delay, seen))
+    monkeypatch.setattr(setup_mod, "create_news_analyst", lambda *a: fake_analyst("news", delay, seen))
+    monkeypatch.setattr(setup_mod, "create_fundamentals_analyst", lambda *a: fake_analyst("fundamentals", delay, seen))
+    monkeypatch.setattr(setup_mod, "create_bull_researcher", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_bear_researcher", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_research_manager", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_trader", lambda *a: passthrough("trader_investment_plan"))
+    monkeypatch.setattr(setup_mod, "create_risky_debator", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_neutral_debator", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_safe_debator", lambda *a: passthrough())
+    monkeypatch.setattr(setup_mod, "create_risk_manager", lambda *a: passthrough("final_trade_decision"))
+
+    class Logic(ConditionalLogic):
+        def should_continue_debate(self, state):
+            return "Research Manager"
+
+        def should_continue_risk_analysis(self, state):
+            return "Risk Judge"
+
+    graph_setup = GraphSetup(
+        None, None, None, {a: ToolNode([fake_lookup]) for a in ANALYSTS},
+        None, None, None, None, None, Logic(), {"parallel_analysts": parallel},
+    )
+    return graph_setup, graph_setup.setup_graph(ANALYSTS), seen
+
+
+def run(graph):
+    init = {"messages": [HumanMessage(content="AAPL")], "company_of_interest": "AAPL", "trade_date": "2025-01-06"}
+    chunks = list(graph.stream(init, stream_mode="updates", config={"recursion_limit": 100}))
+    final = dict(init)
+    for chunk in chunks:
+        for update in chunk.values():
+            final.update(update or {})
+    return chunks, final
+
+
+def test_parallel_branches_join_before_research(monkeypatch):
+    graph_setup, graph, seen = build(monkeypatch, parallel=True)
+    start = time.time()
+    chunks, final = run(graph)
+    elapsed = time.time() - start
+
+    # 每个分析师两次 LLM 调用（0.2s×2），串行总计 1.6s；并行约等于最慢的一个分支
+    assert elapsed < 1.2
+    for analyst_type in ANALYSTS:
+        report_key, count_key = ANALYST_STATE_KEYS[analyst_type]
+        assert final[report_key].startswith(f"{analyst_type} report")
+        assert final[count_key] == 1
+        # 消息通道隔离：分支只看到自己的工具结果
+        assert seen[analyst_type] == [f"call_{analyst_type}"]
+
+    order = [name for chunk in chunks for name in chunk]
+    analyst_done = max(order.index(f"{a.capitalize()} Analyst") for a in ANALYSTS)
+    assert order.index("Bull Researcher") > analyst_done
+    assert final["final_trade_decision"] == "done"
+
+    timings = graph_setup.node_timer.timings()
+    assert timings["Market Analyst"] >= 0.4
+    assert "tools_news" in timings and "Risk Judge" in timings
+    # 节点耗时重叠：累计节点时间大于总耗时
+    assert sum(timings.values()) > elapsed
+
+
+def test_sequential_mode_unchanged(monkeypatch):
+    graph_setup, graph, seen = build(monkeypatch, parallel=False, delay=0.0)
+    chunks, final = run(graph)
+    order = [name for chunk in chunks for name in chunk]
+    assert order[:4] == ["Market Analyst", "tools_market", "Market Analyst", "Msg Clear Market"]
+    assert order.index("Msg Clear Fundamentals") < order.index("Bull Researcher")
+    assert all(final[ANALYST_STATE_KEYS[a][0]] for a in ANALYSTS)
+    assert "Msg Clear Social" in graph_setup.node_timer.timings()
@@ -0,0 +1,131 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+from tradingagents.config import mongodb_storage
+from tradingagents.config.mongodb_storage import BufferedUsageWriter, get_shared_usage_writer
+from tradingagents.config.usage_ledger import UsageLedger
+from tradingagents.config.usage_models import UsageRecord
+
+
+def make_record(hours_ago=0.0, provider="dashscope", cost=0.01, session_id="s1"):
+    timestamp = (datetime.now().astimezone() - timedelta(hours=hours_ago)).isoformat()
+    return UsageRecord(timestamp=timestamp, provider=provider, model_name="qwen-turbo", input_tokens=100,
+                       output_tokens=50, cost=cost, session_id=session_id)
+
+
+def record_lines(path):
+    """账本文件中的记录行（去掉首行代号头部）"""
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert "_ledger" in json.loads(lines[0])
+    return lines[1:]
+
+
+def test_appends_lines_and_aggregates_incrementally(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl")
+    ledger.append(make_record(hours_ago=24 * 40))
+    ledger.append(make_record(hours_ago=30, provider="openai", cost=0.5, session_id="s2"))
+    ledger.append(make_record(hours_ago=1))
+    ledger.append(make_record())
+
+    assert len(record_lines(tmp_path / "usage.jsonl")) == 4
+    today = ledger.statistics(days=1)
+    assert today["total_requests"] == 2 and round(today["total_cost"], 4) == 0.02
+    month = ledger.statistics(days=30)
+    assert month["provider_stats"]["openai"]["requests"] == 1
+    assert month["total_input_tokens"] == 300
+    assert round(ledger.session_cost("s1"), 4) == 0.03
+
+    # 另一个进程的账本实例通过偏移增量看到新追加的记录
+    other = UsageLedger(tmp_path / "usage.jsonl")
+    assert other.statistics(days=1)["total_requests"] == 2
+    ledger.append(make_record())
+    assert other.statistics(days=1)["total_requests"] == 3
+
+
+def test_compaction_keeps_latest_records(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.jsonl", max_records=200)
+    for i in range(301):
+        ledger.append(make_record(hours_ago=(301 - i) / 60, cost=float(i)))
+
+    lines = record_lines(tmp_path / "usage.jsonl")
+    # 超过 200 + 100 条后压缩回 200 条
+    assert len(lines) == 200
+    assert [r.cost for r in ledger.records()] == [float(i) for i in range(101, 301)]
+    assert ledger.statistics(days=1)["total_requests"] == 200
+
+
+def test_reloads_when_rewritten_file_outgrows_offset(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    reader = UsageLedger(path)
+    writer = UsageLedger(path)
+    writer.append_many([make_record(cost=1.0), make_record(cost=2.0)])
+    assert [r.cost for r in reader.records()] == [1.0, 2.0]
+
+    # 另一个进程压缩后又追加到超过原偏移：按 inode 变化全量重载
+    writer.replace([make_record(cost=3.0)])
+    writer.append_many([make_record(cost=4.0), make_record(cost=5.0), make_record(cost=6.0)])
+    assert [r.cost for r in reader.records()] == [3.0, 4.0, 5.0, 6.0]
+
+    # 原地重写（inode 不变）时按首行代号识别
+    other = UsageLedger(tmp_path / "other.jsonl")
+    other.append_many([make_record(cost=7.0) for _ in range(5)])
+    with open(path, "r+", encoding="utf-8") as f:
+        f.write((tmp_path / "other.jsonl").read_text(encoding="utf-8"))
+    assert [r.cost for r in reader.records()] == [7.0] * 5
+    assert path.with_name("usage.jsonl.lock").exists()
+
+
+def test_imports_legacy_usage_json(tmp_path):
+    legacy = tmp_path / "usage.json"
+    legacy.write_text(json.dumps([vars(make_record(hours_ago=2)), vars(make_record(hours_ago=1))]), encoding="utf-8")
+
+    ledger = UsageLedger(tmp_path / "usage.jsonl", legacy_file=legacy)
+    assert len(ledger.records()) == 2
+    assert legacy.exists() and (tmp_path / "usage.jsonl").exists()
+
+
+class FakeStorage:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.written = threading.Event()
+
+    def is_connected(self):
+        return True
+
+    def save_usage_records(self, records):
+        self.batches.append(list(records))
+        self.written.set()
+        return not self.fail
+
+
+def test_buffered_writer_batches_inserts_and_falls_back(tmp_path):
+    storage = FakeStorage()
+    writer = BufferedUsageWriter(storage, batch_size=3, flush_interval=60)
+    for _ in range(3):
+        writer.add(make_record())
+    assert storage.written.wait(2)
+    assert [len(batch) for batch in storage.batches] == [3]
+    writer.close()
+
+    ledger = UsageLedger(tmp_path / "usage.jsonl")
+    failing = BufferedUsageWriter(FakeStorage(fail=True), batch_size=10, flush_interval=60,
+                                  on_failure=ledger.append_many)
+    failing.add(make_record())
+    failing.add(make_record())
+    failing.close()
+    assert len(ledger.records()) == 2
+
+
+def test_shared_writer_is_created_once_per_key(monkeypatch):
+    monkeypatch.setattr(mongodb_storage, "_shared_writers", {})
+    storage = FakeStorage()
+    first = get_shared_usage_writer("db|usage.jsonl", storage, batch_size=10, flush_interval=60)
+    assert get_shared_usage_writer("db|usage.jsonl", storage, batch_size=10, flush_interval=60) is first
+    other = get_shared_usage_writer("db|other.jsonl", storage, batch_size=10, flush_interval=60)
+    assert other is not first
+
+    first.close()
+    assert get_shared_usage_writer("db|usage.jsonl", storage) is not first
+    other.close()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from tradingagents.tools.analysis import indicators as ind
+from tradingagents.tools.analysis.indicators import (
+    IndicatorPipeline,
+    IndicatorSpec,
+    add_all_indicators,
+    compute_many,
+)
+
+
+def make_df(n=200, seed=7):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(np.cumsum(rng.normal(0, 1, n)) + 100)
+    return pd.DataFrame({
+        'open': close, 'high': close + rng.uniform(0, 2, n), 'low': close - rng.uniform(0, 2, n),
+        'close': close, 'vol': rng.integers(1000, 5000, n).astype(float),
+    })
+
+
+def test_pipeline_matches_standalone_functions():
+    df = make_df()
+    out = compute_many(df, [
+        IndicatorSpec('ma', {'n': 20}),
+        IndicatorSpec('ema', {'n': 12}),
+        IndicatorSpec('macd'),
+        IndicatorSpec('boll', {'n': 20, 'k': 2}),
+        IndicatorSpec('rsi', {'n': 14}),
+        IndicatorSpec('atr', {'n': 14}),
+        IndicatorSpec('kdj'),
+    ])
+    pd.testing.assert_series_equal(out['ma20'], ind.ma(df['close'], 20), check_names=False)
+    pd.testing.assert_series_equal(out['ema12'], ind.ema(df['close'], 12), check_names=False)
+    pd.testing.assert_frame_equal(out[['dif', 'dea', 'macd_hist']], ind.macd(df['close']))
+    pd.testing.assert_frame_equal(out[['boll_mid', 'boll_upper', 'boll_lower']], ind.boll(df['close']))
+    pd.testing.assert_series_equal(out['rsi14'], ind.rsi(df['close'], 14), check_names=False)
+    pd.testing.assert_series_equal(out['atr14'], ind.atr(df['high'], df['low'], df['close'], 14), check_names=False)
+    pd.testing.assert_frame_equal(out[['kdj_k', 'kdj_d', 'kdj_j']], ind.kdj(df['high'], df['low'], df['close']))
+
+
+def test_shared_intermediates_are_computed_once(monkeypatch):
+    calls = []
+    real_ema = ind.ema
+
+    def counting_ema(close, n):
+        calls.append(int(n))
+        return real_ema(close, n)
+
+    monkeypatch.setattr(ind, 'ema', counting_ema)
+    compute_many(make_df(), [IndicatorSpec('ema', {'n': 12}), IndicatorSpec('ema', {'n': 26}), IndicatorSpec('macd')])
+    assert sorted(calls) == [12, 26]
+
+
+def test_pipeline_plans_output_columns_once():
+    pipe = IndicatorPipeline([IndicatorSpec('ma', {'n': 5}), IndicatorSpec('ma', {'period': 5}), IndicatorSpec('macd')])
+    assert pipe.columns == ['ma5', 'dif', 'dea', 'macd_hist']
+    assert pipe.compute_block(make_df(30)).shape == (30, 4)
+
+
+def test_add_all_indicators_in_place_with_custom_columns():
+    df = make_df().rename(columns={'close': 'Close', 'high': 'High', 'low': 'Low'})
+    out = add_all_indicators(df, close_col='Close', high_col='High', low_col='Low', rsi_style='china')
+    assert out is df
+    for col in ['ma5', 'ma60', 'rsi6', 'rsi12', 'rsi24', 'rsi14', 'rsi', 'macd_dif', 'macd_dea', 'macd',
+                'boll_mid', 'boll_upper', 'boll_lower']:
+        assert col in df.columns
+    pd.testing.assert_series_equal(df['rsi'], df['rsi12'], check_names=False)
+    pd.testing.assert_series_equal(df['boll_mid'], df['ma20'], check_names=False)
+    pd.testing.assert_series_equal(df['rsi14'], ind.rsi(df['Close'], 14, method='sma'), check_names=False)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tradingagents.tools.analysis.indicators import (
+    NUMBA_AVAILABLE,
+    ewm_mean,
+    kdj,
+    kdj_kernel,
+)
+
+BACKENDS = ["numpy"] + (["numba"] if NUMBA_AVAILABLE else [])
+
+
+def _legacy_kdj(high, low, close, n=9, m1=3, m2=3):
+    """原逐行 iloc 递推实现（基准）"""
+    lowest_low = low.rolling(window=int(n), min_periods=int(n)).min()
+    highest_high = high.rolling(window=int(n), min_periods=int(n)).max()
+    rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
+    rsv = rsv.replace([np.inf, -np.inf], np.nan)
+    k = pd.Series(np.nan, index=close.index)
+    d = pd.Series(np.nan, index=close.index)
+    alpha_k = 1 / float(m1)
+    alpha_d = 1 / float(m2)
+    last_k = 50.0
+    last_d = 50.0
+    for i in range(len(close)):
+        rv = rsv.iloc[i]
+        if np.isnan(rv):
+            continue
+        curr_k = (1 - alpha_k) * last_k + alpha_k * rv
+        curr_d = (1 - alpha_d) * last_d + alpha_d * curr_k
+        k.iloc[i] = curr_k
+        d.iloc[i] = curr_d
+        last_k, last_d = curr_k, curr_d
+    j = 3 * k - 2 * d
+    return pd.DataFrame({"kdj_k": k, "kdj_d": d, "kdj_j": j})
+
+
+def make_hlc(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(0, 1, n)))
+    high = close + rng.uniform(0, 2, n)
+    low = close - rng.uniform(0, 2, n)
+    # 一段无波动区间：high == low 导致 RSV 除零 -> NaN
+    high.iloc[200:215] = close.iloc[200:215]
+    low.iloc[200:215] = close.iloc[200:215]
+    return high, low, close
+
+
+def test_kdj_bit_identical_to_legacy_loop():
+    high, low, close = make_hlc()
+    pd.testing.assert_frame_equal(kdj(high, low, close), _legacy_kdj(high, low, close), check_exact=True)
+    pd.testing.assert_frame_equal(
+        kdj(high, low, close, n=5, m1=4, m2=2), _legacy_kdj(high, low, close, n=5, m1=4, m2=2), check_exact=True
+    )
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_kdj_kernel_2d_matches_per_column(backend):
+    rng = np.random.default_rng(1)
+    rsv = rng.uniform(0, 100, (300, 25))
+    rsv[:8] = np.nan
+    rsv[100:110, 3] = np.nan
+    k, d = kdj_kernel(rsv, backend=backend)
+    for j in range(rsv.shape[1]):
+        kj, dj = kdj_kernel(rsv[:, j], backend="numpy")
+        assert np.array_equal(k[:, j], kj, equal_nan=True)
+        assert np.array_equal(d[:, j], dj, equal_nan=True)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("kwargs", [
+    {"span": 12, "adjust": False},
+    {"alpha": 1 / 14, "adjust": False},
+    {"com": 5, "adjust": True},  # 中国式 SMA RSI6
+    {"com": 13, "adjust": True, "ignore_na": True},
+    {"span": 9, "adjust": False, "min_periods": 5},
+])
+def test_ewm_mean_bit_identical_to_pandas(backend, kwargs):
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=(400, 12))
+    x[:30, :4] = np.nan          # 前导 NaN（面板右对齐填充）
+    x[150:154, 6] = np.nan       # 中间停牌
+    x[60:, 9] = 5.0              # 常数序列
+    expected = pd.DataFrame(x).ewm(**kwargs).mean().to_numpy()
+    assert np.array_equal(ewm_mean(x, backend=backend, **kwargs), expected, equal_nan=True)
+
+
+def test_ewm_mean_requires_single_decay_parameter():
+    with pytest.raises(ValueError):
+        ewm_mean(np.ones(5), span=3, alpha=0.5)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+分析任务的数据预取
+
+各分析师通过 ToolNode 按需调用统一工具，工具内部再串行地经 DataSourceManager /
+OptimizedChinaDataProvider 拉取行情、财务、新闻和情绪数据，LLM 每一轮都要等待网络往返。
+
+本模块在任务开始时按已选分析师的工具调用约定（工具名 + 提示词中规定的参数）
+用线程池并发执行这些统一工具，结果放入该任务的预取包：
+
+- 统一工具先查预取包，命中时直接返回内存中的结果；预取仍在进行时等待该结果，
+  不会重复请求；
+- 参数与预取不一致、预取失败或等待超时时按原流程实时获取；
+- 预取在后台进行，网络延迟与分析师的第一次 LLM 调用重叠；
+- 查找只在当前任务的预取包中进行（propagate 通过 contextvar 标记当前任务），
+  并发运行的多个任务互不命中对方的结果。
+
+DATA_PREFETCH_ENABLED=false 或 config["data_prefetch_enabled"]=False 时关闭。
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 预取线程内执行工具时跳过查找，避免等待自己
+_prefetching: contextvars.ContextVar[bool] = contextvars.ContextVar("data_prefetching", default=False)
+# 当前上下文所属的任务（LangGraph 在复制的上下文中执行工具，因此工具调用时同样可见）
+_current_task: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("data_prefetch_task", default=None)
+
+_active_lock = threading.Lock()
+_active: Dict[str, "TaskPrefetch"] = {}
+# 任务异常退出未调用 close() 时，超过该时长的预取包在下次启动预取时清理
+_STALE_SECONDS = 2 * 3600
+
+
+def prefetch_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """预取键：工具名 + 规范化后的参数（字符串去除首尾空白，按参数名排序）"""
+    normalized = {k: v.strip() if isinstance(v, str) else v for k, v in arguments.items()}
+    return f"{tool_name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+def lookup_prefetched(tool_name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+    """在当前任务的预取包里查找结果（无当前任务、未预取、预取失败或超时时返回 None）"""
+    task_id = _current_task.get()
+    if task_id is None or _prefetching.get():
+        return None
+    key = prefetch_key(tool_name, arguments)
+    with _active_lock:
+        task = _active.get(task_id)
+    if task is None or not task.has(key):
+        return None
+    return task.result(key)
+
+
+def prefetchable(tool_name: str) -> Callable:
+    """统一工具装饰器：调用时先查预取包（放在 @log_tool_call 之内，命中同样记录工具调用日志）"""
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+            except TypeError:
+                return func(*args, **kwargs)
+            cached = lookup_prefetched(tool_name, dict(bound.arguments))
+            if cached is not None:
+                return cached
+            return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def describe_model(llm: Any) -> str:
+    """与新闻分析师传给统一新闻工具的 model_info 保持一致"""
+    try:
+        if hasattr(llm, 'model_name'):
+            return f"{llm.__class__.__name__}:{llm.model_name}"
+        return llm.__class__.__name__
+    except Exception:
+        return "Unknown"
+
+
+def build_prefetch_plan(selected_analysts: Iterable[str], ticker: str, trade_date: str, toolkit: Any,
+                        news_model_info: str = "") -> List[Tuple[str, Callable, Dict[str, Any]]]:
+    """
+    按分析师提示词中规定的工具参数生成预取计划 [(工具名, 函数, 参数)]
+
+    参数必须与分析师引导 LLM 传入的参数一致，否则工具调用时查不到预取结果。
+    """
+    plan = []
+    for analyst in selected_analysts:
+        if analyst == "market":
+            plan.append(("get_stock_market_data_unified", toolkit.get_stock_market_data_unified.func,
+                         {"ticker": ticker, "start_date": trade_date, "end_date": trade_date}))
+        elif analyst == "fundamentals":
+            # 与基本面分析师一致：固定回溯 10 天
+            start_date = (datetime.strptime(trade_date, "%Y-%m-%d") - timedelta(days=10)).strftime("%Y-%m-%d")
+            plan.append(("get_stock_fundamentals_unified", toolkit.get_stock_fundamentals_unified.func,
+                         {"ticker": ticker, "start_date": start_date, "end_date": trade_date,
+                          "curr_date": trade_date}))
+        elif analyst == "social":
+            plan.append(("get_stock_sentiment_unified", toolkit.get_stock_sentiment_unified.func,
+                         {"ticker": ticker, "curr_date": trade_date}))
+        elif analyst == "news":
+            from tradingagents.tools.unified_news_tool import create_unified_news_tool
+            plan.append(("get_stock_news_unified", create_unified_news_tool(toolkit),
+                         {"stock_code": ticker, "max_news": 10, "model_info": news_model_info}))
+    return plan
+
+
+class TaskPrefetch:
+    """一次分析任务的预取包"""
+
+    def __init__(self, task_id: str, wait_timeout: float = 180.0):
+        self.task_id = task_id
+        self.wait_timeout = wait_timeout
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.created_at = time.time()
+        self.hits = 0
+        self.waits = 0
+        self.failures = 0
+
+    def start(self, plan: List[Tuple[str, Callable, Dict[str, Any]]]) -> "TaskPrefetch":
+        if not plan:
+            return self
+        self._executor = ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="prefetch")
+        with self._lock:
+            for tool_name, func, arguments in plan:
+                key = prefetch_key(tool_name, arguments)
+                self._futures[key] = self._executor.submit(self._run, tool_name, func, arguments)
+        with _active_lock:
+            stale = [task for task in _active.values() if task.created_at < self.created_at - _STALE_SECONDS]
+            _active[self.task_id] = self
+        for task in stale:
+            task.close()
+        logger.info(f"⚡ [数据预取] 已启动 {len(plan)} 项: {[name for name, _, _ in plan]}")
+        return self
+
+    @staticmethod
+    def _run(tool_name: str, func: Callable, arguments: Dict[str, Any]):
+        token = _prefetching.set(True)
+        start = time.time()
+        try:
+            return func(**arguments)
+        finally:
+            _prefetching.reset(token)
+            logger.info(f"⚡ [数据预取] {tool_name} 完成，耗时 {time.time() - start:.2f}秒")
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return key in self._futures
+
+    def result(self, key: str) -> Optional[Any]:
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None:
+            return None
+        pending = not future.done()
+        try:
+            value = future.result(timeout=self.wait_timeout)
+        except FutureTimeoutError:
+            logger.warning(f"⚠️ [数据预取] 等待超时，改为实时获取: {key[:80]}")
+            return None
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            logger.warning(f"⚠️ [数据预取] 预取失败，改为实时获取: {e}")
+            return None
+        with self._lock:
+            self.hits += 1
+            self.waits += int(pending)
+        logger.info(f"⚡ [数据预取] 命中{'（等待预取完成）' if pending else ''}: {key[:80]}")
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'planned': len(self._futures), 'hits': self.hits, 'waits': self.waits,
+                    'failures': self.failures}
+
+    def activate(self) -> contextvars.Token:
+        """把当前上下文标记为本任务，返回的 token 交给 close() 恢复"""
+        return _current_task.set(self.task_id)
+
+    def close(self, token: Optional[contextvars.Token] = None):
+        """任务结束：移出查找范围，未完成的预取不再等待；token 为 activate() 的返回值"""
+        if token is not None:
+            _current_task.reset(token)
+        with _active_lock:
+            _active.pop(self.task_id, None)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def start_prefetch(selected_analysts: Iterable[str], ticker: str, trade_date: str, toolkit: Any,
+                   news_model_info: str = "", task_id: Optional[str] = None,
+                   wait_timeout: float = 180.0) -> Optional[TaskPrefetch]:
+    """启动任务预取，计划为空或生成失败时返回 None"""
+    try:
+        plan = build_prefetch_plan(selected_analysts, ticker, trade_date, toolkit, news_model_info)
+    except Exception as e:
+        logger.warning(f"⚠️ [数据预取] 生成预取计划失败，跳过预取: {e}")
+        return None
+    if not plan:
+        return None
+    return TaskPrefetch(task_id or uuid.uuid4().hex, wait_timeout=wait_timeout).start(plan)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Embedding 缓存（按内容哈希，进程内 LRU + SQLite 磁盘持久化）
+
+反思阶段会把同一段很长的 situation 文本分别写入多头/空头/交易员/投资裁判/风险经理五个记忆库，
+每次分析检索记忆时也会重复嵌入相同的查询文本。本模块以 sha256(模型名 + 文本) 为键缓存向量：
+
+- 进程内 LRU 命中时不访问磁盘；
+- SQLite（WAL 模式）跨进程、跨重启共享，相同文本只调用一次 embedding API；
+- 向量以 float32 二进制存储（ChromaDB 内部同样使用 float32）；
+- 统计命中率，供 FinancialSituationMemory.get_cache_info 展示。
+
+默认路径为 <data_cache_dir>/embedding_cache.sqlite3，可用 TA_EMBEDDING_CACHE_PATH 覆盖；
+TA_EMBEDDING_CACHE_ENABLED=false 时禁用。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.embedding_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key        TEXT PRIMARY KEY,
+    model      TEXT,
+    dim        INTEGER,
+    vector     BLOB,
+    created_at REAL
+);
+"""
+
+
+def content_key(model: str, text: str) -> str:
+    """缓存键：sha256(模型名 + 文本)"""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """按内容哈希缓存 embedding 向量（线程安全）"""
+
+    def __init__(self, db_path: Optional[Union[str, Path]] = None, memory_entries: int = 2048):
+        self.db_path = Path(db_path) if db_path else None
+        self.memory_entries = max(0, int(memory_entries))
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        if self.db_path is not None:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
+                                             isolation_level=None)
+                try:
+                    self._conn.execute("PRAGMA journal_mode=WAL")
+                except sqlite3.DatabaseError:
+                    pass
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(_SCHEMA)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding磁盘缓存不可用，仅使用内存缓存: {e}")
+                self._conn = None
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """批量查询，返回 {text: 向量}（只包含命中的文本）"""
+        keys = {content_key(model, t): t for t in dict.fromkeys(texts)}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for key, text in keys.items():
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+                    self.memory_hits += 1
+
+            pending = [k for k, t in keys.items() if t not in found]
+            if pending and self._conn is not None:
+                try:
+                    for start in range(0, len(pending), 500):
+                        chunk = pending[start:start + 500]
+                        rows = self._conn.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                            chunk,
+                        ).fetchall()
+                        for key, blob in rows:
+                            vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                            found[keys[key]] = vector
+                            self._remember(key, vector)
+                            self.disk_hits += 1
+                except sqlite3.Error as e:
+                    logger.debug(f"Embedding磁盘缓存读取失败: {e}")
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text]).get(text)
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]):
+        """写入 {text: 向量}"""
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in vectors.items():
+                key = content_key(model, text)
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember(key, array.tolist())
+                rows.append((key, model, int(array.size), array.tobytes(), now))
+            self.stores += len(rows)
+            if self._conn is not None:
+                try:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)", rows)
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error as e:
+                    logger.debug(f"Embedding磁盘缓存写入失败: {e}")
+                    try:
+                        self._conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+
+    def put(self, model: str, text: str, vector: Sequence[float]):
+        self.put_many(model, {text: vector})
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = None
+            if self._conn is not None:
+                try:
+                    disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'db_path': str(self.db_path) if self.db_path else None,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, vector: List[float]):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(config: Optional[dict] = None) -> Optional[EmbeddingCache]:
+    """获取进程级 embedding 缓存（TA_EMBEDDING_CACHE_ENABLED=false 时返回 None）"""
+    global _embedding_cache
+    if os.getenv("TA_EMBEDDING_CACHE_ENABLED", "true").lower() in ("false", "0", "no", "off"):
+        return None
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                db_path = os.getenv("TA_EMBEDDING_CACHE_PATH")
+                if not db_path:
+                    cache_dir = (config or {}).get("data_cache_dir")
+                    if not cache_dir:
+                        from tradingagents.default_config import DEFAULT_CONFIG
+                        cache_dir = DEFAULT_CONFIG["data_cache_dir"]
+                    db_path = os.path.join(cache_dir, "embedding_cache.sqlite3")
+                _embedding_cache = EmbeddingCache(db_path)
+                logger.info(f"🧠 Embedding缓存已初始化: {db_path}")
+    return _embedding_cache
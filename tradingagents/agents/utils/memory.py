@@ -6,12 +6,23 @@ from dashscope import TextEmbedding
 import os
 import threading
 import hashlib
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("agents.utils.memory")
 
+from .embedding_cache import get_embedding_cache
+
+# 单次批量 embedding 请求的最大条数（DashScope text-embedding-v3 为 10，v1/v2 为 25；
+# OpenAI 接口上限为 2048 条，但受单次请求总 token 数限制，这里取较保守的值）
+_EMBEDDING_BATCH_LIMITS = {
+    "text-embedding-v3": 10,
+    "text-embedding-v2": 25,
+    "text-embedding-v1": 25,
+}
+_DEFAULT_EMBEDDING_BATCH_SIZE = 256
+
 
 class ChromaDBManager:
     """单例ChromaDB管理器，避免并发创建集合的冲突"""
@@ -306,6 +317,9 @@ class FinancialSituationMemory:
                 self.client = "DISABLED"
                 logger.warning(f"⚠️ 未找到OPENAI_API_KEY，记忆功能已禁用")
 
+        # 按内容哈希的 embedding 缓存（进程内 + 磁盘，跨记忆库/进程/重启共享）
+        self.embedding_cache = get_embedding_cache(config)
+
         # 使用单例ChromaDB管理器
         self.chroma_manager = ChromaDBManager()
         self.situation_collection = self.chroma_manager.get_or_create_collection(name)
@@ -348,24 +362,24 @@ class FinancialSituationMemory:
         logger.warning(f"⚠️ 强制截断：保留首尾关键信息，{len(text)}字符截断为{len(truncated)}字符")
         return truncated, True
 
-    def get_embedding(self, text):
-        """Get embedding for a text using the configured provider"""
+    def _prepare_text(self, text):
+        """校验待嵌入文本并记录处理信息；返回 False 表示应直接使用空向量"""
 
         # 检查记忆功能是否被禁用
         if self.client == "DISABLED":
             # 内存功能已禁用，返回空向量
             logger.debug(f"⚠️ 记忆功能已禁用，返回空向量")
-            return [0.0] * 1024  # 返回1024维的零向量
+            return False
 
         # 验证输入文本
         if not text or not isinstance(text, str):
             logger.warning(f"⚠️ 输入文本为空或无效，返回空向量")
-            return [0.0] * 1024
+            return False
 
         text_length = len(text)
         if text_length == 0:
             logger.warning(f"⚠️ 输入文本长度为0，返回空向量")
-            return [0.0] * 1024
+            return False
         
         # 检查是否启用长度限制
         if self.enable_embedding_length_check and text_length > self.max_embedding_length:
@@ -380,7 +394,7 @@ class FinancialSituationMemory:
                 'strategy': 'length_limit_skip',
                 'max_length': self.max_embedding_length
             }
-            return [0.0] * 1024
+            return False
         
         # 记录文本信息（不进行任何截断）
         if text_length > 8192:
@@ -395,13 +409,124 @@ class FinancialSituationMemory:
             'provider': self.llm_provider,
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
+        return True
+
+    def _uses_dashscope(self):
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
+    def _cache_namespace(self):
+        """缓存键中的模型标识：同名模型在不同服务端点上的向量不可混用"""
+        if self._uses_dashscope():
+            return f"dashscope:{self.embedding}"
+        return f"{getattr(self.client, 'base_url', '')}:{self.embedding}"
+
+    def _cache_get(self, texts):
+        if self.embedding_cache is None or not texts:
+            return {}
+        return self.embedding_cache.get_many(self._cache_namespace(), texts)
+
+    def _cache_put(self, vectors):
+        if self.embedding_cache is None:
+            return
+        # 失败时返回的空向量不缓存
+        valid = {t: v for t, v in vectors.items() if any(x != 0.0 for x in v)}
+        self.embedding_cache.put_many(self._cache_namespace(), valid)
+
+    def _embedding_batch_size(self):
+        configured = os.getenv('EMBEDDING_BATCH_SIZE')
+        if configured:
+            return max(1, int(configured))
+        if self._uses_dashscope():
+            return _EMBEDDING_BATCH_LIMITS.get(self.embedding, 10)
+        return _DEFAULT_EMBEDDING_BATCH_SIZE
+
+    def get_embedding(self, text):
+        """Get embedding for a text using the configured provider (cached by content hash)"""
+        if not self._prepare_text(text):
+            return [0.0] * 1024
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        cached = self._cache_get([text]).get(text)
+        if cached is not None:
+            self._last_text_info['cache_hit'] = True
+            return cached
+
+        embedding = self._request_embedding(text)
+        self._cache_put({text: embedding})
+        return embedding
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量获取 embedding
+
+        相同文本只处理一次；先查缓存，未命中的文本按提供商的批量上限分批请求，
+        批量请求失败时逐条请求（沿用单条请求的降级逻辑）。
+        """
+        results = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            if self._prepare_text(text):
+                pending.append(text)
+            else:
+                results[text] = [0.0] * 1024
+
+        cached = self._cache_get(pending)
+        results.update(cached)
+        misses = [t for t in pending if t not in cached]
+
+        batch_size = self._embedding_batch_size()
+        for start in range(0, len(misses), batch_size):
+            chunk = misses[start:start + batch_size]
+            vectors = self._request_embeddings(chunk)
+            if vectors is None:
+                vectors = [self._request_embedding(t) for t in chunk]
+            fresh = dict(zip(chunk, vectors))
+            self._cache_put(fresh)
+            results.update(fresh)
+
+        if texts and misses:
+            logger.debug(f"🧠 批量embedding: {len(texts)}条, 缓存命中{len(cached)}条, 请求{len(misses)}条")
+        return [results[t] for t in texts]
+
+    def _request_embeddings(self, texts):
+        """一次请求嵌入多条文本；失败或不适用时返回 None"""
+        if len(texts) < 2:
+            return None
+        try:
+            if self._uses_dashscope():
+                import dashscope
+                from dashscope import TextEmbedding
+
+                if not getattr(dashscope, 'api_key', None):
+                    return None
+                response = TextEmbedding.call(model=self.embedding, input=texts)
+                if response.status_code != 200:
+                    logger.warning(f"⚠️ DashScope批量embedding失败，改为逐条请求: {response.code} - {response.message}")
+                    return None
+                items = sorted(response.output['embeddings'], key=lambda e: e.get('text_index', 0))
+                vectors = [item['embedding'] for item in items]
+            else:
+                if self.client is None or self.client == "DISABLED":
+                    return None
+                response = self.client.embeddings.create(model=self.embedding, input=texts)
+                vectors = [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            logger.warning(f"⚠️ {self.llm_provider}批量embedding异常，改为逐条请求: {str(e)}")
+            return None
+
+        if len(vectors) != len(texts):
+            logger.warning(f"⚠️ 批量embedding返回数量不符({len(vectors)}/{len(texts)})，改为逐条请求")
+            return None
+        logger.debug(f"✅ {self.llm_provider} 批量embedding成功: {len(texts)}条")
+        return vectors
+
+    def _request_embedding(self, text):
+        """调用 embedding API（单条，含长度限制降级处理）"""
+        if self._uses_dashscope():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -562,7 +687,6 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
         offset = self.situation_collection.count()
 
@@ -570,7 +694,8 @@ class FinancialSituationMemory:
             situations.append(situation)
             advice.append(recommendation)
             ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+
+        embeddings = self.get_embeddings(situations)
 
         self.situation_collection.add(
             documents=situations,
@@ -644,8 +769,9 @@ class FinancialSituationMemory:
         info = {
             'collection_count': self.situation_collection.count(),
             'client_status': 'enabled' if self.client != "DISABLED" else 'disabled',
-            'embedding_model': self.embedding,
-            'provider': self.llm_provider
+            'embedding_model': getattr(self, 'embedding', None),
+            'provider': self.llm_provider,
+            'embedding_cache': self.embedding_cache.stats() if self.embedding_cache is not None else None,
         }
         
         # 添加最后一次文本处理信息
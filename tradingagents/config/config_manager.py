@@ -9,9 +9,11 @@
    迁移脚本: scripts/migrate_config_to_db.py
 """
 
+import copy
 import json
 import os
 import re
+import time
 import warnings
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -40,9 +42,10 @@ logger = get_logger('agents')
 
 # 导入数据模型（避免循环导入）
 from .usage_models import UsageRecord, ModelConfig, PricingConfig
+from .usage_ledger import UsageLedger
 
 try:
-    from .mongodb_storage import MongoDBStorage
+    from .mongodb_storage import MongoDBStorage, get_shared_usage_writer
     MONGODB_AVAILABLE = True
 except ImportError as e:
     logger.error(f"❌ [ConfigManager] 导入 MongoDBStorage 失败 (ImportError): {e}")
@@ -50,12 +53,14 @@ except ImportError as e:
     logger.error(f"   堆栈: {traceback.format_exc()}")
     MONGODB_AVAILABLE = False
     MongoDBStorage = None
+    get_shared_usage_writer = None
 except Exception as e:
     logger.error(f"❌ [ConfigManager] 导入 MongoDBStorage 失败 (Exception): {e}")
     import traceback
     logger.error(f"   堆栈: {traceback.format_exc()}")
     MONGODB_AVAILABLE = False
     MongoDBStorage = None
+    get_shared_usage_writer = None
 
 
 class ConfigManager:
@@ -67,8 +72,10 @@ class ConfigManager:
 
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
-        self.usage_file = self.config_dir / "usage.json"
+        self.usage_file = self.config_dir / "usage.json"  # 旧版整体重写的记录文件，仅用于首次导入
+        self.usage_ledger_file = self.config_dir / "usage.jsonl"
         self.settings_file = self.config_dir / "settings.json"
+        self._settings_cache = None  # ((mtime_ns, size), settings)
 
         # 加载.env文件（保持向后兼容）
         self._load_env_file()
@@ -79,6 +86,27 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 本地使用记录账本（仅追加，首次访问时加载）
+        settings = self.load_settings()
+        self.usage_ledger = UsageLedger(
+            self.usage_ledger_file,
+            legacy_file=self.usage_file,
+            max_records=settings.get("max_usage_records", 10000),
+            retention_days=settings.get("usage_retention_days", 0)
+        )
+
+        # MongoDB 批量写入器（同一数据库和账本在进程内共享）：写入失败的记录回退到本地账本
+        self.usage_writer = None
+        if self.mongodb_storage is not None:
+            self.usage_writer = get_shared_usage_writer(
+                f"{self.mongodb_storage.connection_string}|{self.mongodb_storage.database_name}"
+                f"|{self.usage_ledger_file.resolve()}",
+                self.mongodb_storage,
+                batch_size=int(os.getenv("TOKEN_USAGE_BATCH_SIZE", "50")),
+                flush_interval=float(os.getenv("TOKEN_USAGE_FLUSH_INTERVAL", "2")),
+                on_failure=self.usage_ledger.append_many
+            )
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -291,6 +319,7 @@ class ConfigManager:
                 "currency_preference": "CNY",
                 "auto_save_usage": True,
                 "max_usage_records": 10000,
+                "usage_retention_days": 0,  # 本地使用记录保留天数，0 表示只按条数限制
                 "data_dir": default_data_dir,  # 数据目录配置
                 "cache_dir": os.path.join(default_data_dir, "cache"),  # 缓存目录
                 "results_dir": os.path.join(os.path.expanduser("~"), "Documents", "TradingAgents", "results"),  # 结果目录
@@ -366,21 +395,15 @@ class ConfigManager:
     def load_usage_records(self) -> List[UsageRecord]:
         """加载使用记录"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return self.usage_ledger.records()
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
     
     def save_usage_records(self, records: List[UsageRecord]):
-        """保存使用记录"""
+        """保存使用记录（整体替换账本）"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.replace(records)
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
     
@@ -405,15 +428,11 @@ class ConfigManager:
         # 🔍 详细日志：记录保存位置
         logger.info(f"💾 [Token记录] 准备保存: {provider}/{model_name}, 输入={input_tokens}, 输出={output_tokens}, 成本=¥{cost:.4f}, session={session_id}")
 
-        # 优先使用MongoDB存储
-        if self.mongodb_storage and self.mongodb_storage.is_connected():
-            logger.info(f"📊 [Token记录] 使用 MongoDB 存储 (数据库: {self.mongodb_storage.database_name}, 集合: {self.mongodb_storage.collection_name})")
-            success = self.mongodb_storage.save_usage_record(record)
-            if success:
-                logger.info(f"✅ [Token记录] MongoDB 保存成功: {provider}/{model_name}")
-                return record
-            else:
-                logger.error(f"⚠️ [Token记录] MongoDB保存失败，回退到JSON文件存储")
+        # 优先使用MongoDB存储（缓冲后批量写入，失败时由写入器回退到本地账本）
+        if self.usage_writer and self.mongodb_storage.is_connected():
+            self.usage_writer.add(record)
+            logger.info(f"📊 [Token记录] 已加入 MongoDB 批量写入队列 (集合: {self.mongodb_storage.collection_name}, 待写入: {self.usage_writer.pending()})")
+            return record
         else:
             # 🔍 详细日志：为什么没有使用MongoDB
             if self.mongodb_storage is None:
@@ -422,20 +441,17 @@ class ConfigManager:
             elif not self.mongodb_storage.is_connected():
                 logger.warning(f"⚠️ [Token记录] MongoDB未连接 (is_connected=False)")
 
-            logger.info(f"📄 [Token记录] 使用 JSON 文件存储: {self.usage_file}")
-
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
+            logger.info(f"📄 [Token记录] 使用本地账本存储: {self.usage_ledger_file}")
 
-        # 限制记录数量
+        # 回退到本地账本：追加一行，超出条数上限/保留天数时由账本定期压缩
         settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-
-        self.save_usage_records(records)
-        logger.info(f"✅ [Token记录] JSON 文件保存成功: {self.usage_file}")
+        self.usage_ledger.max_records = settings.get("max_usage_records", 10000)
+        self.usage_ledger.retention_days = settings.get("usage_retention_days", 0)
+        try:
+            self.usage_ledger.append(record)
+            logger.info(f"✅ [Token记录] 本地账本保存成功: {self.usage_ledger_file}")
+        except Exception as e:
+            logger.error(f"保存使用记录失败: {e}")
         return record
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> tuple[float, str]:
@@ -463,11 +479,15 @@ class ConfigManager:
         return 0.0, "CNY"
     
     def load_settings(self) -> Dict[str, Any]:
-        """加载设置，合并.env中的配置"""
+        """加载设置，合并.env中的配置（文件未变化时使用缓存，不重复读取）"""
         try:
             if self.settings_file.exists():
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                stat = self.settings_file.stat()
+                file_key = (stat.st_mtime_ns, stat.st_size)
+                if self._settings_cache is None or self._settings_cache[0] != file_key:
+                    with open(self.settings_file, 'r', encoding='utf-8') as f:
+                        self._settings_cache = (file_key, json.load(f))
+                settings = copy.deepcopy(self._settings_cache[1])
             else:
                 # 如果设置文件不存在，创建默认设置
                 settings = {
@@ -478,6 +498,7 @@ class ConfigManager:
                     "currency_preference": "CNY",
                     "auto_save_usage": True,
                     "max_usage_records": 10000,
+                    "usage_retention_days": 0,
                     "data_dir": os.path.join(os.path.expanduser("~"), "Documents", "TradingAgents", "data"),
                     "cache_dir": os.path.join(os.path.expanduser("~"), "Documents", "TradingAgents", "data", "cache"),
                     "results_dir": os.path.join(os.path.expanduser("~"), "Documents", "TradingAgents", "results"),
@@ -537,6 +558,7 @@ class ConfigManager:
 
     def save_settings(self, settings: Dict[str, Any]):
         """保存设置"""
+        self._settings_cache = None
         try:
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
@@ -561,6 +583,9 @@ class ConfigManager:
         # 优先使用MongoDB获取统计
         if self.mongodb_storage and self.mongodb_storage.is_connected():
             try:
+                # 先写出缓冲区，统计才包含刚记录的调用
+                if self.usage_writer:
+                    self.usage_writer.flush()
                 # 从MongoDB获取基础统计
                 stats = self.mongodb_storage.get_usage_statistics(days)
                 # 获取供应商统计
@@ -573,52 +598,8 @@ class ConfigManager:
             except Exception as e:
                 logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
         
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
-        
-        return {
-            "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
-        }
+        # 回退到本地账本的增量聚合
+        return self.usage_ledger.statistics(days)
     
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
@@ -692,8 +673,13 @@ class ConfigManager:
 class TokenTracker:
     """Token使用跟踪器"""
 
+    # 今日成本每隔这么多秒从存储重新统计一次，期间按新记录累加
+    ALERT_REFRESH_SECONDS = 300
+
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
+        self._today_cost = 0.0
+        self._today_cost_at = None
 
     def track_usage(self, provider: str, model_name: str, input_tokens: int,
                    output_tokens: int, session_id: str = None, analysis_type: str = "stock_analysis"):
@@ -729,9 +715,14 @@ class TokenTracker:
         settings = self.config_manager.load_settings()
         threshold = settings.get("cost_alert_threshold", 100.0)
 
-        # 获取今日总成本
-        today_stats = self.config_manager.get_usage_statistics(1)
-        total_today = today_stats["total_cost"]
+        # 获取今日总成本（统计结果已包含本条记录，缓存期内只累加本条成本）
+        now = time.monotonic()
+        if self._today_cost_at is None or now - self._today_cost_at > self.ALERT_REFRESH_SECONDS:
+            self._today_cost = self.config_manager.get_usage_statistics(1)["total_cost"]
+            self._today_cost_at = now
+        else:
+            self._today_cost += current_cost
+        total_today = self._today_cost
 
         if total_today >= threshold:
             logger.warning(f"⚠️ 成本警告: 今日成本已达到 ¥{total_today:.4f}，超过阈值 ¥{threshold}",
@@ -739,9 +730,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
-        records = self.config_manager.load_usage_records()
-        session_cost = sum(record.cost for record in records if record.session_id == session_id)
-        return session_cost
+        return self.config_manager.usage_ledger.session_cost(session_id)
 
     def estimate_cost(self, provider: str, model_name: str, estimated_input_tokens: int,
                      estimated_output_tokens: int) -> tuple[float, str]:
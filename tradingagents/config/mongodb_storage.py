@@ -4,10 +4,12 @@ MongoDB存储适配器
 用于将token使用记录存储到MongoDB数据库
 """
 
+import atexit
 import os
+import threading
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import asdict
 from .usage_models import UsageRecord
 
@@ -144,6 +146,24 @@ class MongoDBStorage:
             logger.error(f"   堆栈: {traceback.format_exc()}")
             return False
     
+    def save_usage_records(self, records: List[UsageRecord]) -> bool:
+        """批量保存使用记录（一次 insert_many）"""
+        if not self._connected:
+            logger.warning(f"⚠️ [MongoDB存储] 未连接，无法保存记录")
+            return False
+        if not records:
+            return True
+
+        try:
+            created_at = datetime.now(ZoneInfo(get_timezone_name()))
+            documents = [dict(asdict(record), _created_at=created_at) for record in records]
+            result = self.collection.insert_many(documents, ordered=False)
+            logger.debug(f"📊 [MongoDB存储] 批量写入 {len(result.inserted_ids)} 条使用记录")
+            return len(result.inserted_ids) == len(documents)
+        except Exception as e:
+            logger.error(f"❌ [MongoDB存储] 批量保存记录失败: {e}")
+            return False
+
     def load_usage_records(self, limit: int = 10000, days: int = None) -> List[UsageRecord]:
         """从MongoDB加载使用记录"""
         if not self._connected:
@@ -305,4 +325,91 @@ class MongoDBStorage:
         if self.client:
             self.client.close()
             self._connected = False
-            logger.info(f"MongoDB连接已关闭")
\ No newline at end of file
+            logger.info(f"MongoDB连接已关闭")
+
+
+class BufferedUsageWriter:
+    """
+    使用记录的缓冲批量写入器
+
+    add() 只把记录放进内存缓冲区；攒满 batch_size 条或距上次写入超过 flush_interval 秒时，
+    后台线程用一次 insert_many 写入。写入失败的记录交给 on_failure（回退到本地账本）。
+    进程退出时自动写出剩余记录。
+    """
+
+    def __init__(self, storage: MongoDBStorage, batch_size: int = 50, flush_interval: float = 2.0,
+                 on_failure: Optional[Callable[[List[UsageRecord]], None]] = None):
+        self.storage = storage
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.on_failure = on_failure
+
+        self._buffer: List[UsageRecord] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, record: UsageRecord):
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """立即写出缓冲区，返回写入成功的条数"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            if self.storage.is_connected() and self.storage.save_usage_records(batch):
+                return len(batch)
+            logger.error(f"⚠️ [Token记录] MongoDB批量写入失败，{len(batch)} 条记录回退到本地账本")
+            if self.on_failure:
+                self.on_failure(batch)
+            return 0
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ [Token记录] 后台批量写入异常: {e}")
+
+
+_shared_writers: Dict[str, BufferedUsageWriter] = {}
+_shared_writers_lock = threading.Lock()
+
+
+def get_shared_usage_writer(key: str, storage: MongoDBStorage, **kwargs) -> BufferedUsageWriter:
+    """
+    按 key 获取进程内共享的批量写入器
+
+    ConfigManager 会被随处临时创建，每次都新建写入器会为每个实例各起一个后台线程并注册 atexit，
+    同一目标（数据库 + 本地账本）只保留一个写入器。
+    """
+    with _shared_writers_lock:
+        writer = _shared_writers.get(key)
+        if writer is None or writer._closed:
+            writer = BufferedUsageWriter(storage, **kwargs)
+            _shared_writers[key] = writer
+        return writer
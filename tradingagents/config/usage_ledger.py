@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Token 使用记录账本（JSON Lines，仅追加）
+
+旧的 JSON 存储每记录一次 LLM 调用都要读入整个 usage.json、追加一条、截断后整体重写，
+I/O 随历史记录线性增长。账本改为：
+
+- 每条记录追加一行到 usage.jsonl，记录数超过上限 10% 后才整体压缩一次（均摊 O(1)）；
+- 压缩时按 max_records 和 retention_days 保留记录，写临时文件后原子替换；
+- 进程内按小时维护分供应商聚合，统计最近 N 天只合并小时桶，不再扫描全部记录；
+- 通过文件偏移增量读取其他进程追加的记录；文件首行记录代号（generation），每次整体重写都换新代号，
+  inode 或代号变化即说明文件被其他进程压缩过，自动全量重载；
+- 追加与压缩在 usage.jsonl.lock 上加跨进程文件锁（无 fcntl 的平台退化为进程内锁）。
+
+首次使用时若只有旧版 usage.json，会一次性导入账本（旧文件保留不动）。
+"""
+
+import json
+import os
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+from zoneinfo import ZoneInfo
+
+from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.utils.logging_manager import get_logger
+
+from .usage_models import UsageRecord
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = get_logger('agents')
+
+# 超过 max_records 的这一比例后触发压缩
+COMPACT_SLACK_RATIO = 0.1
+MIN_COMPACT_SLACK = 100
+# 账本首行的头部字段，记录文件代号
+HEADER_KEY = "_ledger"
+
+
+def _record_epoch(record: UsageRecord) -> float:
+    """记录时间戳转为 epoch 秒（无时区的时间戳按配置时区解释）"""
+    try:
+        moment = datetime.fromisoformat(record.timestamp)
+    except (TypeError, ValueError):
+        return 0.0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=ZoneInfo(get_timezone_name()))
+    return moment.timestamp()
+
+
+def _header_line() -> str:
+    return json.dumps({HEADER_KEY: {"generation": uuid.uuid4().hex}}) + "\n"
+
+
+def _parse_generation(line: str) -> Optional[str]:
+    """解析头部行中的代号；不是头部行返回 None"""
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(header, dict) and isinstance(header.get(HEADER_KEY), dict):
+        return header[HEADER_KEY].get("generation")
+    return None
+
+
+def _empty_provider_stats() -> Dict[str, float]:
+    return {"cost": 0, "input_tokens": 0, "output_tokens": 0, "requests": 0}
+
+
+def _add_to(stats: Dict[str, float], record: UsageRecord):
+    stats["cost"] += record.cost
+    stats["input_tokens"] += record.input_tokens
+    stats["output_tokens"] += record.output_tokens
+    stats["requests"] += 1
+
+
+class UsageLedger:
+    """仅追加的使用记录账本（线程安全）"""
+
+    def __init__(self, path: Union[str, Path], legacy_file: Optional[Union[str, Path]] = None,
+                 max_records: int = 10000, retention_days: int = 0):
+        self.path = Path(path)
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.max_records = max_records
+        self.retention_days = retention_days
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._offset = 0
+        self._identity = None  # (st_dev, st_ino)
+        self._generation: Optional[str] = None
+        self._file_lock_depth = 0
+        self._records: List[UsageRecord] = []
+        self._epochs: List[float] = []
+        self._hourly: Dict[int, Dict[str, Dict[str, float]]] = {}
+        self._session_costs: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------ 写入
+
+    def append(self, record: UsageRecord):
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[UsageRecord]):
+        """追加记录；写入后从文件增量读取，保证与其他进程的追加顺序一致"""
+        lines = "".join(json.dumps(asdict(r), ensure_ascii=False) + "\n" for r in records)
+        if not lines:
+            return
+        with self._lock:
+            with self._file_lock():
+                self._sync()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    if f.tell() == 0:
+                        f.write(_header_line())
+                    f.write(lines)
+                self._sync()
+                if self._needs_compaction():
+                    self.compact()
+
+    def replace(self, records: List[UsageRecord]):
+        """整体替换账本内容（用于清空记录等管理操作）"""
+        with self._lock, self._file_lock():
+            self._rewrite(records)
+
+    def compact(self):
+        """按记录数上限和保留天数压缩账本"""
+        with self._lock, self._file_lock():
+            self._sync()
+            records = self._records
+            if self.retention_days and self.retention_days > 0:
+                cutoff = datetime.now().timestamp() - self.retention_days * 86400
+                records = records[bisect_left(self._epochs, cutoff):]
+            if self.max_records and len(records) > self.max_records:
+                records = records[-self.max_records:]
+            dropped = len(self._records) - len(records)
+            self._rewrite(records)
+            logger.debug(f"🗜️ [Token账本] 压缩完成: 保留 {len(records)} 条，清理 {dropped} 条")
+
+    # ------------------------------------------------------------------ 查询
+
+    def records(self) -> List[UsageRecord]:
+        with self._lock:
+            self._sync()
+            return list(self._records)
+
+    def session_cost(self, session_id: str) -> float:
+        with self._lock:
+            self._sync()
+            return self._session_costs.get(session_id, 0.0)
+
+    def statistics(self, days: int = 30) -> Dict[str, object]:
+        """最近 N 天的统计：整小时桶直接合并，只有跨越起点的那个小时逐条累加"""
+        with self._lock:
+            self._sync()
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+            boundary_hour = int(cutoff // 3600)
+
+            provider_stats: Dict[str, Dict[str, float]] = {}
+            for hour, providers in self._hourly.items():
+                if hour <= boundary_hour:
+                    continue
+                for provider, stats in providers.items():
+                    target = provider_stats.setdefault(provider, _empty_provider_stats())
+                    for key, value in stats.items():
+                        target[key] += value
+
+            start = bisect_left(self._epochs, cutoff)
+            end = bisect_left(self._epochs, (boundary_hour + 1) * 3600)
+            for record in self._records[start:end]:
+                _add_to(provider_stats.setdefault(record.provider, _empty_provider_stats()), record)
+
+        total_requests = sum(int(s["requests"]) for s in provider_stats.values())
+        return {
+            "period_days": days,
+            "total_cost": round(sum(s["cost"] for s in provider_stats.values()), 4),
+            "total_input_tokens": sum(s["input_tokens"] for s in provider_stats.values()),
+            "total_output_tokens": sum(s["output_tokens"] for s in provider_stats.values()),
+            "total_requests": total_requests,
+            "provider_stats": provider_stats,
+            "records_count": total_requests
+        }
+
+    # ------------------------------------------------------------------ 内部
+
+    def _needs_compaction(self) -> bool:
+        slack = max(MIN_COMPACT_SLACK, int(self.max_records * COMPACT_SLACK_RATIO))
+        if self.max_records and len(self._records) > self.max_records + slack:
+            return True
+        if self.retention_days and self.retention_days > 0 and self._epochs:
+            # 最旧记录超出保留期一天以上再压缩，避免每次追加都重写
+            return self._epochs[0] < datetime.now().timestamp() - (self.retention_days + 1) * 86400
+        return False
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程互斥追加与压缩；调用方须已持有 self._lock，同一实例内可重入"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_generation(self) -> Optional[str]:
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                return _parse_generation(f.readline())
+        except FileNotFoundError:
+            return None
+
+    def _sync(self):
+        """
+        把文件中尚未读取的部分并入内存
+
+        inode 变化（被原子替换）、文件变短或首行代号变化都说明文件被其他进程重写过，全量重载；
+        只看大小会漏掉压缩后又追加到比原偏移更长的情况。
+        """
+        if not self._loaded:
+            self._loaded = True
+            self._import_legacy()
+        try:
+            stat = self.path.stat()
+            identity, size = (stat.st_dev, stat.st_ino), stat.st_size
+        except FileNotFoundError:
+            identity, size = None, 0
+        if (identity != self._identity or size < self._offset
+                or (self._offset and self._read_generation() != self._generation)):
+            self._reset()
+            self._identity = identity
+        if size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # 只消费完整的行，其他进程写了一半的行留到下次
+        complete = chunk.rfind(b"\n") + 1
+        self._offset += complete
+        for line in chunk[:complete].decode("utf-8", errors="replace").splitlines():
+            if not line.strip():
+                continue
+            generation = _parse_generation(line)
+            if generation is not None:
+                self._generation = generation
+                continue
+            try:
+                self._index(UsageRecord(**json.loads(line)))
+            except Exception as e:
+                logger.warning(f"⚠️ [Token账本] 跳过无法解析的记录: {e}")
+
+    def _index(self, record: UsageRecord):
+        epoch = _record_epoch(record)
+        if not self._epochs or epoch >= self._epochs[-1]:
+            self._epochs.append(epoch)
+            self._records.append(record)
+        else:
+            position = bisect_right(self._epochs, epoch)
+            insort(self._epochs, epoch)
+            self._records.insert(position, record)
+
+        providers = self._hourly.setdefault(int(epoch // 3600), {})
+        _add_to(providers.setdefault(record.provider, _empty_provider_stats()), record)
+        if record.session_id:
+            self._session_costs[record.session_id] = self._session_costs.get(record.session_id, 0.0) + record.cost
+
+    def _reset(self):
+        self._offset = 0
+        self._identity, self._generation = None, None
+        self._records, self._epochs = [], []
+        self._hourly, self._session_costs = {}, {}
+
+    def _rewrite(self, records: List[UsageRecord]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(_header_line())
+            for record in records:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._loaded = True
+        self._reset()
+        self._sync()
+
+    def _import_legacy(self):
+        if self.path.exists() or self.legacy_file is None or not self.legacy_file.exists():
+            return
+        try:
+            with open(self.legacy_file, "r", encoding="utf-8") as f:
+                records = [UsageRecord(**item) for item in json.load(f)]
+            with self._file_lock():
+                if self.path.exists():
+                    return
+                self._rewrite(records)
+            logger.info(f"📦 [Token账本] 已从 {self.legacy_file} 导入 {len(records)} 条历史记录")
+        except Exception as e:
+            logger.error(f"❌ [Token账本] 导入旧版使用记录失败: {e}")
@@ -5,6 +5,8 @@
 - 文件缓存（默认）- 简单稳定，不依赖外部服务
 - 数据库缓存（可选）- MongoDB + Redis，性能更好
 - 自适应缓存（推荐）- 自动选择最佳后端
+- 进程内 L1 内存缓存 - 位于以上缓存之前，TA_MEMORY_CACHE_MAX_MB 控制上限（0 为禁用）
+- 列式价格存储 - StockstatsUtils 的价格历史（内存映射 NumPy），TA_PRICE_STORE_ENABLED=false 时禁用
 
 使用方法：
     from tradingagents.dataflows.cache import get_cache
@@ -22,6 +24,12 @@ from typing import Union
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+# 导入进程内 L1 内存缓存
+from .memory_cache import MemoryLRUCache, get_memory_cache
+
+# 导入列式价格存储（StockstatsUtils 使用）
+from .price_store import ColumnarPriceStore
+
 # 导入文件缓存
 try:
     from .file_cache import StockDataCache
@@ -122,6 +130,9 @@ __all__ = [
     'IntegratedCacheManager',
     'DatabaseCacheManager',
     'AdaptiveCacheSystem',
+    'MemoryLRUCache',
+    'get_memory_cache',
+    'ColumnarPriceStore',
 
     # 可用性标志
     'FILE_CACHE_AVAILABLE',
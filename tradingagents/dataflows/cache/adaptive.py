@@ -273,6 +273,11 @@ class AdaptiveCacheSystem:
     
     def load_data(self, cache_key: str) -> Optional[Any]:
         """从缓存加载数据"""
+        cache_data = self.load_entry(cache_key)
+        return cache_data['data'] if cache_data else None
+
+    def load_entry(self, cache_key: str) -> Optional[Dict]:
+        """从缓存加载完整条目（data/metadata/timestamp/backend），无效时返回None"""
         cache_data = None
         
         # 根据主要后端加载
@@ -301,7 +306,7 @@ class AdaptiveCacheSystem:
                 self.logger.debug(f"文件缓存已过期: {cache_key}")
                 return None
         
-        return cache_data['data']
+        return cache_data
     
     def find_cached_data(self, symbol: str, start_date: str = "", end_date: str = "", 
                         data_source: str = "default", data_type: str = "stock_data") -> Optional[str]:
@@ -13,6 +13,9 @@ from pathlib import Path
 from typing import Optional, Dict, Any, Union, List
 import hashlib
 
+from .memory_cache import get_memory_cache, file_version
+from .metadata_index import CacheMetadataIndex
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -92,6 +95,12 @@ class StockDataCache:
             'enable_length_check': os.getenv('ENABLE_CACHE_LENGTH_CHECK', 'false').lower() == 'true'  # 文件缓存默认不限制
         }
 
+        # 进程内 L1 内存缓存（多个智能体重复读取同一股票数据时免去磁盘扫描与解析）
+        self.memory_cache = get_memory_cache()
+
+        # 元数据索引（SQLite），查找/清理/统计不再遍历 metadata 目录
+        self.metadata_index = self._init_metadata_index()
+
         logger.info(f"📁 缓存管理器初始化完成，缓存目录: {self.cache_dir}")
         logger.info(f"🗄️ 数据库缓存管理器初始化完成")
         logger.info(f"   美股数据: ✅ 已配置")
@@ -208,6 +217,17 @@ class StockDataCache:
         """获取元数据文件路径"""
         return self.metadata_dir / f"{cache_key}_meta.json"
     
+    def _init_metadata_index(self) -> Optional[CacheMetadataIndex]:
+        """打开元数据索引；索引为空而已有元数据文件时从 JSON 重建（失败则退回目录扫描）"""
+        try:
+            index = CacheMetadataIndex(self.cache_dir / "metadata_index.sqlite3")
+            if index.count() == 0 and next(self.metadata_dir.glob("*_meta.json"), None) is not None:
+                index.rebuild(self.metadata_dir)
+            return index
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存元数据索引不可用，使用目录扫描: {e}")
+            return None
+
     def _save_metadata(self, cache_key: str, metadata: Dict[str, Any]):
         """保存元数据"""
         metadata_path = self._get_metadata_path(cache_key)
@@ -216,6 +236,43 @@ class StockDataCache:
         
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        if self.metadata_index is not None:
+            try:
+                self.metadata_index.upsert(cache_key, metadata)
+            except Exception as e:
+                logger.warning(f"⚠️ 更新缓存元数据索引失败: {e}")
+
+    def _find_candidates(self, symbol: str, data_type: str, market_type: str, data_source: Optional[str],
+                         max_age_hours: float, start_date: str = None, end_date: str = None) -> List[str]:
+        """
+        查找同一股票、同类数据的候选缓存键
+
+        有索引时为一次索引查询（只返回未过期条目，覆盖请求区间的优先）；否则遍历元数据文件。
+        """
+        if self.metadata_index is not None:
+            try:
+                cutoff = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
+                rows = self.metadata_index.find(symbol, data_type, market_type, data_source,
+                                                newer_than=cutoff, start_date=start_date, end_date=end_date)
+                return [row['cache_key'] for row in rows]
+            except Exception as e:
+                logger.warning(f"⚠️ 缓存元数据索引查询失败，使用目录扫描: {e}")
+
+        candidates = []
+        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+
+                if (metadata.get('symbol') == symbol and
+                    metadata.get('data_type') == data_type and
+                    metadata.get('market_type') == market_type and
+                    (data_source is None or metadata.get('data_source') == data_source)):
+                    candidates.append(metadata_file.stem.replace('_meta', ''))
+            except Exception:
+                continue
+        return candidates
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """加载元数据"""
@@ -230,6 +287,41 @@ class StockDataCache:
             logger.error(f"⚠️ 加载元数据失败: {e}")
             return None
     
+    def _memory_key(self, data_type: str, symbol: str, *parts) -> tuple:
+        """L1 内存缓存键：(缓存目录, data_type, symbol, 范围/数据源...)"""
+        return (str(self.cache_dir), data_type, symbol) + parts
+
+    def _read_cache_file(self, metadata: Dict[str, Any]) -> Optional[Union[pd.DataFrame, str]]:
+        """按元数据读取缓存文件"""
+        cache_path = Path(metadata['file_path'])
+        if not cache_path.exists():
+            return None
+        if metadata.get('file_format') == 'csv':
+            return pd.read_csv(cache_path, index_col=0)
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _remember_in_memory(self, memory_key: tuple, cache_key: str, max_age_hours: float):
+        """磁盘命中后把数据放入 L1（过期时间与磁盘缓存一致，元数据文件被重写后自动失效）"""
+        metadata = self._load_metadata(cache_key)
+        if not metadata:
+            return
+        try:
+            age = (datetime.now() - datetime.fromisoformat(metadata['cached_at'])).total_seconds()
+            data = self._read_cache_file(metadata)
+        except Exception as e:
+            logger.debug(f"L1缓存预加载失败: {cache_key}: {e}")
+            return
+        if data is not None:
+            self.memory_cache.put(memory_key, data, ttl_seconds=max_age_hours * 3600 - age,
+                                  alias=(str(self.cache_dir), cache_key),
+                                  validator=file_version(self._get_metadata_path(cache_key)))
+
+    def _forget_in_memory(self, data_type: str, symbol: str):
+        """数据重写后使该股票该类数据的 L1 条目失效（部分匹配的条目可能指向旧缓存键）"""
+        prefix = self._memory_key(data_type, symbol)
+        self.memory_cache.invalidate_where(lambda k: k[:len(prefix)] == prefix)
+
     def is_cache_valid(self, cache_key: str, max_age_hours: int = None, symbol: str = None, data_type: str = None) -> bool:
         """检查缓存是否有效 - 支持智能TTL配置"""
         metadata = self._load_metadata(cache_key)
@@ -324,6 +416,7 @@ class StockDataCache:
             'content_length': len(content_to_check)
         }
         self._save_metadata(cache_key, metadata)
+        self._forget_in_memory('stock_data', symbol)
 
         # 获取描述信息
         cache_type = f"{market_type}_stock_data"
@@ -332,21 +425,17 @@ class StockDataCache:
         return cache_key
     
     def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
-        """从缓存加载股票数据"""
+        """从缓存加载股票数据（优先 L1 内存缓存）"""
+        data = self.memory_cache.get_by_alias((str(self.cache_dir), cache_key), record=False)
+        if data is not None:
+            return data
+
         metadata = self._load_metadata(cache_key)
         if not metadata:
             return None
         
-        cache_path = Path(metadata['file_path'])
-        if not cache_path.exists():
-            return None
-        
         try:
-            if metadata['file_format'] == 'csv':
-                return pd.read_csv(cache_path, index_col=0)
-            else:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+            return self._read_cache_file(metadata)
         except Exception as e:
             logger.error(f"⚠️ 加载缓存数据失败: {e}")
             return None
@@ -374,6 +463,13 @@ class StockDataCache:
             cache_type = f"{market_type}_stock_data"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
 
+        # L1 内存缓存
+        memory_key = self._memory_key('stock_data', symbol, start_date, end_date, data_source, max_age_hours)
+        alias = self.memory_cache.get_alias(memory_key)
+        if alias:
+            logger.debug(f"🧠 L1内存缓存命中: {symbol} -> {alias[1]}")
+            return alias[1]
+
         # 生成查找键
         search_key = self._generate_cache_key("stock_data", symbol,
                                             start_date=start_date,
@@ -385,24 +481,18 @@ class StockDataCache:
         if self.is_cache_valid(search_key, max_age_hours, symbol, 'stock_data'):
             desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
+            self._remember_in_memory(memory_key, search_key, max_age_hours)
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
+        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存，覆盖请求区间的优先）
+        for cache_key in self._find_candidates(symbol, 'stock_data', market_type, data_source,
+                                               max_age_hours, start_date, end_date):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
+                if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
+                    desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+                    logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+                    self._remember_in_memory(memory_key, cache_key, max_age_hours)
+                    return cache_key
             except Exception:
                 continue
 
@@ -486,13 +576,18 @@ class StockDataCache:
             'content_length': len(fundamentals_data)
         }
         self._save_metadata(cache_key, metadata)
+        self._forget_in_memory('fundamentals', symbol)
         
         desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
         logger.info(f"💼 {desc}已缓存: {symbol} ({data_source}) -> {cache_key}")
         return cache_key
     
     def load_fundamentals_data(self, cache_key: str) -> Optional[str]:
-        """从缓存加载基本面数据"""
+        """从缓存加载基本面数据（优先 L1 内存缓存）"""
+        data = self.memory_cache.get_by_alias((str(self.cache_dir), cache_key), record=False)
+        if data is not None:
+            return data
+
         metadata = self._load_metadata(cache_key)
         if not metadata:
             return None
@@ -527,23 +622,22 @@ class StockDataCache:
         if max_age_hours is None:
             cache_type = f"{market_type}_fundamentals"
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
+
+        # L1 内存缓存
+        memory_key = self._memory_key('fundamentals', symbol, data_source, max_age_hours)
+        alias = self.memory_cache.get_alias(memory_key)
+        if alias:
+            logger.debug(f"🧠 L1内存缓存命中: {symbol} -> {alias[1]}")
+            return alias[1]
         
         # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
+        for cache_key in self._find_candidates(symbol, 'fundamentals', market_type, data_source, max_age_hours):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
+                if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
+                    desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+                    logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+                    self._remember_in_memory(memory_key, cache_key, max_age_hours)
+                    return cache_key
             except Exception:
                 continue
         
@@ -555,6 +649,19 @@ class StockDataCache:
         """清理过期缓存"""
         cutoff_time = datetime.now() - timedelta(days=max_age_days)
         cleared_count = 0
+
+        if self.metadata_index is not None:
+            try:
+                expired = self.metadata_index.older_than(cutoff_time.timestamp())
+                for row in expired:
+                    for path in (row.get('file_path'), self._get_metadata_path(row['cache_key'])):
+                        if path and Path(path).exists():
+                            Path(path).unlink()
+                cleared_count = self.metadata_index.delete(row['cache_key'] for row in expired)
+                logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
+                return cleared_count
+            except Exception as e:
+                logger.warning(f"⚠️ 按索引清理缓存失败，使用目录扫描: {e}")
         
         for metadata_file in self.metadata_dir.glob("*_meta.json"):
             try:
@@ -576,6 +683,7 @@ class StockDataCache:
                 logger.warning(f"⚠️ 清理缓存时出错: {e}")
         
         logger.info(f"🧹 已清理 {cleared_count} 个过期缓存文件")
+        return cleared_count
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
@@ -591,6 +699,22 @@ class StockDataCache:
 
         total_size_bytes = 0
 
+        if self.metadata_index is not None:
+            try:
+                by_type, total_size_bytes, stats['skipped_count'] = self.metadata_index.stats()
+                stats['stock_data_count'] = by_type.get('stock_data', 0)
+                stats['news_count'] = by_type.get('news', 0)
+                stats['fundamentals_count'] = by_type.get('fundamentals', 0)
+                stats['total_files'] = sum(by_type.values())
+                if stats['total_files']:
+                    stats['total_size'] = total_size_bytes
+                    stats['total_size_mb'] = round(total_size_bytes / (1024 * 1024), 2)
+                    stats['memory_cache'] = self.memory_cache.stats()
+                    return stats
+            except Exception as e:
+                logger.warning(f"⚠️ 按索引统计缓存失败，使用目录扫描: {e}")
+                total_size_bytes = 0
+
         # 统计有元数据的缓存文件
         metadata_files_count = 0
         for metadata_file in self.metadata_dir.glob("*_meta.json"):
@@ -654,6 +778,7 @@ class StockDataCache:
 
         stats['total_size'] = total_size_bytes  # 字节
         stats['total_size_mb'] = round(total_size_bytes / (1024 * 1024), 2)  # MB
+        stats['memory_cache'] = self.memory_cache.stats()
         return stats
 
     def get_content_length_config_status(self) -> Dict[str, Any]:
@@ -7,6 +7,7 @@
 
 import os
 import logging
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Optional, Union
 import pandas as pd
@@ -16,6 +17,7 @@ from tradingagents.utils.logging_init import setup_dataflow_logging
 
 # 导入原有缓存系统
 from .file_cache import StockDataCache
+from .memory_cache import get_memory_cache
 
 # 导入自适应缓存系统
 try:
@@ -35,6 +37,9 @@ class IntegratedCacheManager:
         
         # 初始化原有缓存系统（作为备用）
         self.legacy_cache = StockDataCache(cache_dir)
+
+        # 进程内 L1 内存缓存（位于 MongoDB/Redis 之前，避免同一分析内重复网络往返）
+        self.memory_cache = get_memory_cache()
         
         # 尝试初始化自适应缓存系统
         self.adaptive_cache = None
@@ -70,6 +75,53 @@ class IntegratedCacheManager:
         else:
             self.logger.info("📁 使用传统文件缓存系统")
     
+    # ==================== L1 内存缓存（自适应后端） ====================
+
+    def _adaptive_find(self, data_type: str, symbol: str, start_date: str = "",
+                       end_date: str = "", data_source: str = "default") -> Optional[str]:
+        """查找自适应缓存；命中时顺带放入 L1，后续 load 无需再访问数据库"""
+        memory_key = ('adaptive', data_type, symbol, start_date, end_date, data_source)
+        alias = self.memory_cache.get_alias(memory_key)
+        if alias:
+            return alias[1]
+
+        cache_key = self.adaptive_cache._get_cache_key(symbol, start_date, end_date, data_source, data_type)
+        entry = self.adaptive_cache.load_entry(cache_key)
+        if entry is None or entry.get('data') is None:
+            return None
+        self._remember_in_memory(memory_key, cache_key, entry)
+        return cache_key
+
+    def _adaptive_load(self, cache_key: str) -> Optional[Any]:
+        """按缓存键加载自适应缓存（优先 L1）"""
+        data = self.memory_cache.get_by_alias(('adaptive', cache_key), record=False)
+        if data is not None:
+            return data
+
+        entry = self.adaptive_cache.load_entry(cache_key)
+        if entry is None:
+            return None
+        meta = entry.get('metadata') or {}
+        memory_key = ('adaptive', meta.get('data_type'), meta.get('symbol'), meta.get('start_date', ""),
+                      meta.get('end_date', ""), meta.get('data_source'))
+        self._remember_in_memory(memory_key, cache_key, entry)
+        return entry.get('data')
+
+    def _remember_in_memory(self, memory_key: tuple, cache_key: str, entry: Dict[str, Any]):
+        """放入 L1，剩余存活时间 = 后端 TTL - 条目年龄"""
+        meta = entry.get('metadata') or {}
+        ttl = self.adaptive_cache._get_ttl_seconds(meta.get('symbol', ''), meta.get('data_type', 'stock_data'))
+        try:
+            ttl -= (datetime.now() - entry['timestamp']).total_seconds()
+        except Exception:
+            pass
+        self.memory_cache.put(memory_key, entry.get('data'), ttl_seconds=ttl, alias=('adaptive', cache_key))
+
+    def _forget_in_memory(self, data_type: str, symbol: str):
+        """本进程重写了某只股票某类数据后，使其 L1 条目失效"""
+        prefix = ('adaptive', data_type, symbol)
+        self.memory_cache.invalidate_where(lambda k: k[:3] == prefix)
+
     def save_stock_data(self, symbol: str, data: Any, start_date: str = None, 
                        end_date: str = None, data_source: str = "default") -> str:
         """
@@ -87,6 +139,7 @@ class IntegratedCacheManager:
         """
         if self.use_adaptive:
             # 使用自适应缓存系统
+            self._forget_in_memory("stock_data", symbol)
             return self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
@@ -117,7 +170,7 @@ class IntegratedCacheManager:
         """
         if self.use_adaptive:
             # 使用自适应缓存系统
-            return self.adaptive_cache.load_data(cache_key)
+            return self._adaptive_load(cache_key)
         else:
             # 使用传统缓存系统
             return self.legacy_cache.load_stock_data(cache_key)
@@ -138,12 +191,12 @@ class IntegratedCacheManager:
         """
         if self.use_adaptive:
             # 使用自适应缓存系统
-            return self.adaptive_cache.find_cached_data(
-                symbol=symbol,
+            return self._adaptive_find(
+                "stock_data",
+                symbol,
                 start_date=start_date or "",
                 end_date=end_date or "",
-                data_source=data_source,
-                data_type="stock_data"
+                data_source=data_source
             )
         else:
             # 使用传统缓存系统
@@ -157,6 +210,7 @@ class IntegratedCacheManager:
     def save_news_data(self, symbol: str, data: Any, data_source: str = "default") -> str:
         """保存新闻数据"""
         if self.use_adaptive:
+            self._forget_in_memory("news_data", symbol)
             return self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
@@ -169,13 +223,14 @@ class IntegratedCacheManager:
     def load_news_data(self, cache_key: str) -> Optional[Any]:
         """加载新闻数据"""
         if self.use_adaptive:
-            return self.adaptive_cache.load_data(cache_key)
+            return self._adaptive_load(cache_key)
         else:
             return self.legacy_cache.load_news_data(cache_key)
     
     def save_fundamentals_data(self, symbol: str, data: Any, data_source: str = "default") -> str:
         """保存基本面数据"""
         if self.use_adaptive:
+            self._forget_in_memory("fundamentals_data", symbol)
             return self.adaptive_cache.save_data(
                 symbol=symbol,
                 data=data,
@@ -188,7 +243,7 @@ class IntegratedCacheManager:
     def load_fundamentals_data(self, cache_key: str) -> Optional[Any]:
         """加载基本面数据"""
         if self.use_adaptive:
-            return self.adaptive_cache.load_data(cache_key)
+            return self._adaptive_load(cache_key)
         else:
             return self.legacy_cache.load_fundamentals_data(cache_key)
 
@@ -243,6 +298,7 @@ class IntegratedCacheManager:
             stats['backend_info']['database_available'] = self.db_manager.is_database_available()
             stats['backend_info']['mongodb_available'] = self.db_manager.is_mongodb_available()
             stats['backend_info']['redis_available'] = self.db_manager.is_redis_available()
+            stats['memory_cache'] = self.memory_cache.stats()
 
             return stats
         else:
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+进程内 L1 内存缓存（按字节数限额的 LRU）
+
+一次分析中，市场/基本面/风险等多个智能体会反复请求同一只股票的 K 线、基本面和新闻。
+文件缓存每次查找都要扫描元数据 JSON 并重新读取 CSV，数据库缓存每次都要一次网络往返。
+本模块在 StockDataCache / IntegratedCacheManager 之前加一层内存缓存：
+
+- 键为 (data_type, symbol, range, source)，另可登记底层缓存键（cache_key）作为别名；
+- 按估算的字节数做 LRU 淘汰，总量不超过 TA_MEMORY_CACHE_MAX_MB；
+- 过期时间沿用各市场的 TTL 配置；
+- 可为条目提供校验函数（如元数据文件的 mtime），底层文件被重写后自动失效；
+- 统计命中/未命中/淘汰/失效次数，供 get_cache_stats 展示。
+"""
+
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at", "alias", "validator", "token")
+
+    def __init__(self, value, size, expires_at, alias, validator, token):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.alias = alias
+        self.validator = validator
+        self.token = token
+
+
+def estimate_size(value: Any) -> int:
+    """估算对象占用的字节数（DataFrame 按 deep memory_usage，其它按序列化长度）"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemoryLRUCache:
+    """线程安全、按字节数限额的 LRU 缓存"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max(0, int(max_bytes))
+        # 单个条目超过总额的 1/4 时不缓存，避免一个大对象冲掉整个缓存
+        self.max_entry_bytes = int(max_entry_bytes) if max_entry_bytes else self.max_bytes // 4
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._aliases: Dict[Hashable, Hashable] = {}
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    # ---- 读写 ----
+    def get(self, key: Hashable, default: Any = None, record: bool = True) -> Any:
+        with self._lock:
+            entry = self._lookup(key, record)
+            return _copy(entry.value) if entry is not None else default
+
+    def get_by_alias(self, alias: Hashable, default: Any = None, record: bool = True) -> Any:
+        with self._lock:
+            key = self._aliases.get(alias)
+            if key is None:
+                if record:
+                    self.misses += 1
+                return default
+            return self.get(key, default, record)
+
+    def get_alias(self, key: Hashable, record: bool = True) -> Optional[Hashable]:
+        """返回有效条目登记的别名（不复制缓存值）"""
+        with self._lock:
+            entry = self._lookup(key, record)
+            return entry.alias if entry is not None else None
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None,
+            alias: Optional[Hashable] = None, validator: Optional[Callable[[], Any]] = None) -> bool:
+        """
+        写入条目
+
+        Args:
+            key: 缓存键
+            value: 缓存值（DataFrame 会在读写时复制，避免调用方修改缓存内容）
+            ttl_seconds: 存活秒数，None 表示不过期（仍受 LRU 淘汰）
+            alias: 别名（如底层缓存键），可通过 get_by_alias 访问；多个键可共用同一别名
+            validator: 返回版本标记的函数；读取时标记变化则视为失效
+
+        Returns:
+            是否写入成功（超过单条目上限或已过期时不写入）
+        """
+        if self.max_bytes <= 0 or (ttl_seconds is not None and ttl_seconds <= 0):
+            return False
+        size = estimate_size(value)
+        if size > self.max_entry_bytes:
+            with self._lock:
+                self.rejected += 1
+            return False
+        token = _call_validator(validator)
+        if validator is not None and token is _MISSING:
+            return False
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(_copy(value), size, expires_at, alias, validator, token)
+            if alias is not None:
+                self._aliases[alias] = key
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self.evictions += 1
+        return True
+
+    # ---- 失效 ----
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+                return True
+            return False
+
+    def invalidate_alias(self, alias: Hashable) -> int:
+        """失效登记了该别名的所有条目"""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.alias == alias]
+            for k in keys:
+                self._remove(k)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """按键条件批量失效，返回失效条目数"""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                self._remove(k)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self.current_bytes = 0
+
+    # ---- 统计 ----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'rejected': self.rejected,
+            }
+
+    # ---- 内部 ----
+    def _lookup(self, key: Hashable, record: bool) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None or not self._is_fresh(key, entry):
+            if record:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if record:
+            self.hits += 1
+        return entry
+
+    def _is_fresh(self, key: Hashable, entry: _Entry) -> bool:
+        if entry.expires_at is not None and time.monotonic() >= entry.expires_at:
+            self._remove(key)
+            self.expirations += 1
+            return False
+        if entry.validator is not None and _call_validator(entry.validator) != entry.token:
+            self._remove(key)
+            self.invalidations += 1
+            return False
+        return True
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.current_bytes -= entry.size
+        if entry.alias is not None and self._aliases.get(entry.alias) == key:
+            del self._aliases[entry.alias]
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+def _call_validator(validator: Optional[Callable[[], Any]]) -> Any:
+    if validator is None:
+        return None
+    try:
+        return validator()
+    except Exception:
+        return _MISSING
+
+
+def file_version(path) -> Callable[[], Tuple[int, int]]:
+    """返回基于文件 mtime/size 的校验函数（文件被重写或删除后校验失败）"""
+    def check():
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    return check
+
+
+_memory_cache: Optional[MemoryLRUCache] = None
+_memory_cache_lock = threading.Lock()
+
+
+def get_memory_cache() -> MemoryLRUCache:
+    """获取进程级 L1 内存缓存（TA_MEMORY_CACHE_MAX_MB=0 时禁用）"""
+    global _memory_cache
+    if _memory_cache is None:
+        with _memory_cache_lock:
+            if _memory_cache is None:
+                max_mb = float(os.getenv('TA_MEMORY_CACHE_MAX_MB', '128'))
+                _memory_cache = MemoryLRUCache(int(max_mb * 1024 * 1024))
+                logger.info(f"🧠 L1内存缓存已初始化: 上限 {max_mb:.0f}MB")
+    return _memory_cache
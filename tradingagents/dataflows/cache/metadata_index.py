@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+文件缓存元数据索引（SQLite）
+
+StockDataCache 为每个缓存条目写一个 metadata/*_meta.json。原先的查找、过期清理和统计
+都要 glob 并逐个解析这些 JSON，条目数到数万时每次查找都是一次目录遍历。
+
+本模块在缓存目录下维护一个 SQLite 表，保存时同步写入，查找/覆盖区间搜索/过期清理/统计
+均改为带索引的查询。*_meta.json 仍然保留（兼容旧版本，也是 L1 内存缓存的失效依据）；
+首次启用索引时从已有的 JSON 文件重建。
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache_key      TEXT PRIMARY KEY,
+    symbol         TEXT,
+    data_type      TEXT,
+    market_type    TEXT,
+    data_source    TEXT,
+    start_date     TEXT,
+    end_date       TEXT,
+    cached_at      REAL,
+    file_path      TEXT,
+    file_format    TEXT,
+    content_length INTEGER,
+    file_size      INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_cache_lookup
+    ON cache_entries (symbol, data_type, data_source, start_date, end_date, cached_at);
+CREATE INDEX IF NOT EXISTS idx_cache_cached_at ON cache_entries (cached_at);
+"""
+
+_COLUMNS = ("cache_key", "symbol", "data_type", "market_type", "data_source", "start_date",
+            "end_date", "cached_at", "file_path", "file_format", "content_length", "file_size")
+
+
+def _to_timestamp(value: Union[str, datetime, float, None]) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class CacheMetadataIndex:
+    """文件缓存元数据的 SQLite 索引（线程安全，WAL 模式支持多进程读写）"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                pass
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # ---- 写入 ----
+    def upsert(self, cache_key: str, metadata: Dict[str, Any]):
+        """写入/更新一个条目（metadata 与 *_meta.json 内容一致）"""
+        file_path = metadata.get('file_path')
+        file_size = None
+        if file_path:
+            try:
+                file_size = Path(file_path).stat().st_size
+            except OSError:
+                file_size = None
+        row = (
+            cache_key,
+            metadata.get('symbol'),
+            metadata.get('data_type'),
+            metadata.get('market_type'),
+            metadata.get('data_source'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            _to_timestamp(metadata.get('cached_at')),
+            file_path,
+            metadata.get('file_format'),
+            metadata.get('content_length'),
+            file_size,
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO cache_entries ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                row,
+            )
+
+    def delete(self, cache_keys: Iterable[str]) -> int:
+        keys = [(k,) for k in cache_keys]
+        if not keys:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM cache_entries WHERE cache_key = ?", keys)
+            self._conn.execute("COMMIT")
+        return len(keys)
+
+    def rebuild(self, metadata_dir: Path) -> int:
+        """从 *_meta.json 重建索引，返回条目数"""
+        rows = []
+        for metadata_file in metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    rows.append((metadata_file.stem[:-len('_meta')], json.load(f)))
+            except Exception:
+                continue
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.execute("COMMIT")
+        for cache_key, metadata in rows:
+            try:
+                self.upsert(cache_key, metadata)
+            except Exception as e:
+                logger.debug(f"索引条目写入失败 {cache_key}: {e}")
+        logger.info(f"🗂️ 缓存元数据索引已重建: {len(rows)} 条")
+        return len(rows)
+
+    # ---- 查询 ----
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+    def find(self, symbol: str, data_type: str, market_type: Optional[str] = None,
+             data_source: Optional[str] = None, newer_than: Optional[float] = None,
+             start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        查找匹配条目：覆盖请求区间 [start_date, end_date] 的条目优先，其次按缓存时间倒序
+
+        Args:
+            newer_than: 只返回 cached_at 晚于该时间戳的条目（即未过期）
+        """
+        sql = ["SELECT * FROM cache_entries WHERE symbol = ? AND data_type = ?"]
+        params: List[Any] = [symbol, data_type]
+        if market_type is not None:
+            sql.append("AND market_type = ?")
+            params.append(market_type)
+        if data_source is not None:
+            sql.append("AND data_source = ?")
+            params.append(data_source)
+        if newer_than is not None:
+            sql.append("AND cached_at > ?")
+            params.append(newer_than)
+        covers = "(start_date IS NOT NULL AND end_date IS NOT NULL AND start_date <= ? AND end_date >= ?)"
+        sql.append(f"ORDER BY {covers} DESC, cached_at DESC")
+        params += [start_date or "", end_date or ""]
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(" ".join(sql), params).fetchall()]
+
+    def older_than(self, timestamp: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cache_key, file_path FROM cache_entries WHERE cached_at < ?", (timestamp,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def stats(self) -> Tuple[Dict[str, int], int, int]:
+        """返回 ({data_type: 条目数}, 文件总字节数, 无数据文件的条目数)"""
+        with self._lock:
+            by_type = {r[0]: r[1] for r in self._conn.execute(
+                "SELECT data_type, COUNT(*) FROM cache_entries GROUP BY data_type")}
+            total_size, missing = self._conn.execute(
+                "SELECT COALESCE(SUM(file_size), 0), SUM(CASE WHEN file_size IS NULL THEN 1 ELSE 0 END) "
+                "FROM cache_entries").fetchone()
+        return by_type, int(total_size or 0), int(missing or 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -218,6 +218,59 @@ class MongoDBCacheAdapter:
             logger.warning(f"⚠️ 获取历史数据失败: {e}")
             return None
     
+    def get_historical_data_bulk(self, symbols: List[str], start_date: str = None, end_date: str = None,
+                                 period: str = "daily") -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的历史数据：一次 $in 查询，每只股票取优先级最高且有数据的数据源
+
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            period: 数据周期（daily/weekly/monthly），默认为daily
+
+        Returns:
+            {股票代码: DataFrame}，没有数据的股票不在结果中
+        """
+        if not self.use_app_cache or self.db is None or not symbols:
+            return {}
+
+        try:
+            code_map = {str(s).split('.')[0].zfill(6): s for s in symbols}
+            # A股批量查询共用同一数据源优先级
+            priority_order = self._get_data_source_priority(next(iter(code_map)))
+
+            query = {
+                "symbol": {"$in": list(code_map)},
+                "period": period,
+                "data_source": {"$in": priority_order},
+            }
+            date_cond = {}
+            if start_date:
+                date_cond["$gte"] = start_date
+            if end_date:
+                date_cond["$lte"] = end_date
+            if date_cond:
+                query["trade_date"] = date_cond
+
+            data = list(self.db.stock_daily_quotes.find(query, {"_id": 0}))
+            if not data:
+                logger.warning(f"⚠️ [数据来源: MongoDB] 批量查询无{period}数据: {len(code_map)}只股票")
+                return {}
+
+            df = pd.DataFrame(data)
+            rank = df["data_source"].map({src: i for i, src in enumerate(priority_order)})
+            df = df[rank == rank.groupby(df["symbol"]).transform("min")]
+            df = df.sort_values(["symbol", "trade_date"], kind="mergesort")
+
+            result = {code_map[code]: g.reset_index(drop=True) for code, g in df.groupby("symbol", sort=False)}
+            logger.info(f"✅ [数据来源: MongoDB] 批量获取{period}数据: {len(result)}/{len(code_map)}只股票, {len(df)}条记录")
+            return result
+
+        except Exception as e:
+            logger.warning(f"⚠️ 批量获取历史数据失败: {e}")
+            return {}
+
     def get_financial_data(self, symbol: str, report_period: str = None) -> Optional[Dict[str, Any]]:
         """获取财务数据，按数据源优先级查询"""
         if not self.use_app_cache or self.db is None:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+按股票分列存储的价格历史（内存映射 NumPy）
+
+StockstatsUtils 原先每次调用都用 pd.read_csv 读取 {symbol}-YFin-data-*.csv 并重新解析日期，
+online 模式每天还要重新下载 15 年的完整历史。本模块把价格历史转换为列式存储：
+
+    <root>/<SYMBOL>/meta.json   列名、dtype、行数、数据来源、最后更新日期
+    <root>/<SYMBOL>/c<i>.bin    每列一个定长二进制文件（日期为 datetime64[D]）
+
+- 读取时按 meta.json 中的行数对列文件做 np.memmap，得到零拷贝的只读列视图，不再解析 CSV；
+- 新 K 线以追加方式写入列文件末尾，最后原子替换 meta.json（读者只看 meta 中的行数，
+  追加过程中不会读到半写入的数据）；
+- 整体重写时先写入临时目录再替换，不依赖 pyarrow 等额外依赖。
+
+转换已有的 CSV 缓存和冷/热加载基准见 scripts/development/price_store_tool.py。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+DATE_COLUMN = "Date"
+_META_FILE = "meta.json"
+_DATE_DTYPE = np.dtype("datetime64[D]")
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """日期列截取前 10 位（YYYY-mm-dd，忽略时区/时间），其余列转为数值，按日期去重排序"""
+    if DATE_COLUMN not in df.columns:
+        raise ValueError(f"价格数据缺少 {DATE_COLUMN} 列")
+    out = pd.DataFrame(index=range(len(df)))
+    dates = df[DATE_COLUMN]
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.strftime("%Y-%m-%d")
+    out[DATE_COLUMN] = pd.to_datetime(dates.astype(str).str[:10]).to_numpy()
+    for col in df.columns:
+        if col == DATE_COLUMN:
+            continue
+        values = df[col]
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)):
+            values = pd.to_numeric(values, errors="coerce")
+        out[str(col)] = values.to_numpy()
+    out = out.drop_duplicates(subset=DATE_COLUMN, keep="first")
+    return out.sort_values(DATE_COLUMN, kind="stable").reset_index(drop=True)
+
+
+class ColumnarPriceStore:
+    """按股票分列存储的价格历史"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    # ---- 元数据 ----
+    def symbol_dir(self, symbol: str) -> Path:
+        return self.root / symbol.replace("/", "_").upper()
+
+    def meta_path(self, symbol: str) -> Path:
+        return self.symbol_dir(symbol) / _META_FILE
+
+    def meta(self, symbol: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.meta_path(symbol), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def exists(self, symbol: str) -> bool:
+        return self.meta(symbol) is not None
+
+    def last_date(self, symbol: str) -> Optional[str]:
+        meta = self.meta(symbol)
+        return meta.get("last_date") if meta else None
+
+    # ---- 读取 ----
+    def read_columns(self, symbol: str) -> Dict[str, np.ndarray]:
+        """返回 {列名: 只读 np.memmap}（日期列为 datetime64[D]），不存在时抛出 FileNotFoundError"""
+        meta = self.meta(symbol)
+        if meta is None:
+            raise FileNotFoundError(f"列式价格数据不存在: {symbol}")
+        rows = int(meta["rows"])
+        directory = self.symbol_dir(symbol)
+        columns = {}
+        for spec in meta["columns"]:
+            dtype = np.dtype(spec["dtype"])
+            if rows == 0:
+                columns[spec["name"]] = np.empty(0, dtype=dtype)
+            else:
+                columns[spec["name"]] = np.memmap(directory / spec["file"], dtype=dtype, mode="r", shape=(rows,))
+        return columns
+
+    def read_frame(self, symbol: str) -> pd.DataFrame:
+        """
+        读取为 DataFrame（Date 列为 YYYY-mm-dd 字符串，与 stockstats 的用法一致）
+
+        数值列从内存映射直接复制，无解析开销；返回的 DataFrame 可自由修改。
+        """
+        columns = self.read_columns(symbol)
+        data = {}
+        for name, values in columns.items():
+            if name == DATE_COLUMN:
+                data[name] = np.datetime_as_string(values, unit="D").astype(object)
+            else:
+                data[name] = np.array(values)
+        return pd.DataFrame(data)
+
+    # ---- 写入 ----
+    def write(self, symbol: str, df: pd.DataFrame, source: Optional[Dict[str, Any]] = None,
+              updated: Optional[str] = None) -> int:
+        """整体重写某只股票的价格历史，返回行数"""
+        frame = _normalize_frame(df)
+        target = self.symbol_dir(symbol)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            tmp_dir = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=self.root))
+            try:
+                specs = []
+                for i, name in enumerate(frame.columns):
+                    values = frame[name].to_numpy()
+                    if name == DATE_COLUMN:
+                        values = values.astype(_DATE_DTYPE)
+                    values = np.ascontiguousarray(values)
+                    file_name = f"c{i}.bin"
+                    values.tofile(tmp_dir / file_name)
+                    specs.append({"name": name, "dtype": values.dtype.str, "file": file_name})
+                self._write_meta(tmp_dir, {
+                    "columns": specs,
+                    "rows": len(frame),
+                    "last_date": self._last_date(frame),
+                    "source": source,
+                    "updated": updated,
+                })
+                backup = None
+                if target.exists():
+                    backup = target.with_name(f".{target.name}.old")
+                    shutil.rmtree(backup, ignore_errors=True)
+                    os.replace(target, backup)
+                os.replace(tmp_dir, target)
+                if backup is not None:
+                    shutil.rmtree(backup, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        return len(frame)
+
+    def append(self, symbol: str, df: pd.DataFrame, updated: Optional[str] = None) -> int:
+        """
+        追加新 K 线（只追加晚于已有最后日期的行），返回追加行数
+
+        列结构与已有数据不一致时改为整体重写（保留已有历史）。
+        """
+        meta = self.meta(symbol)
+        if meta is None:
+            return self.write(symbol, df, updated=updated)
+        frame = _normalize_frame(df)
+        if meta.get("last_date"):
+            frame = frame[frame[DATE_COLUMN] > np.datetime64(meta["last_date"], "D")]
+
+        names = [spec["name"] for spec in meta["columns"]]
+        if len(frame) and set(frame.columns) != set(names):
+            merged = pd.concat([self.read_frame(symbol), frame.assign(
+                **{DATE_COLUMN: np.datetime_as_string(frame[DATE_COLUMN].to_numpy(), unit="D")})],
+                ignore_index=True)
+            self.write(symbol, merged, source=meta.get("source"), updated=updated)
+            return len(frame)
+
+        directory = self.symbol_dir(symbol)
+        rows = int(meta["rows"])
+        with self._lock:
+            if len(frame):
+                for spec in meta["columns"]:
+                    dtype = np.dtype(spec["dtype"])
+                    values = np.ascontiguousarray(frame[spec["name"]].to_numpy().astype(dtype, copy=False))
+                    with open(directory / spec["file"], "r+b" if (directory / spec["file"]).exists() else "wb") as f:
+                        # 截掉上次中断的追加可能留下的尾部数据
+                        f.truncate(rows * dtype.itemsize)
+                        f.seek(0, os.SEEK_END)
+                        values.tofile(f)
+                meta["rows"] = rows + len(frame)
+                meta["last_date"] = self._last_date(frame)
+            if updated is not None:
+                meta["updated"] = updated
+            self._write_meta(directory, meta)
+        return len(frame)
+
+    def import_csv(self, csv_path: Union[str, Path], symbol: str, updated: Optional[str] = None) -> int:
+        """从 CSV 构建列式数据（记录来源文件的 mtime/size，供判断是否需要重新导入）"""
+        csv_path = Path(csv_path)
+        data = pd.read_csv(csv_path)
+        return self.write(symbol, data, source=self.source_info(csv_path), updated=updated)
+
+    @staticmethod
+    def source_info(path: Union[str, Path]) -> Dict[str, Any]:
+        st = os.stat(path)
+        return {"path": str(Path(path).resolve()), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def is_fresh_for(self, symbol: str, csv_path: Union[str, Path]) -> bool:
+        """列式数据是否由该 CSV 的当前版本构建"""
+        meta = self.meta(symbol)
+        if meta is None or not meta.get("source"):
+            return False
+        try:
+            current = self.source_info(csv_path)
+        except OSError:
+            return False
+        source = meta["source"]
+        return source.get("mtime_ns") == current["mtime_ns"] and source.get("size") == current["size"]
+
+    def delete(self, symbol: str):
+        shutil.rmtree(self.symbol_dir(symbol), ignore_errors=True)
+
+    # ---- 内部 ----
+    @staticmethod
+    def _last_date(frame: pd.DataFrame) -> Optional[str]:
+        if frame.empty:
+            return None
+        return str(np.datetime_as_string(frame[DATE_COLUMN].to_numpy()[-1], unit="D"))
+
+    @staticmethod
+    def _write_meta(directory: Path, meta: Dict[str, Any]):
+        meta["written_at"] = datetime.now().isoformat()
+        tmp = directory / f".{_META_FILE}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, directory / _META_FILE)
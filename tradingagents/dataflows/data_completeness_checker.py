@@ -6,7 +6,7 @@
 
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -150,6 +150,43 @@ class DataCompletenessChecker:
             self.logger.error(f"❌ 检查数据完整性失败: {e}")
             return False, f"检查失败: {str(e)}", details
     
+    def check_coverage(
+        self,
+        last_dates: Dict[str, str],
+        market: str = "CN",
+        latest_trade_date: Optional[str] = None
+    ) -> Tuple[bool, str, dict]:
+        """
+        根据覆盖图批量检查哪些股票缺少最新交易日数据
+
+        Args:
+            last_dates: {symbol: 最后交易日 (YYYY-MM-DD)}，即历史数据服务的覆盖图
+            market: 市场类型 (CN/HK/US)
+            latest_trade_date: 最新交易日，默认自动获取
+
+        Returns:
+            (is_complete, message, details)
+        """
+        latest_trade_date = latest_trade_date or self._get_latest_trade_date(market)
+        missing = sorted(
+            symbol for symbol, last in last_dates.items()
+            if latest_trade_date and last < latest_trade_date
+        )
+        details = {
+            "market": market,
+            "latest_trade_date": latest_trade_date,
+            "total_symbols": len(last_dates),
+            "missing_latest_count": len(missing),
+            "missing_latest_symbols": missing,
+            "completeness_ratio": (1 - len(missing) / len(last_dates)) if last_dates else 0.0,
+        }
+
+        if not last_dates:
+            return False, "覆盖图为空", details
+        if missing:
+            return False, f"⚠️ {len(missing)}/{len(last_dates)} 只股票缺少最新交易日 {latest_trade_date} 的数据", details
+        return True, f"✅ {len(last_dates)} 只股票均已包含最新交易日 {latest_trade_date}", details
+
     def _parse_data_to_dataframe(self, data: str) -> Optional[pd.DataFrame]:
         """将数据字符串解析为 DataFrame"""
         try:
@@ -192,16 +229,11 @@ class DataCompletenessChecker:
             if market == "CN":
                 # A股：使用 Tushare 查找最新交易日
                 from tradingagents.dataflows.providers.china.tushare import TushareProvider
-                import asyncio
+                from tradingagents.utils.async_bridge import run_coro_sync
                 
                 provider = TushareProvider()
                 if provider.is_available():
-                    loop = asyncio.get_event_loop()
-                    if loop.is_closed():
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                    
-                    latest_date = loop.run_until_complete(provider.find_latest_trade_date())
+                    latest_date = run_coro_sync(provider.find_latest_trade_date())
                     if latest_date:
                         return latest_date
             
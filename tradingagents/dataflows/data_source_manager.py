@@ -7,7 +7,6 @@
 import os
 import time
 import asyncio
-import threading
 
 from typing import Dict, List, Optional, Any
 from enum import Enum
@@ -28,6 +27,7 @@ logger = setup_dataflow_logging()
 from tradingagents.constants import DataSourceCode
 from tradingagents.dataflows.providers.china.bonds import AKShareBondProvider
 from tradingagents.utils.instrument_validator import normalize_bond_code
+from tradingagents.utils.async_bridge import run_coro_sync
 
 
 class ChinaDataSource(Enum):
@@ -708,55 +708,10 @@ class DataSourceManager:
             if 'date' in data.columns:
                 data = data.sort_values('date')
 
-            # 计算移动平均线
-            data['ma5'] = data['close'].rolling(window=5, min_periods=1).mean()
-            data['ma10'] = data['close'].rolling(window=10, min_periods=1).mean()
-            data['ma20'] = data['close'].rolling(window=20, min_periods=1).mean()
-            data['ma60'] = data['close'].rolling(window=60, min_periods=1).mean()
-
-            # 计算RSI（相对强弱指标）- 同花顺风格：使用中国式SMA（EMA with adjust=True）
+            # 计算 MA / RSI（同花顺风格：中国式SMA）/ MACD / 布林带，统一指标管线单遍完成
             # 参考：https://blog.csdn.net/u011218867/article/details/117427927
-            # 同花顺/通达信的RSI使用SMA函数，等价于pandas的ewm(com=N-1, adjust=True)
-            delta = data['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-
-            # RSI6 - 使用中国式SMA
-            avg_gain6 = gain.ewm(com=5, adjust=True).mean()  # com = N - 1
-            avg_loss6 = loss.ewm(com=5, adjust=True).mean()
-            rs6 = avg_gain6 / avg_loss6.replace(0, np.nan)
-            data['rsi6'] = 100 - (100 / (1 + rs6))
-
-            # RSI12 - 使用中国式SMA
-            avg_gain12 = gain.ewm(com=11, adjust=True).mean()
-            avg_loss12 = loss.ewm(com=11, adjust=True).mean()
-            rs12 = avg_gain12 / avg_loss12.replace(0, np.nan)
-            data['rsi12'] = 100 - (100 / (1 + rs12))
-
-            # RSI24 - 使用中国式SMA
-            avg_gain24 = gain.ewm(com=23, adjust=True).mean()
-            avg_loss24 = loss.ewm(com=23, adjust=True).mean()
-            rs24 = avg_gain24 / avg_loss24.replace(0, np.nan)
-            data['rsi24'] = 100 - (100 / (1 + rs24))
-
-            # 保留RSI14作为国际标准参考（使用简单移动平均）
-            gain14 = gain.rolling(window=14, min_periods=1).mean()
-            loss14 = loss.rolling(window=14, min_periods=1).mean()
-            rs14 = gain14 / loss14.replace(0, np.nan)
-            data['rsi14'] = 100 - (100 / (1 + rs14))
-
-            # 计算MACD
-            ema12 = data['close'].ewm(span=12, adjust=False).mean()
-            ema26 = data['close'].ewm(span=26, adjust=False).mean()
-            data['macd_dif'] = ema12 - ema26
-            data['macd_dea'] = data['macd_dif'].ewm(span=9, adjust=False).mean()
-            data['macd'] = (data['macd_dif'] - data['macd_dea']) * 2
-
-            # 计算布林带
-            data['boll_mid'] = data['close'].rolling(window=20, min_periods=1).mean()
-            std = data['close'].rolling(window=20, min_periods=1).std()
-            data['boll_upper'] = data['boll_mid'] + 2 * std
-            data['boll_lower'] = data['boll_mid'] - 2 * std
+            from tradingagents.tools.analysis.indicators import add_all_indicators
+            data = add_all_indicators(data, close_col='close', rsi_style='china')
 
             logger.info(f"✅ [技术指标] 技术指标计算完成")
 
@@ -1033,27 +988,115 @@ class DataSourceManager:
 
         return out
 
-    def _run_coro_safely(self, coro):
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                result_box = {}
-                err_box = {}
-                def runner():
+    def get_stock_dataframes(self, symbols: List[str], start_date: str = None, end_date: str = None,
+                             period: str = "daily", as_frame: bool = False):
+        """
+        批量获取多只股票的 DataFrame（每个数据源一次批量查询，按优先级逐级补齐缺失股票）
+
+        - MongoDB：一次 $in 查询
+        - Tushare：daily/weekly/monthly 多代码批量请求（按 6000 行上限分块）
+        - AKShare/BaoStock：无多代码接口，只为仍缺失的股票逐只获取（AKShare 有限并发）
+
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期，默认一年前
+            end_date: 结束日期，默认今天
+            period: 数据周期（daily/weekly/monthly），默认为daily
+            as_frame: 为 True 时返回带 code 列的长表，否则返回 {股票代码: DataFrame}
+
+        Returns:
+            {股票代码: DataFrame}（列标准同 get_stock_dataframe，失败的股票不在结果中），或合并后的长表
+        """
+        from datetime import datetime, timedelta
+
+        symbols = list(dict.fromkeys(str(s) for s in symbols if s))
+        end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+        logger.info(f"📊 [批量DataFrame接口] 获取{len(symbols)}只股票数据 ({start_date} 到 {end_date})")
+
+        frames: Dict[str, pd.DataFrame] = {}
+        sources = [ChinaDataSource.MONGODB] if self.use_mongodb_cache else []
+        if symbols:
+            sources += self._get_data_source_priority_order(symbols[0])
+
+        for source in sources:
+            missing = [s for s in symbols if s not in frames]
+            if not missing:
+                break
+            try:
+                fetched = self._fetch_dataframes_from_source(source, missing, start_date, end_date, period)
+            except Exception as e:
+                logger.warning(f"⚠️ [批量DataFrame接口] {source.value} 失败: {e}")
+                continue
+            for symbol, df in fetched.items():
+                if df is not None and not df.empty:
+                    frames[symbol] = self._standardize_bulk_dataframe(df, symbol)
+            logger.info(f"✅ [批量DataFrame接口] {source.value}: {len(fetched)}/{len(missing)}只股票")
+
+        failed = [s for s in symbols if s not in frames]
+        if failed:
+            logger.warning(f"⚠️ [批量DataFrame接口] 所有数据源都失败: {failed[:20]}{'...' if len(failed) > 20 else ''}")
+
+        if as_frame:
+            return pd.concat(frames.values(), ignore_index=True) if frames else pd.DataFrame()
+        return frames
+
+    def _fetch_dataframes_from_source(self, source: ChinaDataSource, symbols: List[str],
+                                      start_date: str, end_date: str, period: str) -> Dict[str, pd.DataFrame]:
+        """从单个数据源批量获取，返回 {股票代码: 原始DataFrame}"""
+        if source == ChinaDataSource.MONGODB:
+            adapter = self._get_mongodb_adapter()
+            return adapter.get_historical_data_bulk(symbols, start_date, end_date, period=period) if adapter else {}
+
+        if source == ChinaDataSource.TUSHARE:
+            provider = self._get_tushare_adapter()
+            if provider is None:
+                return {}
+            return self._run_coro_safely(provider.get_historical_data_batch(symbols, start_date, end_date, period))
+
+        if source == ChinaDataSource.AKSHARE:
+            provider = self._get_akshare_adapter()
+            concurrency = 4
+        elif source == ChinaDataSource.BAOSTOCK:
+            provider = self._get_baostock_adapter()
+            concurrency = 1  # BaoStock 每次调用都会登录/登出，不做并发
+        else:
+            return {}
+        if provider is None:
+            return {}
+
+        async def fetch_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch(symbol):
+                async with semaphore:
                     try:
-                        result_box['v'] = asyncio.run(coro)
+                        return symbol, await provider.get_historical_data(symbol, start_date, end_date, period)
                     except Exception as e:
-                        err_box['e'] = e
-                t = threading.Thread(target=runner, daemon=True)
-                t.start()
-                t.join()
-                if 'e' in err_box:
-                    raise err_box['e']
-                return result_box.get('v')
-            else:
-                return loop.run_until_complete(coro)
-        except RuntimeError:
-            return asyncio.run(coro)
+                        logger.debug(f"⚠️ [批量DataFrame接口] {source.value} 获取{symbol}失败: {e}")
+                        return symbol, None
+
+            results = await asyncio.gather(*(fetch(s) for s in symbols))
+            return {s: df for s, df in results if df is not None and not df.empty}
+
+        return self._run_coro_safely(fetch_all())
+
+    def _standardize_bulk_dataframe(self, df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        """标准化批量结果：日期索引转为列、统一 code 列，再走 _standardize_dataframe"""
+        out = df
+        if 'date' not in out.columns and 'trade_date' not in out.columns and out.index.name in ('date', 'trade_date'):
+            out = out.reset_index()
+        # 同时存在 symbol 和 code 时，映射后会出现重复的 code 列
+        out = out.drop(columns=[c for c in ('symbol', 'code') if c in out.columns])
+        if 'date' in out.columns and 'trade_date' in out.columns:
+            out = out.drop(columns=['trade_date'])
+        out = self._standardize_dataframe(out).reset_index(drop=True)
+        out['code'] = symbol
+        return out
+
+    def _run_coro_safely(self, coro, timeout: Optional[float] = None):
+        """在同步上下文中执行协程（经由进程级常驻事件循环，复用连接池）"""
+        return run_coro_sync(coro, timeout=timeout)
 
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None, period: str = "daily") -> str:
         """
@@ -1335,17 +1378,6 @@ class DataSourceManager:
                 # 获取股票基本信息
                 provider = self._get_tushare_adapter()
                 if provider:
-                    import asyncio
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_closed():
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                    except RuntimeError:
-                        # 在线程池中没有事件循环，创建新的
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-
                     stock_info = self._run_coro_safely(provider.get_stock_basic_info(symbol))
                     stock_name = stock_info.get('name', f'股票{symbol}') if stock_info else f'股票{symbol}'
                 else:
@@ -1363,17 +1395,6 @@ class DataSourceManager:
                 return f"❌ Tushare提供器不可用"
 
             # 使用异步方法获取历史数据
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_closed():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-            except RuntimeError:
-                # 在线程池中没有事件循环，创建新的
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
             data = self._run_coro_safely(provider.get_historical_data(symbol, start_date, end_date))
 
             if data is not None and not data.empty:
@@ -1418,17 +1439,6 @@ class DataSourceManager:
             provider = get_akshare_provider()
 
             # 使用异步方法获取历史数据
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_closed():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-            except RuntimeError:
-                # 在线程池中没有事件循环，创建新的
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
             data = self._run_coro_safely(provider.get_historical_data(symbol, start_date, end_date, period))
 
             duration = time.time() - start_time
@@ -1462,17 +1472,6 @@ class DataSourceManager:
         provider = get_baostock_provider()
 
         # 使用异步方法获取历史数据
-        import asyncio
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-        except RuntimeError:
-            # 在线程池中没有事件循环，创建新的
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
         data = self._run_coro_safely(provider.get_historical_data(symbol, start_date, end_date, period))
 
         if data is not None and not data.empty:
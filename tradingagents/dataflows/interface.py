@@ -206,6 +206,7 @@ except ImportError as e:
 from tradingagents.config.config_manager import config_manager
 # from tradingagents.dataflows.providers.china.bonds import AKShareBondProvider  # 暂时注释：bonds.py 文件不存在
 from tradingagents.utils.instrument_validator import normalize_bond_code
+from tradingagents.utils.async_bridge import run_coro_sync
 from .data_source_manager import get_data_source_manager
 
 # 获取数据目录
@@ -656,18 +657,9 @@ def get_reddit_company_news(
 
 # ==================== 债券统一接口（BOND_CN） ====================
 
-def _run_coro_safely(coro):
-    """Run an async coroutine from sync context safely using a worker thread when needed."""
-    try:
-        # If no running loop, run directly
-        asyncio.get_running_loop()
-        from concurrent.futures import ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=1) as ex:
-            fut = ex.submit(asyncio.run, coro)
-            return fut.result()
-    except RuntimeError:
-        # No running loop
-        return asyncio.run(coro)
+def _run_coro_safely(coro, timeout: Optional[float] = None):
+    """在同步上下文中执行协程（经由进程级常驻事件循环）"""
+    return run_coro_sync(coro, timeout=timeout)
 
 
 def get_cn_bond_data_unified(code: str, start_date: str, end_date: str, period: str = "daily") -> str:
@@ -804,39 +796,36 @@ def get_stock_stats_indicators_window(
     curr_date = datetime.strptime(curr_date, "%Y-%m-%d")
     before = curr_date - relativedelta(days=look_back_days)
 
-    if not online:
-        # read from YFin data
-        data = pd.read_csv(
-            os.path.join(
-                DATA_DIR,
-                f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-            )
+    # 价格数据只加载一次、指标在完整历史上只计算一次，再截取窗口（原先每天各算一遍）
+    try:
+        window = StockstatsUtils.get_stock_stats_window(
+            symbol,
+            [indicator],
+            before.strftime("%Y-%m-%d"),
+            curr_date.strftime("%Y-%m-%d"),
+            os.path.join(DATA_DIR, "market_data", "price_data"),
+            online=online,
         )
-        data["Date"] = pd.to_datetime(data["Date"], utc=True)
-        dates_in_df = data["Date"].astype(str).str[:10]
-
-        ind_string = ""
-        while curr_date >= before:
-            # only do the trading dates
-            if curr_date.strftime("%Y-%m-%d") in dates_in_df.values:
-                indicator_value = get_stockstats_indicator(
-                    symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-                )
-
-                ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
-
-            curr_date = curr_date - relativedelta(days=1)
-    else:
-        # online gathering
-        ind_string = ""
-        while curr_date >= before:
-            indicator_value = get_stockstats_indicator(
-                symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-            )
-
-            ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
-
-            curr_date = curr_date - relativedelta(days=1)
+        values = {date: str(value) for date, value in window[indicator].items()}
+    except Exception as e:
+        if not online:
+            raise
+        print(
+            f"Error getting stockstats indicator data for indicator {indicator} from {before.strftime('%Y-%m-%d')} to {end_date}: {e}"
+        )
+        values = None
+
+    ind_string = ""
+    while curr_date >= before:
+        day = curr_date.strftime("%Y-%m-%d")
+        if values is None:
+            ind_string += f"{day}: \n"
+        elif day in values:
+            ind_string += f"{day}: {values[day]}\n"
+        elif online:
+            # online 模式输出所有自然日，非交易日给出提示
+            ind_string += f"{day}: N/A: Not a trading day (weekend or holiday)\n"
+        curr_date = curr_date - relativedelta(days=1)
 
     result_str = (
         f"## {indicator} values from {before.strftime('%Y-%m-%d')} to {end_date}:\n\n"
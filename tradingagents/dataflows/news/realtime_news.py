@@ -9,13 +9,16 @@ import json
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 import time
 import os
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from dataclasses import asdict, dataclass
 
 # 导入日志模块
 from tradingagents.config.runtime_settings import get_timezone_name
+from tradingagents.dataflows.news.near_duplicates import cluster_near_duplicates
 
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -32,6 +35,30 @@ class NewsItem:
     url: str
     urgency: str  # high, medium, low
     relevance_score: float
+    coverage: int = 1  # 近似重复聚类后，报道同一事件的新闻条数
+
+
+@dataclass
+class NewsSourceMetric:
+    """单个新闻源的获取指标"""
+    source: str
+    status: str  # ok, empty, timeout, error, skipped
+    count: int = 0
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+# 新闻源请求共用的线程池（超时的请求在后台线程中自行结束，不阻塞调用方）
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+_fetch_executor_lock = threading.Lock()
+
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="news-source")
+        return _fetch_executor
 
 
 class RealtimeNewsAggregator:
@@ -47,6 +74,13 @@ class RealtimeNewsAggregator:
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
 
+        # 单个新闻源与整体的超时预算（秒）
+        self.source_timeout = float(os.getenv('NEWS_SOURCE_TIMEOUT_SECONDS', '8'))
+        self.total_timeout = float(os.getenv('NEWS_TOTAL_TIMEOUT_SECONDS', '12'))
+
+        # 最近一次聚合的结构化指标（各源状态、条数、耗时）
+        self.last_metrics: Dict[str, Any] = {}
+
     def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
         """
         获取实时股票新闻
@@ -59,62 +93,21 @@ class RealtimeNewsAggregator:
         """
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now(ZoneInfo(get_timezone_name()))
-        all_news = []
-
-        # 1. FinnHub实时新闻 (最高优先级)
-        logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
-        finnhub_start = datetime.now(ZoneInfo(get_timezone_name()))
-        finnhub_news = self._get_finnhub_realtime_news(ticker, hours_back)
-        finnhub_time = (datetime.now(ZoneInfo(get_timezone_name())) - finnhub_start).total_seconds()
 
-        if finnhub_news:
-            logger.info(f"[新闻聚合器] 成功从 FinnHub 获取 {len(finnhub_news)} 条新闻，耗时: {finnhub_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
-
-        all_news.extend(finnhub_news)
-
-        # 2. Alpha Vantage新闻
-        logger.info(f"[新闻聚合器] 尝试从 Alpha Vantage 获取 {ticker} 的新闻")
-        av_start = datetime.now(ZoneInfo(get_timezone_name()))
-        av_news = self._get_alpha_vantage_news(ticker, hours_back)
-        av_time = (datetime.now(ZoneInfo(get_timezone_name())) - av_start).total_seconds()
-
-        if av_news:
-            logger.info(f"[新闻聚合器] 成功从 Alpha Vantage 获取 {len(av_news)} 条新闻，耗时: {av_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
-
-        all_news.extend(av_news)
-
-        # 3. NewsAPI (如果配置了)
+        # 各新闻源并发获取（优先级体现在合并顺序上，去重时保留靠前来源的新闻）
+        sources = [
+            ("FinnHub", self._get_finnhub_realtime_news),
+            ("Alpha Vantage", self._get_alpha_vantage_news),
+        ]
         if self.newsapi_key:
-            logger.info(f"[新闻聚合器] 尝试从 NewsAPI 获取 {ticker} 的新闻")
-            newsapi_start = datetime.now(ZoneInfo(get_timezone_name()))
-            newsapi_news = self._get_newsapi_news(ticker, hours_back)
-            newsapi_time = (datetime.now(ZoneInfo(get_timezone_name())) - newsapi_start).total_seconds()
-
-            if newsapi_news:
-                logger.info(f"[新闻聚合器] 成功从 NewsAPI 获取 {len(newsapi_news)} 条新闻，耗时: {newsapi_time:.2f}秒")
-            else:
-                logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
-
-            all_news.extend(newsapi_news)
+            sources.append(("NewsAPI", self._get_newsapi_news))
         else:
             logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
+        sources.append(("中文财经", self._get_chinese_finance_news))
 
-        # 4. 中文财经新闻源
-        logger.info(f"[新闻聚合器] 尝试获取 {ticker} 的中文财经新闻")
-        chinese_start = datetime.now(ZoneInfo(get_timezone_name()))
-        chinese_news = self._get_chinese_finance_news(ticker, hours_back)
-        chinese_time = (datetime.now(ZoneInfo(get_timezone_name())) - chinese_start).total_seconds()
-
-        if chinese_news:
-            logger.info(f"[新闻聚合器] 成功获取 {len(chinese_news)} 条中文财经新闻，耗时: {chinese_time:.2f}秒")
-        else:
-            logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
-
-        all_news.extend(chinese_news)
+        all_news, source_metrics = self._fetch_sources_concurrently(sources, ticker, hours_back)
+        if not self.newsapi_key:
+            source_metrics.insert(2, NewsSourceMetric(source="NewsAPI", status="skipped"))
 
         # 去重和排序
         logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
@@ -131,6 +124,22 @@ class RealtimeNewsAggregator:
         total_time = (datetime.now(ZoneInfo(get_timezone_name())) - start_time).total_seconds()
         logger.info(f"[新闻聚合器] {ticker} 的新闻聚合完成，总共获取 {len(sorted_news)} 条新闻，总耗时: {total_time:.2f}秒")
 
+        self.last_metrics = {
+            "ticker": ticker,
+            "total_seconds": round(total_time, 3),
+            "dedup_seconds": round(dedup_time, 3),
+            "news_count": len(sorted_news),
+            "duplicates_removed": removed_count,
+            "timed_out": [m.source for m in source_metrics if m.status == "timeout"],
+            "sources": [asdict(m) for m in source_metrics],
+        }
+        logger.info(
+            f"[新闻聚合器] 新闻源指标: " + ", ".join(
+                f"{m.source}={m.status}/{m.count}条/{m.elapsed_seconds:.2f}秒" for m in source_metrics
+            ),
+            extra={"news_metrics": self.last_metrics}
+        )
+
         # 限制新闻数量为最新的max_news条
         if len(sorted_news) > max_news:
             original_count = len(sorted_news)
@@ -144,6 +153,58 @@ class RealtimeNewsAggregator:
 
         return sorted_news
 
+    def _fetch_sources_concurrently(self, sources, ticker: str, hours_back: int):
+        """
+        并发请求各新闻源
+
+        每个源有独立的超时预算（source_timeout），同时整体不超过 total_timeout；
+        超时的源记为 timeout 并被放弃（后台线程自行结束），返回已拿到的部分结果。
+
+        Returns:
+            (按 sources 顺序合并的新闻列表, 各源的 NewsSourceMetric 列表)
+        """
+        started = time.monotonic()
+        overall_deadline = started + self.total_timeout
+        executor = _get_fetch_executor()
+        futures = [
+            (name, executor.submit(self._timed_fetch, fetch, ticker, hours_back))
+            for name, fetch in sources
+        ]
+
+        all_news: List[NewsItem] = []
+        metrics: List[NewsSourceMetric] = []
+        for name, future in futures:
+            budget = min(started + self.source_timeout, overall_deadline) - time.monotonic()
+            try:
+                items, elapsed = future.result(timeout=max(0.0, budget))
+            except FuturesTimeoutError:
+                future.cancel()
+                waited = time.monotonic() - started
+                logger.warning(f"[新闻聚合器] {name} 超时（{waited:.2f}秒），放弃该新闻源的结果")
+                metrics.append(NewsSourceMetric(source=name, status="timeout", elapsed_seconds=round(waited, 3)))
+                continue
+            except Exception as e:
+                logger.error(f"[新闻聚合器] {name} 获取失败: {e}")
+                metrics.append(NewsSourceMetric(source=name, status="error",
+                                                elapsed_seconds=round(time.monotonic() - started, 3), error=str(e)))
+                continue
+
+            if items:
+                logger.info(f"[新闻聚合器] 成功从 {name} 获取 {len(items)} 条新闻，耗时: {elapsed:.2f}秒")
+            else:
+                logger.info(f"[新闻聚合器] {name} 未返回新闻，耗时: {elapsed:.2f}秒")
+            metrics.append(NewsSourceMetric(source=name, status="ok" if items else "empty",
+                                            count=len(items), elapsed_seconds=round(elapsed, 3)))
+            all_news.extend(items)
+
+        return all_news, metrics
+
+    @staticmethod
+    def _timed_fetch(fetch, ticker: str, hours_back: int):
+        began = time.monotonic()
+        items = fetch(ticker, hours_back) or []
+        return items, time.monotonic() - began
+
     def _get_finnhub_realtime_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
         """获取FinnHub实时新闻"""
         if not self.finnhub_key:
@@ -163,7 +224,7 @@ class RealtimeNewsAggregator:
                 'token': self.finnhub_key
             }
 
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.source_timeout)
             response.raise_for_status()
 
             news_data = response.json()
@@ -208,7 +269,7 @@ class RealtimeNewsAggregator:
                 'limit': 50
             }
 
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.source_timeout)
             response.raise_for_status()
 
             data = response.json()
@@ -268,7 +329,7 @@ class RealtimeNewsAggregator:
                 'apiKey': self.newsapi_key
             }
 
-            response = requests.get(url, params=params, headers=self.headers)
+            response = requests.get(url, params=params, headers=self.headers, timeout=self.source_timeout)
             response.raise_for_status()
 
             data = response.json()
@@ -598,13 +659,42 @@ class RealtimeNewsAggregator:
             seen_titles.add(title_key)
             unique_news.append(item)
 
+        # 近似重复聚类：同一通稿的多个转载版本只保留最佳代表，簇大小记为覆盖度
+        clusters = cluster_near_duplicates([n.title for n in unique_news], [n.content for n in unique_news])
+        near_duplicate_count = len(unique_news) - len(clusters)
+        if near_duplicate_count:
+            unique_news = [self._pick_cluster_representative([unique_news[i] for i in members])
+                           for members in clusters]
+
         # 记录去重结果
         time_taken = (datetime.now(ZoneInfo(get_timezone_name())) - start_time).total_seconds()
         logger.info(f"[新闻去重] 去重完成，原始新闻: {len(news_items)}条，去重后: {len(unique_news)}条，")
-        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
+        logger.info(f"[新闻去重] 去除重复: {duplicate_count}条，近似重复: {near_duplicate_count}条，"
+                    f"标题过短: {short_title_count}条，耗时: {time_taken:.2f}秒")
 
         return unique_news
 
+    @staticmethod
+    def _pick_cluster_representative(members: List[NewsItem]) -> NewsItem:
+        """
+        簇内选相关度最高、紧急度最高、内容最完整的一条，其余并入覆盖度
+
+        members 按新闻源合并顺序排列（即来源优先级），以上都相同时保留优先级高的来源。
+        """
+        urgency_rank = {'high': 2, 'medium': 1, 'low': 0}
+        best = members[max(range(len(members)), key=lambda i: (
+            members[i].relevance_score,
+            urgency_rank.get(members[i].urgency, 0),
+            len(members[i].content or ""),
+            -i,
+        ))]
+        best.coverage = sum(n.coverage for n in members)
+        return best
+
+    @staticmethod
+    def _coverage_note(news: NewsItem) -> str:
+        return f" | **覆盖**: {news.coverage}家媒体报道" if news.coverage > 1 else ""
+
     def format_news_report(self, news_items: List[NewsItem], ticker: str) -> str:
         """格式化新闻报告"""
         logger.info(f"[新闻报告] 开始为 {ticker} 生成新闻报告")
@@ -642,14 +732,14 @@ class RealtimeNewsAggregator:
             report += "## 🚨 紧急新闻\n\n"
             for news in high_urgency[:3]:  # 最多显示3条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}{self._coverage_note(news)}\n"
                 report += f"{news.content}\n\n"
 
         if medium_urgency:
             report += "## 📢 重要新闻\n\n"
             for news in medium_urgency[:5]:  # 最多显示5条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}{self._coverage_note(news)}\n"
                 report += f"{news.content}\n\n"
 
         # 添加时效性说明
@@ -33,6 +33,7 @@ class TushareProvider(BaseStockDataProvider):
         self.api = None
         self.config = get_provider_config("tushare")
         self.token_source = None  # 记录 Token 来源: 'database' 或 'env'
+        self._rate_limiter = None  # 与同步服务共用的 Tushare 速率限制器（首次请求时获取）
 
         if not TUSHARE_AVAILABLE:
             self.logger.error("❌ Tushare库未安装，请运行: pip install tushare")
@@ -585,8 +586,144 @@ class TushareProvider(BaseStockDataProvider):
             )
             return None
     
+    async def get_historical_data_batch(
+        self,
+        symbols: List[str],
+        start_date: Union[str, date],
+        end_date: Union[str, date] = None,
+        period: str = "daily"
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的历史数据（前复权）
+
+        daily/weekly/monthly 接口支持逗号分隔的多个 ts_code，单次最多返回 6000 行；
+        按日期跨度分块，每块一次行情请求 + 一次复权因子请求，按 pro_bar 的方式计算前复权。
+        每次请求前经过 Tushare 速率限制器；失败的分块直接跳过，由调用方回退到其它数据源。
+
+        Returns:
+            {股票代码: DataFrame}（格式与 get_historical_data 相同），无数据的股票不在结果中
+        """
+        if not self.is_available() or not symbols:
+            return {}
+
+        start_str = self._format_date(start_date)
+        end_str = self._format_date(end_date) if end_date else datetime.now().strftime('%Y%m%d')
+        api_method = {"weekly": self.api.weekly, "monthly": self.api.monthly}.get(period, self.api.daily)
+
+        code_map = {self._normalize_ts_code(s): s for s in symbols}
+        ts_codes = list(code_map)
+        # 每块行数 = 股票数 × 区间内的周期数，需不超过单次 6000 行上限
+        bars = len(pd.bdate_range(start_str, end_str, freq={"weekly": "W", "monthly": "ME"}.get(period, "B"))) or 1
+        per_call = max(1, 6000 // (bars + 1))
+
+        result: Dict[str, pd.DataFrame] = {}
+        for i in range(0, len(ts_codes), per_call):
+            chunk = ",".join(ts_codes[i:i + per_call])
+            try:
+                await self._acquire_rate_limit()
+                df = await asyncio.to_thread(api_method, ts_code=chunk, start_date=start_str, end_date=end_str)
+                if df is None or df.empty:
+                    continue
+                await self._acquire_rate_limit()
+                factors = await asyncio.to_thread(
+                    self.api.adj_factor, ts_code=chunk, start_date=start_str, end_date=end_str
+                )
+                df = self._apply_qfq(df, factors)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 批量获取{period}历史数据失败（{chunk[:40]}...）: {e}")
+                continue
+
+            for ts_code, group in df.groupby('ts_code', sort=False):
+                result[code_map.get(ts_code, ts_code)] = self._standardize_historical_data(group.copy())
+
+        self.logger.info(f"✅ 批量获取{period}历史数据: {len(result)}/{len(symbols)}只股票 (前复权 qfq)")
+        return result
+
+    async def _acquire_rate_limit(self):
+        """获取调用许可：复用后端同步服务的 Tushare 速率限制器（单例），独立运行时不限速"""
+        if self._rate_limiter is None:
+            try:
+                from app.core.config import settings
+                from app.core.rate_limiter import get_tushare_rate_limiter
+                self._rate_limiter = get_tushare_rate_limiter(
+                    tier=getattr(settings, "TUSHARE_TIER", "standard"),
+                    safety_margin=float(getattr(settings, "TUSHARE_RATE_LIMIT_SAFETY_MARGIN", "0.8")),
+                )
+            except Exception as e:
+                self.logger.debug(f"Tushare 速率限制器不可用，批量请求不限速: {e}")
+                self._rate_limiter = False
+        if self._rate_limiter:
+            await self._rate_limiter.acquire()
+
+    @staticmethod
+    def _apply_qfq(df: pd.DataFrame, factors: Optional[pd.DataFrame],
+                   latest_factors: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        按 pro_bar 的方式计算前复权价格：价格 × 当日复权因子 / 区间内最新复权因子
+
+        latest_factors（ts_code -> 复权因子）指定基准因子，用于分多次处理同一区间时保持同一基准；
+        未包含的股票以 df 内最新因子为基准。
+        """
+        if factors is None or factors.empty:
+            return df
+        df = df.merge(factors[['ts_code', 'trade_date', 'adj_factor']], on=['ts_code', 'trade_date'], how='left')
+        df['adj_factor'] = df.groupby('ts_code')['adj_factor'].transform(lambda s: s.bfill().ffill())
+        latest = df.sort_values('trade_date').groupby('ts_code')['adj_factor'].transform('last')
+        if latest_factors is not None:
+            latest = df['ts_code'].map(latest_factors).fillna(latest.reindex(df.index))
+        ratio = (df['adj_factor'] / latest.reindex(df.index)).fillna(1.0)
+        for col in ('open', 'high', 'low', 'close', 'pre_close'):
+            if col in df.columns:
+                df[col] = (df[col] * ratio).round(2)
+        return df.drop(columns=['adj_factor'])
+
+    # ==================== 按交易日的全市场接口 ====================
+
+    async def get_trade_dates(self, start_date: Union[str, date], end_date: Union[str, date] = None) -> List[str]:
+        """获取区间内的交易日（YYYYMMDD，升序），一次 trade_cal 请求"""
+        if not self.is_available():
+            return []
+        start_str = self._format_date(start_date)
+        end_str = self._format_date(end_date) if end_date else datetime.now().strftime('%Y%m%d')
+        df = await asyncio.to_thread(
+            self.api.trade_cal, exchange='SSE', start_date=start_str, end_date=end_str, is_open='1'
+        )
+        if df is None or df.empty:
+            return []
+        return sorted(df['cal_date'].astype(str).tolist())
+
+    async def get_daily_by_trade_date(self, trade_date: Union[str, date]) -> Optional[pd.DataFrame]:
+        """获取某个交易日全市场的日线行情（未复权，一次 daily 请求）"""
+        if not self.is_available():
+            return None
+        df = await asyncio.to_thread(self.api.daily, trade_date=self._format_date(trade_date))
+        return df if df is not None and not df.empty else None
+
+    async def get_adj_factor_by_trade_date(self, trade_date: Union[str, date]) -> Optional[pd.DataFrame]:
+        """获取某个交易日全市场的复权因子（一次 adj_factor 请求）"""
+        if not self.is_available():
+            return None
+        df = await asyncio.to_thread(self.api.adj_factor, trade_date=self._format_date(trade_date))
+        return df if df is not None and not df.empty else None
+
+    @classmethod
+    def standardize_market_daily(cls, daily: pd.DataFrame, factors: Optional[pd.DataFrame],
+                                 latest_factors: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        把按交易日获取的全市场行情整理为按股票区分的长表
+
+        前复权与 get_historical_data 对同一区间调用 pro_bar 的结果一致（以区间内每只股票最新的复权因子为基准，
+        逐日处理时由 latest_factors 传入该基准）；
+        返回列：symbol（6位代码）、date（datetime）以及行情列，按 symbol、date 排序。
+        """
+        df = cls._apply_qfq(daily, factors, latest_factors)
+        df = df.rename(columns={'trade_date': 'date', 'vol': 'volume'})
+        df['date'] = pd.to_datetime(df['date'].astype(str), format='%Y%m%d')
+        df.insert(0, 'symbol', df['ts_code'].str.split('.').str[0])
+        return df.sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+
     # ==================== 扩展接口 ====================
-    
+
     async def get_daily_basic(self, trade_date: str) -> Optional[pd.DataFrame]:
         """获取每日基础财务数据"""
         if not self.is_available():
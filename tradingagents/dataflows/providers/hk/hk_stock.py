@@ -266,31 +266,9 @@ class HKStockProvider:
             else:
                 data = data.sort_index()
 
-            # 计算移动平均线
-            data['ma5'] = data['Close'].rolling(window=5, min_periods=1).mean()
-            data['ma10'] = data['Close'].rolling(window=10, min_periods=1).mean()
-            data['ma20'] = data['Close'].rolling(window=20, min_periods=1).mean()
-            data['ma60'] = data['Close'].rolling(window=60, min_periods=1).mean()
-
-            # 计算RSI（相对强弱指标）
-            delta = data['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-            rs = gain / (loss.replace(0, np.nan))
-            data['rsi'] = 100 - (100 / (1 + rs))
-
-            # 计算MACD
-            ema12 = data['Close'].ewm(span=12, adjust=False).mean()
-            ema26 = data['Close'].ewm(span=26, adjust=False).mean()
-            data['macd_dif'] = ema12 - ema26
-            data['macd_dea'] = data['macd_dif'].ewm(span=9, adjust=False).mean()
-            data['macd'] = (data['macd_dif'] - data['macd_dea']) * 2
-
-            # 计算布林带
-            data['boll_mid'] = data['Close'].rolling(window=20, min_periods=1).mean()
-            std = data['Close'].rolling(window=20, min_periods=1).std()
-            data['boll_upper'] = data['boll_mid'] + 2 * std
-            data['boll_lower'] = data['boll_mid'] - 2 * std
+            # 计算 MA / RSI14（简单移动平均）/ MACD / 布林带，统一指标管线单遍完成
+            from tradingagents.tools.analysis.indicators import add_all_indicators
+            data = add_all_indicators(data, close_col='Close', high_col='High', low_col='Low', rsi_style='sma')
 
             # 只保留最后3-5天的数据用于展示（减少token消耗）
             display_rows = min(5, len(data))
@@ -1,16 +1,170 @@
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from stockstats import wrap
-from typing import Annotated
+from typing import Annotated, Iterable, Optional
 import os
 from tradingagents.config.config_manager import config_manager
+from tradingagents.dataflows.cache.price_store import ColumnarPriceStore
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
 
 def get_config():
     """兼容性包装函数"""
     return config_manager.load_settings()
 
 
+def _paths_version(paths: Iterable) -> tuple:
+    """文件 (mtime_ns, size) 组合，用作 L1 缓存校验（文件不存在记为 None）"""
+    versions = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            versions.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            versions.append(None)
+    return tuple(versions)
+
+
 class StockstatsUtils:
+    @staticmethod
+    def _load_price_frame(symbol: str, data_dir: str, online: bool) -> pd.DataFrame:
+        """
+        读取价格数据并用 stockstats 包装（Date 列为 YYYY-mm-dd 开头的字符串）
+
+        价格历史优先从列式存储（内存映射 NumPy，见 cache/price_store.py）读取，不再每次解析 CSV；
+        online 模式每天只增量下载新 K 线。原始价格数据另放在 L1 内存缓存中，
+        同一只股票的多个指标、多次调用只读一次；每次返回的都是独立副本，在其上计算指标不会污染缓存。
+        """
+        from tradingagents.dataflows.cache.memory_cache import get_memory_cache
+
+        start_date = end_date = None
+        if not online:
+            data_file = os.path.join(data_dir, f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv")
+            store_root = data_dir
+        else:
+            # Get today's date as YYYY-mm-dd to add to cache
+            today_date = pd.Timestamp.today()
+            start_date = (today_date - pd.DateOffset(years=15)).strftime("%Y-%m-%d")
+            end_date = today_date.strftime("%Y-%m-%d")
+
+            # Get config and ensure cache directory exists
+            config = get_config()
+            os.makedirs(config["data_cache_dir"], exist_ok=True)
+            data_file = os.path.join(
+                config["data_cache_dir"],
+                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
+            )
+            store_root = config["data_cache_dir"]
+
+        store = StockstatsUtils._price_store(store_root)
+        if store is not None:
+            watched = [data_file, store.meta_path(symbol)] if not online else [store.meta_path(symbol)]
+            memory_key = ("stockstats_prices", str(store.symbol_dir(symbol)), end_date)
+        else:
+            watched = [data_file]
+            memory_key = ("stockstats_prices", os.path.abspath(data_file))
+
+        memory_cache = get_memory_cache()
+        data = memory_cache.get(memory_key)
+        if data is None:
+            data = None
+            if store is not None:
+                try:
+                    data = StockstatsUtils._read_from_store(store, symbol, data_file, online, start_date, end_date)
+                except FileNotFoundError:
+                    raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+                except Exception as e:
+                    logger.warning(f"⚠️ 列式价格存储读取失败，回退到 CSV: {symbol}: {e}")
+            if data is None:
+                data = StockstatsUtils._read_from_csv(symbol, data_file, online, start_date, end_date)
+            memory_cache.put(memory_key, data, validator=lambda: _paths_version(watched))
+
+        return wrap(data)
+
+    @staticmethod
+    def _price_store(root: str) -> Optional[ColumnarPriceStore]:
+        """TA_PRICE_STORE_ENABLED=false 时禁用列式存储，沿用 CSV"""
+        if os.getenv("TA_PRICE_STORE_ENABLED", "true").lower() in ("false", "0", "no", "off"):
+            return None
+        return ColumnarPriceStore(os.path.join(root, "columnar"))
+
+    @staticmethod
+    def _download(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        data = yf.download(
+            symbol,
+            start=start_date,
+            end=end_date,
+            multi_level_index=False,
+            progress=False,
+            auto_adjust=True,
+        )
+        return data.reset_index()
+
+    @staticmethod
+    def _read_from_store(
+        store: ColumnarPriceStore, symbol: str, data_file: str, online: bool,
+        start_date: Optional[str], end_date: Optional[str],
+    ) -> pd.DataFrame:
+        if not online:
+            # 离线 CSV 更新后重新导入；CSV 已删除但列式数据还在时直接使用
+            if os.path.exists(data_file):
+                if not store.is_fresh_for(symbol, data_file):
+                    store.import_csv(data_file, symbol)
+            elif not store.exists(symbol):
+                raise FileNotFoundError(data_file)
+            return store.read_frame(symbol)
+
+        meta = store.meta(symbol)
+        if meta is None:
+            if os.path.exists(data_file):
+                store.import_csv(data_file, symbol, updated=end_date)
+            else:
+                store.write(symbol, StockstatsUtils._download(symbol, start_date, end_date), updated=end_date)
+        elif meta.get("updated") != end_date:
+            last_date = meta.get("last_date") or start_date
+            try:
+                recent = StockstatsUtils._download(symbol, last_date, end_date)
+                if StockstatsUtils._history_adjusted(store, symbol, recent, last_date):
+                    # auto_adjust 的复权价在除权除息后整体变化，重新下载完整历史
+                    logger.info(f"🔄 {symbol} 复权价发生变化，重建列式价格历史")
+                    store.write(symbol, StockstatsUtils._download(symbol, start_date, end_date), updated=end_date)
+                else:
+                    appended = store.append(symbol, recent, updated=end_date)
+                    logger.debug(f"📈 {symbol} 列式价格历史追加 {appended} 条")
+            except Exception as e:
+                logger.warning(f"⚠️ {symbol} 增量更新失败，使用已有价格历史: {e}")
+        return store.read_frame(symbol)
+
+    @staticmethod
+    def _history_adjusted(store: ColumnarPriceStore, symbol: str, recent: pd.DataFrame, last_date: str) -> bool:
+        """比较重叠日（已存的最后一天）的收盘价，判断复权价是否变化"""
+        if recent.empty or "Close" not in recent.columns:
+            return False
+        dates = pd.to_datetime(recent["Date"]).dt.strftime("%Y-%m-%d")
+        overlap = recent.loc[dates == last_date, "Close"]
+        stored = store.read_columns(symbol)
+        if overlap.empty or "Close" not in stored or len(stored["Close"]) == 0:
+            return False
+        return not np.isclose(float(stored["Close"][-1]), float(overlap.iloc[0]), rtol=1e-6)
+
+    @staticmethod
+    def _read_from_csv(
+        symbol: str, data_file: str, online: bool, start_date: Optional[str], end_date: Optional[str],
+    ) -> pd.DataFrame:
+        if not online:
+            try:
+                return pd.read_csv(data_file)
+            except FileNotFoundError:
+                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+        if os.path.exists(data_file):
+            data = pd.read_csv(data_file)
+        else:
+            data = StockstatsUtils._download(symbol, start_date, end_date)
+            data.to_csv(data_file, index=False)
+        data["Date"] = pd.to_datetime(data["Date"]).dt.strftime("%Y-%m-%d")
+        return data
+
     @staticmethod
     def get_stock_stats(
         symbol: Annotated[str, "ticker symbol for the company"],
@@ -29,57 +183,8 @@ class StockstatsUtils:
             "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
         ] = False,
     ):
-        df = None
-        data = None
-
-        if not online:
-            try:
-                data = pd.read_csv(
-                    os.path.join(
-                        data_dir,
-                        f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-                    )
-                )
-                df = wrap(data)
-            except FileNotFoundError:
-                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
-        else:
-            # Get today's date as YYYY-mm-dd to add to cache
-            today_date = pd.Timestamp.today()
-            curr_date = pd.to_datetime(curr_date)
-
-            end_date = today_date
-            start_date = today_date - pd.DateOffset(years=15)
-            start_date = start_date.strftime("%Y-%m-%d")
-            end_date = end_date.strftime("%Y-%m-%d")
-
-            # Get config and ensure cache directory exists
-            config = get_config()
-            os.makedirs(config["data_cache_dir"], exist_ok=True)
-
-            data_file = os.path.join(
-                config["data_cache_dir"],
-                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
-            )
-
-            if os.path.exists(data_file):
-                data = pd.read_csv(data_file)
-                data["Date"] = pd.to_datetime(data["Date"])
-            else:
-                data = yf.download(
-                    symbol,
-                    start=start_date,
-                    end=end_date,
-                    multi_level_index=False,
-                    progress=False,
-                    auto_adjust=True,
-                )
-                data = data.reset_index()
-                data.to_csv(data_file, index=False)
-
-            df = wrap(data)
-            df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-            curr_date = curr_date.strftime("%Y-%m-%d")
+        df = StockstatsUtils._load_price_frame(symbol, data_dir, online)
+        curr_date = pd.to_datetime(curr_date).strftime("%Y-%m-%d")
 
         df[indicator]  # trigger stockstats to calculate the indicator
         matching_rows = df[df["Date"].str.startswith(curr_date)]
@@ -89,3 +194,43 @@ class StockstatsUtils:
             return indicator_value
         else:
             return "N/A: Not a trading day (weekend or holiday)"
+
+    @staticmethod
+    def get_stock_stats_window(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicators: Annotated[
+            list, "quantitative indicators based off of the stock data for the company"
+        ],
+        start_date: Annotated[str, "window start date, YYYY-mm-dd"],
+        end_date: Annotated[str, "window end date (inclusive), YYYY-mm-dd"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> pd.DataFrame:
+        """
+        一次性计算多个指标在 [start_date, end_date] 窗口内的取值
+
+        价格数据只加载一次，每个指标在完整历史上只计算一次（保证均线等指标的预热期完整），
+        再按日期向量化截取窗口。
+
+        Returns:
+            以交易日（YYYY-mm-dd）为索引、每个指标一列的 DataFrame，按日期升序
+        """
+        df = StockstatsUtils._load_price_frame(symbol, data_dir, online)
+        for indicator in indicators:
+            df[indicator]  # trigger stockstats to calculate the indicator
+
+        dates = df["Date"].astype(str).str[:10]
+        window = pd.DataFrame(
+            {indicator: df[indicator].values for indicator in indicators},
+            index=dates.values,
+        )
+        # 与逐日查询一致：同一日期有多行时取第一行
+        window = window[~window.index.duplicated(keep="first")]
+        window = window[(window.index >= start_date) & (window.index <= end_date)]
+        return window.sort_index()
@@ -17,6 +17,14 @@ DEFAULT_CONFIG = {
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # 分析师并行执行（各分析师作为独立分支，全部完成后进入研究辩论）
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
+    # 任务开始时并发预取各分析师需要的数据（统一工具优先读取预取结果）
+    "data_prefetch_enabled": os.getenv("DATA_PREFETCH_ENABLED", "true").lower() == "true",
+    # LLM 响应缓存（相同模型、参数、消息和工具时直接复用上次的回复，默认关闭）
+    "llm_cache_enabled": os.getenv("LLM_RESPONSE_CACHE_ENABLED", "false").lower() == "true",
+    "llm_cache_ttl_hours": float(os.getenv("LLM_RESPONSE_CACHE_TTL_HOURS", "24")),
+    "llm_cache_max_mb": float(os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "256")),
     # Tool settings - 从环境变量读取，提供默认值
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
@@ -0,0 +1,54 @@
+# TradingAgents/graph/node_timing.py
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+
+class NodeTimingRecorder:
+    """记录图中各节点的实际执行时间
+
+    原先按相邻两个 stream chunk 的时间间隔给节点计时，只在节点严格串行时成立；
+    分析师并行执行时节点相互重叠，改为由节点自身记录起止时间（同名节点多次执行时累加）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: List[Tuple[str, float, float]] = []
+
+    def reset(self):
+        with self._lock:
+            self._spans = []
+
+    def wrap(self, name: str, node: Any) -> Callable:
+        """包装节点函数或 Runnable（如 ToolNode），执行时记录耗时"""
+        is_runnable = isinstance(node, Runnable)
+
+        def timed_node(state, config: RunnableConfig):
+            start = time.time()
+            try:
+                return node.invoke(state, config) if is_runnable else node(state)
+            finally:
+                end = time.time()
+                with self._lock:
+                    self._spans.append((name, start, end))
+
+        timed_node.__name__ = f"timed_{name}"
+        return timed_node
+
+    def spans(self) -> List[Tuple[str, float, float]]:
+        with self._lock:
+            return list(self._spans)
+
+    def timings(self) -> Dict[str, float]:
+        """{节点名: 累计执行秒数}，按首次执行顺序排列"""
+        timings: Dict[str, float] = {}
+        for name, start, end in sorted(self.spans(), key=lambda s: s[1]):
+            timings[name] = timings.get(name, 0.0) + (end - start)
+        return timings
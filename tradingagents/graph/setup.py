@@ -1,6 +1,7 @@
 # TradingAgents/graph/setup.py
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
@@ -10,11 +11,20 @@ from tradingagents.agents.utils.agent_states import AgentState
 from tradingagents.agents.utils.agent_utils import Toolkit
 
 from .conditional_logic import ConditionalLogic
+from .node_timing import NodeTimingRecorder
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+# 各分析师写入的报告字段与工具调用计数字段（并行分支只把这两个字段合并回主图）
+ANALYST_STATE_KEYS = {
+    "market": ("market_report", "market_tool_call_count"),
+    "social": ("sentiment_report", "sentiment_tool_call_count"),
+    "news": ("news_report", "news_tool_call_count"),
+    "fundamentals": ("fundamentals_report", "fundamentals_tool_call_count"),
+}
+
 
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
@@ -47,9 +57,11 @@ class GraphSetup:
         self.conditional_logic = conditional_logic
         self.config = config or {}
         self.react_llm = react_llm
+        self.node_timer = NodeTimingRecorder()
 
     def setup_graph(
-        self, selected_analysts=["market", "social", "news", "fundamentals"]
+        self, selected_analysts=["market", "social", "news", "fundamentals"],
+        parallel_analysts: Optional[bool] = None,
     ):
         """Set up and compile the agent workflow graph.
 
@@ -59,9 +71,14 @@ class GraphSetup:
                 - "social": Social media analyst
                 - "news": News analyst
                 - "fundamentals": Fundamentals analyst
+            parallel_analysts (bool): 分析师是否作为并行分支执行（默认读取配置 parallel_analysts）。
+                并行模式下每个分析师的"分析-工具"循环编译为消息通道独立的子图，
+                全部完成后再进入研究辩论；串行模式保持 market → social → news → fundamentals 的顺序。
         """
         if len(selected_analysts) == 0:
             raise ValueError("Trading Agents Graph Setup Error: no analysts selected!")
+        if parallel_analysts is None:
+            parallel_analysts = bool(self.config.get("parallel_analysts", False))
 
         # Create analyst nodes
         analyst_nodes = {}
@@ -159,49 +176,72 @@ class GraphSetup:
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
+        # 节点均经计时包装，节点并行重叠时 propagate 仍能得到准确的节点耗时
+        timed = self.node_timer.wrap
+
+        if parallel_analysts:
+            # 并行模式：每个分析师作为一个分支节点，START 扇出，全部完成后汇合到 Bull Researcher
+            analyst_names = []
+            for analyst_type in selected_analysts:
+                name = f"{analyst_type.capitalize()} Analyst"
+                workflow.add_node(
+                    name,
+                    self._build_analyst_branch(
+                        analyst_type, analyst_nodes[analyst_type], tool_nodes[analyst_type]
+                    ),
+                )
+                workflow.add_edge(START, name)
+                analyst_names.append(name)
+            logger.info(f"🔀 分析师并行执行: {', '.join(analyst_names)}")
+        else:
+            # Add analyst nodes to the graph
+            for analyst_type, node in analyst_nodes.items():
+                workflow.add_node(f"{analyst_type.capitalize()} Analyst", timed(f"{analyst_type.capitalize()} Analyst", node))
+                workflow.add_node(
+                    f"Msg Clear {analyst_type.capitalize()}",
+                    timed(f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]),
+                )
+                workflow.add_node(f"tools_{analyst_type}", timed(f"tools_{analyst_type}", tool_nodes[analyst_type]))
 
         # Add other nodes
-        workflow.add_node("Bull Researcher", bull_researcher_node)
-        workflow.add_node("Bear Researcher", bear_researcher_node)
-        workflow.add_node("Research Manager", research_manager_node)
-        workflow.add_node("Trader", trader_node)
-        workflow.add_node("Risky Analyst", risky_analyst)
-        workflow.add_node("Neutral Analyst", neutral_analyst)
-        workflow.add_node("Safe Analyst", safe_analyst)
-        workflow.add_node("Risk Judge", risk_manager_node)
+        workflow.add_node("Bull Researcher", timed("Bull Researcher", bull_researcher_node))
+        workflow.add_node("Bear Researcher", timed("Bear Researcher", bear_researcher_node))
+        workflow.add_node("Research Manager", timed("Research Manager", research_manager_node))
+        workflow.add_node("Trader", timed("Trader", trader_node))
+        workflow.add_node("Risky Analyst", timed("Risky Analyst", risky_analyst))
+        workflow.add_node("Neutral Analyst", timed("Neutral Analyst", neutral_analyst))
+        workflow.add_node("Safe Analyst", timed("Safe Analyst", safe_analyst))
+        workflow.add_node("Risk Judge", timed("Risk Judge", risk_manager_node))
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
-            )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
+        if parallel_analysts:
+            # 汇合：所有分析师分支完成后才进入研究辩论
+            workflow.add_edge(analyst_names, "Bull Researcher")
+        else:
+            # Start with the first analyst
+            first_analyst = selected_analysts[0]
+            workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+            # Connect analysts in sequence
+            for i, analyst_type in enumerate(selected_analysts):
+                current_analyst = f"{analyst_type.capitalize()} Analyst"
+                current_tools = f"tools_{analyst_type}"
+                current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+                # Add conditional edges for current analyst
+                workflow.add_conditional_edges(
+                    current_analyst,
+                    getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+                    [current_tools, current_clear],
+                )
+                workflow.add_edge(current_tools, current_analyst)
+
+                # Connect to next analyst or to Bull Researcher if this is the last analyst
+                if i < len(selected_analysts) - 1:
+                    next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                    workflow.add_edge(current_clear, next_analyst)
+                else:
+                    workflow.add_edge(current_clear, "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -251,3 +291,36 @@ class GraphSetup:
 
         # Compile and return
         return workflow.compile()
+
+    def _build_analyst_branch(self, analyst_type: str, analyst_node, tool_node):
+        """把单个分析师的"分析-工具"循环编译为子图，作为主图中的一个并行分支节点
+
+        子图拥有独立的 messages 通道（从主图当前消息复制一份开始），分支之间互不可见；
+        分支结束后只把该分析师的报告和工具调用计数写回主图，因此多个分支同时完成也不会冲突。
+        """
+        analyst_name = f"{analyst_type.capitalize()} Analyst"
+        tools_name = f"tools_{analyst_type}"
+        clear_name = f"Msg Clear {analyst_type.capitalize()}"
+        report_key, count_key = ANALYST_STATE_KEYS[analyst_type]
+
+        branch = StateGraph(AgentState)
+        branch.add_node(analyst_name, self.node_timer.wrap(analyst_name, analyst_node))
+        branch.add_node(tools_name, self.node_timer.wrap(tools_name, tool_node))
+        branch.add_edge(START, analyst_name)
+        branch.add_conditional_edges(
+            analyst_name,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            {tools_name: tools_name, clear_name: END},
+        )
+        branch.add_edge(tools_name, analyst_name)
+        subgraph = branch.compile()
+
+        def run_analyst_branch(state, config: RunnableConfig):
+            result = subgraph.invoke(dict(state), config)
+            return {
+                report_key: result.get(report_key, ""),
+                count_key: result.get(count_key, 0),
+            }
+
+        run_analyst_branch.__name__ = f"{analyst_type}_analyst_branch"
+        return run_analyst_branch
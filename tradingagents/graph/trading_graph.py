@@ -11,12 +11,18 @@ from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from tradingagents.llm_adapters import ChatDashScopeOpenAI, ChatGoogleOpenAI
+from tradingagents.llm_adapters.response_cache import (
+    LLM_CACHE_BYPASS_KEY,
+    attach_llm_cache,
+    get_llm_response_cache,
+)
 
 from langgraph.prebuilt import ToolNode
 
 from tradingagents.agents import *
 from tradingagents.default_config import DEFAULT_CONFIG
 from tradingagents.agents.utils.memory import FinancialSituationMemory
+from tradingagents.agents.utils.data_prefetch import describe_model, start_prefetch
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
@@ -683,7 +689,15 @@ class TradingAgentsGraph:
             )
 
             logger.info(f"✅ [自定义厂家 {provider_name}] 已配置自定义端点并应用用户配置的模型参数")
-        
+
+        # LLM 响应缓存（可选）：挂到各分支创建的模型实例上，作用域按供应商 + API 地址区分
+        self.llm_cache = get_llm_response_cache(self.config)
+        if self.llm_cache is not None:
+            attach_llm_cache(self.quick_thinking_llm, quick_provider or self.config["llm_provider"],
+                             quick_backend_url or self.config.get("backend_url"), self.llm_cache)
+            attach_llm_cache(self.deep_thinking_llm, deep_provider or self.config["llm_provider"],
+                             deep_backend_url or self.config.get("backend_url"), self.llm_cache)
+
         self.toolkit = Toolkit(config=self.config)
 
         # Initialize memories (如果启用)
@@ -741,6 +755,7 @@ class TradingAgentsGraph:
         self.log_states_dict = {}  # date to full state dict
 
         # Set up the graph
+        self.selected_analysts = list(selected_analysts)
         self.graph = self.graph_setup.setup_graph(selected_analysts)
 
     def _create_tool_nodes(self) -> Dict[str, ToolNode]:
@@ -801,7 +816,8 @@ class TradingAgentsGraph:
             ),
         }
 
-    def propagate(self, company_name, trade_date, progress_callback=None, task_id=None):
+    def propagate(self, company_name, trade_date, progress_callback=None, task_id=None,
+                  bypass_llm_cache=False):
         """Run the trading agents graph for a company on a specific date.
 
         Args:
@@ -809,6 +825,7 @@ class TradingAgentsGraph:
             trade_date: Date for analysis
             progress_callback: Optional callback function for progress updates
             task_id: Optional task ID for tracking performance data
+            bypass_llm_cache: 本次分析不读取 LLM 响应缓存（新结果仍会写回缓存）
         """
 
         # 添加详细的接收日志
@@ -836,56 +853,26 @@ class TradingAgentsGraph:
 
         # 保存task_id用于后续保存性能数据
         self._current_task_id = task_id
+        self.graph_setup.node_timer.reset()
+
+        # 任务开始即并发预取各分析师需要的数据，网络等待与第一次 LLM 调用重叠
+        data_prefetch = None
+        if self.config.get("data_prefetch_enabled", True):
+            data_prefetch = start_prefetch(
+                self.selected_analysts, company_name, trade_date, self.toolkit,
+                news_model_info=describe_model(self.quick_thinking_llm), task_id=task_id,
+            )
 
-        # 根据是否有进度回调选择不同的stream_mode
-        args = self.propagator.get_graph_args(use_progress_callback=bool(progress_callback))
-
-        if self.debug:
-            # Debug mode with tracing and progress updates
-            trace = []
-            final_state = None
-            for chunk in self.graph.stream(init_agent_state, **args):
-                # 记录节点计时
-                for node_name in chunk.keys():
-                    if not node_name.startswith('__'):
-                        # 如果有上一个节点，记录其结束时间
-                        if current_node_name and current_node_start:
-                            elapsed = time.time() - current_node_start
-                            node_timings[current_node_name] = elapsed
-                            logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-
-                        # 开始新节点计时
-                        current_node_name = node_name
-                        current_node_start = time.time()
-                        break
-
-                # 在 updates 模式下，chunk 格式为 {node_name: state_update}
-                # 在 values 模式下，chunk 格式为完整的状态
-                if progress_callback and args.get("stream_mode") == "updates":
-                    # updates 模式：chunk = {"Market Analyst": {...}}
-                    self._send_progress_update(chunk, progress_callback)
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
-                else:
-                    # values 模式：chunk = {"messages": [...], ...}
-                    if len(chunk.get("messages", [])) > 0:
-                        chunk["messages"][-1].pretty_print()
-                    trace.append(chunk)
-                    final_state = chunk
-
-            if not trace and final_state:
-                # updates 模式下，使用累积的状态
-                pass
-            elif trace:
-                final_state = trace[-1]
-        else:
-            # Standard mode without tracing but with progress updates
-            if progress_callback:
-                # 使用 updates 模式以便获取节点级别的进度
+        prefetch_token = data_prefetch.activate() if data_prefetch is not None else None
+        try:
+            # 根据是否有进度回调选择不同的stream_mode
+            args = self.propagator.get_graph_args(use_progress_callback=bool(progress_callback))
+            if bypass_llm_cache:
+                args["config"].setdefault("metadata", {})[LLM_CACHE_BYPASS_KEY] = True
+            llm_cache_baseline = self.llm_cache.node_stats() if self.llm_cache is not None else None
+
+            if self.debug:
+                # Debug mode with tracing and progress updates
                 trace = []
                 final_state = None
                 for chunk in self.graph.stream(init_agent_state, **args):
@@ -897,48 +884,97 @@ class TradingAgentsGraph:
                                 elapsed = time.time() - current_node_start
                                 node_timings[current_node_name] = elapsed
                                 logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-                                logger.info(f"🔍 [TIMING] 节点切换: {current_node_name} → {node_name}")
 
                             # 开始新节点计时
                             current_node_name = node_name
                             current_node_start = time.time()
-                            logger.info(f"🔍 [TIMING] 开始计时: {node_name}")
                             break
 
-                    self._send_progress_update(chunk, progress_callback)
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                    # 在 updates 模式下，chunk 格式为 {node_name: state_update}
+                    # 在 values 模式下，chunk 格式为完整的状态
+                    if progress_callback and args.get("stream_mode") == "updates":
+                        # updates 模式：chunk = {"Market Analyst": {...}}
+                        self._send_progress_update(chunk, progress_callback)
+                        # 累积状态更新
+                        if final_state is None:
+                            final_state = init_agent_state.copy()
+                        for node_name, node_update in chunk.items():
+                            if not node_name.startswith('__'):
+                                final_state.update(node_update)
+                    else:
+                        # values 模式：chunk = {"messages": [...], ...}
+                        if len(chunk.get("messages", [])) > 0:
+                            chunk["messages"][-1].pretty_print()
+                        trace.append(chunk)
+                        final_state = chunk
+
+                if not trace and final_state:
+                    # updates 模式下，使用累积的状态
+                    pass
+                elif trace:
+                    final_state = trace[-1]
             else:
-                # 原有的invoke模式（也需要计时）
-                logger.info("⏱️ 使用 invoke 模式执行分析（无进度回调）")
-                # 使用stream模式以便计时，但不发送进度更新
-                trace = []
-                final_state = None
-                for chunk in self.graph.stream(init_agent_state, **args):
-                    # 记录节点计时
-                    for node_name in chunk.keys():
-                        if not node_name.startswith('__'):
-                            # 如果有上一个节点，记录其结束时间
-                            if current_node_name and current_node_start:
-                                elapsed = time.time() - current_node_start
-                                node_timings[current_node_name] = elapsed
-                                logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
-
-                            # 开始新节点计时
-                            current_node_name = node_name
-                            current_node_start = time.time()
-                            break
-
-                    # 累积状态更新
-                    if final_state is None:
-                        final_state = init_agent_state.copy()
-                    for node_name, node_update in chunk.items():
-                        if not node_name.startswith('__'):
-                            final_state.update(node_update)
+                # Standard mode without tracing but with progress updates
+                if progress_callback:
+                    # 使用 updates 模式以便获取节点级别的进度
+                    trace = []
+                    final_state = None
+                    for chunk in self.graph.stream(init_agent_state, **args):
+                        # 记录节点计时
+                        for node_name in chunk.keys():
+                            if not node_name.startswith('__'):
+                                # 如果有上一个节点，记录其结束时间
+                                if current_node_name and current_node_start:
+                                    elapsed = time.time() - current_node_start
+                                    node_timings[current_node_name] = elapsed
+                                    logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
+                                    logger.info(f"🔍 [TIMING] 节点切换: {current_node_name} → {node_name}")
+
+                                # 开始新节点计时
+                                current_node_name = node_name
+                                current_node_start = time.time()
+                                logger.info(f"🔍 [TIMING] 开始计时: {node_name}")
+                                break
+
+                        self._send_progress_update(chunk, progress_callback)
+                        # 累积状态更新
+                        if final_state is None:
+                            final_state = init_agent_state.copy()
+                        for node_name, node_update in chunk.items():
+                            if not node_name.startswith('__'):
+                                final_state.update(node_update)
+                else:
+                    # 原有的invoke模式（也需要计时）
+                    logger.info("⏱️ 使用 invoke 模式执行分析（无进度回调）")
+                    # 使用stream模式以便计时，但不发送进度更新
+                    trace = []
+                    final_state = None
+                    for chunk in self.graph.stream(init_agent_state, **args):
+                        # 记录节点计时
+                        for node_name in chunk.keys():
+                            if not node_name.startswith('__'):
+                                # 如果有上一个节点，记录其结束时间
+                                if current_node_name and current_node_start:
+                                    elapsed = time.time() - current_node_start
+                                    node_timings[current_node_name] = elapsed
+                                    logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
+
+                                # 开始新节点计时
+                                current_node_name = node_name
+                                current_node_start = time.time()
+                                break
+
+                        # 累积状态更新
+                        if final_state is None:
+                            final_state = init_agent_state.copy()
+                        for node_name, node_update in chunk.items():
+                            if not node_name.startswith('__'):
+                                final_state.update(node_update)
+        finally:
+            # 异常退出时同样释放预取线程池，并恢复当前任务标记
+            if data_prefetch is not None:
+                data_prefetch.close(prefetch_token)
+                logger.info(f"⚡ [数据预取] 统计: {data_prefetch.stats()}")
 
         # 记录最后一个节点的时间
         if current_node_name and current_node_start:
@@ -946,6 +982,11 @@ class TradingAgentsGraph:
             node_timings[current_node_name] = elapsed
             logger.info(f"⏱️ [{current_node_name}] 耗时: {elapsed:.2f}秒")
 
+        # 优先使用节点自身记录的执行时间：并行分支重叠执行时，按相邻 chunk 的间隔计时不再准确
+        recorded_timings = self.graph_setup.node_timer.timings()
+        if recorded_timings:
+            node_timings = recorded_timings
+
         # 计算总时间
         total_elapsed = time.time() - total_start_time
 
@@ -961,6 +1002,11 @@ class TradingAgentsGraph:
 
         # 构建性能数据
         performance_data = self._build_performance_data(node_timings, total_elapsed)
+        if self.llm_cache is not None:
+            cache_stats = self.llm_cache.stats(baseline=llm_cache_baseline)
+            performance_data['llm_cache'] = cache_stats
+            logger.info(f"💾 [LLM缓存] 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, "
+                        f"绕过 {cache_stats['bypassed']} 次")
 
         # 将性能数据添加到状态中
         final_state['performance_metrics'] = performance_data
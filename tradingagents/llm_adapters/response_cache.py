@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+LLM 响应缓存（按内容寻址，SQLite 持久化）
+
+同一只股票、同一交易日重复分析时，分析师/研究员节点收到的消息往往逐字相同，
+每次都要重新调用模型。本模块实现 LangChain 的 BaseCache 接口，挂到聊天模型的 cache 字段上：
+
+- 缓存键为 sha256(作用域 + llm_string + prompt)：作用域区分供应商和 API 地址，
+  llm_string 由 LangChain 生成，包含模型名、temperature 等调用参数以及 bind_tools 绑定的工具 schema，
+  prompt 是去掉消息 id 后的规范化消息列表；
+- 命中时 LangChain 直接返回缓存的生成结果，不发起请求、不消耗 token；
+- 支持 TTL 和总大小上限（超出时按最近访问时间淘汰）；
+- 按 LangGraph 节点统计命中/未命中次数；
+- 单次分析可绕过缓存（仍会用新结果刷新缓存），见 bypass_llm_cache()
+  和 TradingAgentsGraph.propagate(bypass_llm_cache=True)。
+
+默认关闭，LLM_RESPONSE_CACHE_ENABLED=true 或 config["llm_cache_enabled"]=True 时启用。
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.runnables.config import var_child_runnable_config
+
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+# 写入图运行配置 metadata 中的绕过标记（LangGraph 会传递给每个节点）
+LLM_CACHE_BYPASS_KEY = "llm_cache_bypass"
+
+_bypass_var: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key         TEXT PRIMARY KEY,
+    scope       TEXT,
+    generations TEXT,
+    size        INTEGER,
+    created_at  REAL,
+    expires_at  REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_expires ON llm_responses (expires_at);
+"""
+
+
+@contextlib.contextmanager
+def bypass_llm_cache(enabled: bool = True):
+    """在该上下文内跳过缓存读取（结果仍写回缓存）"""
+    token = _bypass_var.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass_var.reset(token)
+
+
+def _current_run_metadata() -> Dict[str, Any]:
+    config = var_child_runnable_config.get()
+    return (config or {}).get("metadata") or {}
+
+
+def _current_node() -> str:
+    return str(_current_run_metadata().get("langgraph_node") or "unknown")
+
+
+def _bypass_requested() -> bool:
+    return _bypass_var.get() or bool(_current_run_metadata().get(LLM_CACHE_BYPASS_KEY))
+
+
+def response_key(scope: str, prompt: str, llm_string: str) -> str:
+    """缓存键：sha256(作用域 + llm_string + prompt)"""
+    return hashlib.sha256(f"{scope}\n{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM 响应的 SQLite 存储（线程安全，WAL 模式支持多进程共享）"""
+
+    def __init__(self, db_path: Union[str, Path], ttl_seconds: float = 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._node_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "bypassed": 0})
+        self.evictions = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                pass
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def for_scope(self, scope: str) -> "ScopedLLMCache":
+        """返回挂到某个模型实例上的 BaseCache 视图"""
+        return ScopedLLMCache(self, scope)
+
+    # ---- 读写 ----
+    def lookup(self, scope: str, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        node = _current_node()
+        if _bypass_requested():
+            self._count(node, "bypassed")
+            return None
+        key = response_key(scope, prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT generations FROM llm_responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logger.debug(f"LLM响应缓存读取失败: {e}")
+                row = None
+        if row is None:
+            self._count(node, "misses")
+            return None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                generations = loads(row[0], allowed_objects="core")
+        except Exception as e:
+            logger.debug(f"LLM响应缓存条目无法解析，按未命中处理: {e}")
+            self._count(node, "misses")
+            return None
+        self._count(node, "hits")
+        logger.debug(f"💾 [LLM缓存] 命中: {node}")
+        return generations
+
+    def update(self, scope: str, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        try:
+            payload = dumps(list(return_val))
+        except Exception as e:
+            logger.debug(f"LLM响应无法序列化，跳过缓存: {e}")
+            return
+        key = response_key(scope, prompt, llm_string)
+        now = time.time()
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses "
+                    "(key, scope, generations, size, created_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, scope, payload, size, now, now + self.ttl_seconds, now),
+                )
+                self._enforce_limits(now)
+            except sqlite3.Error as e:
+                logger.debug(f"LLM响应缓存写入失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+
+    # ---- 统计 ----
+    def node_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {node: dict(counts) for node, counts in self._node_stats.items()}
+
+    def stats(self, baseline: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+        """
+        缓存统计；传入之前的 node_stats() 快照时，命中/未命中只统计快照之后的部分
+
+        进程内多个分析共享同一个缓存，用快照相减而不是清零，避免并发分析互相干扰。
+        """
+        nodes = self.node_stats()
+        if baseline:
+            nodes = {
+                node: {field: count - baseline.get(node, {}).get(field, 0) for field, count in counts.items()}
+                for node, counts in nodes.items()
+            }
+            nodes = {node: counts for node, counts in nodes.items() if any(counts.values())}
+        hits = sum(c["hits"] for c in nodes.values())
+        misses = sum(c["misses"] for c in nodes.values())
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        return {
+            'db_path': str(self.db_path),
+            'entries': entries,
+            'total_bytes': int(total_bytes),
+            'hits': hits,
+            'misses': misses,
+            'bypassed': sum(c["bypassed"] for c in nodes.values()),
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'evictions': self.evictions,
+            'nodes': nodes,
+        }
+
+    # ---- 内部 ----
+    def _count(self, node: str, field: str):
+        with self._lock:
+            self._node_stats[node][field] += 1
+
+    def _enforce_limits(self, now: float):
+        """删除过期条目；总大小超过上限时按最近访问时间淘汰到上限的 90%"""
+        removed = self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            victims = []
+            for key, size in self._conn.execute("SELECT key, size FROM llm_responses ORDER BY accessed_at"):
+                if total <= target:
+                    break
+                victims.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+            removed += len(victims)
+        self.evictions += max(removed, 0)
+
+
+class ScopedLLMCache(BaseCache):
+    """绑定到单个模型实例的缓存视图（作用域区分供应商/API 地址）"""
+
+    def __init__(self, store: LLMResponseCache, scope: str):
+        self.store = store
+        self.scope = scope
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.store.lookup(self.scope, prompt, llm_string)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.update(self.scope, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+def _env_flag(name: str) -> Optional[bool]:
+    value = os.getenv(name)
+    if value is None:
+        return None
+    return value.lower() in ("true", "1", "yes", "on")
+
+
+_response_cache: Optional[LLMResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache(config: Optional[dict] = None) -> Optional[LLMResponseCache]:
+    """获取进程级 LLM 响应缓存（未启用时返回 None）"""
+    global _response_cache
+    config = config or {}
+    enabled = config.get("llm_cache_enabled")
+    if enabled is None:
+        enabled = _env_flag("LLM_RESPONSE_CACHE_ENABLED")
+    if not enabled:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                db_path = os.getenv("LLM_RESPONSE_CACHE_PATH")
+                if not db_path:
+                    cache_dir = config.get("data_cache_dir")
+                    if not cache_dir:
+                        from tradingagents.default_config import DEFAULT_CONFIG
+                        cache_dir = DEFAULT_CONFIG["data_cache_dir"]
+                    db_path = os.path.join(cache_dir, "llm_response_cache.sqlite3")
+                ttl_hours = float(config.get("llm_cache_ttl_hours") or os.getenv("LLM_RESPONSE_CACHE_TTL_HOURS", "24"))
+                max_mb = float(config.get("llm_cache_max_mb") or os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "256"))
+                _response_cache = LLMResponseCache(db_path, ttl_seconds=ttl_hours * 3600,
+                                                   max_bytes=int(max_mb * 1024 * 1024))
+                logger.info(f"💾 LLM响应缓存已启用: {db_path} (TTL={ttl_hours}h, 上限={max_mb}MB)")
+    return _response_cache
+
+
+def attach_llm_cache(llm: Any, provider: str, backend_url: Optional[str], cache: LLMResponseCache) -> Any:
+    """把缓存挂到模型实例上（作用域为 供应商 + API 地址），返回该实例"""
+    if llm is None or not hasattr(llm, "cache"):
+        return llm
+    scope = f"{(provider or '').lower()}|{backend_url or ''}"
+    try:
+        llm.cache = cache.for_scope(scope)
+    except Exception as e:
+        logger.warning(f"⚠️ 无法为 {llm.__class__.__name__} 启用LLM响应缓存: {e}")
+    return llm
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+# 可选：numba 编译递推循环（未安装时使用 NumPy 实现，结果逐位一致）
+try:
+    from numba import njit as _njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    _njit = None
+    NUMBA_AVAILABLE = False
+
 
 @dataclass(frozen=True)
 class IndicatorSpec:
@@ -22,6 +30,201 @@ def _require_cols(df: pd.DataFrame, cols: Iterable[str]):
         raise ValueError(f"DataFrame缺少必要列: {missing}, 现有列: {list(df.columns)[:10]}...")
 
 
+# --- 递推滤波内核 ---
+# 输入为 NumPy 数组，时间轴为 axis 0：1D (bars,) 或 2D (bars, symbols)，2D 时对所有列同时递推。
+# 运算顺序与 pandas / 原 Python 循环保持一致，因此输出逐位相同。
+
+def _resolve_backend(backend: str) -> str:
+    if backend == "auto":
+        return "numba" if NUMBA_AVAILABLE else "numpy"
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        raise ValueError("numba 未安装，无法使用 backend='numba'")
+    if backend not in {"numba", "numpy"}:
+        raise ValueError(f"不支持的递推后端: {backend}，支持: 'auto', 'numba', 'numpy'")
+    return backend
+
+
+def _kdj_numpy(rsv: np.ndarray, alpha_k: float, alpha_d: float, init: float) -> Tuple[np.ndarray, np.ndarray]:
+    k = np.full(rsv.shape, np.nan)
+    d = np.full(rsv.shape, np.nan)
+    if rsv.ndim == 1:
+        # 单序列：纯 Python 浮点循环（与 NumPy float64 运算逐位一致，且远快于逐元素 iloc）
+        last_k = last_d = init
+        for i, rv in enumerate(rsv.tolist()):
+            if rv != rv:
+                continue
+            last_k = (1 - alpha_k) * last_k + alpha_k * rv
+            last_d = (1 - alpha_d) * last_d + alpha_d * last_k
+            k[i] = last_k
+            d[i] = last_d
+        return k, d
+
+    last_k = np.full(rsv.shape[1], init)
+    last_d = np.full(rsv.shape[1], init)
+    for i in range(rsv.shape[0]):
+        rv = rsv[i]
+        valid = ~np.isnan(rv)
+        curr_k = (1 - alpha_k) * last_k + alpha_k * rv
+        curr_d = (1 - alpha_d) * last_d + alpha_d * curr_k
+        last_k = np.where(valid, curr_k, last_k)
+        last_d = np.where(valid, curr_d, last_d)
+        k[i] = np.where(valid, curr_k, np.nan)
+        d[i] = np.where(valid, curr_d, np.nan)
+    return k, d
+
+
+def _ewm_numpy(x: np.ndarray, alpha: float, adjust: bool, ignore_na: bool, minp: int) -> np.ndarray:
+    """pandas ``ewm(...).mean()`` 的按行向量化实现（与 aggregations.ewm 的更新步骤一致）"""
+    two_d = x.reshape(x.shape[0], -1)
+    out = np.full(two_d.shape, np.nan)
+    if two_d.shape[0] == 0:
+        return out.reshape(x.shape)
+
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    weighted = two_d[0].copy()
+    nobs = (~np.isnan(weighted)).astype(np.int64)
+    old_wt = np.ones(two_d.shape[1])
+    out[0] = np.where(nobs >= minp, weighted, np.nan)
+    for i in range(1, two_d.shape[0]):
+        cur = two_d[i]
+        obs = ~np.isnan(cur)
+        nobs += obs
+        started = ~np.isnan(weighted)
+        step = started & obs if ignore_na else started
+        old_wt = np.where(step, old_wt * old_wt_factor, old_wt)
+        upd = started & obs & (weighted != cur)
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(upd, blended, weighted)
+        if adjust:
+            old_wt = np.where(started & obs, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(started & obs, 1.0, old_wt)
+        weighted = np.where(~started & obs, cur, weighted)
+        out[i] = np.where(nobs >= minp, weighted, np.nan)
+    return out.reshape(x.shape)
+
+
+if NUMBA_AVAILABLE:
+    @_njit(cache=True)
+    def _kdj_numba(rsv, alpha_k, alpha_d, init):  # pragma: no cover - 需要 numba
+        n_rows, n_cols = rsv.shape
+        k = np.full(rsv.shape, np.nan)
+        d = np.full(rsv.shape, np.nan)
+        for j in range(n_cols):
+            last_k = init
+            last_d = init
+            for i in range(n_rows):
+                rv = rsv[i, j]
+                if rv != rv:
+                    continue
+                last_k = (1 - alpha_k) * last_k + alpha_k * rv
+                last_d = (1 - alpha_d) * last_d + alpha_d * last_k
+                k[i, j] = last_k
+                d[i, j] = last_d
+        return k, d
+
+    @_njit(cache=True)
+    def _ewm_numba(x, alpha, adjust, ignore_na, minp):  # pragma: no cover - 需要 numba
+        n_rows, n_cols = x.shape
+        out = np.full(x.shape, np.nan)
+        old_wt_factor = 1.0 - alpha
+        new_wt = 1.0 if adjust else alpha
+        for j in range(n_cols):
+            if n_rows == 0:
+                break
+            weighted = x[0, j]
+            nobs = 1 if weighted == weighted else 0
+            old_wt = 1.0
+            if nobs >= minp:
+                out[0, j] = weighted
+            for i in range(1, n_rows):
+                cur = x[i, j]
+                is_obs = cur == cur
+                if is_obs:
+                    nobs += 1
+                if weighted == weighted:
+                    if is_obs or not ignore_na:
+                        old_wt *= old_wt_factor
+                        if is_obs:
+                            if weighted != cur:
+                                weighted = old_wt * weighted + new_wt * cur
+                                weighted /= (old_wt + new_wt)
+                            if adjust:
+                                old_wt += new_wt
+                            else:
+                                old_wt = 1.0
+                elif is_obs:
+                    weighted = cur
+                if nobs >= minp:
+                    out[i, j] = weighted
+        return out
+
+
+def kdj_kernel(rsv: np.ndarray, m1: int = 3, m2: int = 3, init: float = 50.0,
+               backend: str = "auto") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    KDJ 的 K/D 递推内核
+
+    K = (1 - 1/m1) * K' + 1/m1 * RSV，D = (1 - 1/m2) * D' + 1/m2 * K，初值为 init；
+    RSV 为 NaN 的位置输出 NaN 且保持上一状态（与原逐行循环一致）。
+
+    Args:
+        rsv: RSV 数组，1D (bars,) 或 2D (bars, symbols)
+        m1: K 平滑周期
+        m2: D 平滑周期
+        init: K/D 初值
+        backend: 'auto'（有 numba 时编译循环）、'numba' 或 'numpy'
+
+    Returns:
+        (k, d)，形状与 rsv 相同
+    """
+    rsv = np.asarray(rsv, dtype=np.float64)
+    alpha_k = 1 / float(m1)
+    alpha_d = 1 / float(m2)
+    if _resolve_backend(backend) == "numba":
+        k, d = _kdj_numba(np.ascontiguousarray(rsv.reshape(rsv.shape[0], -1)), alpha_k, alpha_d, float(init))
+        return k.reshape(rsv.shape), d.reshape(rsv.shape)
+    return _kdj_numpy(rsv, alpha_k, alpha_d, float(init))
+
+
+def ewm_mean(values: np.ndarray, com: Optional[float] = None, span: Optional[float] = None,
+             alpha: Optional[float] = None, adjust: bool = True, ignore_na: bool = False,
+             min_periods: int = 0, backend: str = "auto") -> np.ndarray:
+    """
+    按列的指数加权均值内核，等价于 ``pd.DataFrame(values).ewm(...).mean()``
+
+    pandas 对多列 DataFrame 的 ewm 逐列调用底层实现；本函数对 2D 数组所有列同时递推，
+    适用于全市场面板（bars × symbols）。com/span/alpha 的换算方式与 pandas 相同。
+
+    Args:
+        values: 1D 或 2D 数组（时间轴为 axis 0）
+        com / span / alpha: 三选一，含义同 pandas.ewm
+        adjust: 同 pandas.ewm（中国式 SMA 使用 adjust=True）
+        ignore_na: 同 pandas.ewm
+        min_periods: 同 pandas.ewm
+        backend: 'auto'、'numba' 或 'numpy'
+
+    Returns:
+        与 values 同形状的数组
+    """
+    if sum(p is not None for p in (com, span, alpha)) != 1:
+        raise ValueError("com、span、alpha 必须且只能指定一个")
+    if span is not None:
+        com = (float(span) - 1) / 2.0
+    elif alpha is not None:
+        com = (1.0 - float(alpha)) / float(alpha)
+    a = 1.0 / (1.0 + float(com))
+    minp = max(int(min_periods), 1)
+
+    x = np.asarray(values, dtype=np.float64)
+    if _resolve_backend(backend) == "numba":
+        out = _ewm_numba(np.ascontiguousarray(x.reshape(x.shape[0], -1)), a, bool(adjust), bool(ignore_na), minp)
+        return out.reshape(x.shape)
+    return _ewm_numpy(x, a, bool(adjust), bool(ignore_na), minp)
+
+
 def ma(close: pd.Series, n: int, min_periods: int = None) -> pd.Series:
     """
     计算移动平均线（Moving Average）
@@ -95,10 +298,18 @@ def rsi(close: pd.Series, n: int = 14, method: str = 'ema') -> pd.Series:
         - 'sma': 使用 rolling(window=n).mean()，简单移动平均
         - 'china': 使用 ewm(com=n-1, adjust=True)，与同花顺/通达信一致
     """
+    gain, loss = _gain_loss(close)
+    return _rsi_from_gain_loss(gain, loss, n, method)
+
+
+def _gain_loss(close: pd.Series):
     delta = close.diff()
     gain = delta.where(delta > 0, 0)
     loss = -delta.where(delta < 0, 0)
+    return gain, loss
 
+
+def _rsi_from_gain_loss(gain: pd.Series, loss: pd.Series, n: int, method: str) -> pd.Series:
     if method == 'ema':
         # 国际标准：Wilder's指数移动平均
         avg_gain = gain.ewm(alpha=1 / float(n), adjust=False).mean()
@@ -163,110 +374,203 @@ def kdj(high: pd.Series, low: pd.Series, close: pd.Series, n: int = 9, m1: int =
     # 处理除零与起始NaN
     rsv = rsv.replace([np.inf, -np.inf], np.nan)
 
-    # 按经典公式递推（初始化 50）
-    k = pd.Series(np.nan, index=close.index)
-    d = pd.Series(np.nan, index=close.index)
-    alpha_k = 1 / float(m1)
-    alpha_d = 1 / float(m2)
-    last_k = 50.0
-    last_d = 50.0
-    for i in range(len(close)):
-        rv = rsv.iloc[i]
-        if np.isnan(rv):
-            k.iloc[i] = np.nan
-            d.iloc[i] = np.nan
-            continue
-        curr_k = (1 - alpha_k) * last_k + alpha_k * rv
-        curr_d = (1 - alpha_d) * last_d + alpha_d * curr_k
-        k.iloc[i] = curr_k
-        d.iloc[i] = curr_d
-        last_k, last_d = curr_k, curr_d
+    # 按经典公式递推（初始化 50），由 NumPy/numba 内核完成
+    k_arr, d_arr = kdj_kernel(rsv.to_numpy(dtype=np.float64), m1=m1, m2=m2, init=50.0)
+    k = pd.Series(k_arr, index=close.index)
+    d = pd.Series(d_arr, index=close.index)
     j = 3 * k - 2 * d
     return pd.DataFrame({"kdj_k": k, "kdj_d": d, "kdj_j": j})
 
 
-def compute_indicator(df: pd.DataFrame, spec: IndicatorSpec) -> pd.DataFrame:
+class _SharedIntermediates:
+    """
+    单次指标计算内共享的中间结果
+
+    同一 EMA、滚动窗口、涨跌拆分等只计算一次，例如 EMA12/26 同时供 ema 与 macd 使用，
+    MA20 与 BOLL 中轨共用同一个 rolling(20) 均值。
+    """
+
+    def __init__(self, df: pd.DataFrame, close_col: str = 'close', high_col: str = 'high', low_col: str = 'low'):
+        self._df = df
+        self._cols = {'close': close_col, 'high': high_col, 'low': low_col}
+        self._memo: Dict[tuple, Any] = {}
+
+    def _memoize(self, key: tuple, fn):
+        if key not in self._memo:
+            self._memo[key] = fn()
+        return self._memo[key]
+
+    def col(self, name: str) -> pd.Series:
+        return self._df[self._cols[name]]
+
+    def ema(self, n: int) -> pd.Series:
+        return self._memoize(('ema', n), lambda: ema(self.col('close'), n))
+
+    def rolling_mean(self, n: int, min_periods: int = 1) -> pd.Series:
+        return self._memoize(('mean', n, min_periods),
+                             lambda: self.col('close').rolling(window=n, min_periods=min_periods).mean())
+
+    def rolling_std(self, n: int, min_periods: int = 1) -> pd.Series:
+        return self._memoize(('std', n, min_periods),
+                             lambda: self.col('close').rolling(window=n, min_periods=min_periods).std())
+
+    def rsi(self, n: int, method: str) -> pd.Series:
+        gain, loss = self._memoize(('gain_loss',), lambda: _gain_loss(self.col('close')))
+        return self._memoize(('rsi', n, method), lambda: _rsi_from_gain_loss(gain, loss, n, method))
+
+    def macd(self, fast: int, slow: int, signal: int):
+        dif = self._memoize(('dif', fast, slow), lambda: self.ema(fast) - self.ema(slow))
+        dea = self._memoize(('dea', fast, slow, signal), lambda: dif.ewm(span=int(signal), adjust=False).mean())
+        return dif, dea
+
+    def atr(self, n: int) -> pd.Series:
+        def true_range():
+            prev_close = self.col('close').shift(1)
+            return pd.concat([
+                (self.col('high') - self.col('low')).abs(),
+                (self.col('high') - prev_close).abs(),
+                (self.col('low') - prev_close).abs(),
+            ], axis=1).max(axis=1)
+        tr = self._memoize(('tr',), true_range)
+        return self._memoize(('atr', n), lambda: tr.rolling(window=n, min_periods=n).mean())
+
+    def kdj(self, n: int, m1: int, m2: int):
+        def compute():
+            out = kdj(self.col('high'), self.col('low'), self.col('close'), n=n, m1=m1, m2=m2)
+            return out['kdj_k'], out['kdj_d'], out['kdj_j']
+        return self._memoize(('kdj', n, m1, m2), compute)
+
+
+_Output = Tuple[str, Any]  # (列名, fn(_SharedIntermediates) -> pd.Series)
+
+
+def _spec_outputs(spec: IndicatorSpec) -> Tuple[List[str], List[_Output]]:
+    """把一个指标规格展开为（必需列, 输出列计算函数）"""
     name = spec.name.lower()
     params = spec.params or {}
-    out = df.copy()
 
     if name == "ma":
-        _require_cols(df, ["close"])
         n = int(params.get("n", params.get("period", 20)))
-        out[f"ma{n}"] = ma(df["close"], n)
-        return out
+        return ["close"], [(f"ma{n}", lambda s: s.rolling_mean(n, 1))]
 
     if name == "ema":
-        _require_cols(df, ["close"])
         n = int(params.get("n", params.get("period", 20)))
-        out[f"ema{n}"] = ema(df["close"], n)
-        return out
+        return ["close"], [(f"ema{n}", lambda s: s.ema(n))]
 
     if name == "macd":
-        _require_cols(df, ["close"])
         fast = int(params.get("fast", 12))
         slow = int(params.get("slow", 26))
         signal = int(params.get("signal", 9))
-        macd_df = macd(df["close"], fast=fast, slow=slow, signal=signal)
-        for c in macd_df.columns:
-            out[c] = macd_df[c]
-        return out
+        return ["close"], [
+            ("dif", lambda s: s.macd(fast, slow, signal)[0]),
+            ("dea", lambda s: s.macd(fast, slow, signal)[1]),
+            ("macd_hist", lambda s: s.macd(fast, slow, signal)[0] - s.macd(fast, slow, signal)[1]),
+        ]
 
     if name == "rsi":
-        _require_cols(df, ["close"])
         n = int(params.get("n", params.get("period", 14)))
-        out[f"rsi{n}"] = rsi(df["close"], n)
-        return out
+        return ["close"], [(f"rsi{n}", lambda s: s.rsi(n, 'ema'))]
 
     if name == "boll":
-        _require_cols(df, ["close"])
         n = int(params.get("n", 20))
         k = float(params.get("k", 2.0))
-        boll_df = boll(df["close"], n=n, k=k)
-        for c in boll_df.columns:
-            out[c] = boll_df[c]
-        return out
+        return ["close"], [
+            ("boll_mid", lambda s: s.rolling_mean(n, 1)),
+            ("boll_upper", lambda s: s.rolling_mean(n, 1) + k * s.rolling_std(n, 1)),
+            ("boll_lower", lambda s: s.rolling_mean(n, 1) - k * s.rolling_std(n, 1)),
+        ]
 
     if name == "atr":
-        _require_cols(df, ["high", "low", "close"])
         n = int(params.get("n", 14))
-        out[f"atr{n}"] = atr(df["high"], df["low"], df["close"], n=n)
-        return out
+        return ["high", "low", "close"], [(f"atr{n}", lambda s: s.atr(n))]
 
     if name == "kdj":
-        _require_cols(df, ["high", "low", "close"])
         n = int(params.get("n", 9))
         m1 = int(params.get("m1", 3))
         m2 = int(params.get("m2", 3))
-        kdj_df = kdj(df["high"], df["low"], df["close"], n=n, m1=m1, m2=m2)
-        for c in kdj_df.columns:
-            out[c] = kdj_df[c]
-        return out
+        return ["high", "low", "close"], [
+            ("kdj_k", lambda s: s.kdj(n, m1, m2)[0]),
+            ("kdj_d", lambda s: s.kdj(n, m1, m2)[1]),
+            ("kdj_j", lambda s: s.kdj(n, m1, m2)[2]),
+        ]
 
     raise ValueError(f"不支持的指标: {name}")
 
 
+class IndicatorPipeline:
+    """
+    多指标单遍计算管线
+
+    构造时把指标规格规划为输出列列表（同名输出以后者为准），计算时共享中间结果，
+    并把所有输出写入一个预分配的 float64 结果块，最后一次性并入 DataFrame，
+    不再像逐个 compute_indicator 那样每个指标复制一次整表。
+
+    示例：
+        >>> pipe = IndicatorPipeline([IndicatorSpec('ema', {'n': 12}), IndicatorSpec('macd')])
+        >>> out = pipe.run(df)            # 返回新 DataFrame，不修改 df
+        >>> pipe.apply(df)                # 原地追加指标列
+    """
+
+    def __init__(self, specs: Optional[List[IndicatorSpec]] = None, outputs: Optional[List[_Output]] = None,
+                 required: Iterable[str] = ()):
+        self._outputs: List[_Output] = list(outputs or [])
+        self._required: List[str] = list(required)
+        for spec in self._dedupe(specs or []):
+            req, outs = _spec_outputs(spec)
+            self._required.extend(req)
+            self._outputs.extend(outs)
+        self._required = list(dict.fromkeys(self._required))
+        self.columns: List[str] = list(dict.fromkeys(col for col, _ in self._outputs))
+
+    @staticmethod
+    def _dedupe(specs: List[IndicatorSpec]) -> List[IndicatorSpec]:
+        # 粗略去重（按 name+sorted(params)）
+        unique_specs: List[IndicatorSpec] = []
+        seen = set()
+        for s in specs:
+            key = (s.name.lower(), tuple(sorted((s.params or {}).items())))
+            if key not in seen:
+                seen.add(key)
+                unique_specs.append(s)
+        return unique_specs
+
+    def compute_block(self, df: pd.DataFrame, close_col: str = 'close', high_col: str = 'high',
+                      low_col: str = 'low') -> np.ndarray:
+        """计算全部输出列，返回形状为 (len(df), len(self.columns)) 的结果块"""
+        col_map = {'close': close_col, 'high': high_col, 'low': low_col}
+        _require_cols(df, [col_map.get(c, c) for c in self._required])
+
+        shared = _SharedIntermediates(df, close_col=close_col, high_col=high_col, low_col=low_col)
+        position = {c: i for i, c in enumerate(self.columns)}
+        block = np.empty((len(df), len(self.columns)), dtype=np.float64)
+        for col, fn in self._outputs:
+            block[:, position[col]] = fn(shared).to_numpy(dtype=np.float64)
+        return block
+
+    def run(self, df: pd.DataFrame, **col_names) -> pd.DataFrame:
+        """返回追加了指标列的新 DataFrame（不修改输入）"""
+        if not self.columns:
+            return df.copy()
+        result = pd.DataFrame(self.compute_block(df, **col_names), index=df.index, columns=self.columns)
+        if df.columns.intersection(self.columns).empty:
+            return pd.concat([df, result], axis=1)
+        out = df.copy()
+        out[self.columns] = result
+        return out
+
+    def apply(self, df: pd.DataFrame, **col_names) -> pd.DataFrame:
+        """原地把指标列写入 df 并返回 df"""
+        if self.columns:
+            df[self.columns] = self.compute_block(df, **col_names)
+        return df
+
+
+def compute_indicator(df: pd.DataFrame, spec: IndicatorSpec) -> pd.DataFrame:
+    return IndicatorPipeline([spec]).run(df)
+
+
 def compute_many(df: pd.DataFrame, specs: List[IndicatorSpec]) -> pd.DataFrame:
-    if not specs:
-        return df.copy()
-    # 粗略去重（按 name+sorted(params)）
-    def key(s: IndicatorSpec):
-        p = s.params or {}
-        items = tuple(sorted(p.items()))
-        return (s.name.lower(), items)
-
-    unique_specs: List[IndicatorSpec] = []
-    seen = set()
-    for s in specs:
-        k = key(s)
-        if k not in seen:
-            seen.add(k)
-            unique_specs.append(s)
-
-    out = df.copy()
-    for s in unique_specs:
-        out = compute_indicator(out, s)
-    return out
+    return IndicatorPipeline(specs).run(df)
 
 
 def last_values(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
@@ -292,6 +596,7 @@ def add_all_indicators(df: pd.DataFrame, close_col: str = 'close',
         rsi_style: RSI计算风格
             - 'international': 国际标准（RSI14，使用EMA）
             - 'china': 中国风格（RSI6/12/24 + RSI14，使用中国式SMA）
+            - 'sma': RSI14，使用简单移动平均
 
     Returns:
         添加了技术指标列的DataFrame（原地修改）
@@ -317,37 +622,43 @@ def add_all_indicators(df: pd.DataFrame, close_col: str = 'close',
     if close_col not in df.columns:
         raise ValueError(f"DataFrame缺少收盘价列: {close_col}")
 
-    # 计算移动平均线（MA5, MA10, MA20, MA60）
-    df['ma5'] = ma(df[close_col], 5, min_periods=1)
-    df['ma10'] = ma(df[close_col], 10, min_periods=1)
-    df['ma20'] = ma(df[close_col], 20, min_periods=1)
-    df['ma60'] = ma(df[close_col], 60, min_periods=1)
+    return _all_indicators_pipeline(rsi_style).apply(df, close_col=close_col, high_col=high_col, low_col=low_col)
+
+
+def _all_indicators_pipeline(rsi_style: str) -> IndicatorPipeline:
+    # 移动平均线（MA5, MA10, MA20, MA60）
+    outputs: List[_Output] = [(f"ma{n}", (lambda n: lambda s: s.rolling_mean(n, 1))(n)) for n in (5, 10, 20, 60)]
 
-    # 计算RSI指标
+    # RSI指标
     if rsi_style == 'china':
         # 中国风格：RSI6, RSI12, RSI24（使用中国式SMA）
-        df['rsi6'] = rsi(df[close_col], 6, method='china')
-        df['rsi12'] = rsi(df[close_col], 12, method='china')
-        df['rsi24'] = rsi(df[close_col], 24, method='china')
-        # 保留RSI14作为国际标准参考（使用简单移动平均）
-        df['rsi14'] = rsi(df[close_col], 14, method='sma')
-        # 为了兼容性，也添加 'rsi' 列（指向 rsi12）
-        df['rsi'] = df['rsi12']
+        outputs += [
+            ('rsi6', lambda s: s.rsi(6, 'china')),
+            ('rsi12', lambda s: s.rsi(12, 'china')),
+            ('rsi24', lambda s: s.rsi(24, 'china')),
+            # 保留RSI14作为国际标准参考（使用简单移动平均）
+            ('rsi14', lambda s: s.rsi(14, 'sma')),
+            # 为了兼容性，也添加 'rsi' 列（指向 rsi12）
+            ('rsi', lambda s: s.rsi(12, 'china')),
+        ]
+    elif rsi_style == 'sma':
+        # RSI14（简单移动平均）
+        outputs.append(('rsi', lambda s: s.rsi(14, 'sma')))
     else:
         # 国际标准：RSI14（使用EMA）
-        df['rsi'] = rsi(df[close_col], 14, method='ema')
-
-    # 计算MACD
-    macd_df = macd(df[close_col], fast=12, slow=26, signal=9)
-    df['macd_dif'] = macd_df['dif']
-    df['macd_dea'] = macd_df['dea']
-    df['macd'] = macd_df['macd_hist'] * 2  # 注意：这里乘以2是为了与通达信/同花顺保持一致
-
-    # 计算布林带（20日，2倍标准差）
-    boll_df = boll(df[close_col], n=20, k=2.0, min_periods=1)
-    df['boll_mid'] = boll_df['boll_mid']
-    df['boll_upper'] = boll_df['boll_upper']
-    df['boll_lower'] = boll_df['boll_lower']
-
-    return df
-
+        outputs.append(('rsi', lambda s: s.rsi(14, 'ema')))
+
+    # MACD（柱状图乘以2是为了与通达信/同花顺保持一致）
+    outputs += [
+        ('macd_dif', lambda s: s.macd(12, 26, 9)[0]),
+        ('macd_dea', lambda s: s.macd(12, 26, 9)[1]),
+        ('macd', lambda s: (s.macd(12, 26, 9)[0] - s.macd(12, 26, 9)[1]) * 2),
+    ]
+
+    # 布林带（20日，2倍标准差，与 MA20 共用滚动窗口）
+    outputs += [
+        ('boll_mid', lambda s: s.rolling_mean(20, 1)),
+        ('boll_upper', lambda s: s.rolling_mean(20, 1) + 2.0 * s.rolling_std(20, 1)),
+        ('boll_lower', lambda s: s.rolling_mean(20, 1) - 2.0 * s.rolling_std(20, 1)),
+    ]
+    return IndicatorPipeline(outputs=outputs, required=['close'])
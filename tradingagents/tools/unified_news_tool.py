@@ -452,7 +452,14 @@ def create_unified_news_tool(toolkit):
         """
         if not stock_code:
             return "❌ 错误: 未提供股票代码"
-        
+
+        # 任务开始时已预取的新闻直接返回
+        from tradingagents.agents.utils.data_prefetch import lookup_prefetched
+        prefetched = lookup_prefetched("get_stock_news_unified",
+                                       {"stock_code": stock_code, "max_news": max_news, "model_info": model_info})
+        if prefetched is not None:
+            return prefetched
+
         return analyzer.get_stock_news_unified(stock_code, max_news, model_info)
     
     # 设置工具属性
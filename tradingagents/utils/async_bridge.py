@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+同步 → 异步调用桥（进程级常驻事件循环）
+
+LangGraph 工具、数据源管理器等同步代码经常需要调用异步的 Provider 方法。
+原先的做法是每次调用新建线程 + asyncio.run()（或新建事件循环），
+每次都要付出线程创建、事件循环初始化以及重建 Motor/Redis/HTTP 客户端状态的开销。
+
+本模块维护一个后台线程中常驻运行的事件循环，同步代码通过
+run_coroutine_threadsafe 提交协程并等待结果：
+- 事件循环与其上的连接池在多次调用间复用；
+- 支持超时（超时后取消协程）与调用方中断时的取消；
+- 统计桥接调用次数，便于观察同步→异步桥接的频率。
+
+用法：
+    from tradingagents.utils.async_bridge import run_coro_sync
+    data = run_coro_sync(provider.get_historical_data(symbol, start, end), timeout=60)
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional
+
+from tradingagents.utils.logging_manager import get_logger
+
+logger = get_logger('agents')
+
+
+class AsyncBridge:
+    """在后台线程常驻一个事件循环，供同步代码提交协程"""
+
+    def __init__(self, name: str = "async-bridge"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "calls": 0,              # 桥接调用总数
+            "from_running_loop": 0,  # 调用方线程中有正在运行的事件循环
+            "from_sync": 0,          # 调用方为纯同步上下文
+            "nested": 0,             # 在桥接循环内部再次同步调用（回退为临时线程）
+            "timeouts": 0,
+            "cancelled": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "total_seconds": 0.0,
+            "loop_starts": 0,
+        }
+
+    # ---- 事件循环生命周期 ----
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        loop = self._loop
+        if loop is not None and loop.is_running() and self._thread is not None and self._thread.is_alive():
+            return loop
+        with self._lock:
+            if self._loop is not None and self._loop.is_running() and self._thread.is_alive():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                try:
+                    loop.run_forever()
+                finally:
+                    try:
+                        loop.run_until_complete(loop.shutdown_asyncgens())
+                    finally:
+                        loop.close()
+
+            thread = threading.Thread(target=run, name=self.name, daemon=True)
+            thread.start()
+            started.wait()
+            self._loop, self._thread = loop, thread
+            self._bump("loop_starts")
+            logger.debug(f"🔁 [AsyncBridge] 后台事件循环已启动: {self.name}")
+            return loop
+
+    def in_bridge_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def shutdown(self, timeout: float = 5.0):
+        """停止后台事件循环（进程退出时自动调用）"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None or not loop.is_running():
+            return
+
+        async def cancel_pending():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_pending(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    # ---- 提交协程 ----
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        在后台事件循环中执行协程并同步等待结果
+
+        Args:
+            coro: 协程对象
+            timeout: 超时秒数，None 表示不限；超时后协程被取消并抛出 TimeoutError
+
+        Returns:
+            协程返回值（协程抛出的异常原样抛出）
+        """
+        try:
+            asyncio.get_running_loop()
+            self._bump("from_running_loop")
+        except RuntimeError:
+            self._bump("from_sync")
+        self._bump("calls")
+
+        if self.in_bridge_thread():
+            # 协程内部又同步调用了桥接：不能阻塞自身所在的循环，回退到临时线程
+            self._bump("nested")
+            return self._run_in_temp_thread(coro, timeout)
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        started = time.monotonic()
+        with self._stats_lock:
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self._bump("timeouts")
+            raise TimeoutError(f"异步调用超时（{timeout}s）")
+        except concurrent.futures.CancelledError:
+            self._bump("cancelled")
+            raise
+        except BaseException as e:
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                # 调用方被中断：取消仍在后台执行的协程
+                future.cancel()
+                self._bump("cancelled")
+            else:
+                self._bump("errors")
+            raise
+        finally:
+            with self._stats_lock:
+                self._stats["in_flight"] -= 1
+                self._stats["total_seconds"] += time.monotonic() - started
+
+    @staticmethod
+    def _run_in_temp_thread(coro: Awaitable[Any], timeout: Optional[float]) -> Any:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
+            return ex.submit(asyncio.run, asyncio.wait_for(coro, timeout)).result()
+
+    # ---- 统计 ----
+    def _bump(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["total_seconds"] = round(stats["total_seconds"], 3)
+        stats["loop_running"] = self._loop is not None and self._loop.is_running()
+        return stats
+
+
+_bridge: Optional[AsyncBridge] = None
+_bridge_lock = threading.Lock()
+
+
+def get_async_bridge() -> AsyncBridge:
+    """获取进程级 AsyncBridge 单例"""
+    global _bridge
+    if _bridge is None:
+        with _bridge_lock:
+            if _bridge is None:
+                _bridge = AsyncBridge("tradingagents-async-bridge")
+                atexit.register(_bridge.shutdown)
+    return _bridge
+
+
+def run_coro_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """在同步上下文中执行协程（经由进程级常驻事件循环）"""
+    return get_async_bridge().run(coro, timeout=timeout)
+
+
+def get_async_bridge_stats() -> Dict[str, Any]:
+    """获取同步→异步桥接统计"""
+    return get_async_bridge().stats()
@@ -1,20 +1,58 @@
 """
 增强新闻过滤器 - 集成本地小模型和规则过滤
 支持多种过滤策略：规则过滤、语义相似度、本地分类模型
+
+整表过滤时一次性打分：文本分批编码，语义相似度为归一化矩阵与全部公司向量的一次矩阵乘法，
+分类模型按批推理。新闻向量按内容哈希写入共享的 embedding 缓存，换一只股票重新过滤同一批新闻
+时不再重复编码；语义模型在进程内只加载一次。
 """
 
 import pandas as pd
 import re
 import logging
-from typing import List, Dict, Tuple, Optional
+import threading
+from typing import Any, List, Dict, Sequence, Tuple, Optional
 from datetime import datetime
 import numpy as np
 
 # 导入基础过滤器
 from .news_filter import NewsRelevanceFilter, create_news_filter, get_company_name
+from tradingagents.agents.utils.embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
+SEMANTIC_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"  # 支持中文的轻量级模型
+ENCODE_BATCH_SIZE = 64
+CLASSIFY_BATCH_SIZE = 16
+
+# 综合评分权重
+SCORE_WEIGHTS = {
+    'rule': 0.4,      # 规则过滤权重40%
+    'semantic': 0.35,  # 语义相似度权重35%
+    'classification': 0.25  # 分类模型权重25%
+}
+
+_sentence_models: Dict[str, Any] = {}
+_sentence_models_lock = threading.Lock()
+
+
+def _load_sentence_model(model_name: str):
+    """进程内共享的 SentenceTransformer 实例（每只股票新建过滤器时不再重复加载）"""
+    model = _sentence_models.get(model_name)
+    if model is None:
+        with _sentence_models_lock:
+            model = _sentence_models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+                _sentence_models[model_name] = model
+    return model
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
 class EnhancedNewsFilter(NewsRelevanceFilter):
     """增强新闻过滤器，集成本地模型和多种过滤策略"""
     
@@ -34,7 +72,8 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         
         # 语义模型相关
         self.sentence_model = None
-        self.company_embedding = None
+        self.semantic_model_name = SEMANTIC_MODEL_NAME
+        self.company_embedding = None  # 行归一化后的公司相关文本向量 (k, d)
         
         # 本地分类模型相关
         self.classification_model = None
@@ -53,11 +92,9 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             
             # 尝试使用sentence-transformers
             try:
-                from sentence_transformers import SentenceTransformer
-                
                 # 使用轻量级中文模型
-                model_name = "paraphrase-multilingual-MiniLM-L12-v2"  # 支持中文的轻量级模型
-                self.sentence_model = SentenceTransformer(model_name)
+                model_name = self.semantic_model_name
+                self.sentence_model = _load_sentence_model(model_name)
                 
                 # 预计算公司相关的embedding
                 company_texts = [
@@ -69,7 +106,7 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
                     f"{self.company_name}财报"
                 ]
                 
-                self.company_embedding = self.sentence_model.encode(company_texts)
+                self.company_embedding = _normalize_rows(self.encode_texts(company_texts))
                 logger.info(f"[增强过滤器] ✅ 语义模型加载成功: {model_name}")
                 
             except ImportError:
@@ -106,6 +143,85 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             logger.error(f"[增强过滤器] 本地分类模型初始化失败: {e}")
             self.use_local_model = False
     
+    def encode_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        批量编码文本，命中 embedding 缓存的文本不再送入模型
+
+        Returns:
+            np.ndarray: (len(texts), d) 的 float32 矩阵
+        """
+        cache = get_embedding_cache()
+        cache_model = f"sentence-transformers/{self.semantic_model_name}"
+        vectors = cache.get_many(cache_model, texts) if cache is not None else {}
+
+        missing = [t for t in dict.fromkeys(texts) if t not in vectors]
+        if missing:
+            encoded = self.sentence_model.encode(missing, batch_size=ENCODE_BATCH_SIZE, show_progress_bar=False)
+            fresh = {text: np.asarray(vector, dtype=np.float32) for text, vector in zip(missing, encoded)}
+            if cache is not None:
+                cache.put_many(cache_model, fresh)
+            vectors.update(fresh)
+            logger.debug(f"[增强过滤器] 编码 {len(missing)} 条文本，缓存命中 {len(texts) - len(missing)} 条")
+
+        return np.asarray([vectors[t] for t in texts], dtype=np.float32)
+
+    def semantic_scores(self, titles: Sequence[str], contents: Sequence[str]) -> np.ndarray:
+        """
+        批量计算语义相似度评分（与公司相关文本的最大余弦相似度）
+
+        Returns:
+            np.ndarray: 每条新闻的评分 (0-100)
+        """
+        if not self.use_semantic or self.sentence_model is None or not len(titles):
+            return np.zeros(len(titles))
+
+        try:
+            # 组合标题和内容的前200字符
+            texts = [f"{title} {content[:200]}" for title, content in zip(titles, contents)]
+            similarities = _normalize_rows(self.encode_texts(texts)) @ self.company_embedding.T
+            # 取最高相似度，转换为0-100评分
+            return np.clip(similarities.max(axis=1) * 100, 0, 100).astype(float)
+        except Exception as e:
+            logger.error(f"[增强过滤器] 语义相似度计算失败: {e}")
+            return np.zeros(len(titles))
+
+    def classification_scores(self, titles: Sequence[str], contents: Sequence[str]) -> np.ndarray:
+        """
+        使用本地模型批量分类新闻相关性
+
+        Returns:
+            np.ndarray: 每条新闻的分类相关性评分 (0-100)
+        """
+        if not self.use_local_model or self.classification_model is None or not len(titles):
+            return np.zeros(len(titles))
+
+        try:
+            import torch
+
+            # 添加公司信息作为上下文，内容取前300字符
+            texts = [f"关于{self.company_name}({self.stock_code})的新闻: {title} {content[:300]}"
+                     for title, content in zip(titles, contents)]
+
+            scores = []
+            for start in range(0, len(texts), CLASSIFY_BATCH_SIZE):
+                inputs = self.tokenizer(
+                    texts[start:start + CLASSIFY_BATCH_SIZE],
+                    return_tensors="pt",
+                    truncation=True,
+                    padding=True,
+                    max_length=512
+                )
+                with torch.no_grad():
+                    probabilities = torch.softmax(self.classification_model(**inputs).logits, dim=-1)
+                # 假设第一个类别是"相关"，第二个是"不相关"
+                # 这里需要根据具体模型调整
+                scores.extend((probabilities[:, 0] * 100).tolist())
+            return np.asarray(scores, dtype=float)
+
+        except Exception as e:
+            logger.error(f"[增强过滤器] 本地模型分类失败: {e}")
+            return np.zeros(len(titles))
+
     def calculate_semantic_similarity(self, title: str, content: str) -> float:
         """
         计算语义相似度评分
@@ -117,36 +233,9 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         Returns:
             float: 语义相似度评分 (0-100)
         """
-        if not self.use_semantic or self.sentence_model is None:
-            return 0
-        
-        try:
-            # 组合标题和内容的前200字符
-            text = f"{title} {content[:200]}"
-            
-            # 计算文本embedding
-            text_embedding = self.sentence_model.encode([text])
-            
-            # 计算与公司相关文本的相似度
-            similarities = []
-            for company_emb in self.company_embedding:
-                similarity = np.dot(text_embedding[0], company_emb) / (
-                    np.linalg.norm(text_embedding[0]) * np.linalg.norm(company_emb)
-                )
-                similarities.append(similarity)
-            
-            # 取最高相似度
-            max_similarity = max(similarities)
-            
-            # 转换为0-100评分
-            semantic_score = max(0, min(100, max_similarity * 100))
-            
-            logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
-            return semantic_score
-            
-        except Exception as e:
-            logger.error(f"[增强过滤器] 语义相似度计算失败: {e}")
-            return 0
+        semantic_score = float(self.semantic_scores([title], [content])[0])
+        logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
+        return semantic_score
     
     def classify_news_relevance(self, title: str, content: str) -> float:
         """
@@ -159,48 +248,32 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         Returns:
             float: 分类相关性评分 (0-100)
         """
-        if not self.use_local_model or self.classification_model is None:
-            return 0
-        
-        try:
-            import torch
-            
-            # 构建分类文本
-            text = f"{title} {content[:300]}"
-            
-            # 添加公司信息作为上下文
-            context_text = f"关于{self.company_name}({self.stock_code})的新闻: {text}"
-            
-            # 分词和编码
-            inputs = self.tokenizer(
-                context_text,
-                return_tensors="pt",
-                truncation=True,
-                padding=True,
-                max_length=512
-            )
-            
-            # 模型推理
-            with torch.no_grad():
-                outputs = self.classification_model(**inputs)
-                logits = outputs.logits
-                
-                # 使用softmax获取概率分布
-                probabilities = torch.softmax(logits, dim=-1)
-                
-                # 假设第一个类别是"相关"，第二个是"不相关"
-                # 这里需要根据具体模型调整
-                relevance_prob = probabilities[0][0].item()  # 相关性概率
-                
-                # 转换为0-100评分
-                classification_score = relevance_prob * 100
-                
-                logger.debug(f"[增强过滤器] 分类模型评分: {classification_score:.1f}")
-                return classification_score
-                
-        except Exception as e:
-            logger.error(f"[增强过滤器] 本地模型分类失败: {e}")
-            return 0
+        classification_score = float(self.classification_scores([title], [content])[0])
+        logger.debug(f"[增强过滤器] 分类模型评分: {classification_score:.1f}")
+        return classification_score
+
+    def score_news_batch(self, titles: Sequence[str], contents: Sequence[str]) -> pd.DataFrame:
+        """
+        批量计算增强相关性评分
+
+        Returns:
+            pd.DataFrame: rule_score/semantic_score/classification_score/final_score 四列，与输入一一对应
+        """
+        rule = np.asarray([self.calculate_relevance_score(t, c) for t, c in zip(titles, contents)], dtype=float)
+        semantic = self.semantic_scores(titles, contents)
+        classification = self.classification_scores(titles, contents)
+
+        # 综合评分（加权平均）
+        final = (SCORE_WEIGHTS['rule'] * rule +
+                 SCORE_WEIGHTS['semantic'] * semantic +
+                 SCORE_WEIGHTS['classification'] * classification)
+
+        return pd.DataFrame({
+            'rule_score': rule,
+            'semantic_score': semantic,
+            'classification_score': classification,
+            'final_score': final,
+        })
     
     def calculate_enhanced_relevance_score(self, title: str, content: str) -> Dict[str, float]:
         """
@@ -213,43 +286,10 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         Returns:
             Dict: 包含各种评分的字典
         """
-        scores = {}
-        
-        # 1. 基础规则评分
-        rule_score = super().calculate_relevance_score(title, content)
-        scores['rule_score'] = rule_score
+        scores = {k: float(v) for k, v in self.score_news_batch([title], [content]).iloc[0].items()}
         
-        # 2. 语义相似度评分
-        if self.use_semantic:
-            semantic_score = self.calculate_semantic_similarity(title, content)
-            scores['semantic_score'] = semantic_score
-        else:
-            scores['semantic_score'] = 0
-        
-        # 3. 本地模型分类评分
-        if self.use_local_model:
-            classification_score = self.classify_news_relevance(title, content)
-            scores['classification_score'] = classification_score
-        else:
-            scores['classification_score'] = 0
-        
-        # 4. 综合评分（加权平均）
-        weights = {
-            'rule': 0.4,      # 规则过滤权重40%
-            'semantic': 0.35,  # 语义相似度权重35%
-            'classification': 0.25  # 分类模型权重25%
-        }
-        
-        final_score = (
-            weights['rule'] * rule_score +
-            weights['semantic'] * scores['semantic_score'] +
-            weights['classification'] * scores['classification_score']
-        )
-        
-        scores['final_score'] = final_score
-        
-        logger.debug(f"[增强过滤器] 综合评分 - 规则:{rule_score:.1f}, 语义:{scores['semantic_score']:.1f}, "
-                    f"分类:{scores['classification_score']:.1f}, 最终:{final_score:.1f}")
+        logger.debug(f"[增强过滤器] 综合评分 - 规则:{scores['rule_score']:.1f}, 语义:{scores['semantic_score']:.1f}, "
+                    f"分类:{scores['classification_score']:.1f}, 最终:{scores['final_score']:.1f}")
         
         return scores
     
@@ -270,27 +310,20 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         
         logger.info(f"[增强过滤器] 开始增强过滤，原始数量: {len(news_df)}条，最低评分阈值: {min_score}")
         
-        filtered_news = []
-        
-        for idx, row in news_df.iterrows():
-            title = row.get('新闻标题', row.get('标题', ''))
-            content = row.get('新闻内容', row.get('内容', ''))
-            
-            # 计算增强评分
-            scores = self.calculate_enhanced_relevance_score(title, content)
-            
-            if scores['final_score'] >= min_score:
-                row_dict = row.to_dict()
-                row_dict.update(scores)  # 添加所有评分信息
-                filtered_news.append(row_dict)
-                
-                logger.debug(f"[增强过滤器] 保留新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
-            else:
-                logger.debug(f"[增强过滤器] 过滤新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
+        titles = self._text_column(news_df, '新闻标题', '标题')
+        contents = self._text_column(news_df, '新闻内容', '内容')
+
+        # 整表一次性计算增强评分
+        scores = self.score_news_batch(titles, contents)
+        keep = (scores['final_score'] >= min_score).to_numpy()
+        logger.debug(f"[增强过滤器] 保留 {int(keep.sum())}条，过滤 {int((~keep).sum())}条")
         
         # 创建过滤后的DataFrame
-        if filtered_news:
-            filtered_df = pd.DataFrame(filtered_news)
+        if keep.any():
+            filtered_df = news_df.reset_index(drop=True)[keep].copy()
+            for column in scores.columns:  # 添加所有评分信息
+                filtered_df[column] = scores[column].to_numpy()[keep]
+            filtered_df = filtered_df.reset_index(drop=True)
             # 按综合评分排序
             filtered_df = filtered_df.sort_values('final_score', ascending=False)
             logger.info(f"[增强过滤器] 增强过滤完成，保留 {len(filtered_df)}条 新闻")
@@ -300,6 +333,14 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             
         return filtered_df
 
+    @staticmethod
+    def _text_column(news_df: pd.DataFrame, *candidates: str) -> List[str]:
+        """按候选列名取文本列，缺失值视为空字符串"""
+        for column in candidates:
+            if column in news_df.columns:
+                return news_df[column].fillna('').astype(str).tolist()
+        return [''] * len(news_df)
+
 
 def create_enhanced_news_filter(ticker: str, use_semantic: bool = True, use_local_model: bool = False) -> EnhancedNewsFilter:
     """